@@ -0,0 +1,122 @@
+"""
+Migration: Schema inicial (users, consultas, triagens) anterior às migrations 001+
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "000_base"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# O SQLAlchemy grava o nome do membro do enum
+_ROLES = [
+    "ADMIN", "SUPERVISOR", "DOCTOR", "NURSE", "RECEPTIONIST", "PHYSIOTHERAPIST", "NUTRITIONIST",
+    "PSYCHOLOGIST", "SPEECH_THERAPIST", "ACUPUNCTURIST", "CLINICAL_PSYPEDAGOGIST", "HAIRDRESSER",
+    "CAREGIVER", "PATIENT",
+]
+_STATUS = ["AGUARDANDO", "EM_TRIAGEM", "AGUARDANDO_MEDICO", "EM_ATENDIMENTO", "FINALIZADA", "CANCELADA"]
+_URGENCIA = ["BAIXA", "MEDIA", "ALTA", "CRITICA"]
+
+
+def upgrade() -> None:
+    """Criar as tabelas base como estavam antes da migration 001.
+
+    Tabelas já existentes (criadas pelo create_all antigo) são mantidas.
+    """
+    inspetor = sa.inspect(op.get_bind())
+    urgencia = sa.Enum(*_URGENCIA, name="classificacaourgencia")
+
+    if not inspetor.has_table("users"):
+        _criar_users()
+    if not inspetor.has_table("consultas"):
+        _criar_consultas(urgencia)
+    if not inspetor.has_table("triagens"):
+        _criar_triagens(urgencia)
+
+
+def _criar_users() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(255), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("senha_hash", sa.String(255), nullable=False),
+        sa.Column("role", sa.Enum(*_ROLES, name="userrole"), nullable=False),
+        sa.Column("telefone", sa.String(20), nullable=True),
+        sa.Column("cpf", sa.String(14), nullable=True),
+        sa.Column("data_nascimento", sa.DateTime(), nullable=True),
+        sa.Column("ativo", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_cpf", "users", ["cpf"], unique=True)
+
+
+def _criar_consultas(urgencia) -> None:
+    op.create_table(
+        "consultas",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("paciente_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("enfermeira_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("medico_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("tipo", sa.Enum("URGENTE", "AGENDADA", name="consultatipo"), nullable=False),
+        sa.Column("status", sa.Enum(*_STATUS, name="consultastatus"), nullable=True),
+        sa.Column("classificacao_urgencia", urgencia, nullable=True),
+        sa.Column("data_agendamento", sa.DateTime(), nullable=True),
+        sa.Column("data_inicio", sa.DateTime(), nullable=True),
+        sa.Column("data_fim", sa.DateTime(), nullable=True),
+        sa.Column("duracao_minutos", sa.Integer(), nullable=True),
+        sa.Column("zoom_meeting_id", sa.String(255), nullable=True, unique=True),
+        sa.Column("zoom_join_url", sa.String(512), nullable=True),
+        sa.Column("zoom_start_url", sa.String(512), nullable=True),
+        sa.Column("zoom_password", sa.String(50), nullable=True),
+        sa.Column("observacoes", sa.Text(), nullable=True),
+        sa.Column("diagnostico", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_consultas_id", "consultas", ["id"])
+
+
+def _criar_triagens(urgencia) -> None:
+    op.create_table(
+        "triagens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("consulta_id", sa.Integer(), sa.ForeignKey("consultas.id"), nullable=False),
+        sa.Column("paciente_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("sintomas", sa.Text(), nullable=False),
+        sa.Column("temperatura", sa.String(10), nullable=True),
+        sa.Column("pressao_arterial", sa.String(20), nullable=True),
+        sa.Column("frequencia_cardiaca", sa.String(10), nullable=True),
+        sa.Column("saturacao_oxigenio", sa.String(10), nullable=True),
+        sa.Column("dor_escala", sa.Integer(), nullable=True),
+        sa.Column("historico_medico", sa.Text(), nullable=True),
+        sa.Column("medicamentos_uso", sa.Text(), nullable=True),
+        sa.Column("alergias", sa.Text(), nullable=True),
+        sa.Column("classificacao_automatica", urgencia, nullable=True),
+        sa.Column("classificacao_enfermeira", urgencia, nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_triagens_id", "triagens", ["id"])
+
+
+def downgrade() -> None:
+    """Remover as tabelas base."""
+    op.drop_index("ix_triagens_id", table_name="triagens")
+    op.drop_table("triagens")
+    op.drop_index("ix_consultas_id", table_name="consultas")
+    op.drop_table("consultas")
+    op.drop_index("ix_users_cpf", table_name="users")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
+    if op.get_bind().dialect.name == "postgresql":
+        for nome in ("classificacaourgencia", "consultastatus", "consultatipo", "userrole"):
+            op.execute(f"DROP TYPE IF EXISTS {nome}")
@@ -9,7 +9,7 @@ from sqlalchemy.dialects import mysql
 
 # revision identifiers, used by Alembic
 revision = '001'
-down_revision = None
+down_revision = "000_base"
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,54 @@
+"""
+Migration: Adicionar tabelas de arquivos com deduplicação por conteúdo
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "003_add_arquivos"
+down_revision = "002_add_availability_fields"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Criar tabelas arquivo_blobs (conteúdo) e arquivos (uploads)."""
+    op.create_table(
+        "arquivo_blobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("storage_key", sa.String(512), nullable=False),
+        sa.Column("content_type", sa.String(100), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_arquivo_blobs_id", "arquivo_blobs", ["id"])
+    op.create_index("ix_arquivo_blobs_sha256", "arquivo_blobs", ["sha256"], unique=True)
+
+    op.create_table(
+        "arquivos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("blob_id", sa.Integer(), sa.ForeignKey("arquivo_blobs.id"), nullable=False),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("uploaded_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("original_name", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_arquivos_id", "arquivos", ["id"])
+    op.create_index("ix_arquivos_blob_id", "arquivos", ["blob_id"])
+    op.create_index("ix_arquivos_patient_id", "arquivos", ["patient_id"])
+
+
+def downgrade() -> None:
+    """Remover tabelas de arquivos."""
+    op.drop_index("ix_arquivos_patient_id", table_name="arquivos")
+    op.drop_index("ix_arquivos_blob_id", table_name="arquivos")
+    op.drop_index("ix_arquivos_id", table_name="arquivos")
+    op.drop_table("arquivos")
+
+    op.drop_index("ix_arquivo_blobs_sha256", table_name="arquivo_blobs")
+    op.drop_index("ix_arquivo_blobs_id", table_name="arquivo_blobs")
+    op.drop_table("arquivo_blobs")
@@ -0,0 +1,30 @@
+"""
+Migration: Adicionar campos de miniatura/pré-visualização aos blobs de arquivos
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "004_add_arquivo_previews"
+down_revision = "003_add_arquivos"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Adicionar status e chaves dos derivados na tabela arquivo_blobs."""
+    op.add_column(
+        "arquivo_blobs",
+        sa.Column("preview_status", sa.String(13), nullable=False, server_default="pendente"),
+    )
+    op.add_column("arquivo_blobs", sa.Column("thumbnail_key", sa.String(512), nullable=True))
+    op.add_column("arquivo_blobs", sa.Column("preview_key", sa.String(512), nullable=True))
+
+
+def downgrade() -> None:
+    """Remover campos de pré-visualização."""
+    op.drop_column("arquivo_blobs", "preview_key")
+    op.drop_column("arquivo_blobs", "thumbnail_key")
+    op.drop_column("arquivo_blobs", "preview_status")
@@ -0,0 +1,180 @@
+"""
+Migration: Adicionar sinais vitais numéricos à triagem (com backfill em lotes)
+Criada: 19/10/2026
+"""
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "005_add_triagem_sinais_vitais"
+down_revision = "004_add_arquivo_previews"
+branch_labels = None
+depends_on = None
+
+# Linhas por lote do backfill (cada lote é confirmado isoladamente)
+BACKFILL_CHUNK_SIZE = 1000
+
+INDEXES = {
+    "ix_triagens_saturacao_created": ["saturacao_oxigenio_pct", "created_at"],
+    "ix_triagens_temperatura_created": ["temperatura_c", "created_at"],
+    "ix_triagens_fc_created": ["frequencia_cardiaca_bpm", "created_at"],
+    "ix_triagens_sistolica_created": ["pressao_sistolica_mmhg", "created_at"],
+}
+
+# Cópia congelada das regras de app/services/sinais_vitais.py nesta revisão:
+# a migração não importa código da aplicação, que pode mudar depois
+_NUMERO_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_FAHRENHEIT_RE = re.compile(r"\d\s*[°º]?\s*F\b", re.IGNORECASE)
+_PRESSAO_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:/|x|X|por)\s*(\d+(?:[.,]\d+)?)")
+
+TEMPERATURA_FAIXA = (25.0, 45.0)
+FREQUENCIA_CARDIACA_FAIXA = (20, 300)
+SATURACAO_FAIXA = (30, 100)
+SISTOLICA_FAIXA = (40, 300)
+DIASTOLICA_FAIXA = (20, 200)
+
+
+def _numero(valor):
+    if not valor:
+        return None
+    match = _NUMERO_RE.search(valor)
+    if not match:
+        return None
+    return float(match.group(0).replace(",", "."))
+
+
+def _na_faixa(valor, faixa):
+    return valor is not None and faixa[0] <= valor <= faixa[1]
+
+
+def parse_temperatura(valor):
+    temp = _numero(valor)
+    if temp is None:
+        return None
+    if _FAHRENHEIT_RE.search(valor) or temp > TEMPERATURA_FAIXA[1]:
+        temp = (temp - 32) * 5 / 9
+    temp = round(temp, 1)
+    return temp if _na_faixa(temp, TEMPERATURA_FAIXA) else None
+
+
+def parse_frequencia_cardiaca(valor):
+    fc = _numero(valor)
+    return int(round(fc)) if _na_faixa(fc, FREQUENCIA_CARDIACA_FAIXA) else None
+
+
+def parse_saturacao(valor):
+    sat = _numero(valor)
+    return int(round(sat)) if _na_faixa(sat, SATURACAO_FAIXA) else None
+
+
+def parse_pressao_arterial(valor):
+    if not valor:
+        return None, None
+    match = _PRESSAO_RE.search(valor)
+    if not match:
+        return None, None
+    sistolica, diastolica = (float(g.replace(",", ".")) for g in match.groups())
+    if sistolica < 30 and diastolica < 30:
+        sistolica, diastolica = sistolica * 10, diastolica * 10
+    if not (_na_faixa(sistolica, SISTOLICA_FAIXA) and _na_faixa(diastolica, DIASTOLICA_FAIXA)):
+        return None, None
+    if diastolica >= sistolica:
+        return None, None
+    return int(round(sistolica)), int(round(diastolica))
+
+
+triagens = sa.table(
+    "triagens",
+    sa.column("id", sa.Integer),
+    sa.column("temperatura", sa.String),
+    sa.column("pressao_arterial", sa.String),
+    sa.column("frequencia_cardiaca", sa.String),
+    sa.column("saturacao_oxigenio", sa.String),
+    sa.column("temperatura_c", sa.Float),
+    sa.column("frequencia_cardiaca_bpm", sa.SmallInteger),
+    sa.column("saturacao_oxigenio_pct", sa.SmallInteger),
+    sa.column("pressao_sistolica_mmhg", sa.SmallInteger),
+    sa.column("pressao_diastolica_mmhg", sa.SmallInteger),
+)
+
+
+def _backfill() -> None:
+    """Percorre a tabela por id (keyset) e grava os valores numéricos em lotes."""
+    bind = op.get_bind()
+    update = (
+        triagens.update()
+        .where(triagens.c.id == sa.bindparam("_id"))
+        .values(
+            temperatura_c=sa.bindparam("_temperatura_c"),
+            frequencia_cardiaca_bpm=sa.bindparam("_fc"),
+            saturacao_oxigenio_pct=sa.bindparam("_sat"),
+            pressao_sistolica_mmhg=sa.bindparam("_sistolica"),
+            pressao_diastolica_mmhg=sa.bindparam("_diastolica"),
+        )
+    )
+
+    ultimo_id = 0
+    total = 0
+    while True:
+        rows = bind.execute(
+            sa.select(
+                triagens.c.id,
+                triagens.c.temperatura,
+                triagens.c.pressao_arterial,
+                triagens.c.frequencia_cardiaca,
+                triagens.c.saturacao_oxigenio,
+            )
+            .where(triagens.c.id > ultimo_id)
+            .order_by(triagens.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        params = []
+        for row in rows:
+            sistolica, diastolica = parse_pressao_arterial(row.pressao_arterial)
+            params.append({
+                "_id": row.id,
+                "_temperatura_c": parse_temperatura(row.temperatura),
+                "_fc": parse_frequencia_cardiaca(row.frequencia_cardiaca),
+                "_sat": parse_saturacao(row.saturacao_oxigenio),
+                "_sistolica": sistolica,
+                "_diastolica": diastolica,
+            })
+        bind.execute(update, params)
+
+        ultimo_id = rows[-1].id
+        total += len(rows)
+        print(f"  triagens: {total} linhas normalizadas (até id {ultimo_id})")
+
+
+def upgrade() -> None:
+    """Adicionar colunas, preencher a partir do texto e criar os índices."""
+    op.add_column("triagens", sa.Column("temperatura_c", sa.Float(), nullable=True))
+    op.add_column("triagens", sa.Column("frequencia_cardiaca_bpm", sa.SmallInteger(), nullable=True))
+    op.add_column("triagens", sa.Column("saturacao_oxigenio_pct", sa.SmallInteger(), nullable=True))
+    op.add_column("triagens", sa.Column("pressao_sistolica_mmhg", sa.SmallInteger(), nullable=True))
+    op.add_column("triagens", sa.Column("pressao_diastolica_mmhg", sa.SmallInteger(), nullable=True))
+
+    # Lotes confirmados um a um: não mantém a tabela inteira bloqueada
+    with op.get_context().autocommit_block():
+        _backfill()
+
+    # Índices criados depois do backfill (mais barato que mantê-los durante)
+    for name, columns in INDEXES.items():
+        op.create_index(name, "triagens", columns)
+
+
+def downgrade() -> None:
+    """Remover índices e colunas numéricas."""
+    for name in INDEXES:
+        op.drop_index(name, table_name="triagens")
+    op.drop_column("triagens", "pressao_diastolica_mmhg")
+    op.drop_column("triagens", "pressao_sistolica_mmhg")
+    op.drop_column("triagens", "saturacao_oxigenio_pct")
+    op.drop_column("triagens", "frequencia_cardiaca_bpm")
+    op.drop_column("triagens", "temperatura_c")
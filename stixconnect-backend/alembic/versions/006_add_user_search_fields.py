@@ -0,0 +1,127 @@
+"""
+Migration: Adicionar campos normalizados de busca aos usuários
+Criada: 19/10/2026
+"""
+
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "006_add_user_search_fields"
+down_revision = "005_add_triagem_sinais_vitais"
+branch_labels = None
+depends_on = None
+
+# Linhas por lote do backfill (cada lote é confirmado isoladamente)
+BACKFILL_CHUNK_SIZE = 1000
+
+# Cópia congelada da normalização de app/models/models.py nesta revisão:
+# a migração não importa código da aplicação, que pode mudar depois
+_PALAVRA_RE = re.compile(r"\w+")
+
+
+def normalizar_nome(nome):
+    if not nome:
+        return None
+    nome = nome.lower()
+    if not nome.isascii():
+        nome = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_PALAVRA_RE.findall(nome)) or None
+
+
+def somente_digitos(valor):
+    if not valor:
+        return None
+    digitos = "".join(c for c in valor if c.isdigit())
+    return digitos or None
+
+
+users = sa.table(
+    "users",
+    sa.column("id", sa.Integer),
+    sa.column("nome", sa.String),
+    sa.column("cpf", sa.String),
+    sa.column("num_prontuario", sa.String),
+    sa.column("nome_busca", sa.String),
+    sa.column("cpf_digitos", sa.String),
+    sa.column("prontuario_digitos", sa.String),
+)
+
+
+def _backfill() -> None:
+    """Percorre a tabela por id (keyset) e grava os campos normalizados em lotes."""
+    bind = op.get_bind()
+    update = (
+        users.update()
+        .where(users.c.id == sa.bindparam("_id"))
+        .values(
+            nome_busca=sa.bindparam("_nome_busca"),
+            cpf_digitos=sa.bindparam("_cpf_digitos"),
+            prontuario_digitos=sa.bindparam("_prontuario_digitos"),
+        )
+    )
+
+    ultimo_id = 0
+    total = 0
+    while True:
+        rows = bind.execute(
+            sa.select(users.c.id, users.c.nome, users.c.cpf, users.c.num_prontuario)
+            .where(users.c.id > ultimo_id)
+            .order_by(users.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        bind.execute(update, [
+            {
+                "_id": row.id,
+                "_nome_busca": normalizar_nome(row.nome),
+                "_cpf_digitos": somente_digitos(row.cpf),
+                "_prontuario_digitos": somente_digitos(row.num_prontuario),
+            }
+            for row in rows
+        ])
+
+        ultimo_id = rows[-1].id
+        total += len(rows)
+        print(f"  users: {total} linhas normalizadas (até id {ultimo_id})")
+
+
+def upgrade() -> None:
+    """Adicionar colunas, preencher a partir dos campos originais e criar os índices."""
+    op.add_column("users", sa.Column("nome_busca", sa.String(255), nullable=True))
+    op.add_column("users", sa.Column("cpf_digitos", sa.String(14), nullable=True))
+    op.add_column("users", sa.Column("prontuario_digitos", sa.String(50), nullable=True))
+
+    with op.get_context().autocommit_block():
+        _backfill()
+
+    op.create_index("ix_users_cpf_digitos", "users", ["cpf_digitos"])
+    op.create_index("ix_users_prontuario_digitos", "users", ["prontuario_digitos"])
+
+    dialeto = op.get_bind().dialect.name
+    if dialeto == "mysql":
+        op.create_index("ix_users_nome_busca", "users", ["nome_busca"], mysql_prefix="FULLTEXT")
+    elif dialeto == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_users_nome_busca", "users", ["nome_busca"],
+            postgresql_using="gin", postgresql_ops={"nome_busca": "gin_trgm_ops"},
+        )
+    else:
+        # SQLite: a busca por nome usa o índice de n-gramas em memória
+        op.create_index("ix_users_nome_busca", "users", ["nome_busca"])
+
+
+def downgrade() -> None:
+    """Remover índices e campos de busca."""
+    op.drop_index("ix_users_nome_busca", table_name="users")
+    op.drop_index("ix_users_prontuario_digitos", table_name="users")
+    op.drop_index("ix_users_cpf_digitos", table_name="users")
+    op.drop_column("users", "prontuario_digitos")
+    op.drop_column("users", "cpf_digitos")
+    op.drop_column("users", "nome_busca")
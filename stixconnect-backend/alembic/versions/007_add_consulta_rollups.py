@@ -0,0 +1,43 @@
+"""
+Migration: Adicionar rollups horários de tempos de consulta
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "007_add_consulta_rollups"
+down_revision = "006_add_user_search_fields"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Criar a tabela de rollups e o índice de consultas por data_fim."""
+    op.create_table(
+        "consulta_rollups_horarios",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("granularidade", sa.String(10), nullable=False),
+        sa.Column("hora", sa.DateTime(), nullable=False),
+        sa.Column("role", sa.String(50), nullable=False),
+        sa.Column("urgencia", sa.String(20), nullable=False),
+        sa.Column("metrica", sa.String(20), nullable=False),
+        sa.Column("quantidade", sa.Integer(), nullable=False),
+        sa.Column("soma", sa.Float(), nullable=False),
+        sa.Column("minimo", sa.Float(), nullable=True),
+        sa.Column("maximo", sa.Float(), nullable=True),
+        sa.Column("sketch", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("granularidade", "hora", "role", "urgencia", "metrica", name="uq_consulta_rollups_hora_dimensoes"),
+    )
+    op.create_index("ix_consulta_rollups_horarios_id", "consulta_rollups_horarios", ["id"])
+    # O job de rollup lê as consultas encerradas por intervalo de data_fim
+    op.create_index("ix_consultas_data_fim", "consultas", ["data_fim"])
+
+
+def downgrade() -> None:
+    """Remover a tabela de rollups e o índice de data_fim."""
+    op.drop_index("ix_consultas_data_fim", table_name="consultas")
+    op.drop_index("ix_consulta_rollups_horarios_id", table_name="consulta_rollups_horarios")
+    op.drop_table("consulta_rollups_horarios")
@@ -0,0 +1,22 @@
+"""
+Migration: Adicionar índice de consultas por status e criação
+Criada: 19/10/2026
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "008_add_consultas_status_index"
+down_revision = "007_add_consulta_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Criar o índice usado pela fila e pelas consultas de estados ativos."""
+    op.create_index("ix_consultas_status_created", "consultas", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    """Remover o índice."""
+    op.drop_index("ix_consultas_status_created", table_name="consultas")
@@ -0,0 +1,85 @@
+"""
+Migration: Adicionar tabelas de arquivo de consultas e triagens
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "009_add_consultas_arquivo"
+down_revision = "008_add_consultas_status_index"
+branch_labels = None
+depends_on = None
+
+# Mesmos tipos das colunas de consultas/triagens (o SQLAlchemy grava o nome do membro)
+consulta_tipo = sa.Enum("URGENTE", "AGENDADA", name="consultatipo")
+consulta_status = sa.Enum(
+    "AGUARDANDO", "EM_TRIAGEM", "AGUARDANDO_MEDICO", "EM_ATENDIMENTO", "FINALIZADA", "CANCELADA",
+    name="consultastatus",
+)
+urgencia = sa.Enum("BAIXA", "MEDIA", "ALTA", "CRITICA", name="classificacaourgencia")
+
+
+def upgrade() -> None:
+    """Criar consultas_arquivo e triagens_arquivo (mesmas colunas e ids das tabelas quentes)."""
+    op.create_table(
+        "consultas_arquivo",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("paciente_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("enfermeira_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("medico_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("tipo", consulta_tipo, nullable=False),
+        sa.Column("status", consulta_status, nullable=True),
+        sa.Column("classificacao_urgencia", urgencia, nullable=True),
+        sa.Column("data_agendamento", sa.DateTime(), nullable=True),
+        sa.Column("data_inicio", sa.DateTime(), nullable=True),
+        sa.Column("data_fim", sa.DateTime(), nullable=True),
+        sa.Column("duracao_minutos", sa.Integer(), nullable=True),
+        sa.Column("zoom_meeting_id", sa.String(255), nullable=True),
+        sa.Column("zoom_join_url", sa.String(512), nullable=True),
+        sa.Column("zoom_start_url", sa.String(512), nullable=True),
+        sa.Column("zoom_password", sa.String(50), nullable=True),
+        sa.Column("observacoes", sa.Text(), nullable=True),
+        sa.Column("diagnostico", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("arquivada_em", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_consultas_arquivo_data_fim", "consultas_arquivo", ["data_fim"])
+    op.create_index("ix_consultas_arquivo_paciente_created", "consultas_arquivo", ["paciente_id", "created_at"])
+
+    op.create_table(
+        "triagens_arquivo",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("consulta_id", sa.Integer(), sa.ForeignKey("consultas_arquivo.id"), nullable=False),
+        sa.Column("paciente_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("sintomas", sa.Text(), nullable=False),
+        sa.Column("temperatura", sa.String(10), nullable=True),
+        sa.Column("pressao_arterial", sa.String(20), nullable=True),
+        sa.Column("frequencia_cardiaca", sa.String(10), nullable=True),
+        sa.Column("saturacao_oxigenio", sa.String(10), nullable=True),
+        sa.Column("dor_escala", sa.Integer(), nullable=True),
+        sa.Column("historico_medico", sa.Text(), nullable=True),
+        sa.Column("medicamentos_uso", sa.Text(), nullable=True),
+        sa.Column("alergias", sa.Text(), nullable=True),
+        sa.Column("temperatura_c", sa.Float(), nullable=True),
+        sa.Column("frequencia_cardiaca_bpm", sa.SmallInteger(), nullable=True),
+        sa.Column("saturacao_oxigenio_pct", sa.SmallInteger(), nullable=True),
+        sa.Column("pressao_sistolica_mmhg", sa.SmallInteger(), nullable=True),
+        sa.Column("pressao_diastolica_mmhg", sa.SmallInteger(), nullable=True),
+        sa.Column("classificacao_automatica", urgencia, nullable=True),
+        sa.Column("classificacao_enfermeira", urgencia, nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_triagens_arquivo_consulta_id", "triagens_arquivo", ["consulta_id"])
+
+
+def downgrade() -> None:
+    """Remover as tabelas de arquivo (as linhas arquivadas são perdidas)."""
+    op.drop_index("ix_triagens_arquivo_consulta_id", table_name="triagens_arquivo")
+    op.drop_table("triagens_arquivo")
+    op.drop_index("ix_consultas_arquivo_paciente_created", table_name="consultas_arquivo")
+    op.drop_index("ix_consultas_arquivo_data_fim", table_name="consultas_arquivo")
+    op.drop_table("consultas_arquivo")
@@ -0,0 +1,41 @@
+"""
+Migration: Adicionar tabela outbox_eventos (transactional outbox)
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "010_add_outbox_eventos"
+down_revision = "009_add_consultas_arquivo"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Criar outbox_eventos e o índice usado pelo dispatcher (estado, disponivel_em)."""
+    op.create_table(
+        "outbox_eventos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tipo", sa.String(64), nullable=False),
+        sa.Column("agregado_id", sa.Integer(), nullable=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("estado", sa.String(16), nullable=False, server_default="pendente"),
+        sa.Column("tentativas", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("entregues", sa.Text(), nullable=True),
+        sa.Column("disponivel_em", sa.DateTime(), nullable=False),
+        sa.Column("reservado_por", sa.String(36), nullable=True),
+        sa.Column("erro", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("processado_em", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_outbox_eventos_id", "outbox_eventos", ["id"])
+    op.create_index("ix_outbox_eventos_estado_disponivel", "outbox_eventos", ["estado", "disponivel_em"])
+
+
+def downgrade() -> None:
+    """Remover outbox_eventos."""
+    op.drop_index("ix_outbox_eventos_estado_disponivel", table_name="outbox_eventos")
+    op.drop_index("ix_outbox_eventos_id", table_name="outbox_eventos")
+    op.drop_table("outbox_eventos")
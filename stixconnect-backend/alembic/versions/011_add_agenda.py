@@ -0,0 +1,62 @@
+"""
+Migration: Adicionar agenda (status AGENDADA, fim do horário reservado e expediente dos profissionais)
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "011_add_agenda"
+down_revision = "010_add_outbox_eventos"
+branch_labels = None
+depends_on = None
+
+# O SQLAlchemy grava o nome do membro do enum
+_STATUS = ["AGUARDANDO", "EM_TRIAGEM", "AGUARDANDO_MEDICO", "EM_ATENDIMENTO", "FINALIZADA", "CANCELADA"]
+status_antigo = sa.Enum(*_STATUS, name="consultastatus")
+status_novo = sa.Enum("AGENDADA", *_STATUS, name="consultastatus")
+
+
+def upgrade() -> None:
+    """Novo valor AGENDADA, data_agendamento_fim, índice da agenda e horarios_trabalho."""
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE consultastatus ADD VALUE IF NOT EXISTS 'AGENDADA'")
+    elif bind.dialect.name == "mysql":
+        for tabela in ("consultas", "consultas_arquivo"):
+            op.alter_column(tabela, "status", existing_type=status_antigo, type_=status_novo, existing_nullable=True)
+
+    op.add_column("consultas", sa.Column("data_agendamento_fim", sa.DateTime(), nullable=True))
+    op.add_column("consultas_arquivo", sa.Column("data_agendamento_fim", sa.DateTime(), nullable=True))
+    op.create_index("ix_consultas_medico_agendamento", "consultas", ["medico_id", "data_agendamento"])
+
+    op.create_table(
+        "horarios_trabalho",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("profissional_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("dia_semana", sa.SmallInteger(), nullable=False),
+        sa.Column("hora_inicio", sa.Time(), nullable=False),
+        sa.Column("hora_fim", sa.Time(), nullable=False),
+        sa.Column("duracao_slot_minutos", sa.SmallInteger(), nullable=False, server_default="30"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_horarios_trabalho_id", "horarios_trabalho", ["id"])
+    op.create_index("ix_horarios_trabalho_profissional_dia", "horarios_trabalho", ["profissional_id", "dia_semana"])
+
+
+def downgrade() -> None:
+    """Remover a agenda. Consultas ainda AGENDADA passam a CANCELADA (no PostgreSQL o valor do enum permanece)."""
+    op.drop_index("ix_horarios_trabalho_profissional_dia", table_name="horarios_trabalho")
+    op.drop_index("ix_horarios_trabalho_id", table_name="horarios_trabalho")
+    op.drop_table("horarios_trabalho")
+
+    op.drop_index("ix_consultas_medico_agendamento", table_name="consultas")
+    op.drop_column("consultas_arquivo", "data_agendamento_fim")
+    op.drop_column("consultas", "data_agendamento_fim")
+
+    op.execute("UPDATE consultas SET status = 'CANCELADA' WHERE status = 'AGENDADA'")
+    if op.get_bind().dialect.name == "mysql":
+        for tabela in ("consultas", "consultas_arquivo"):
+            op.alter_column(tabela, "status", existing_type=status_novo, type_=status_antigo, existing_nullable=True)
@@ -0,0 +1,46 @@
+"""
+Migration: Adicionar tabela notificacoes (fila de SMS)
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "012_add_notificacoes"
+down_revision = "011_add_agenda"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Criar notificacoes e os índices usados pelo dispatcher (estado, disponivel_em) e pela deduplicação."""
+    op.create_table(
+        "notificacoes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("canal", sa.String(16), nullable=False, server_default="sms"),
+        sa.Column("destino", sa.String(20), nullable=False),
+        sa.Column("mensagem", sa.Text(), nullable=False),
+        sa.Column("chave_dedup", sa.String(128), nullable=True),
+        sa.Column("usuario_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("consulta_id", sa.Integer(), nullable=True),
+        sa.Column("estado", sa.String(16), nullable=False, server_default="pendente"),
+        sa.Column("tentativas", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("disponivel_em", sa.DateTime(), nullable=False),
+        sa.Column("reservado_por", sa.String(36), nullable=True),
+        sa.Column("provedor_id", sa.String(64), nullable=True),
+        sa.Column("erro", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("enviada_em", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_notificacoes_id", "notificacoes", ["id"])
+    op.create_index("ix_notificacoes_chave_dedup", "notificacoes", ["chave_dedup"])
+    op.create_index("ix_notificacoes_estado_disponivel", "notificacoes", ["estado", "disponivel_em"])
+
+
+def downgrade() -> None:
+    """Remover notificacoes."""
+    op.drop_index("ix_notificacoes_estado_disponivel", table_name="notificacoes")
+    op.drop_index("ix_notificacoes_chave_dedup", table_name="notificacoes")
+    op.drop_index("ix_notificacoes_id", table_name="notificacoes")
+    op.drop_table("notificacoes")
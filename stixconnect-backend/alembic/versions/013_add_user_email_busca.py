@@ -0,0 +1,26 @@
+"""
+Migration: Adicionar email normalizado (minúsculas) para a busca de usuários
+Criada: 19/10/2026
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "013_add_user_email_busca"
+down_revision = "012_add_notificacoes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Adicionar email_busca, preencher com LOWER(email) e indexar."""
+    op.add_column("users", sa.Column("email_busca", sa.String(255), nullable=True))
+    op.execute("UPDATE users SET email_busca = LOWER(email)")
+    op.create_index("ix_users_email_busca", "users", ["email_busca"])
+
+
+def downgrade() -> None:
+    """Remover índice e coluna."""
+    op.drop_index("ix_users_email_busca", table_name="users")
+    op.drop_column("users", "email_busca")
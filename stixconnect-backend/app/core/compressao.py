@@ -0,0 +1,139 @@
+"""
+Compressão das respostas HTTP (gzip / brotli).
+
+CompressaoMiddleware (ASGI puro) comprime respostas de corpo único cujo tipo
+é textual (JSON, texto, XML, JS, SVG) e cujo tamanho passa de
+COMPRESSAO_MIN_BYTES, escolhendo brotli quando o cliente aceita e o pacote
+`brotli` está instalado, senão gzip. Respostas em streaming (arquivos,
+Range), já codificadas ou sem corpo (204/206/304) passam intactas.
+
+Toda resposta comprimível recebe `Vary: Accept-Encoding`, mesmo quando não é
+comprimida, para que caches intermediários não entreguem a versão errada.
+ETags fortes viram fracas na versão comprimida (os bytes mudam, o conteúdo
+não).
+"""
+
+import gzip
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # dependência opcional
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+# Corpos acima deste tamanho são comprimidos fora do event loop
+COMPRIMIR_EM_THREAD_BYTES = 256 * 1024
+
+
+def escolher_codificacao(accept_encoding: Optional[str]) -> Optional[str]:
+    """"br", "gzip" ou None a partir do Accept-Encoding (respeita q=0)"""
+    aceitas = {}
+    for item in (accept_encoding or "").split(","):
+        partes = [p.strip() for p in item.split(";")]
+        if not partes[0]:
+            continue
+        q = 1.0
+        for parametro in partes[1:]:
+            if parametro.startswith("q="):
+                try:
+                    q = float(parametro[2:])
+                except ValueError:
+                    q = 0.0
+        aceitas[partes[0].lower()] = q
+    curinga = aceitas.get("*", 0.0)
+    if brotli is not None and aceitas.get("br", curinga) > 0:
+        return "br"
+    if aceitas.get("gzip", curinga) > 0:
+        return "gzip"
+    return None
+
+
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=settings.COMPRESSAO_BROTLI_QUALIDADE)
+    return gzip.compress(corpo, compresslevel=settings.COMPRESSAO_GZIP_NIVEL, mtime=0)
+
+
+def _comprimivel(headers: Headers, status: int) -> bool:
+    if status < 200 or status in (204, 206, 304):
+        return False
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    tipo = headers.get("content-type", "")
+    return tipo.startswith(TIPOS_COMPRIMIVEIS)
+
+
+def _adicionar_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif vary.strip() != "*" and "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressaoMiddleware:
+    """Comprime respostas textuais de corpo único acima do limite"""
+
+    def __init__(self, app: ASGIApp, minimo: Optional[int] = None):
+        self.app = app
+        self.minimo = settings.COMPRESSAO_MIN_BYTES if minimo is None else minimo
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacao = escolher_codificacao(Headers(scope=scope).get("accept-encoding"))
+        inicio: Optional[Message] = None
+        decidido = False
+
+        async def send_wrapper(message: Message):
+            nonlocal inicio, decidido
+            if decidido:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            decidido = True
+            if message["type"] != "http.response.body" or inicio is None:
+                if inicio is not None:
+                    await send(inicio)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=list(inicio.get("headers", [])))
+            if not _comprimivel(headers, inicio["status"]):
+                await send(inicio)
+                await send(message)
+                return
+            _adicionar_vary(headers)
+
+            corpo = message.get("body", b"")
+            if codificacao is None or message.get("more_body", False) or len(corpo) < self.minimo:
+                await send({**inicio, "headers": headers.raw})
+                await send(message)
+                return
+
+            if len(corpo) >= COMPRIMIR_EM_THREAD_BYTES:
+                comprimido = await anyio.to_thread.run_sync(comprimir, corpo, codificacao)
+            else:
+                comprimido = comprimir(corpo, codificacao)
+            headers["content-encoding"] = codificacao
+            headers["content-length"] = str(len(comprimido))
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["etag"] = "W/" + etag
+            await send({**inicio, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": comprimido})
+
+        await self.app(scope, receive, send_wrapper)
+
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class Settings(BaseSettings):
     # Database
@@ -9,6 +9,17 @@ class Settings(BaseSettings):
     DB_PASSWORD: Optional[str] = None
     DB_NAME: Optional[str] = None
     DB_PORT: int = 3306
+    # Banco legado para scripts/migrate_data.py (padrão: MySQL montado com DB_*)
+    LEGACY_DATABASE_URL: Optional[str] = None
+    # Réplicas de leitura (get_read_db); vazio = tudo no primário
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_SECONDS: float = 2.0
+    READ_YOUR_WRITES_SECONDS: float = 10.0
+    READ_YOUR_WRITES_REDIS_URL: Optional[str] = None   # marca de escrita compartilhada entre workers
+    # Cria as tabelas que faltam na inicialização; o container desliga e roda
+    # `alembic upgrade head` no entrypoint
+    DB_CREATE_ALL: bool = True
     
     # Zoom API
     ZOOM_ACCOUNT_ID: str = ""
@@ -26,11 +37,128 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_REGION: str = "us-east-1"
     AWS_S3_BUCKET: str = "stixconnect-files"
+
+    # Armazenamento de arquivos: "auto" (S3 se configurado, senão local), "s3", "local" ou "memory"
+    STORAGE_BACKEND: str = "auto"
+    STORAGE_MAX_CONCURRENCY: int = 16
+    UPLOAD_DIR: str = "uploads"
+    UPLOAD_CACHE_MAX_AGE: int = 31536000
+    # Prefixo interno do nginx para X-Accel-Redirect (envio via sendfile pelo proxy)
+    UPLOAD_ACCEL_REDIRECT_PREFIX: Optional[str] = None
+
+    # Miniaturas e pré-visualizações de exames (pool de processos)
+    PREVIEW_ENABLED: bool = True
+    PREVIEW_WORKERS: int = 2
+    PREVIEW_QUEUE_SIZE: int = 100
+    PREVIEW_VARREDURA_SEGUNDOS: float = 300.0   # reenfileira blobs PENDENTE
+    THUMBNAIL_SIZE: int = 256
+    PREVIEW_SIZE: int = 1024
+
+    # Triagem: arquivo JSON com as palavras-chave (padrão: app/data/triagem_regras.json)
+    TRIAGEM_RULES_PATH: Optional[str] = None
+    TRIAGEM_LOTE_MAX: int = 100000
     
+    # Estatísticas do painel admin: intervalo de reconciliação com o banco
+    ESTATISTICAS_RECONCILIAR_SEGUNDOS: int = 60
+    # Sugestões de nomes (typeahead): intervalo de reconstrução do índice a partir do banco
+    SUGESTOES_RECONCILIAR_SEGUNDOS: int = 300
+
+    # Rollups horários de espera/duração (job periódico no lifespan)
+    ROLLUP_ENABLED: bool = True
+    ROLLUP_INTERVALO_SEGUNDOS: int = 300
+    ROLLUP_REPROCESSAR_HORAS: int = 2
+
+    # Arquivamento de consultas encerradas (tabelas *_arquivo), em lotes com pausa
+    ARQUIVAMENTO_ENABLED: bool = False
+    ARQUIVAMENTO_IDADE_DIAS: int = 180
+    ARQUIVAMENTO_LOTE: int = 500
+    ARQUIVAMENTO_PAUSA_MS: int = 200
+    ARQUIVAMENTO_INTERVALO_SEGUNDOS: int = 3600
+
+    # Agenda das consultas AGENDADA: fuso do expediente, antecedência e liberação para a fila
+    AGENDA_ENABLED: bool = True
+    AGENDA_FUSO_HORARIO: str = "Africa/Luanda"
+    AGENDA_ANTECEDENCIA_MINUTOS: int = 60     # reserva com pelo menos esta antecedência
+    AGENDA_LIBERAR_ANTES_MINUTOS: int = 10    # entra na fila do profissional este tempo antes
+    AGENDA_MAX_DIAS: int = 31                 # período máximo do GET /agenda/slots
+    AGENDA_INTERVALO_SEGUNDOS: int = 30
+
+    # Outbox de eventos de domínio (push WebSocket, Zoom...) entregue em segundo plano
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_LOTE: int = 100
+    OUTBOX_INTERVALO_SEGUNDOS: float = 1.0
+    OUTBOX_CONCORRENCIA: int = 8
+    OUTBOX_RESERVA_SEGUNDOS: int = 300
+    OUTBOX_MAX_TENTATIVAS: int = 10
+    OUTBOX_BACKOFF_MAX_SEGUNDOS: int = 600
+    OUTBOX_RETENCAO_HORAS: int = 72
+
+    # Limite de taxa (token bucket por minuto) e contenção de login
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_IP_POR_MINUTO: int = 600
+    RATE_LIMIT_USUARIO_POR_MINUTO: int = 300
+    RATE_LIMIT_ROTAS: Dict[str, int] = {   # "MÉTODO caminho": limite por IP
+        "POST /auth/login": 20,
+        "POST /auth/register": 10,
+        "POST /auth/refresh": 30,
+        "POST /files/upload": 60,
+    }
+    # IP do cliente atrás de proxy reverso/load balancer: com CONFIAR_PROXY, vem
+    # do X-Forwarded-For, lido da direita pulando os RATE_LIMIT_PROXY_SALTOS
+    # proxies da infraestrutura (1 = um nginx/ALB na frente). Sem proxy, deixe
+    # False: o cabeçalho é forjável pelo cliente
+    RATE_LIMIT_CONFIAR_PROXY: bool = False
+    RATE_LIMIT_PROXY_SALTOS: int = 1
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    LOGIN_CONTA_POR_MINUTO: int = 10
+    LOGIN_FALHAS_LIVRES_CONTA: int = 5
+    LOGIN_FALHAS_LIVRES_IP: int = 20
+    LOGIN_FALHAS_JANELA_SEGUNDOS: int = 3600
+    LOGIN_BACKOFF_MAX_SEGUNDOS: int = 900          # bloqueio máximo de um IP
+    LOGIN_BACKOFF_MAX_CONTA_SEGUNDOS: int = 60     # bloqueio máximo de uma conta (qualquer um pode provocá-lo)
+
+    # Idempotency-Key nos POST de criação; Redis compartilha as chaves entre workers
+    IDEMPOTENCIA_TTL_SEGUNDOS: int = 86400
+    IDEMPOTENCIA_ESPERA_SEGUNDOS: float = 30.0
+    IDEMPOTENCIA_REDIS_URL: Optional[str] = None
+
+    # Eventos das salas WebSocket: com Redis, publicados para todos os workers
+    WS_REDIS_URL: Optional[str] = None
+
+    # Compressão das respostas (gzip/brotli) acima de COMPRESSAO_MIN_BYTES
+    COMPRESSAO_ENABLED: bool = True
+    COMPRESSAO_MIN_BYTES: int = 1024
+    COMPRESSAO_GZIP_NIVEL: int = 6
+    COMPRESSAO_BROTLI_QUALIDADE: int = 4
+
+    # Métricas de desempenho (/metrics; Server-Timing quando DEBUG)
+    METRICS_ENABLED: bool = True
+
+    # Diagnóstico: log de consultas SQL lentas (None desativa) e profiler por amostragem
+    SLOW_QUERY_MS: Optional[float] = 500
+    PROFILER_ENABLED: bool = True
+    PROFILER_SAMPLE_RATE: float = 0.0   # fração do tráfego perfilada (além do cabeçalho X-Profile de admin)
+    PROFILER_INTERVAL_MS: float = 5
+    PROFILER_MAX_PERFIS: int = 50
+    PROFILER_DIR: Optional[str] = None
+
     # Twilio
     TWILIO_ACCOUNT_SID: Optional[str] = None
     TWILIO_AUTH_TOKEN: Optional[str] = None
     TWILIO_PHONE_NUMBER: Optional[str] = None
+
+    # Notificações por SMS (fila persistente enviada em lotes pelo NotificacaoDispatcher)
+    NOTIFICACOES_ENABLED: bool = True
+    NOTIFICACOES_TRANSPORTE: str = "auto"     # auto (Twilio se configurado, senão desativado), twilio, fake ou desativado
+    NOTIFICACOES_LOTE: int = 100
+    NOTIFICACOES_CONCORRENCIA: int = 8        # envios simultâneos ao provedor
+    NOTIFICACOES_TAXA_POR_SEGUNDO: float = 1.0  # limite do provedor (Twilio: 1 SMS/s por número longo)
+    NOTIFICACOES_INTERVALO_SEGUNDOS: float = 2.0
+    NOTIFICACOES_RESERVA_SEGUNDOS: int = 300
+    NOTIFICACOES_MAX_TENTATIVAS: int = 6
+    NOTIFICACOES_BACKOFF_MAX_SEGUNDOS: int = 900
+    NOTIFICACOES_RETENCAO_DIAS: int = 30
+    NOTIFICACOES_CODIGO_PAIS: str = "244"     # prefixo de números sem código do país
     
     # Aplicação
     APP_NAME: str = "StixConnect"
@@ -1,20 +1,216 @@
-from sqlalchemy import create_engine
+"""
+Conexões com o banco.
+
+`engine`/SessionLocal/get_db apontam para o primário. Com DATABASE_REPLICA_URLS
+configurado, get_read_db entrega sessões de leitura em uma réplica (rodízio),
+desde que:
+- o atraso de replicação medido na réplica seja <= REPLICA_MAX_LAG_SECONDS
+  (verificado no máximo a cada REPLICA_LAG_CHECK_SECONDS);
+- o usuário da requisição não tenha gravado no primário nos últimos
+  READ_YOUR_WRITES_SECONDS (leia-o-que-escreveu).
+Caso contrário a leitura vai para o primário.
+
+A marca de escrita recente fica em memória, por processo: com vários
+workers, uma leitura atendida por outro worker não a enxerga. Configure
+READ_YOUR_WRITES_REDIS_URL para guardá-la no Redis, visível a todos os
+workers (se o Redis falhar, a leitura vai para o primário).
+"""
+
+import itertools
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+from jose import jwt
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.requests import HTTPConnection
 from app.core.config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+
+def _criar_engine(url: str) -> Engine:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, connect_args=connect_args)
+
+
+engine = _criar_engine(settings.DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
+
+# ---- réplicas de leitura ----
+
+def medir_atraso(engine_replica: Engine) -> float:
+    """Segundos de atraso de replicação da réplica (0 se o banco não replica)"""
+    dialeto = engine_replica.dialect.name
+    with engine_replica.connect() as conn:
+        if dialeto == "mysql":
+            try:
+                row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+                coluna = "Seconds_Behind_Source"
+            except Exception:
+                row = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()  # MySQL < 8.0.22
+                coluna = "Seconds_Behind_Master"
+            if row is None:
+                return 0.0
+            # NULL: replicação parada
+            return math.inf if row[coluna] is None else float(row[coluna])
+        if dialeto == "postgresql":
+            return float(conn.execute(text(
+                "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )).scalar())
+    return 0.0
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = _criar_engine(url)
+        self.atraso: Optional[float] = None
+        self._verificado_em = 0.0
+        self._lock = threading.Lock()
+
+    def atraso_atual(self) -> float:
+        """Atraso em cache; remedido por no máximo uma thread quando expira"""
+        if time.monotonic() - self._verificado_em >= settings.REPLICA_LAG_CHECK_SECONDS \
+                and self._lock.acquire(blocking=False):
+            try:
+                self.atraso = medir_atraso(self.engine)
+            except Exception as e:
+                print(f"Erro ao medir atraso da réplica {self.engine.url!r}: {e}")
+                self.atraso = math.inf
+            finally:
+                self._verificado_em = time.monotonic()
+                self._lock.release()
+        return math.inf if self.atraso is None else self.atraso
+
+
+class RoteadorLeitura:
+    """Escolhe a réplica de cada leitura e guarda as escritas recentes por usuário"""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._rodizio = itertools.count()
+        self._escritas: Dict[str, float] = {}
+        self._redis = None
+        if settings.READ_YOUR_WRITES_REDIS_URL and self.replicas:
+            import redis  # dependência opcional
+
+            self._redis = redis.Redis.from_url(settings.READ_YOUR_WRITES_REDIS_URL)
+
+    def registrar_escrita(self, chave: str):
+        agora = time.monotonic()
+        self._escritas[chave] = agora
+        if len(self._escritas) > 10000:
+            limite = agora - settings.READ_YOUR_WRITES_SECONDS
+            self._escritas = {k: t for k, t in list(self._escritas.items()) if t >= limite}
+        if self._redis is not None:
+            try:
+                self._redis.set(f"stixconnect:escrita:{chave}", 1,
+                                px=int(settings.READ_YOUR_WRITES_SECONDS * 1000))
+            except Exception as e:
+                print(f"Erro ao registrar escrita recente no Redis: {e}")
+
+    def escreveu_recentemente(self, chave: Optional[str]) -> bool:
+        if not chave:
+            return False
+        momento = self._escritas.get(chave)
+        if momento is not None and time.monotonic() - momento < settings.READ_YOUR_WRITES_SECONDS:
+            return True
+        if self._redis is None:
+            return False
+        try:
+            return bool(self._redis.exists(f"stixconnect:escrita:{chave}"))
+        except Exception as e:
+            print(f"Erro ao consultar escrita recente no Redis: {e}")
+            return True
+
+    def escolher(self, chave: Optional[str] = None) -> Optional[Replica]:
+        """Réplica saudável para a leitura, ou None para usar o primário"""
+        if not self.replicas or self.escreveu_recentemente(chave):
+            return None
+        inicio = next(self._rodizio)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(inicio + i) % len(self.replicas)]
+            if replica.atraso_atual() <= settings.REPLICA_MAX_LAG_SECONDS:
+                return replica
+        return None
+
+
+roteador_leitura = RoteadorLeitura(settings.DATABASE_REPLICA_URLS)
+
+
+def chave_leitura(authorization: Optional[str]) -> Optional[str]:
+    """Usuário (sub do JWT) da requisição; a assinatura é validada depois por get_current_user"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.get_unverified_claims(authorization[7:]).get("sub")
+    except Exception:
+        return None
+
+
+def get_db(conexao: HTTPConnection = None):
     db = SessionLocal()
+    if conexao is not None:
+        db.info["authorization"] = conexao.headers.get("authorization")
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(conexao: HTTPConnection = None):
+    """Sessão somente leitura: réplica quando possível, senão o primário"""
+    authorization = conexao.headers.get("authorization") if conexao is not None else None
+    replica = roteador_leitura.escolher(chave_leitura(authorization))
+    if replica is None:
+        db = SessionLocal()
+        db.info["authorization"] = authorization
+    else:
+        db = SessionLocal(bind=replica.engine)
+        db.info["replica"] = replica.url
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _bloquear_escrita_replica(session, flush_context, instances):
+    if session.info.get("replica"):
+        raise RuntimeError("Sessão de leitura (réplica) não aceita escrita")
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _marcar_escrita(session, flush_context):
+    session.info["escreveu"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _marcar_escrita_dml(orm_execute_state):
+    # UPDATE/DELETE/INSERT diretos (ex.: transições CAS) não passam pelo flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        if orm_execute_state.session.info.get("replica"):
+            raise RuntimeError("Sessão de leitura (réplica) não aceita escrita")
+        orm_execute_state.session.info["escreveu"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _registrar_escrita(session):
+    if session.info.pop("escreveu", False) and roteador_leitura.replicas:
+        chave = chave_leitura(session.info.get("authorization"))
+        if chave:
+            roteador_leitura.registrar_escrita(chave)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_escrita(session):
+    session.info.pop("escreveu", None)
@@ -0,0 +1,251 @@
+"""
+Chaves de idempotência (cabeçalho Idempotency-Key) para os POST de criação.
+
+IdempotenciaMiddleware (ASGI puro) atende as rotas de ROTAS_IDEMPOTENTES
+quando a requisição traz Idempotency-Key e um token válido:
+- a primeira requisição com a chave reserva a chave e executa normalmente;
+  uma resposta 2xx é guardada (status, cabeçalhos, corpo e impressão digital
+  do corpo da requisição) por IDEMPOTENCIA_TTL_SEGUNDOS;
+- repetições recebem a resposta guardada, com `Idempotent-Replayed: true`,
+  sem executar a rota de novo;
+- repetições simultâneas esperam a primeira terminar (até
+  IDEMPOTENCIA_ESPERA_SEGUNDOS; depois, 409);
+- resposta não-2xx ou erro libera a chave: nada foi criado, a repetição
+  executa de novo;
+- a mesma chave com outro corpo de requisição recebe 422.
+
+A chave é separada por usuário (sub do token, com assinatura verificada) e
+por rota. O armazenamento é em memória (por processo) ou Redis quando
+IDEMPOTENCIA_REDIS_URL está configurado (necessário com vários workers).
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import email_do_token
+
+ROTAS_IDEMPOTENTES = {"/consultas/", "/patients/", "/admin/users/", "/files/upload"}
+
+# Validade da reserva de uma requisição em andamento (libera a chave se o worker morrer)
+RESERVA_TTL_SEGUNDOS = 300
+
+EM_ANDAMENTO = "andamento"
+CONCLUIDA = "concluida"
+
+
+class ArmazemMemoria:
+    """Registros por chave com expiração, no processo atual"""
+
+    def __init__(self):
+        self._registros: Dict[str, tuple] = {}
+
+    def _vivo(self, chave: str) -> Optional[dict]:
+        item = self._registros.get(chave)
+        if item is None:
+            return None
+        expira, registro = item
+        if expira <= time.monotonic():
+            del self._registros[chave]
+            return None
+        return registro
+
+    async def reservar(self, chave: str, ttl: float) -> Optional[dict]:
+        """Reserva a chave (retorna None) ou devolve o registro existente"""
+        registro = self._vivo(chave)
+        if registro is not None:
+            return registro
+        agora = time.monotonic()
+        if len(self._registros) > 10000:
+            self._registros = {k: v for k, v in list(self._registros.items()) if v[0] > agora}
+        self._registros[chave] = (agora + ttl, {"estado": EM_ANDAMENTO})
+        return None
+
+    async def obter(self, chave: str) -> Optional[dict]:
+        return self._vivo(chave)
+
+    async def concluir(self, chave: str, registro: dict, ttl: float):
+        self._registros[chave] = (time.monotonic() + ttl, registro)
+
+    async def liberar(self, chave: str):
+        self._registros.pop(chave, None)
+
+
+class ArmazemRedis:
+    """Registros no Redis (SET NX com expiração), compartilhados entre workers"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # dependência opcional
+
+        self._redis = redis.from_url(url)
+
+    @staticmethod
+    def _codificar(registro: dict) -> str:
+        if "corpo" in registro:
+            registro = {**registro, "corpo": base64.b64encode(registro["corpo"]).decode("ascii")}
+        return json.dumps(registro)
+
+    @staticmethod
+    def _decodificar(valor) -> Optional[dict]:
+        if valor is None:
+            return None
+        registro = json.loads(valor)
+        if "corpo" in registro:
+            registro["corpo"] = base64.b64decode(registro["corpo"])
+        return registro
+
+    async def reservar(self, chave: str, ttl: float) -> Optional[dict]:
+        reservado = await self._redis.set(chave, self._codificar({"estado": EM_ANDAMENTO}), nx=True, px=int(ttl * 1000))
+        return None if reservado else await self.obter(chave)
+
+    async def obter(self, chave: str) -> Optional[dict]:
+        return self._decodificar(await self._redis.get(chave))
+
+    async def concluir(self, chave: str, registro: dict, ttl: float):
+        await self._redis.set(chave, self._codificar(registro), px=int(ttl * 1000))
+
+    async def liberar(self, chave: str):
+        await self._redis.delete(chave)
+
+
+def criar_armazem():
+    if settings.IDEMPOTENCIA_REDIS_URL:
+        return ArmazemRedis(settings.IDEMPOTENCIA_REDIS_URL)
+    return ArmazemMemoria()
+
+
+class ImpressaoCorpo:
+    """
+    SHA-256 do corpo da requisição, calculado por partes. Em multipart o
+    boundary é ignorado: clientes costumam gerar um novo a cada tentativa.
+    """
+
+    def __init__(self, headers: Headers):
+        self._hash = hashlib.sha256()
+        self._boundary = b""
+        self._resto = b""
+        tipo = headers.get("content-type", "")
+        if tipo.startswith("multipart/") and "boundary=" in tipo:
+            self._boundary = tipo.split("boundary=", 1)[1].split(";")[0].strip().strip('"').encode("latin-1")
+
+    def update(self, dados: bytes):
+        if not self._boundary:
+            self._hash.update(dados)
+            return
+        # Guarda o final do bloco: o boundary pode estar dividido entre dois blocos
+        dados = (self._resto + dados).replace(self._boundary, b"")
+        corte = max(len(dados) - len(self._boundary) + 1, 0)
+        self._hash.update(dados[:corte])
+        self._resto = dados[corte:]
+
+    def hexdigest(self) -> str:
+        final = self._hash.copy()
+        final.update(self._resto)
+        return final.hexdigest()
+
+
+def _erro(status_code: int, detalhe: str) -> JSONResponse:
+    return JSONResponse({"detail": detalhe}, status_code=status_code)
+
+
+class IdempotenciaMiddleware:
+    """Guarda e repete as respostas dos POST de criação com Idempotency-Key"""
+
+    def __init__(self, app: ASGIApp, armazem=None):
+        self.app = app
+        self.armazem = armazem if armazem is not None else criar_armazem()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in ROTAS_IDEMPOTENTES:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        chave_cliente = headers.get("idempotency-key")
+        usuario = email_do_token(headers.get("authorization")) if chave_cliente else None
+        if not chave_cliente or usuario is None:
+            # Sem chave ou sem token válido: a própria rota responde (401 etc.)
+            await self.app(scope, receive, send)
+            return
+        if len(chave_cliente) > 255:
+            await _erro(400, "Idempotency-Key deve ter no máximo 255 caracteres")(scope, receive, send)
+            return
+
+        chave = "idem:" + hashlib.sha256(f"{usuario}\0{scope['path']}\0{chave_cliente}".encode()).hexdigest()
+        ttl = settings.IDEMPOTENCIA_TTL_SEGUNDOS
+        limite = time.monotonic() + settings.IDEMPOTENCIA_ESPERA_SEGUNDOS
+        registro = await self.armazem.reservar(chave, RESERVA_TTL_SEGUNDOS)
+        while registro is not None and registro["estado"] == EM_ANDAMENTO:
+            # Repetição simultânea: espera a primeira terminar (ou liberar a chave)
+            if time.monotonic() >= limite:
+                await _erro(409, "Requisição com esta Idempotency-Key ainda em processamento")(scope, receive, send)
+                return
+            await asyncio.sleep(0.05)
+            registro = await self.armazem.obter(chave)
+            if registro is None:
+                registro = await self.armazem.reservar(chave, RESERVA_TTL_SEGUNDOS)
+
+        if registro is not None:
+            await self._repetir(registro, ImpressaoCorpo(headers), scope, receive, send)
+            return
+
+        impressao = ImpressaoCorpo(headers)
+        inicio: Optional[Message] = None
+        partes = []
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                impressao.update(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal inicio
+            if message["type"] == "http.response.start":
+                inicio = message
+            elif message["type"] == "http.response.body":
+                partes.append(message.get("body", b""))
+            await send(message)
+
+        guardado = False
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+            if inicio is not None and 200 <= inicio["status"] < 300:
+                await self.armazem.concluir(chave, {
+                    "estado": CONCLUIDA,
+                    "impressao": impressao.hexdigest(),
+                    "status": inicio["status"],
+                    "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in inicio.get("headers", [])],
+                    "corpo": b"".join(partes),
+                }, ttl)
+                guardado = True
+        finally:
+            if not guardado:
+                await self.armazem.liberar(chave)
+
+    async def _repetir(self, registro: dict, impressao: ImpressaoCorpo, scope: Scope, receive: Receive, send: Send):
+        # Consome o corpo da repetição só para comparar a impressão digital
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            impressao.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        if impressao.hexdigest() != registro["impressao"]:
+            await _erro(422, "Idempotency-Key já usada com outro corpo de requisição")(scope, receive, send)
+            return
+        await send({
+            "type": "http.response.start",
+            "status": registro["status"],
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in registro["headers"]]
+                       + [(b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": registro["corpo"]})
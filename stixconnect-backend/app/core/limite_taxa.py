@@ -0,0 +1,288 @@
+"""
+Limite de taxa (token bucket) e contenção de tentativas de login.
+
+LimiteTaxaMiddleware (ASGI puro) tira uma ficha, por requisição, de até três
+baldes: o do IP (RATE_LIMIT_IP_POR_MINUTO), o do usuário autenticado
+(RATE_LIMIT_USUARIO_POR_MINUTO) e, nas rotas de RATE_LIMIT_ROTAS, um balde
+próprio da rota por IP. Cada balde comporta um minuto de limite (rajada) e
+reabastece continuamente. Sem ficha em algum balde: 429 com Retry-After.
+
+ControleLogin é chamado pelo /auth/login antes da consulta ao usuário e do
+bcrypt: balde por conta (LOGIN_CONTA_POR_MINUTO) e backoff exponencial
+depois de LOGIN_FALHAS_LIVRES_CONTA / LOGIN_FALHAS_LIVRES_IP falhas seguidas
+(2, 4, 8... segundos). O bloqueio do IP vai até LOGIN_BACKOFF_MAX_SEGUNDOS; o
+da conta, que qualquer um pode provocar errando a senha alheia, para em
+LOGIN_BACKOFF_MAX_CONTA_SEGUNDOS (o dono espera no máximo isso, e um ataque
+distribuído continua limitado a uma tentativa por intervalo). Sucesso zera as
+falhas da conta e do IP.
+
+Atrás de proxy reverso, RATE_LIMIT_CONFIAR_PROXY e RATE_LIMIT_PROXY_SALTOS
+dizem de onde vem o IP do cliente (ver ip_cliente).
+
+Os baldes e contadores ficam em memória (por processo) ou no Redis quando
+RATE_LIMIT_REDIS_URL está configurado (limites valem para todos os workers).
+"""
+
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import email_do_token
+
+# (chave, capacidade, fichas por segundo)
+Balde = Tuple[str, float, float]
+
+ROTAS_ISENTAS = {"/health", "/health/live", "/health/ready", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+
+class ArmazemMemoria:
+    """Baldes e contadores com expiração, no processo atual"""
+
+    bloqueante = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baldes: Dict[str, Tuple[float, float, float, float]] = {}
+        self._valores: Dict[str, Tuple[float, float]] = {}
+
+    def consumir(self, baldes: List[Balde]) -> float:
+        """Tira uma ficha de cada balde (tudo ou nada); 0 se permitido, senão segundos de espera"""
+        with self._lock:
+            agora = time.monotonic()
+            if len(self._baldes) > 10000:
+                # Baldes já cheios equivalem a baldes novos
+                self._baldes = {
+                    k: v for k, v in list(self._baldes.items()) if v[0] + (agora - v[1]) * v[2] < v[3]
+                }
+            niveis = []
+            espera = 0.0
+            for chave, capacidade, taxa in baldes:
+                fichas, antes, _, _ = self._baldes.get(chave, (capacidade, agora, taxa, capacidade))
+                fichas = min(capacidade, fichas + (agora - antes) * taxa)
+                niveis.append(fichas)
+                if fichas < 1:
+                    espera = max(espera, (1 - fichas) / taxa)
+            for (chave, capacidade, taxa), fichas in zip(baldes, niveis):
+                self._baldes[chave] = (fichas if espera else fichas - 1, agora, taxa, capacidade)
+            return espera
+
+    def _vivo(self, chave: str) -> Optional[float]:
+        item = self._valores.get(chave)
+        if item is None:
+            return None
+        valor, expira = item
+        if expira <= time.monotonic():
+            self._valores.pop(chave, None)
+            return None
+        return valor
+
+    def incrementar(self, chave: str, ttl: float) -> int:
+        with self._lock:
+            valor = (self._vivo(chave) or 0) + 1
+            expira = self._valores[chave][1] if valor > 1 else time.monotonic() + ttl
+            self._valores[chave] = (valor, expira)
+            if len(self._valores) > 10000:
+                agora = time.monotonic()
+                self._valores = {k: v for k, v in list(self._valores.items()) if v[1] > agora}
+            return int(valor)
+
+    def definir(self, chave: str, valor: float, ttl: float):
+        with self._lock:
+            self._valores[chave] = (valor, time.monotonic() + ttl)
+
+    def obter(self, chave: str) -> Optional[float]:
+        with self._lock:
+            return self._vivo(chave)
+
+    def apagar(self, *chaves: str):
+        with self._lock:
+            for chave in chaves:
+                self._valores.pop(chave, None)
+
+
+# Token bucket atômico para várias chaves; o relógio é o do próprio Redis
+_SCRIPT_CONSUMIR = """
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local niveis = {}
+local espera = 0
+for i, chave in ipairs(KEYS) do
+    local capacidade = tonumber(ARGV[2 * i - 1])
+    local taxa = tonumber(ARGV[2 * i])
+    local b = redis.call('HMGET', chave, 'f', 't')
+    local fichas = tonumber(b[1]) or capacidade
+    local antes = tonumber(b[2]) or agora
+    fichas = math.min(capacidade, fichas + math.max(0, agora - antes) * taxa)
+    niveis[i] = fichas
+    if fichas < 1 then espera = math.max(espera, (1 - fichas) / taxa) end
+end
+for i, chave in ipairs(KEYS) do
+    local fichas = niveis[i]
+    if espera == 0 then fichas = fichas - 1 end
+    redis.call('HSET', chave, 'f', tostring(fichas), 't', tostring(agora))
+    redis.call('PEXPIRE', chave, math.ceil(tonumber(ARGV[2 * i - 1]) / tonumber(ARGV[2 * i]) * 1000) + 1000)
+end
+return tostring(espera)
+"""
+
+
+class ArmazemRedis:
+    """Baldes e contadores no Redis, compartilhados entre workers"""
+
+    bloqueante = True
+
+    def __init__(self, url: str):
+        import redis  # dependência opcional
+
+        self._redis = redis.Redis.from_url(url)
+        self._consumir = self._redis.register_script(_SCRIPT_CONSUMIR)
+
+    def consumir(self, baldes: List[Balde]) -> float:
+        argumentos = []
+        for _, capacidade, taxa in baldes:
+            argumentos += [capacidade, taxa]
+        return float(self._consumir(keys=[b[0] for b in baldes], args=argumentos))
+
+    def incrementar(self, chave: str, ttl: float) -> int:
+        valor = self._redis.incr(chave)
+        if valor == 1:
+            self._redis.pexpire(chave, int(ttl * 1000))
+        return int(valor)
+
+    def definir(self, chave: str, valor: float, ttl: float):
+        self._redis.set(chave, valor, px=int(ttl * 1000))
+
+    def obter(self, chave: str) -> Optional[float]:
+        valor = self._redis.get(chave)
+        return None if valor is None else float(valor)
+
+    def apagar(self, *chaves: str):
+        self._redis.delete(*chaves)
+
+
+def criar_armazem():
+    if settings.RATE_LIMIT_REDIS_URL:
+        return ArmazemRedis(settings.RATE_LIMIT_REDIS_URL)
+    return ArmazemMemoria()
+
+
+armazem = criar_armazem()
+
+
+def ip_cliente(scope: Scope) -> str:
+    """
+    IP do cliente. Com RATE_LIMIT_CONFIAR_PROXY, vem do X-Forwarded-For: cada
+    proxy acrescenta à direita o IP de quem o chamou, então o cliente é o
+    RATE_LIMIT_PROXY_SALTOS-ésimo a partir da direita (o que estiver à
+    esquerda dele foi enviado pelo próprio cliente e não é confiável).
+    """
+    if settings.RATE_LIMIT_CONFIAR_PROXY:
+        encaminhado = Headers(scope=scope).get("x-forwarded-for")
+        if encaminhado:
+            ips = [ip.strip() for ip in encaminhado.split(",") if ip.strip()]
+            if ips:
+                return ips[-min(max(1, settings.RATE_LIMIT_PROXY_SALTOS), len(ips))]
+    cliente = scope.get("client")
+    return cliente[0] if cliente else "desconhecido"
+
+
+def balde_por_minuto(chave: str, limite: int) -> Balde:
+    return chave, float(limite), limite / 60.0
+
+
+def resposta_429(espera: float, detalhe: str) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detalhe}, status_code=429, headers={"Retry-After": str(max(1, math.ceil(espera)))}
+    )
+
+
+class LimiteTaxaMiddleware:
+    """Aplica os baldes de IP, usuário e rota antes de chegar às rotas"""
+
+    def __init__(self, app: ASGIApp, armazem_baldes=None):
+        self.app = app
+        self.armazem = armazem_baldes if armazem_baldes is not None else armazem
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in ROTAS_ISENTAS:
+            await self.app(scope, receive, send)
+            return
+
+        ip = ip_cliente(scope)
+        baldes = [balde_por_minuto(f"taxa:ip:{ip}", settings.RATE_LIMIT_IP_POR_MINUTO)]
+        usuario = email_do_token(Headers(scope=scope).get("authorization"))
+        if usuario:
+            baldes.append(balde_por_minuto(f"taxa:usuario:{usuario}", settings.RATE_LIMIT_USUARIO_POR_MINUTO))
+        rota = f"{scope['method']} {scope['path']}"
+        limite_rota = settings.RATE_LIMIT_ROTAS.get(rota)
+        if limite_rota:
+            baldes.append(balde_por_minuto(f"taxa:rota:{rota}:{ip}", limite_rota))
+
+        if self.armazem.bloqueante:
+            espera = await anyio.to_thread.run_sync(self.armazem.consumir, baldes)
+        else:
+            espera = self.armazem.consumir(baldes)
+        if espera:
+            await resposta_429(espera, "Muitas requisições. Tente novamente em instantes.")(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class LoginBloqueadoError(Exception):
+    def __init__(self, espera: float):
+        super().__init__(f"Login bloqueado por {espera:.0f} s")
+        self.espera = espera
+
+
+class ControleLogin:
+    """Balde por conta e backoff exponencial de falhas, antes de qualquer bcrypt"""
+
+    def __init__(self, armazem_login=None):
+        self.armazem = armazem_login if armazem_login is not None else armazem
+
+    @staticmethod
+    def _chaves(email: str, ip: str) -> List[Tuple[str, int, int]]:
+        """(chave, falhas livres, bloqueio máximo) da conta e do IP"""
+        return [
+            (f"login:conta:{email.strip().lower()}", settings.LOGIN_FALHAS_LIVRES_CONTA,
+             min(settings.LOGIN_BACKOFF_MAX_CONTA_SEGUNDOS, settings.LOGIN_BACKOFF_MAX_SEGUNDOS)),
+            (f"login:ip:{ip}", settings.LOGIN_FALHAS_LIVRES_IP, settings.LOGIN_BACKOFF_MAX_SEGUNDOS),
+        ]
+
+    def verificar(self, email: str, ip: str):
+        """Levanta LoginBloqueadoError se a conta/IP está em backoff ou sem fichas"""
+        agora = time.time()
+        espera = 0.0
+        for chave, _, _ in self._chaves(email, ip):
+            ate = self.armazem.obter(f"{chave}:bloqueio")
+            if ate:
+                espera = max(espera, ate - agora)
+        if espera > 0:
+            raise LoginBloqueadoError(espera)
+        conta = self._chaves(email, ip)[0][0]
+        espera = self.armazem.consumir([balde_por_minuto(f"{conta}:balde", settings.LOGIN_CONTA_POR_MINUTO)])
+        if espera:
+            raise LoginBloqueadoError(espera)
+
+    def registrar_falha(self, email: str, ip: str):
+        for chave, livres, maximo in self._chaves(email, ip):
+            falhas = self.armazem.incrementar(f"{chave}:falhas", settings.LOGIN_FALHAS_JANELA_SEGUNDOS)
+            if falhas > livres:
+                duracao = min(2 ** (falhas - livres), maximo)
+                self.armazem.definir(f"{chave}:bloqueio", time.time() + duracao, duracao)
+
+    def registrar_sucesso(self, email: str, ip: str):
+        chaves = []
+        for chave, _, _ in self._chaves(email, ip):
+            chaves += [f"{chave}:falhas", f"{chave}:bloqueio"]
+        self.armazem.apagar(*chaves)
+
+
+controle_login = ControleLogin()
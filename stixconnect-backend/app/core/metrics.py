@@ -0,0 +1,270 @@
+"""
+Instrumentação de desempenho por requisição.
+
+- MetricsMiddleware (ASGI puro): latência por rota (histograma), tamanho da
+  resposta, número e tempo total de comandos SQL e tempo em chamadas
+  externas (Zoom, armazenamento) de cada requisição.
+- Eventos de Engine (todos os engines: primário e réplicas de leitura)
+  alimentam os contadores SQL da requisição corrente (contextvar, propagado
+  para o threadpool das rotas síncronas).
+- medir_externo("zoom") mede chamadas a serviços externos.
+- /metrics (apenas administradores) expõe os agregados no formato texto do
+  Prometheus; com DEBUG, cada resposta recebe um cabeçalho Server-Timing.
+- Comandos SQL acima de SLOW_QUERY_MS são registrados no log
+  "stixconnect.slow_query" (comando, formato dos parâmetros, duração e rota
+  de origem) e nas últimas ocorrências de consultas_lentas.
+"""
+
+import logging
+import re
+import time
+from collections import deque
+from datetime import datetime
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# Limites (segundos) do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Tamanho máximo do comando SQL registrado no log de consultas lentas
+SLOW_QUERY_STATEMENT_MAX = 2000
+
+slow_query_logger = logging.getLogger("stixconnect.slow_query")
+
+
+class RequestMetrics:
+    """Contadores da requisição corrente"""
+
+    __slots__ = ("scope", "sql_count", "sql_time", "external")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.external: Dict[str, float] = {}
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "<sem rota>"
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def medir_externo(servico: str):
+    """Acumula o tempo de uma chamada externa na requisição corrente"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.external[servico] = metrics.external.get(servico, 0.0) + time.perf_counter() - inicio
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "count", "sum", "bytes", "sql_count", "sql_time", "external")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.bytes = 0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.external: Dict[str, List[float]] = {}
+
+
+class MetricsRegistry:
+    """Agregados por (método, rota, status); atualizados apenas no event loop"""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str, int], _RouteStats] = {}
+
+    def observe(self, method: str, route: str, status: int, duration: float, size: int, metrics: RequestMetrics):
+        key = (method, route, status)
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = _RouteStats()
+        stats.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        stats.count += 1
+        stats.sum += duration
+        stats.bytes += size
+        stats.sql_count += metrics.sql_count
+        stats.sql_time += metrics.sql_time
+        if not metrics.external:
+            return
+        for servico, tempo in metrics.external.items():
+            total = stats.external.setdefault(servico, [0, 0.0])
+            total[0] += 1
+            total[1] += tempo
+
+    def render(self) -> str:
+        """Formato de exposição texto do Prometheus (0.0.4)"""
+        linhas = [
+            "# HELP http_request_duration_seconds Latência das requisições HTTP",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        sql, tamanho, externo = [], [], []
+        for (method, route, status), stats in sorted(self.routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            acumulado = 0
+            for limite, quantidade in zip(LATENCY_BUCKETS + (float("inf"),), stats.buckets):
+                acumulado += quantidade
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {acumulado}')
+            linhas.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.sum:.6f}")
+            linhas.append(f"http_request_duration_seconds_count{{{labels}}} {stats.count}")
+            tamanho.append(f"http_response_size_bytes_sum{{{labels}}} {stats.bytes}")
+            tamanho.append(f"http_response_size_bytes_count{{{labels}}} {stats.count}")
+            sql.append(f"db_statements_total{{{labels}}} {stats.sql_count}")
+            sql.append(f"db_statement_duration_seconds_total{{{labels}}} {stats.sql_time:.6f}")
+            for servico, (chamadas, tempo) in sorted(stats.external.items()):
+                ext_labels = f'{labels},service="{servico}"'
+                externo.append(f"external_requests_total{{{ext_labels}}} {chamadas}")
+                externo.append(f"external_duration_seconds_total{{{ext_labels}}} {tempo:.6f}")
+
+        linhas += ["# HELP http_response_size_bytes Tamanho do corpo das respostas",
+                   "# TYPE http_response_size_bytes summary"] + tamanho
+        linhas += ["# HELP db_statements_total Comandos SQL executados",
+                   "# TYPE db_statements_total counter",
+                   "# HELP db_statement_duration_seconds_total Tempo total em comandos SQL",
+                   "# TYPE db_statement_duration_seconds_total counter"] + sql
+        linhas += ["# HELP external_requests_total Requisições com chamadas a serviços externos",
+                   "# TYPE external_requests_total counter",
+                   "# HELP external_duration_seconds_total Tempo total em chamadas externas",
+                   "# TYPE external_duration_seconds_total counter"] + externo
+        return "\n".join(linhas) + "\n"
+
+
+def _escape(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+
+# Registrados na classe Engine: valem para o primário, as réplicas de leitura
+# e qualquer engine criado depois. O início fica no contexto de execução
+# (um por comando), sem pilha no conn.info.
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_inicio(conn, cursor, statement, parameters, context, executemany):
+    context._stx_inicio = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_fim(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - context._stx_inicio
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.sql_count += 1
+        metrics.sql_time += duracao
+    if settings.SLOW_QUERY_MS is not None and duracao * 1000 >= settings.SLOW_QUERY_MS:
+        _registrar_consulta_lenta(statement, parameters, executemany, duracao, metrics)
+
+
+# Últimas consultas lentas deste processo (GET /admin/diagnostico/consultas-lentas)
+consultas_lentas: deque = deque(maxlen=200)
+
+_ESPACOS_RE = re.compile(r"\s+")
+
+
+def formato_parametros(parameters, executemany: bool = False):
+    """
+    Formato dos parâmetros sem os valores (que podem conter dados de
+    pacientes): {"nome": "str"}, ["int", "str"] ou, em executemany,
+    {"linhas": N, "formato": ...}.
+    """
+    if executemany:
+        linhas = list(parameters or [])
+        return {"linhas": len(linhas), "formato": formato_parametros(linhas[0]) if linhas else None}
+    if isinstance(parameters, dict):
+        return {chave: type(valor).__name__ for chave, valor in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(valor).__name__ for valor in parameters]
+    return None
+
+
+def _registrar_consulta_lenta(statement: str, parameters, executemany: bool, duracao: float,
+                              metrics: Optional[RequestMetrics]):
+    comando = _ESPACOS_RE.sub(" ", statement).strip()
+    if len(comando) > SLOW_QUERY_STATEMENT_MAX:
+        comando = comando[:SLOW_QUERY_STATEMENT_MAX] + "..."
+    registro = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "duracao_ms": round(duracao * 1000, 1),
+        "metodo": metrics.scope.get("method") if metrics is not None else None,
+        "rota": metrics.route if metrics is not None else None,
+        "comando": comando,
+        "parametros": formato_parametros(parameters, executemany),
+    }
+    consultas_lentas.append(registro)
+    slow_query_logger.warning(
+        "consulta lenta %.1fms rota=%s %s parametros=%s",
+        registro["duracao_ms"],
+        f"{registro['metodo']} {registro['rota']}" if metrics is not None else "<fora de requisição>",
+        comando, registro["parametros"],
+    )
+
+
+class MetricsMiddleware:
+    """Mede cada requisição HTTP e registra os agregados por rota"""
+
+    def __init__(self, app: ASGIApp, server_timing: Optional[bool] = None):
+        self.app = app
+        self.server_timing = settings.DEBUG if server_timing is None else server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope)
+        token = _current.set(metrics)
+        inicio = time.perf_counter()
+        status = 500
+        tamanho = 0
+        server_timing = self.server_timing
+
+        async def send_wrapper(message: Message):
+            nonlocal status, tamanho
+            tipo = message["type"]
+            if tipo == "http.response.body":
+                tamanho += len(message.get("body", b""))
+            elif tipo == "http.response.start":
+                status = message["status"]
+                if server_timing:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", _server_timing(metrics, time.perf_counter() - inicio).encode("latin-1"))
+                    ]
+            elif tipo == "http.response.zerocopysend":
+                tamanho += message.get("count") or 0
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            registry.observe(scope["method"], metrics.route, status, time.perf_counter() - inicio, tamanho, metrics)
+
+
+def _server_timing(metrics: RequestMetrics, total: float) -> str:
+    partes = [f"app;dur={total * 1000:.1f}", f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} queries"']
+    partes += [f"{servico};dur={tempo * 1000:.1f}" for servico, tempo in metrics.external.items()]
+    return ", ".join(partes)
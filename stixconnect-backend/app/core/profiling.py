@@ -0,0 +1,299 @@
+"""
+Profiler por amostragem, ativado por requisição.
+
+Uma requisição é perfilada quando traz o cabeçalho `X-Profile: 1` com um
+token de administrador, ou por sorteio em PROFILER_SAMPLE_RATE do tráfego.
+Enquanto houver requisições perfiladas, uma thread de amostragem lê a pilha
+das threads a cada PROFILER_INTERVAL_MS e conta as pilhas de cada requisição:
+
+- no event loop, apenas amostras cuja pilha passa pelo frame do middleware
+  da requisição (as corrotinas em execução ficam encadeadas nele);
+- nas threads do threadpool (rotas e dependências síncronas), amostras em
+  que o contexto (contextvars) copiado para a thread é o da requisição.
+
+O resultado está no formato "collapsed stacks" (uma pilha por linha,
+frames separados por ";" e o número de amostras), aceito por flamegraph.pl,
+speedscope e inferno. Os perfis ficam em memória (últimos
+PROFILER_MAX_PERFIS) e, com PROFILER_DIR, também em arquivos .folded.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Frames acima deste limite são descartados (recursão profunda)
+MAX_PROFUNDIDADE = 200
+
+
+class PerfilRequisicao:
+    """Amostras de pilha de uma requisição"""
+
+    def __init__(self, method: str, path: str, motivo: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route = path
+        self.motivo = motivo
+        self.inicio = datetime.utcnow()
+        self.duracao = 0.0
+        self.status = 500
+        self.amostras: Counter = Counter()
+        self.frame = None            # frame do middleware no event loop
+        self.loop_thread: Optional[int] = None
+
+    @property
+    def total_amostras(self) -> int:
+        return sum(self.amostras.values())
+
+    def collapsed(self) -> str:
+        raiz = f"{self.method} {self.route}"
+        return "".join(f"{raiz};{pilha} {n}\n" for pilha, n in self.amostras.most_common())
+
+    def resumo(self) -> dict:
+        return {
+            "id": self.id,
+            "inicio": self.inicio.isoformat(),
+            "metodo": self.method,
+            "rota": self.route,
+            "path": self.path,
+            "status": self.status,
+            "motivo": self.motivo,
+            "duracao_ms": round(self.duracao * 1000, 1),
+            "amostras": self.total_amostras,
+        }
+
+
+_perfil_atual: ContextVar[Optional[PerfilRequisicao]] = ContextVar("perfil_requisicao", default=None)
+
+
+def _rotulo(code) -> str:
+    arquivo = code.co_filename
+    for raiz in _RAIZES:
+        if arquivo.startswith(raiz):
+            arquivo = arquivo[len(raiz):]
+            break
+    return f"{arquivo}:{code.co_qualname}"
+
+
+_RAIZES = sorted(
+    {os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep}
+    | {p + os.sep for p in sys.path if p and os.path.isdir(p)},
+    key=len, reverse=True,
+)
+
+
+# Worker do threadpool aguardando tarefa (fila de trabalho)
+_OCIOSO = ("queue.py:", "threading.py:")
+
+
+class Amostrador:
+    """Thread de amostragem; ativa apenas enquanto há requisições perfiladas"""
+
+    def __init__(self):
+        self._ativos: Dict[str, PerfilRequisicao] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # thread -> frame do worker que guarda o Context copiado (localizado uma vez)
+        self._frames_contexto: Dict[int, object] = {}
+
+    def iniciar(self, perfil: PerfilRequisicao):
+        with self._cond:
+            self._ativos[perfil.id] = perfil
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="profiler-amostrador", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def parar(self, perfil: PerfilRequisicao):
+        with self._cond:
+            self._ativos.pop(perfil.id, None)
+
+    def _executar(self):
+        intervalo = settings.PROFILER_INTERVAL_MS / 1000
+        proprio = threading.get_ident()
+        while True:
+            with self._cond:
+                while not self._ativos:
+                    self._cond.wait()
+                # Sob o lock: após parar(), o perfil não recebe mais amostras
+                self._amostrar(list(self._ativos.values()), proprio)
+            time.sleep(intervalo)
+
+    def _amostrar(self, perfis: List[PerfilRequisicao], proprio: int):
+        frames = sys._current_frames()
+        for thread_id, frame in frames.items():
+            if thread_id == proprio:
+                continue
+            for perfil in perfis:
+                if thread_id == perfil.loop_thread:
+                    pilha = _pilha_ate(frame, perfil.frame)
+                else:
+                    pilha = self._pilha_worker(thread_id, frame, perfil)
+                if pilha:
+                    perfil.amostras[pilha] += 1
+        # Threads encerradas
+        for thread_id in list(self._frames_contexto):
+            if thread_id not in frames:
+                del self._frames_contexto[thread_id]
+
+    def _pilha_worker(self, thread_id: int, frame, perfil: PerfilRequisicao) -> Optional[str]:
+        """Pilha acima do frame do worker cujo Context é o da requisição"""
+        base = self._frames_contexto.get(thread_id)
+        if base is None:
+            base = _frame_com_contexto(frame)
+            if base is None:
+                return None
+            self._frames_contexto[thread_id] = base
+        contexto = next((v for v in base.f_locals.values() if isinstance(v, Context)), None)
+        if contexto is None or contexto.get(_perfil_atual) is not perfil:
+            return None
+        pilha = _pilha_ate(frame, base, incluir_base=False)
+        if pilha is None or pilha.startswith(_OCIOSO):
+            return None  # worker ocioso, aguardando a próxima tarefa
+        return pilha
+
+
+def _frame_com_contexto(frame):
+    """Frame mais externo com um contextvars.Context nas variáveis locais"""
+    encontrado = None
+    while frame is not None:
+        if any(isinstance(v, Context) for v in frame.f_locals.values()):
+            encontrado = frame
+        frame = frame.f_back
+    return encontrado
+
+
+def _pilha_ate(frame, base, incluir_base: bool = True) -> Optional[str]:
+    """Pilha collapsed (da base até o frame corrente) se `base` estiver nela"""
+    rotulos = []
+    while frame is not None:
+        if frame is base:
+            if incluir_base:
+                rotulos.append(_rotulo(frame.f_code))
+            rotulos.reverse()
+            return ";".join(rotulos[:MAX_PROFUNDIDADE]) or None
+        rotulos.append(_rotulo(frame.f_code))
+        frame = frame.f_back
+    return None
+
+
+class PerfisRegistry:
+    """Perfis recentes deste processo (e em PROFILER_DIR, se configurado)"""
+
+    def __init__(self):
+        self._perfis: deque = deque(maxlen=settings.PROFILER_MAX_PERFIS)
+
+    def adicionar(self, perfil: PerfilRequisicao):
+        self._perfis.append(perfil)
+        if settings.PROFILER_DIR:
+            os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+            nome = f"{perfil.inicio:%Y%m%dT%H%M%S}_{perfil.id}.folded"
+            with open(os.path.join(settings.PROFILER_DIR, nome), "w") as f:
+                f.write(perfil.collapsed())
+
+    def listar(self) -> List[dict]:
+        return [p.resumo() for p in reversed(self._perfis)]
+
+    def obter_collapsed(self, perfil_id: str) -> Optional[str]:
+        for perfil in self._perfis:
+            if perfil.id == perfil_id:
+                return perfil.collapsed()
+        if settings.PROFILER_DIR and perfil_id.isalnum() and os.path.isdir(settings.PROFILER_DIR):
+            for nome in os.listdir(settings.PROFILER_DIR):
+                if nome.endswith(f"_{perfil_id}.folded"):
+                    with open(os.path.join(settings.PROFILER_DIR, nome)) as f:
+                        return f.read()
+        return None
+
+    def agregado(self, rota: Optional[str] = None) -> str:
+        """Soma as amostras dos perfis em memória (opcionalmente de uma rota)"""
+        total: Counter = Counter()
+        for perfil in self._perfis:
+            if rota is None or perfil.route == rota:
+                for linha in perfil.collapsed().splitlines():
+                    pilha, n = linha.rsplit(" ", 1)
+                    total[pilha] += int(n)
+        return "".join(f"{pilha} {n}\n" for pilha, n in total.most_common())
+
+
+amostrador = Amostrador()
+perfis = PerfisRegistry()
+
+
+def _header(headers: Iterable, nome: bytes) -> Optional[bytes]:
+    for chave, valor in headers:
+        if chave == nome:
+            return valor
+    return None
+
+
+def _solicitado_por_admin(scope: Scope) -> bool:
+    """X-Profile: 1 com um access token válido de administrador"""
+    headers = scope.get("headers", [])
+    if _header(headers, PROFILE_HEADER) not in (b"1", b"true"):
+        return False
+    autorizacao = (_header(headers, b"authorization") or b"").decode("latin-1")
+    if not autorizacao.lower().startswith("bearer "):
+        return False
+    from jose import JWTError, jwt
+    from app.models.models import UserRole
+    try:
+        payload = jwt.decode(autorizacao[7:].strip(), settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("type") == "access" and payload.get("role") == UserRole.ADMIN.value
+
+
+class ProfilerMiddleware:
+    """Perfila as requisições marcadas pelo cabeçalho de admin ou pelo sorteio"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if _solicitado_por_admin(scope):
+            motivo = "cabecalho"
+        elif settings.PROFILER_SAMPLE_RATE > 0 and random.random() < settings.PROFILER_SAMPLE_RATE:
+            motivo = "amostragem"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        perfil = PerfilRequisicao(scope["method"], scope["path"], motivo)
+        perfil.frame = sys._getframe()
+        perfil.loop_thread = threading.get_ident()
+        token = _perfil_atual.set(perfil)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                perfil.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, perfil.id.encode())]
+            await send(message)
+
+        inicio = time.perf_counter()
+        amostrador.iniciar(perfil)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            amostrador.parar(perfil)
+            _perfil_atual.reset(token)
+            perfil.duracao = time.perf_counter() - inicio
+            perfil.route = getattr(scope.get("route"), "path", None) or perfil.path
+            perfis.adicionar(perfil)
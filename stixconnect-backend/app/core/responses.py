@@ -0,0 +1,241 @@
+"""
+Respostas HTTP customizadas
+"""
+
+import hashlib
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import anyio
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta um cabeçalho Range com um único intervalo.
+
+    Returns:
+        (início, fim inclusivo), None para servir o arquivo inteiro
+        (sem Range ou com múltiplos intervalos).
+
+    Raises:
+        ValueError: intervalo não satisfazível (416)
+    """
+    if not header or "," in header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Sufixo: últimos N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Range vazio")
+        return max(size - length, 0), size - 1
+    first = int(start)
+    last = int(end) if end else size - 1
+    if first >= size or last < first:
+        raise ValueError("Range fora do arquivo")
+    return first, min(last, size - 1)
+
+
+class RangeFileResponse(Response):
+    """
+    Serve um arquivo do disco com suporte a Range, ETag forte e
+    If-None-Match / If-Range.
+
+    Usa envio zero-copy (sendfile) quando o servidor ASGI oferece a extensão
+    "http.response.zerocopysend", ou delega o envio a um proxy (nginx
+    X-Accel-Redirect) quando `accel_redirect` é informado.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        request_headers: Headers,
+        media_type: Optional[str] = None,
+        etag: Optional[str] = None,
+        cache_control: Optional[str] = None,
+        method: str = "GET",
+        accel_redirect: Optional[str] = None,
+    ):
+        self.path = path
+        self.request_headers = request_headers
+        self.media_type = media_type or "application/octet-stream"
+        self.etag = etag
+        self.cache_control = cache_control
+        self.send_body = method != "HEAD"
+        self.accel_redirect = accel_redirect
+        self.background = None
+        self.body = b""
+        self.status_code = 200
+        self.raw_headers = []
+
+    def _etag_for(self, stat: os.stat_result) -> str:
+        if self.etag:
+            return f'"{self.etag}"'
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stat = await anyio.to_thread.run_sync(os.stat, self.path)
+        size = stat.st_size
+        etag = self._etag_for(stat)
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "content-type": self.media_type,
+        }
+        if self.cache_control:
+            headers["cache-control"] = self.cache_control
+
+        if_none_match = self.request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            await self._send_headers(send, 304, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        # If-Range: só aplica o Range se a versão ainda for a mesma
+        range_header = self.request_headers.get("range")
+        if_range = self.request_headers.get("if-range")
+        if if_range and if_range.strip() != etag:
+            range_header = None
+
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["content-range"] = f"bytes */{size}"
+            headers["content-length"] = "0"
+            await self._send_headers(send, 416, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status_code = 200
+        start, end = 0, size - 1
+        if byte_range is not None:
+            status_code = 206
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+        length = max(end - start + 1, 0)
+        headers["content-length"] = str(length)
+
+        if self.accel_redirect and byte_range is None:
+            # O proxy reverso faz o envio (e trata Range por conta própria)
+            headers["x-accel-redirect"] = self.accel_redirect
+            headers.pop("content-length")
+            await self._send_headers(send, 200, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await self._send_headers(send, status_code, headers)
+        if not self.send_body or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": start,
+                    "count": length,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+    async def _send_headers(self, send: Send, status_code: int, headers: dict):
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        })
+
+
+class RespostaJSON(JSONResponse):
+    """
+    default_response_class do app: codifica com orjson quando instalado
+    (senão, json da biblioteca padrão).
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+@lru_cache(maxsize=None)
+def _adaptador(tipo) -> TypeAdapter:
+    return TypeAdapter(tipo)
+
+
+def resposta_validada(tipo, dados: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Caminho rápido das listagens: valida `dados` (objetos ORM ou dicts) contra
+    `tipo` uma única vez e gera os bytes JSON direto no pydantic-core.
+
+    Com response_model, o FastAPI faz model_dump do retorno, revalida tudo
+    contra o response_model, converte com jsonable_encoder e só então chama
+    json.dumps. O response_model continua declarado nas rotas para o OpenAPI.
+    """
+    adaptador = _adaptador(tipo)
+    valor = adaptador.validate_python(dados, from_attributes=True)
+    return Response(adaptador.dump_json(valor), status_code=status_code, headers=headers, media_type="application/json")
+
+
+# ---- requisições condicionais (ETag fraca) ----
+
+# O cliente pode guardar, mas revalida sempre (If-None-Match)
+CACHE_CONTROL_REVALIDAR = "private, no-cache"
+
+
+def etag_fraca(*versao: Any) -> str:
+    """
+    ETag fraca a partir da versão do recurso (ids, updated_at, contagens,
+    parâmetros da página), sem serializar a resposta.
+    """
+    return 'W/"%s"' % hashlib.blake2b(repr(versao).encode(), digest_size=12).hexdigest()
+
+
+def cabecalhos_etag(etag: str) -> Dict[str, str]:
+    return {"etag": etag, "cache-control": CACHE_CONTROL_REVALIDAR}
+
+
+def nao_modificado(request: Request, etag: str) -> Optional[Response]:
+    """Resposta 304 se o If-None-Match da requisição casa com `etag` (comparação fraca)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    alvo = etag.removeprefix("W/")
+    if if_none_match.strip() != "*" and alvo not in (t.strip().removeprefix("W/") for t in if_none_match.split(",")):
+        return None
+    return Response(status_code=304, headers=cabecalhos_etag(etag))
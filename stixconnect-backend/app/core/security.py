@@ -112,6 +112,16 @@ def decode_token(token: str) -> TokenData:
         )
 
 
+def email_do_token(authorization: Optional[str]) -> Optional[str]:
+    """Usuário (sub) de um cabeçalho Authorization Bearer válido, ou None (uso em middlewares)"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return decode_token(authorization[7:]).email
+    except HTTPException:
+        return None
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
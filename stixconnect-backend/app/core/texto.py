@@ -0,0 +1,13 @@
+"""
+Normalização de texto compartilhada (modelos, busca e triagem).
+"""
+
+import unicodedata
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas e sem acentos ("Convulsão" -> "convulsao")"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
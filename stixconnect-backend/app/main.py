@@ -1,24 +1,75 @@
-from fastapi import FastAPI, Request, status
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-import os
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
 from app.core.database import engine, Base
-from app.routers import auth, consultas, admin, patients, files
+from app.routers import auth, consultas, admin, patients, files, uploads, triagem, search, agenda
+from app.routers.admin import require_admin
 from app.routers.users import router as users_router, admin_router as users_admin_router
 from app.core.config import settings
-
-# Cria as tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry
+from app.core.profiling import ProfilerMiddleware
+from app.core.responses import RespostaJSON
+from app.core.compressao import CompressaoMiddleware
+from app.core.idempotencia import IdempotenciaMiddleware
+from app.core.limite_taxa import LimiteTaxaMiddleware
+from app.services.preview_service import get_preview_pipeline
+from app.services.rollup_service import rollup_scheduler
+from app.services.arquivamento_service import arquivamento_scheduler
+from app.services.outbox_service import outbox_dispatcher
+from app.services.agenda_service import agenda_scheduler
+from app.services.notificacao_service import notificacao_dispatcher
+from app.websockets.difusao import difusao
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicialização e encerramento da aplicação.
+    O schema do banco vem do Alembic (alembic upgrade head, executado pelo
+    entrypoint do container); com DB_CREATE_ALL (padrão) as tabelas que
+    faltam também são criadas aqui.
+    """
+    if settings.DB_CREATE_ALL:
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    if settings.PREVIEW_ENABLED:
+        await get_preview_pipeline().start()
+    if settings.ROLLUP_ENABLED:
+        await rollup_scheduler.start()
+    if settings.ARQUIVAMENTO_ENABLED:
+        await arquivamento_scheduler.start()
+    await difusao.start()
+    if settings.OUTBOX_ENABLED:
+        await outbox_dispatcher.start()
+    if settings.AGENDA_ENABLED:
+        await agenda_scheduler.start()
+    if settings.NOTIFICACOES_ENABLED:
+        await notificacao_dispatcher.start()
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await notificacao_dispatcher.stop()
+        await agenda_scheduler.stop()
+        await outbox_dispatcher.stop()
+        await difusao.stop()
+        await arquivamento_scheduler.stop()
+        await rollup_scheduler.stop()
+        await get_preview_pipeline().stop()
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="API para gerenciamento de consultas médicas com integração Zoom",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=RespostaJSON,
 )
+app.state.ready = False
 
 # Configuração CORS - origens específicas para segurança
 ALLOWED_ORIGINS = settings.CORS_ORIGINS if hasattr(settings, 'CORS_ORIGINS') else [
@@ -31,6 +82,13 @@ ALLOWED_ORIGINS = settings.CORS_ORIGINS if hasattr(settings, 'CORS_ORIGINS') els
     "https://stixconnect.vercel.app", # Vercel preview deployments
 ]
 
+# Idempotency-Key (mais interno: as repetições recebem CORS e compressão da requisição atual)
+app.add_middleware(IdempotenciaMiddleware)
+
+# Limite de taxa (dentro do CORS, para o 429 chegar legível ao navegador)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(LimiteTaxaMiddleware)
+
 # CORS deve ser adicionado ANTES de qualquer outra configuração de rotas
 app.add_middleware(
     CORSMiddleware,
@@ -41,10 +99,17 @@ app.add_middleware(
     max_age=3600,  # Cache preflight por 1 hora
 )
 
-# Servir arquivos de upload locais (desenvolvimento)
-upload_dir = "uploads"
-if os.path.exists(upload_dir):
-    app.mount("/uploads", StaticFiles(directory=upload_dir), name="uploads")
+# Compressão gzip/brotli (dentro das métricas, que registram os bytes enviados)
+if settings.COMPRESSAO_ENABLED:
+    app.add_middleware(CompressaoMiddleware)
+
+# Profiler por amostragem (X-Profile de admin ou PROFILER_SAMPLE_RATE)
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# Métricas por requisição (mais externo: mede também o CORS e o profiler)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # ============================================
 # Rotas da API
@@ -55,16 +120,26 @@ app.include_router(auth.router)
 
 # Consultas e triagem
 app.include_router(consultas.router)
+app.include_router(triagem.router)
+
+# Agenda (expediente e horários livres)
+app.include_router(agenda.router)
 
 # Pacientes
 app.include_router(patients.router)
 
+# Busca (autocomplete)
+app.include_router(search.router)
+
 # Usuários (perfil próprio)
 app.include_router(users_router)
 
 # Arquivos
 app.include_router(files.router)
 
+# Arquivos de upload locais (desenvolvimento / on-premise)
+app.include_router(uploads.router)
+
 # Administração
 app.include_router(admin.router)
 app.include_router(users_admin_router)
@@ -82,9 +157,36 @@ def root():
     }
 
 @app.get("/health")
+@app.get("/health/live")
 def health_check():
+    """Liveness: o processo está de pé (não consulta dependências)"""
     return {"status": "ok"}
 
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: inicialização concluída e banco acessível"""
+    checks = {"startup": bool(app.state.ready)}
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        checks["database"] = True
+    except Exception as e:
+        print(f"Readiness: banco indisponível: {e}")
+        checks["database"] = False
+    if settings.PREVIEW_ENABLED:
+        checks["preview_pipeline"] = get_preview_pipeline().running
+    
+    ready = all(checks.values())
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not_ready", "checks": checks},
+    )
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_admin)])
+def metrics():
+    """Métricas no formato texto do Prometheus (apenas administradores, como o diagnóstico)"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Handler para erros de validação do Pydantic
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Boolean
+from sqlalchemy import Column, Integer, SmallInteger, Float, String, DateTime, Time, ForeignKey, Enum, Text, Boolean, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Optional
 import enum
+import re
 from app.core.database import Base
+from app.core.texto import fold_text
 
 class UserRole(str, enum.Enum):
     """14 roles de usuário do sistema StixConnect"""
@@ -29,6 +32,7 @@ class UserRole(str, enum.Enum):
     PATIENT = "patient"
 
 class ConsultaStatus(str, enum.Enum):
+    AGENDADA = "agendada"  # consulta agendada ainda fora da fila (ver agenda_service)
     AGUARDANDO = "aguardando"
     EM_TRIAGEM = "em_triagem"
     AGUARDANDO_MEDICO = "aguardando_medico"
@@ -46,6 +50,13 @@ class ClassificacaoUrgencia(str, enum.Enum):
     ALTA = "alta"
     CRITICA = "critica"
 
+class PreviewStatus(str, enum.Enum):
+    """Status da geração de miniatura/pré-visualização de um arquivo"""
+    PENDENTE = "pendente"
+    PRONTO = "pronto"
+    NAO_SUPORTADO = "nao_suportado"
+    FALHOU = "falhou"
+
 class AvailabilityStatus(str, enum.Enum):
     """Status de disponibilidade de profissionais para roteamento"""
     ONLINE = "online"
@@ -80,6 +91,12 @@ class User(Base):
     especialidade = Column(String(255), nullable=True)  # Para médicos/profissionais
     crm = Column(String(50), nullable=True)  # Para médicos
     
+    # Campos normalizados para busca (preenchidos na escrita, ver _normalizar_campos_busca)
+    nome_busca = Column(String(255), nullable=True)
+    email_busca = Column(String(255), index=True, nullable=True)
+    cpf_digitos = Column(String(14), index=True, nullable=True)
+    prontuario_digitos = Column(String(50), index=True, nullable=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -87,6 +104,44 @@ class User(Base):
     consultas_enfermeira = relationship("Consulta", back_populates="enfermeira", foreign_keys="Consulta.enfermeira_id")
     consultas_medico = relationship("Consulta", back_populates="medico", foreign_keys="Consulta.medico_id")
     triagens = relationship("Triagem", back_populates="paciente")
+    
+    # FULLTEXT no MySQL, trigramas (pg_trgm) no PostgreSQL, B-tree nos demais
+    __table_args__ = (
+        Index(
+            "ix_users_nome_busca",
+            "nome_busca",
+            mysql_prefix="FULLTEXT",
+            postgresql_using="gin",
+            postgresql_ops={"nome_busca": "gin_trgm_ops"},
+        ),
+    )
+
+
+_PALAVRA_RE = re.compile(r"\w+")
+
+
+def normalizar_nome(nome: Optional[str]) -> Optional[str]:
+    """Palavras em minúsculas e sem acentos ("José D'Ávila" -> "jose d avila")"""
+    if not nome:
+        return None
+    return " ".join(_PALAVRA_RE.findall(fold_text(nome))) or None
+
+
+def somente_digitos(valor: Optional[str]) -> Optional[str]:
+    """Mantém apenas os dígitos ("123.456.789-00" -> "12345678900")"""
+    if not valor:
+        return None
+    digitos = "".join(c for c in valor if c.isdigit())
+    return digitos or None
+
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _normalizar_campos_busca(mapper, connection, target: User):
+    target.nome_busca = normalizar_nome(target.nome)
+    target.email_busca = target.email.lower() if target.email else None
+    target.cpf_digitos = somente_digitos(target.cpf)
+    target.prontuario_digitos = somente_digitos(target.num_prontuario)
 
 class Consulta(Base):
     __tablename__ = "consultas"
@@ -101,8 +156,9 @@ class Consulta(Base):
     classificacao_urgencia = Column(Enum(ClassificacaoUrgencia))
     
     data_agendamento = Column(DateTime, nullable=True)
+    data_agendamento_fim = Column(DateTime, nullable=True)
     data_inicio = Column(DateTime, nullable=True)
-    data_fim = Column(DateTime, nullable=True)
+    data_fim = Column(DateTime, nullable=True, index=True)
     duracao_minutos = Column(Integer, nullable=True)
     
     zoom_meeting_id = Column(String(255), unique=True)
@@ -121,6 +177,13 @@ class Consulta(Base):
     medico = relationship("User", back_populates="consultas_medico", foreign_keys=[medico_id])
     triagem = relationship("Triagem", back_populates="consulta", uselist=False)
 
+    # Fila e painéis filtram por status (estados ativos) ordenando por chegada;
+    # a agenda busca os horários reservados de cada profissional por período
+    __table_args__ = (
+        Index("ix_consultas_status_created", "status", "created_at"),
+        Index("ix_consultas_medico_agendamento", "medico_id", "data_agendamento"),
+    )
+
 class Triagem(Base):
     __tablename__ = "triagens"
     
@@ -138,6 +201,13 @@ class Triagem(Base):
     medicamentos_uso = Column(Text)
     alergias = Column(Text)
     
+    # Sinais vitais normalizados na escrita (ver app/services/sinais_vitais.py)
+    temperatura_c = Column(Float, nullable=True)
+    frequencia_cardiaca_bpm = Column(SmallInteger, nullable=True)
+    saturacao_oxigenio_pct = Column(SmallInteger, nullable=True)
+    pressao_sistolica_mmhg = Column(SmallInteger, nullable=True)
+    pressao_diastolica_mmhg = Column(SmallInteger, nullable=True)
+    
     classificacao_automatica = Column(Enum(ClassificacaoUrgencia))
     classificacao_enfermeira = Column(Enum(ClassificacaoUrgencia))
     
@@ -145,4 +215,231 @@ class Triagem(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     consulta = relationship("Consulta", back_populates="triagem")
-    paciente = relationship("User", back_populates="triagens")
\ No newline at end of file
+    paciente = relationship("User", back_populates="triagens")
+    
+    # Consultas por limiar em um período ("SpO2 < 92 hoje")
+    __table_args__ = (
+        Index("ix_triagens_saturacao_created", "saturacao_oxigenio_pct", "created_at"),
+        Index("ix_triagens_temperatura_created", "temperatura_c", "created_at"),
+        Index("ix_triagens_fc_created", "frequencia_cardiaca_bpm", "created_at"),
+        Index("ix_triagens_sistolica_created", "pressao_sistolica_mmhg", "created_at"),
+    )
+
+class ConsultaArquivada(Base):
+    """
+    Consulta encerrada movida para o arquivo (ver app/services/arquivamento_service.py).
+    Mesmas colunas e ids de consultas; somente leitura.
+    """
+    __tablename__ = "consultas_arquivo"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    paciente_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    enfermeira_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    medico_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    tipo = Column(Enum(ConsultaTipo), nullable=False)
+    status = Column(Enum(ConsultaStatus))
+    classificacao_urgencia = Column(Enum(ClassificacaoUrgencia))
+
+    data_agendamento = Column(DateTime, nullable=True)
+    data_agendamento_fim = Column(DateTime, nullable=True)
+    data_inicio = Column(DateTime, nullable=True)
+    data_fim = Column(DateTime, nullable=True, index=True)
+    duracao_minutos = Column(Integer, nullable=True)
+
+    zoom_meeting_id = Column(String(255))
+    zoom_join_url = Column(String(512))
+    zoom_start_url = Column(String(512))
+    zoom_password = Column(String(50))
+
+    observacoes = Column(Text)
+    diagnostico = Column(Text)
+
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    arquivada_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    paciente = relationship("User", foreign_keys=[paciente_id], viewonly=True)
+    enfermeira = relationship("User", foreign_keys=[enfermeira_id], viewonly=True)
+    medico = relationship("User", foreign_keys=[medico_id], viewonly=True)
+    triagem = relationship("TriagemArquivada", uselist=False, viewonly=True)
+
+    # Histórico do paciente
+    __table_args__ = (
+        Index("ix_consultas_arquivo_paciente_created", "paciente_id", "created_at"),
+    )
+
+class TriagemArquivada(Base):
+    """Triagem de uma consulta arquivada (mesmas colunas e ids de triagens)"""
+    __tablename__ = "triagens_arquivo"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    consulta_id = Column(Integer, ForeignKey("consultas_arquivo.id"), nullable=False, index=True)
+    paciente_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    sintomas = Column(Text, nullable=False)
+    temperatura = Column(String(10))
+    pressao_arterial = Column(String(20))
+    frequencia_cardiaca = Column(String(10))
+    saturacao_oxigenio = Column(String(10))
+    dor_escala = Column(Integer)
+    historico_medico = Column(Text)
+    medicamentos_uso = Column(Text)
+    alergias = Column(Text)
+
+    temperatura_c = Column(Float, nullable=True)
+    frequencia_cardiaca_bpm = Column(SmallInteger, nullable=True)
+    saturacao_oxigenio_pct = Column(SmallInteger, nullable=True)
+    pressao_sistolica_mmhg = Column(SmallInteger, nullable=True)
+    pressao_diastolica_mmhg = Column(SmallInteger, nullable=True)
+
+    classificacao_automatica = Column(Enum(ClassificacaoUrgencia))
+    classificacao_enfermeira = Column(Enum(ClassificacaoUrgencia))
+
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+class ArquivoBlob(Base):
+    """Conteúdo armazenado, endereçado pelo SHA-256 e compartilhado entre uploads iguais"""
+    __tablename__ = "arquivo_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, index=True, nullable=False)
+    storage_key = Column(String(512), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=1, nullable=False)
+
+    # Derivados gerados em segundo plano, armazenados ao lado do original
+    preview_status = Column(Enum(PreviewStatus, native_enum=False, values_callable=lambda x: [e.value for e in PreviewStatus]), default=PreviewStatus.PENDENTE, nullable=False)
+    thumbnail_key = Column(String(512), nullable=True)
+    preview_key = Column(String(512), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    arquivos = relationship("Arquivo", back_populates="blob")
+
+
+class Arquivo(Base):
+    """Upload de um usuário (referência a um ArquivoBlob)"""
+    __tablename__ = "arquivos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    blob_id = Column(Integer, ForeignKey("arquivo_blobs.id"), nullable=False, index=True)
+    patient_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    original_name = Column(String(255), nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    blob = relationship("ArquivoBlob", back_populates="arquivos")
+
+
+class ConsultaRollupHorario(Base):
+    """
+    Agregado por hora de encerramento (data_fim) das consultas encerradas, por
+    role do profissional, urgência e métrica ("espera" ou "duracao", em
+    segundos), com um DDSketch serializado para estimar quantis. Dias completos
+    também têm um agregado diário (granularidade "dia", hora = 00:00).
+    """
+    __tablename__ = "consulta_rollups_horarios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularidade = Column(String(10), nullable=False, default="hora")
+    hora = Column(DateTime, nullable=False)
+    role = Column(String(50), nullable=False)
+    urgencia = Column(String(20), nullable=False)
+    metrica = Column(String(20), nullable=False)
+
+    quantidade = Column(Integer, nullable=False)
+    soma = Column(Float, nullable=False)
+    minimo = Column(Float, nullable=True)
+    maximo = Column(Float, nullable=True)
+    sketch = Column(Text, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("granularidade", "hora", "role", "urgencia", "metrica", name="uq_consulta_rollups_hora_dimensoes"),
+    )
+
+
+class EventoOutbox(Base):
+    """
+    Evento de domínio gravado na mesma transação da alteração que o gerou
+    (transactional outbox). O OutboxDispatcher (app/services/outbox_service.py)
+    entrega cada evento aos assinantes do tipo, ao menos uma vez.
+    """
+    __tablename__ = "outbox_eventos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(64), nullable=False)
+    agregado_id = Column(Integer, nullable=True)
+    payload = Column(Text, nullable=False)  # JSON
+
+    estado = Column(String(16), nullable=False, default="pendente")  # pendente, processado, falhou
+    tentativas = Column(Integer, nullable=False, default=0)
+    entregues = Column(Text, nullable=True)  # JSON: assinantes que já receberam o evento
+    disponivel_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    reservado_por = Column(String(36), nullable=True)
+    erro = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processado_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_eventos_estado_disponivel", "estado", "disponivel_em"),
+    )
+
+
+class HorarioTrabalho(Base):
+    """
+    Expediente semanal de um profissional para consultas agendadas: no
+    dia_semana (0 = segunda), de hora_inicio a hora_fim no fuso
+    AGENDA_FUSO_HORARIO, dividido em slots de duracao_slot_minutos.
+    """
+    __tablename__ = "horarios_trabalho"
+
+    id = Column(Integer, primary_key=True, index=True)
+    profissional_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    dia_semana = Column(SmallInteger, nullable=False)
+    hora_inicio = Column(Time, nullable=False)
+    hora_fim = Column(Time, nullable=False)
+    duracao_slot_minutos = Column(SmallInteger, nullable=False, default=30)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_horarios_trabalho_profissional_dia", "profissional_id", "dia_semana"),
+    )
+
+
+class Notificacao(Base):
+    """
+    SMS na fila de envio. O NotificacaoDispatcher
+    (app/services/notificacao_service.py) envia em lotes e grava o resultado;
+    chave_dedup evita que o mesmo aviso seja enviado duas vezes.
+    """
+    __tablename__ = "notificacoes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    canal = Column(String(16), nullable=False, default="sms")
+    destino = Column(String(20), nullable=False)
+    mensagem = Column(Text, nullable=False)
+    chave_dedup = Column(String(128), nullable=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    consulta_id = Column(Integer, nullable=True)
+
+    estado = Column(String(16), nullable=False, default="pendente")  # pendente, enviada, falhou, duplicada
+    tentativas = Column(Integer, nullable=False, default=0)
+    disponivel_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    reservado_por = Column(String(36), nullable=True)
+    provedor_id = Column(String(64), nullable=True)
+    erro = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    enviada_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notificacoes_estado_disponivel", "estado", "disponivel_em"),
+    )
@@ -1,10 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from datetime import datetime
-from app.core.database import get_db
+from typing import List, Optional
+from datetime import datetime, timedelta
+from app.core.database import get_db, get_read_db
 from app.core.security import get_current_user
+from app.core.metrics import consultas_lentas
+from app.core.profiling import perfis
+from app.core.responses import resposta_validada
+from app.routers.consultas import com_relacionamentos
+from app.services.estatisticas_service import estatisticas_service
+from app.services.rollup_service import RollupEmExecucaoError, rollup_scheduler, rollup_service, utc_naive
+from app.services.arquivamento_service import ArquivamentoEmExecucaoError, arquivamento_scheduler, arquivamento_service
+from app.services.outbox_service import outbox_dispatcher
+from app.services.notificacao_service import notificacao_dispatcher
 from app.models.models import User, Consulta, UserRole, ConsultaStatus
 from app.schemas.schemas import ConsultaDetailResponse, UserResponse
 
@@ -17,12 +26,118 @@ def require_admin(current_user: User = Depends(get_current_user)):
 
 @router.get("/consultas", response_model=List[ConsultaDetailResponse])
 def listar_todas_consultas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), admin: User = Depends(require_admin)):
-    consultas = db.query(Consulta).order_by(Consulta.created_at.desc()).offset(skip).limit(limit).all()
-    return consultas
+    consultas = com_relacionamentos(db.query(Consulta)).order_by(Consulta.created_at.desc()).offset(skip).limit(limit).all()
+    return resposta_validada(List[ConsultaDetailResponse], consultas)
 
 @router.get("/estatisticas")
-def obter_estatisticas(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
-    hoje = datetime.utcnow().date()
-    total_consultas = db.query(func.count(Consulta.id)).scalar()
-    consultas_hoje = db.query(func.count(Consulta.id)).filter(func.date(Consulta.created_at) == hoje).scalar()
-    return {"total_consultas": total_consultas, "consultas_hoje": consultas_hoje}
\ No newline at end of file
+def obter_estatisticas(db: Session = Depends(get_read_db), admin: User = Depends(require_admin)):
+    """
+    Totais de consultas (geral, hoje, por status, urgência e profissional) e
+    médias de espera e duração, lidos de contadores incrementais em memória.
+    """
+    return estatisticas_service.resumo(db)
+
+@router.get("/analytics/tempos")
+def obter_tempos(
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    agrupar: str = "total",
+    role: Optional[str] = None,
+    urgencia: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    admin: User = Depends(require_admin),
+):
+    """
+    Percentis (p50/p90/p95/p99) de espera e duração das consultas encerradas
+    em [inicio, fim) (padrão: últimas 24h), agrupados por total, hora, dia,
+    role ou urgência. Calculado a partir dos rollups horários.
+    """
+    if agrupar not in ("total", "hora", "dia", "role", "urgencia"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="agrupar deve ser total, hora, dia, role ou urgencia")
+    fim = utc_naive(fim) if fim else datetime.utcnow()
+    inicio = utc_naive(inicio) if inicio else fim - timedelta(hours=24)
+    if inicio >= fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="inicio deve ser anterior a fim")
+    return rollup_service.consultar(db, inicio, fim, agrupar=agrupar, role=role, urgencia=urgencia)
+
+@router.post("/analytics/rollup", status_code=status.HTTP_202_ACCEPTED)
+async def executar_rollup(desde: Optional[datetime] = None, admin: User = Depends(require_admin)):
+    """
+    Agenda o job de rollup em segundo plano (com `desde`, reprocessa a partir
+    dessa data) e responde 202; o andamento fica em GET /admin/analytics/rollup.
+    """
+    desde = utc_naive(desde) if desde else None
+    if desde is not None and desde >= datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="desde deve estar no passado")
+    try:
+        return rollup_scheduler.reprocessar(desde)
+    except RollupEmExecucaoError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/analytics/rollup")
+def status_rollup(admin: User = Depends(require_admin)):
+    """Estado do último reprocessamento de rollups agendado neste processo"""
+    return rollup_scheduler.ultimo_reprocessamento
+
+@router.get("/manutencao/arquivamento")
+def relatorios_arquivamento(admin: User = Depends(require_admin)):
+    """Relatórios das últimas execuções do arquivamento neste processo"""
+    return list(arquivamento_service.relatorios)
+
+@router.post("/manutencao/arquivamento", status_code=status.HTTP_202_ACCEPTED)
+async def executar_arquivamento(
+    idade_dias: Optional[int] = None,
+    max_lotes: Optional[int] = None,
+    admin: User = Depends(require_admin)
+):
+    """
+    Agenda em segundo plano o arquivamento das consultas encerradas há mais de
+    `idade_dias` (padrão da configuração) e responde 202; o andamento fica em
+    GET /admin/manutencao/arquivamento/execucao.
+    """
+    try:
+        return arquivamento_scheduler.arquivar(idade_dias=idade_dias, max_lotes=max_lotes)
+    except ArquivamentoEmExecucaoError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/manutencao/arquivamento/execucao")
+def status_arquivamento(admin: User = Depends(require_admin)):
+    """Estado do último arquivamento agendado pelo admin neste processo"""
+    return arquivamento_scheduler.ultima_execucao
+
+@router.get("/manutencao/outbox")
+def resumo_outbox(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
+    """Eventos do outbox por estado, pendente mais antigo e falhas recentes de entrega"""
+    return outbox_dispatcher.resumo(db)
+
+@router.get("/manutencao/notificacoes")
+def resumo_notificacoes(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
+    """SMS por estado, pendente mais antigo e falhas recentes de envio"""
+    return notificacao_dispatcher.resumo(db)
+
+# ============================================
+# Diagnóstico de desempenho (por processo)
+# ============================================
+
+@router.get("/diagnostico/consultas-lentas")
+def listar_consultas_lentas(limit: int = 50, admin: User = Depends(require_admin)):
+    """Últimas consultas SQL acima de SLOW_QUERY_MS, da mais recente"""
+    return list(consultas_lentas)[::-1][:limit]
+
+@router.get("/diagnostico/perfis")
+def listar_perfis(admin: User = Depends(require_admin)):
+    """Requisições perfiladas recentemente (X-Profile ou amostragem)"""
+    return perfis.listar()
+
+@router.get("/diagnostico/perfis/agregado", response_class=PlainTextResponse)
+def perfil_agregado(rota: Optional[str] = None, admin: User = Depends(require_admin)):
+    """Pilhas collapsed somadas dos perfis em memória (entrada do flamegraph.pl)"""
+    return perfis.agregado(rota)
+
+@router.get("/diagnostico/perfis/{perfil_id}", response_class=PlainTextResponse)
+def obter_perfil(perfil_id: str, admin: User = Depends(require_admin)):
+    """Pilhas collapsed de uma requisição (id do cabeçalho X-Profile-Id)"""
+    collapsed = perfis.obter_collapsed(perfil_id)
+    if collapsed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil não encontrado")
+    return collapsed
@@ -0,0 +1,69 @@
+"""
+Router da Agenda
+Expediente dos profissionais e horários livres para consultas agendadas
+(a reserva é feita em POST /consultas/ com tipo "agendada")
+"""
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db, get_read_db
+from app.core.responses import resposta_validada
+from app.core.security import get_current_user, ADMIN_ROLES
+from app.models.models import User, UserRole
+from app.schemas.schemas import AgendaSlotsResponse, HorarioTrabalhoCreate, HorarioTrabalhoResponse
+from app.services.agenda_service import AgendaInvalidaError, agenda_service, dia_local
+
+router = APIRouter(prefix="/agenda", tags=["Agenda"])
+
+
+@router.get("/slots", response_model=List[AgendaSlotsResponse])
+def listar_slots(
+    data_inicio: Optional[date] = Query(None, description="Primeiro dia (fuso da agenda); padrão: hoje"),
+    data_fim: Optional[date] = Query(None, description="Último dia, inclusive; padrão: 7 dias"),
+    profissional_id: Optional[int] = None,
+    role: Optional[UserRole] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Horários livres (UTC) de um profissional ou de todos os profissionais de um papel no período"""
+    data_inicio = data_inicio or dia_local(datetime.utcnow())
+    data_fim = data_fim or data_inicio + timedelta(days=6)
+    try:
+        agenda = agenda_service.listar_slots(db, data_inicio, data_fim, profissional_id=profissional_id, role=role)
+    except AgendaInvalidaError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return resposta_validada(List[AgendaSlotsResponse], agenda)
+
+
+@router.get("/horarios/{profissional_id}", response_model=List[HorarioTrabalhoResponse])
+def listar_horarios(
+    profissional_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Expediente semanal do profissional"""
+    return agenda_service.horarios(db, profissional_id)
+
+
+@router.put("/horarios/{profissional_id}", response_model=List[HorarioTrabalhoResponse])
+def definir_horarios(
+    profissional_id: int,
+    blocos: List[HorarioTrabalhoCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Substitui o expediente semanal (o próprio profissional, recepção ou administração)"""
+    if current_user.id != profissional_id and current_user.role not in ADMIN_ROLES + [UserRole.RECEPTIONIST]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para alterar o expediente deste profissional"
+        )
+    profissional = db.query(User).filter(User.id == profissional_id).first()
+    if not profissional:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profissional não encontrado")
+    try:
+        return agenda_service.definir_horarios(db, profissional, [b.model_dump() for b in blocos])
+    except AgendaInvalidaError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
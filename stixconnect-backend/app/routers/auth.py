@@ -1,5 +1,6 @@
+import math
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import (
@@ -7,6 +8,8 @@ from app.core.security import (
     create_refresh_token, get_current_user
 )
 from app.core.config import settings
+from app.core.limite_taxa import LoginBloqueadoError, controle_login, ip_cliente
+from app.core.responses import cabecalhos_etag, etag_fraca, nao_modificado
 from app.models.models import User
 from app.schemas.schemas import (
     Token, LoginRequest, UserCreate, UserResponse,
@@ -57,13 +60,25 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+def login(credentials: LoginRequest, request: Request, db: Session = Depends(get_db)):
     """Autentica um usuário e retorna tokens JWT (access + refresh)"""
     
+    # Backoff de falhas e limite por conta antes de qualquer consulta ou bcrypt
+    ip = ip_cliente(request.scope)
+    try:
+        controle_login.verificar(credentials.email, ip)
+    except LoginBloqueadoError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente mais tarde.",
+            headers={"Retry-After": str(max(1, math.ceil(e.espera)))},
+        )
+    
     user = db.query(User).filter(User.email == credentials.email).first()
     
     # Não revelar se o email existe ou não (segurança)
     if not user or not verify_password(credentials.senha, user.senha_hash):
+        controle_login.registrar_falha(credentials.email, ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email / matrícula ou senha incorretos.",
@@ -76,6 +91,8 @@ def login(credentials: LoginRequest, db: Session = Depends(get_db)):
             detail="Usuário inativo"
         )
     
+    controle_login.registrar_sucesso(credentials.email, ip)
+    
     # Criar access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -171,6 +188,11 @@ def logout(current_user: User = Depends(get_current_user), db: Session = Depends
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
-    """Retorna informações do usuário autenticado"""
+def get_current_user_info(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    """Retorna informações do usuário autenticado (com ETag; 304 se não mudou)"""
+    etag = etag_fraca("users", current_user.id, current_user.updated_at)
+    nao_mudou = nao_modificado(request, etag)
+    if nao_mudou:
+        return nao_mudou
+    response.headers.update(cabecalhos_etag(etag))
     return current_user
\ No newline at end of file
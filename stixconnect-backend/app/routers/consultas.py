@@ -1,29 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 from datetime import datetime
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.responses import cabecalhos_etag, etag_fraca, nao_modificado, resposta_validada
 from app.core.security import get_current_user
-from app.models.models import User, Consulta, Triagem, ConsultaStatus, ConsultaTipo, UserRole
-from app.schemas.schemas import ConsultaCreate, ConsultaResponse, ConsultaUpdate, ConsultaDetailResponse, TriagemUpdate, TransferToProfessionalRequest
-from app.services.zoom_service import zoom_service
+from app.models.models import User, Consulta, ConsultaArquivada, Triagem, TriagemArquivada, ConsultaStatus, ConsultaTipo, UserRole
+from app.schemas.schemas import ConsultaCreate, ConsultaResponse, ConsultaUpdate, ConsultaDetailResponse, TriagemUpdate, TransferToProfessionalRequest, ConsultaFinalizarRequest, ConsultaCancelarRequest
+from app.services.reunioes_service import solicitar_reuniao
+from app.services.agenda_service import AgendaInvalidaError, HorarioIndisponivelError, agenda_service
 from app.services.triagem_service import triagem_service
+from app.services.sinais_vitais import normalizar_sinais_vitais
 from app.services.routing_service import routing_service
+from app.services.arquivamento_service import arquivamento_service
+from app.services.consulta_status_service import (
+    consulta_status_service, ConflitoTransicaoError, TransicaoInvalidaError,
+)
 
 router = APIRouter(prefix="/consultas", tags=["Consultas"])
 
+def com_relacionamentos(query):
+    """Carrega paciente, equipe e triagem em poucas consultas (evita N+1 ao serializar)"""
+    return query.options(
+        selectinload(Consulta.paciente), selectinload(Consulta.enfermeira),
+        selectinload(Consulta.medico), selectinload(Consulta.triagem),
+    )
+
+
+def etag_consulta(db: Session, consulta) -> str:
+    """
+    ETag do detalhe da consulta: updated_at da consulta, da triagem e das
+    pessoas envolvidas, lidos em uma consulta leve (sem carregar os relacionamentos)
+    """
+    triagem = TriagemArquivada if isinstance(consulta, ConsultaArquivada) else Triagem
+    pessoas = [i for i in (consulta.paciente_id, consulta.enfermeira_id, consulta.medico_id) if i is not None]
+    versao_triagem, versao_pessoas = db.execute(select(
+        select(func.max(triagem.updated_at)).where(triagem.consulta_id == consulta.id).scalar_subquery(),
+        select(func.max(User.updated_at)).where(User.id.in_(pessoas)).scalar_subquery(),
+    )).one()
+    return etag_fraca(consulta.__tablename__, consulta.id, consulta.updated_at, versao_triagem, versao_pessoas)
+
+
+ROLES_PROFISSIONAIS = [UserRole.DOCTOR, UserRole.PHYSIOTHERAPIST, UserRole.NUTRITIONIST,
+                       UserRole.PSYCHOLOGIST, UserRole.SPEECH_THERAPIST, UserRole.ACUPUNCTURIST,
+                       UserRole.CLINICAL_PSYPEDAGOGIST, UserRole.HAIRDRESSER, UserRole.CAREGIVER]
+
+
+def _transicionar(db: Session, consulta: Consulta, novo: ConsultaStatus, current_user: User, valores: dict = None, commit: bool = False):
+    """Aplica a transição de status, convertendo os erros da máquina de estados em HTTP"""
+    try:
+        return consulta_status_service.transicionar(
+            db, consulta, novo, usuario_id=current_user.id, valores=valores, commit=commit
+        )
+    except TransicaoInvalidaError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Não é possível passar de {consulta.status.value} para {novo.value}"
+        )
+    except ConflitoTransicaoError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
 @router.post("/", response_model=ConsultaResponse, status_code=status.HTTP_201_CREATED)
 def criar_consulta(consulta_data: ConsultaCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Cria uma nova consulta e automaticamente atribui a um enfermeiro disponível"""
+    """
+    Cria uma nova consulta. Urgentes são atribuídas a um enfermeiro disponível;
+    agendadas com profissional_id reservam o horário do profissional e entram
+    na fila dele perto do horário. Agendadas sem profissional_id (clientes
+    anteriores à agenda) seguem o fluxo das urgentes, com data_agendamento
+    apenas informativa.
+    """
     if current_user.role != UserRole.PATIENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas pacientes podem criar consultas")
     
-    nova_consulta = Consulta(
-        paciente_id=current_user.id,
-        tipo=consulta_data.tipo,
-        data_agendamento=consulta_data.data_agendamento,
-        status=ConsultaStatus.AGUARDANDO,
-    )
+    if consulta_data.tipo == ConsultaTipo.AGENDADA and consulta_data.profissional_id is not None:
+        try:
+            profissional, inicio, fim = agenda_service.reservar(
+                db, consulta_data.profissional_id, consulta_data.data_agendamento
+            )
+        except AgendaInvalidaError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+        except HorarioIndisponivelError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        nova_consulta = Consulta(
+            paciente_id=current_user.id,
+            tipo=ConsultaTipo.AGENDADA,
+            medico_id=profissional.id,
+            data_agendamento=inicio,
+            data_agendamento_fim=fim,
+            status=ConsultaStatus.AGENDADA,
+        )
+    else:
+        nova_consulta = Consulta(
+            paciente_id=current_user.id,
+            tipo=consulta_data.tipo,
+            data_agendamento=consulta_data.data_agendamento,
+            status=ConsultaStatus.AGUARDANDO,
+        )
     db.add(nova_consulta)
     db.flush()
     
@@ -50,19 +124,19 @@ def criar_consulta(consulta_data: ConsultaCreate, db: Session = Depends(get_db),
             alergias=triagem_data.alergias,
             classificacao_automatica=classificacao,
         )
+        normalizar_sinais_vitais(nova_triagem)
         nova_consulta.classificacao_urgencia = classificacao
         db.add(nova_triagem)
 
-    # SEMPRE tentar atribuir automaticamente a um enfermeiro disponível
-    enfermeira = routing_service.get_available_nurse(db)
+    # Urgentes: SEMPRE tentar atribuir automaticamente a um enfermeiro disponível
+    enfermeira = routing_service.get_available_nurse(db) if nova_consulta.status == ConsultaStatus.AGUARDANDO else None
     if enfermeira:
         nova_consulta.enfermeira_id = enfermeira.id
         nova_consulta.status = ConsultaStatus.EM_TRIAGEM
-        enfermeira.pacientes_atuais = (enfermeira.pacientes_atuais or 0) + 1
-        db.add(enfermeira)
+        consulta_status_service.ajustar_carga(db, enfermeira.id, +1)
     else:
         # Se não houver enfermeiro disponível, mantém status AGUARDANDO
-        # O enfermeiro poderá pegar da fila depois
+        # O enfermeiro poderá pegar da fila depois (agendadas: AgendaScheduler)
         pass
 
     db.commit()
@@ -72,7 +146,7 @@ def criar_consulta(consulta_data: ConsultaCreate, db: Session = Depends(get_db),
 
 @router.get("/queue", response_model=List[ConsultaDetailResponse])
 def listar_fila_consultas(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -86,7 +160,7 @@ def listar_fila_consultas(
         )
 
     query = (
-        db.query(Consulta)
+        com_relacionamentos(db.query(Consulta))
         .filter(Consulta.status == ConsultaStatus.AGUARDANDO)
         .order_by(
             Consulta.classificacao_urgencia.desc(),  # crítica/alta primeiro
@@ -94,12 +168,12 @@ def listar_fila_consultas(
         )
     )
     consultas = query.all()
-    return consultas
+    return resposta_validada(List[ConsultaDetailResponse], consultas)
 
 @router.get("/", response_model=List[ConsultaDetailResponse])
 def listar_consultas(status_filter: ConsultaStatus = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Lista consultas baseado no role do usuário"""
-    query = db.query(Consulta)
+    query = com_relacionamentos(db.query(Consulta))
     
     if current_user.role == UserRole.PATIENT:
         # Pacientes veem apenas suas próprias consultas
@@ -127,16 +201,17 @@ def listar_consultas(status_filter: ConsultaStatus = None, db: Session = Depends
         query = query.filter(Consulta.status == status_filter)
     
     consultas = query.order_by(Consulta.created_at.desc()).all()
-    return consultas
+    return resposta_validada(List[ConsultaDetailResponse], consultas)
 
 @router.get("/{consulta_id}", response_model=ConsultaDetailResponse)
 def obter_consulta(
     consulta_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtém detalhes de uma consulta específica"""
-    consulta = db.query(Consulta).filter(Consulta.id == consulta_id).first()
+    """Obtém detalhes de uma consulta específica (inclusive arquivada)"""
+    consulta = arquivamento_service.buscar_consulta(db, consulta_id)
     
     if not consulta:
         raise HTTPException(
@@ -167,7 +242,11 @@ def obter_consulta(
             )
     # Admins e supervisores podem ver todas
     
-    return consulta
+    etag = etag_consulta(db, consulta)
+    nao_mudou = nao_modificado(request, etag)
+    if nao_mudou:
+        return nao_mudou
+    return resposta_validada(ConsultaDetailResponse, consulta, headers=cabecalhos_etag(etag))
 
 @router.post("/{consulta_id}/iniciar-atendimento")
 def iniciar_atendimento(consulta_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -178,29 +257,29 @@ def iniciar_atendimento(consulta_id: int, db: Session = Depends(get_db), current
     if not consulta:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
     
-    # Criar reunião Zoom se ainda não existir
-    if not consulta.zoom_meeting_id:
-        topic = f"Triagem - {consulta.paciente.nome}"
-        meeting = zoom_service.create_meeting(topic=topic, duration=60)
-        consulta.zoom_meeting_id = meeting["meeting_id"]
-        consulta.zoom_join_url = meeting["join_url"]
-        consulta.zoom_start_url = meeting["start_url"]
-        consulta.zoom_password = meeting["password"]
-    
-    # Atribuir ao enfermeiro se ainda não estiver atribuído
-    if not consulta.enfermeira_id:
-        consulta.enfermeira_id = current_user.id
-        current_user.pacientes_atuais = (current_user.pacientes_atuais or 0) + 1
-        db.add(current_user)
-    
-    consulta.status = ConsultaStatus.EM_TRIAGEM
-    if not consulta.data_inicio:
+    if consulta.status == ConsultaStatus.AGUARDANDO:
+        # Retirar da fila: só uma enfermeira vence a disputa pela mesma consulta
+        valores = {"enfermeira_id": consulta.enfermeira_id or current_user.id}
+        if not consulta.data_inicio:
+            valores["data_inicio"] = datetime.utcnow()
+        _transicionar(db, consulta, ConsultaStatus.EM_TRIAGEM, current_user, valores)
+    elif consulta.status != ConsultaStatus.EM_TRIAGEM:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Consulta não pode iniciar triagem. Status atual: {consulta.status.value}"
+        )
+    elif not consulta.data_inicio:
         consulta.data_inicio = datetime.utcnow()
     
+    # Reunião Zoom criada em segundo plano (outbox): a resposta sai "pendente"
+    # e a sala recebe "zoom_ready" quando ela estiver pronta
+    if not consulta.zoom_meeting_id:
+        solicitar_reuniao(db, consulta, f"Triagem - {consulta.paciente.nome}")
     db.commit()
     db.refresh(consulta)
     return {
         "message": "Atendimento iniciado",
+        "zoom_status": "pronta" if consulta.zoom_meeting_id else "pendente",
         "zoom_join_url": consulta.zoom_join_url,
         "zoom_password": consulta.zoom_password
     }
@@ -244,6 +323,7 @@ def atualizar_triagem(
     update_data = triagem_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(triagem, field, value)
+    normalizar_sinais_vitais(triagem)
     
     # Se classificacao_enfermeira foi atualizada, atualizar também na consulta
     if triagem_data.classificacao_enfermeira:
@@ -313,25 +393,19 @@ def encaminhar_para_profissional(
             detail="Não é possível encaminhar para outro enfermeiro"
         )
     
-    # Encaminhar usando o routing service
-    consulta = routing_service.transfer_to_professional(db, consulta, profissional)
+    # Encaminhar usando o routing service (libera a carga do enfermeiro)
+    try:
+        consulta = routing_service.transfer_to_professional(db, consulta, profissional)
+    except ConflitoTransicaoError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     
     # Adicionar observações se fornecidas
     if transfer_data.observacoes:
         consulta.observacoes = transfer_data.observacoes
     
-    # Decrementar contador do enfermeiro
-    if current_user.pacientes_atuais and current_user.pacientes_atuais > 0:
-        current_user.pacientes_atuais -= 1
-        db.add(current_user)
-    
-    # Criar nova reunião Zoom para o profissional
+    # Nova reunião Zoom para o profissional, criada em segundo plano (outbox)
     topic = f"Consulta - {consulta.paciente.nome} com {profissional.nome}"
-    meeting = zoom_service.create_meeting(topic=topic, duration=60)
-    consulta.zoom_meeting_id = meeting["meeting_id"]
-    consulta.zoom_join_url = meeting["join_url"]
-    consulta.zoom_start_url = meeting["start_url"]
-    consulta.zoom_password = meeting["password"]
+    solicitar_reuniao(db, consulta, topic, medico_id=profissional.id, nova=True)
     
     db.commit()
     db.refresh(consulta)
@@ -381,4 +455,90 @@ def listar_profissionais_disponiveis(
             "limite_pacientes": p.limite_pacientes or 0,
         }
         for p in profissionais
-    ]
\ No newline at end of file
+    ]
+
+
+@router.post("/{consulta_id}/iniciar-consulta", response_model=ConsultaDetailResponse)
+def iniciar_consulta(consulta_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Profissional atribuído inicia a consulta encaminhada (aguardando_medico -> em_atendimento)"""
+    consulta = db.query(Consulta).filter(Consulta.id == consulta_id).first()
+    if not consulta:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
+    if consulta.medico_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Apenas o profissional atribuído pode iniciar a consulta"
+        )
+    _transicionar(db, consulta, ConsultaStatus.EM_ATENDIMENTO, current_user, commit=True)
+    db.refresh(consulta)
+    return consulta
+
+
+@router.post("/{consulta_id}/finalizar", response_model=ConsultaDetailResponse)
+def finalizar_consulta(
+    consulta_id: int,
+    dados: ConsultaFinalizarRequest = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Finaliza a consulta (profissional ou enfermeira responsável, admin ou
+    supervisor). Registra data_fim e duracao_minutos e libera a carga do
+    responsável.
+    """
+    consulta = db.query(Consulta).filter(Consulta.id == consulta_id).first()
+    if not consulta:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
+    
+    responsavel = (
+        current_user.role in [UserRole.ADMIN, UserRole.SUPERVISOR] or
+        (consulta.status == ConsultaStatus.EM_TRIAGEM and consulta.enfermeira_id == current_user.id) or
+        (consulta.status != ConsultaStatus.EM_TRIAGEM and consulta.medico_id == current_user.id)
+    )
+    if not responsavel:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Apenas o responsável pela consulta pode finalizá-la"
+        )
+    
+    valores = {}
+    if dados and dados.diagnostico is not None:
+        valores["diagnostico"] = dados.diagnostico
+    if dados and dados.observacoes is not None:
+        valores["observacoes"] = dados.observacoes
+    _transicionar(db, consulta, ConsultaStatus.FINALIZADA, current_user, valores, commit=True)
+    db.refresh(consulta)
+    return consulta
+
+
+@router.post("/{consulta_id}/cancelar", response_model=ConsultaDetailResponse)
+def cancelar_consulta(
+    consulta_id: int,
+    dados: ConsultaCancelarRequest = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancela a consulta (o próprio paciente, a equipe atribuída, admin ou
+    supervisor). Registra data_fim e libera a carga do responsável.
+    """
+    consulta = db.query(Consulta).filter(Consulta.id == consulta_id).first()
+    if not consulta:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
+    
+    autorizado = (
+        current_user.role in [UserRole.ADMIN, UserRole.SUPERVISOR] or
+        current_user.id in (consulta.paciente_id, consulta.enfermeira_id, consulta.medico_id)
+    )
+    if not autorizado:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem permissão para cancelar esta consulta"
+        )
+    
+    valores = {}
+    if dados and dados.motivo:
+        valores["observacoes"] = f"Cancelada: {dados.motivo}"
+    _transicionar(db, consulta, ConsultaStatus.CANCELADA, current_user, valores, commit=True)
+    db.refresh(consulta)
+    return consulta
@@ -1,19 +1,21 @@
 """
 Router de Arquivos
-Upload e gerenciamento de arquivos via AWS S3
+Upload e gerenciamento de arquivos via AWS S3 (ou disco local em desenvolvimento)
 """
 
 from typing import Optional, List
 from datetime import datetime
-import uuid
 import mimetypes
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.security import get_current_user
-from app.core.config import settings
-from app.models.models import User
+from app.models.models import User, UserRole, Arquivo, PreviewStatus
+from app.core.security import ADMIN_ROLES
+from app.services.s3_service import BaseStorageService, StorageError, get_storage_service
+from app.services.file_service import file_service, FileTooLargeError
+from app.services.preview_service import get_preview_pipeline
 
 router = APIRouter(prefix="/files", tags=["Arquivos"])
 
@@ -32,11 +34,14 @@ MAX_FILE_SIZE = 10 * 1024 * 1024
 
 
 class FileUploadResponse(BaseModel):
+    id: Optional[int] = None
     url: str
     filename: str
     original_name: str
     content_type: str
     size: int
+    sha256: Optional[str] = None
+    deduplicated: bool = False
 
 
 class FileInfo(BaseModel):
@@ -49,28 +54,9 @@ class FileInfo(BaseModel):
     size: int
     uploaded_by: int
     uploaded_at: datetime
-
-
-from app.services.s3_service import get_s3_service
-
-def get_s3_client():
-    """Retorna cliente S3 ou None se não configurado (legacy)"""
-    s3_service = get_s3_service()
-    return s3_service.s3_client if s3_service.is_configured() else None
-
-
-def generate_s3_key(patient_id: Optional[int], filename: str) -> str:
-    """Gera chave única para o arquivo no S3"""
-    now = datetime.utcnow()
-    unique_id = str(uuid.uuid4())[:8]
-    
-    # Sanitizar nome do arquivo
-    safe_filename = "".join(c for c in filename if c.isalnum() or c in '.-_')
-    
-    if patient_id:
-        return f"patients/{patient_id}/{now.year}/{now.month:02d}/{unique_id}_{safe_filename}"
-    else:
-        return f"uploads/{now.year}/{now.month:02d}/{unique_id}_{safe_filename}"
+    preview_status: Optional[PreviewStatus] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
 
 
 @router.post("/upload", response_model=FileUploadResponse)
@@ -78,9 +64,10 @@ async def upload_file(
     file: UploadFile = File(...),
     patient_id: Optional[int] = Form(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    storage: BaseStorageService = Depends(get_storage_service)
 ):
-    """Faz upload de um arquivo para o S3"""
+    """Faz upload de um arquivo para o armazenamento configurado (S3 ou local)"""
     
     # Validar tipo de arquivo
     content_type = file.content_type or mimetypes.guess_type(file.filename)[0]
@@ -90,54 +77,81 @@ async def upload_file(
             detail=f"Tipo de arquivo não permitido. Tipos aceitos: PDF, JPG, PNG, DICOM"
         )
     
-    # Ler conteúdo do arquivo
-    file_content = await file.read()
-    
-    # Validar tamanho
-    if len(file_content) > MAX_FILE_SIZE:
+    # Ler conteúdo calculando o SHA-256 (interrompe se exceder o limite)
+    try:
+        file_content, sha256 = await file_service.read_upload(file, MAX_FILE_SIZE)
+    except FileTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"Arquivo muito grande. Tamanho máximo: {MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
-    # Gerar chave S3
-    s3_key = generate_s3_key(patient_id, file.filename)
-    
-    # Tentar upload para S3
-    s3_client = get_s3_client()
+    # Conteúdo já armazenado não é reenviado (deduplicação por SHA-256)
+    try:
+        arquivo, deduplicated = await file_service.store(
+            db,
+            storage,
+            file_content,
+            sha256,
+            original_name=file.filename,
+            content_type=content_type,
+            uploaded_by=current_user.id,
+            patient_id=patient_id
+        )
+    except StorageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
     
-    if s3_client:
-        try:
-            s3_client.put_object(
-                Bucket=settings.AWS_S3_BUCKET,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=content_type
-            )
-            url = f"https://{settings.AWS_S3_BUCKET}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_key}"
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao fazer upload para S3: {str(e)}"
-            )
-    else:
-        # S3 não configurado - salvar localmente (desenvolvimento)
-        import os
-        upload_dir = "uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        local_path = os.path.join(upload_dir, s3_key.replace("/", "_"))
-        with open(local_path, "wb") as f:
-            f.write(file_content)
-        
-        url = f"/uploads/{s3_key.replace('/', '_')}"
+    # Miniatura/pré-visualização geradas em segundo plano
+    if arquivo.blob.preview_status == PreviewStatus.PENDENTE and not deduplicated:
+        get_preview_pipeline().submit(storage, arquivo.blob)
     
     return FileUploadResponse(
-        url=url,
-        filename=s3_key,
-        original_name=file.filename,
-        content_type=content_type,
-        size=len(file_content)
+        id=arquivo.id,
+        url=storage.url_for(arquivo.blob.storage_key),
+        filename=arquivo.blob.storage_key,
+        original_name=arquivo.original_name,
+        content_type=arquivo.blob.content_type,
+        size=arquivo.blob.size,
+        sha256=sha256,
+        deduplicated=deduplicated
+    )
+
+
+def _get_arquivo_or_404(db: Session, file_id: int, current_user: User) -> Arquivo:
+    """Busca um arquivo verificando se o usuário pode acessá-lo"""
+    arquivo = db.query(Arquivo).filter(Arquivo.id == file_id).first()
+    if not arquivo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Arquivo não encontrado"
+        )
+    
+    if current_user.role == UserRole.PATIENT and current_user.id not in (arquivo.patient_id, arquivo.uploaded_by):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem permissão para acessar este arquivo"
+        )
+    return arquivo
+
+
+def _to_file_info(arquivo: Arquivo, storage: BaseStorageService) -> FileInfo:
+    blob = arquivo.blob
+    return FileInfo(
+        id=arquivo.id,
+        patient_id=arquivo.patient_id,
+        filename=blob.storage_key,
+        original_name=arquivo.original_name,
+        url=storage.url_for(blob.storage_key),
+        content_type=blob.content_type,
+        size=blob.size,
+        uploaded_by=arquivo.uploaded_by,
+        uploaded_at=arquivo.created_at,
+        preview_status=blob.preview_status,
+        thumbnail_url=storage.url_for(blob.thumbnail_key) if blob.thumbnail_key else None,
+        preview_url=storage.url_for(blob.preview_key) if blob.preview_key else None
     )
 
 
@@ -145,36 +159,68 @@ async def upload_file(
 async def get_patient_files(
     patient_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    storage: BaseStorageService = Depends(get_storage_service)
 ):
-    """Lista arquivos de um paciente (stub - implementar com tabela de arquivos)"""
-    # TODO: Implementar tabela de arquivos e listar do banco
-    return []
+    """Lista arquivos de um paciente"""
+    if current_user.role == UserRole.PATIENT and current_user.id != patient_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem permissão para ver estes arquivos"
+        )
+    
+    arquivos = (
+        db.query(Arquivo)
+        .options(joinedload(Arquivo.blob))
+        .filter(Arquivo.patient_id == patient_id)
+        .order_by(Arquivo.created_at.desc())
+        .all()
+    )
+    return [_to_file_info(a, storage) for a in arquivos]
 
 
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_file(
     file_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    storage: BaseStorageService = Depends(get_storage_service)
 ):
-    """Deleta um arquivo (stub - implementar com tabela de arquivos)"""
-    # TODO: Implementar deleção do S3 e banco
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Funcionalidade ainda não implementada"
-    )
+    """Deleta um arquivo (o conteúdo só é removido quando não há mais referências)"""
+    arquivo = _get_arquivo_or_404(db, file_id, current_user)
+    
+    if arquivo.uploaded_by != current_user.id and current_user.role not in ADMIN_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Apenas quem enviou o arquivo ou administradores podem removê-lo"
+        )
+    
+    try:
+        await file_service.release(db, storage, arquivo)
+    except StorageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    return None
 
 
 @router.get("/{file_id}/download-url")
 async def get_download_url(
     file_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    storage: BaseStorageService = Depends(get_storage_service)
 ):
-    """Gera URL temporária para download (stub)"""
-    # TODO: Implementar com presigned URL do S3
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Funcionalidade ainda não implementada"
-    )
+    """Gera URL temporária para download"""
+    arquivo = _get_arquivo_or_404(db, file_id, current_user)
+    
+    try:
+        url = await storage.get_presigned_url(arquivo.blob.storage_key)
+    except StorageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    
+    return {"url": url, "expires_in": 3600}
@@ -6,13 +6,17 @@ CRUD completo para gerenciamento de pacientes
 from typing import Optional, List
 from datetime import datetime
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.core.database import get_db
-from app.core.security import get_current_user, require_clinical, get_password_hash
+from app.core.database import get_db, get_read_db
+from app.core.security import ADMIN_ROLES, CLINICAL_ROLES, get_current_user, require_clinical, get_password_hash
+from app.core.responses import cabecalhos_etag, etag_fraca, nao_modificado, resposta_validada
 from app.models.models import User, UserRole
 from app.schemas.patients import PatientCreate, PatientUpdate, PatientResponse
+from app.schemas.schemas import ConsultaResponse, Pagina
+from app.services.search_service import user_search_service
+from app.services.arquivamento_service import arquivamento_service
 
 router = APIRouter(prefix="/patients", tags=["Pacientes"])
 
@@ -24,47 +28,47 @@ def generate_prontuario() -> str:
     return f"STIX-{timestamp}-{unique_id}"
 
 
-@router.get("/", response_model=dict)
+@router.get("/", response_model=Pagina[PatientResponse])
 def list_patients(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Lista pacientes com paginação e busca opcional"""
     
-    query = db.query(User).filter(User.role == UserRole.PATIENT)
-    
-    # Busca por nome, email ou CPF
+    headers = None
+    # Busca por nome, email, CPF ou prontuário (índice de busca, ordenada por relevância)
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                User.nome.ilike(search_term),
-                User.email.ilike(search_term),
-                User.cpf.ilike(search_term),
-                User.num_prontuario.ilike(search_term)
-            )
+        patients, total = user_search_service.search(
+            db, search, roles=[UserRole.PATIENT], skip=skip, limit=limit
         )
+    else:
+        query = db.query(User).filter(User.role == UserRole.PATIENT)
+        # Total e último updated_at na mesma agregação: ETag antes de ler a página
+        total, ultima_alteracao = query.with_entities(func.count(User.id), func.max(User.updated_at)).one()
+        etag = etag_fraca("patients", total, ultima_alteracao, skip, limit)
+        nao_mudou = nao_modificado(request, etag)
+        if nao_mudou:
+            return nao_mudou
+        headers = cabecalhos_etag(etag)
+        patients = query.offset(skip).limit(limit).all()
     
-    # Contagem total
-    total = query.count()
-    
-    # Paginação
-    patients = query.offset(skip).limit(limit).all()
-    
-    return {
-        "items": [PatientResponse.model_validate(p) for p in patients],
+    return resposta_validada(Pagina[PatientResponse], {
+        "items": patients,
         "total": total,
         "skip": skip,
         "limit": limit
-    }
+    }, headers=headers)
 
 
 @router.get("/{patient_id}", response_model=PatientResponse)
 def get_patient(
     patient_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -81,9 +85,42 @@ def get_patient(
             detail="Paciente não encontrado"
         )
     
+    etag = etag_fraca("users", patient.id, patient.updated_at)
+    nao_mudou = nao_modificado(request, etag)
+    if nao_mudou:
+        return nao_mudou
+    response.headers.update(cabecalhos_etag(etag))
     return patient
 
 
+@router.get("/{patient_id}/consultas", response_model=Pagina[ConsultaResponse])
+def list_patient_consultas(
+    patient_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Histórico de consultas do paciente, incluindo as arquivadas.
+    Acesso: o próprio paciente, administradores e profissionais de saúde.
+    """
+    
+    if current_user.id != patient_id and current_user.role not in ADMIN_ROLES + CLINICAL_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem permissão para ver este histórico"
+        )
+    
+    consultas, total = arquivamento_service.historico_paciente(db, patient_id, skip=skip, limit=limit)
+    return resposta_validada(Pagina[ConsultaResponse], {
+        "items": consultas,
+        "total": total,
+        "skip": skip,
+        "limit": limit
+    })
+
+
 @router.get("/prontuario/{num_prontuario}", response_model=PatientResponse)
 def get_patient_by_prontuario(
     num_prontuario: str,
@@ -0,0 +1,49 @@
+"""
+Router de Busca
+Sugestões de pacientes e profissionais enquanto o usuário digita
+"""
+
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.security import require_roles, ADMIN_ROLES, CLINICAL_ROLES
+from app.models.models import User, UserRole
+from app.services.suggest_service import get_suggest_service
+
+router = APIRouter(prefix="/search", tags=["Busca"])
+
+# Tipos aceitos em ?type= além das roles individuais
+SUGGEST_TYPES = {
+    "patient": [UserRole.PATIENT],
+    "professional": CLINICAL_ROLES,
+}
+
+
+class SuggestItem(BaseModel):
+    id: int
+    nome: str
+    role: UserRole
+
+
+@router.get("/suggest", response_model=List[SuggestItem])
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    type: str = Query("patient", description="patient, professional ou uma role específica"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(ADMIN_ROLES + CLINICAL_ROLES + [UserRole.RECEPTIONIST]))
+):
+    """Sugestões por prefixo do nome, dos cadastros mais recentes para os mais antigos"""
+    roles = SUGGEST_TYPES.get(type)
+    if roles is None:
+        try:
+            roles = [UserRole(type)]
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tipo inválido: {type}"
+            )
+    
+    return get_suggest_service().suggest(db, q, roles, limit)
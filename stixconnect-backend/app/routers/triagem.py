@@ -0,0 +1,48 @@
+"""
+Router de Triagem
+Classificação de urgência em lote (reclassificação de formulários históricos)
+"""
+
+import json
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.core.security import require_roles, ADMIN_ROLES, CLINICAL_ROLES
+from app.models.models import User
+from app.schemas.schemas import TriagemLoteRequest
+from app.services.triagem_service import triagem_service
+
+router = APIRouter(prefix="/triagem", tags=["Triagem"])
+
+# Linhas NDJSON enviadas por bloco da resposta
+NDJSON_BLOCO = 1000
+
+
+@router.post("/classificar/lote")
+def classificar_lote(
+    lote: TriagemLoteRequest,
+    current_user: User = Depends(require_roles(ADMIN_ROLES + CLINICAL_ROLES))
+):
+    """
+    Classifica um lote de formulários de triagem sem persistir nada.
+    Responde em NDJSON: uma linha {"indice", "id", "classificacao"} por formulário,
+    na mesma ordem do lote. Lotes acima de TRIAGEM_LOTE_MAX são recusados na
+    validação (422).
+    """
+    formularios = lote.formularios
+    
+    classificacoes = triagem_service.classificar_lote(
+        [f.sintomas for f in formularios],
+        [f.temperatura for f in formularios],
+        [f.saturacao_oxigenio for f in formularios],
+        [f.dor_escala for f in formularios],
+    )
+    
+    def gerar_linhas():
+        for inicio in range(0, len(formularios), NDJSON_BLOCO):
+            fim = inicio + NDJSON_BLOCO
+            yield "".join(
+                json.dumps({"indice": i, "id": f.id, "classificacao": c.value}) + "\n"
+                for i, (f, c) in enumerate(zip(formularios[inicio:fim], classificacoes[inicio:fim]), start=inicio)
+            )
+    
+    return StreamingResponse(gerar_linhas(), media_type="application/x-ndjson")
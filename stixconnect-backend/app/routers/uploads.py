@@ -0,0 +1,59 @@
+"""
+Router de Uploads Locais
+Download dos arquivos do armazenamento em disco (desenvolvimento / on-premise)
+com suporte a Range, ETag e cache HTTP
+"""
+
+import mimetypes
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.models import ArquivoBlob
+from app.core.responses import RangeFileResponse
+from app.services.s3_service import BaseStorageService, LocalStorageService, get_storage_service
+
+router = APIRouter(prefix="/uploads", tags=["Arquivos"])
+
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def download_local_file(
+    key: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    storage: BaseStorageService = Depends(get_storage_service)
+):
+    """Serve um arquivo salvo localmente (retomável via Range)"""
+    if not isinstance(storage, LocalStorageService):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Arquivo não encontrado")
+    
+    path = storage.resolve(key)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Arquivo não encontrado")
+    
+    if storage.is_immutable(key):
+        # Conteúdo endereçado por hash: a chave identifica a versão
+        etag = key.rsplit("/", 1)[-1]
+        cache_control = f"private, max-age={settings.UPLOAD_CACHE_MAX_AGE}, immutable"
+    else:
+        etag = None
+        cache_control = "private, no-cache"
+    
+    accel_redirect = None
+    if settings.UPLOAD_ACCEL_REDIRECT_PREFIX:
+        accel_redirect = f"{settings.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{key}"
+    
+    media_type = mimetypes.guess_type(key)[0]
+    if media_type is None and storage.is_immutable(key):
+        # Blobs não têm extensão; o tipo fica registrado no banco
+        media_type = db.query(ArquivoBlob.content_type).filter(ArquivoBlob.sha256 == etag).scalar()
+    
+    return RangeFileResponse(
+        path,
+        request.headers,
+        media_type=media_type,
+        etag=etag,
+        cache_control=cache_control,
+        method=request.method,
+        accel_redirect=accel_redirect
+    )
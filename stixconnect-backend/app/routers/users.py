@@ -5,16 +5,18 @@ Gerenciamento de usuários (admin) e perfil próprio
 
 from typing import Optional, List
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from pydantic import BaseModel
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.security import (
     get_current_user, require_admin, get_password_hash, verify_password
 )
 from app.models.models import User, UserRole, AvailabilityStatus
-from app.schemas.schemas import UserResponse, UserUpdate, UserCreateAdmin
+from app.core.responses import cabecalhos_etag, etag_fraca, nao_modificado, resposta_validada
+from app.schemas.schemas import Pagina, UserResponse, UserUpdate, UserCreateAdmin
+from app.services.search_service import user_search_service
 
 router = APIRouter(prefix="/users", tags=["Usuários"])
 
@@ -30,8 +32,13 @@ class AvailabilityUpdate(BaseModel):
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_profile(current_user: User = Depends(get_current_user)):
-    """Retorna o perfil do usuário autenticado"""
+def get_current_user_profile(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    """Retorna o perfil do usuário autenticado (com ETag; 304 se não mudou)"""
+    etag = etag_fraca("users", current_user.id, current_user.updated_at)
+    nao_mudou = nao_modificado(request, etag)
+    if nao_mudou:
+        return nao_mudou
+    response.headers.update(cabecalhos_etag(etag))
     return current_user
 
 
@@ -206,14 +213,15 @@ def create_user(
         )
 
 
-@admin_router.get("/", response_model=dict)
+@admin_router.get("/", response_model=Pagina[UserResponse])
 def list_users(
+    request: Request,
     skip: Optional[int] = Query(0, ge=0),
     limit: Optional[int] = Query(20, ge=1, le=500),
     role: Optional[str] = None,
     search: Optional[str] = None,
     ativo: Optional[bool] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_admin)
 ):
     """Lista todos os usuários (admin only)"""
@@ -222,46 +230,44 @@ def list_users(
     skip = skip or 0
     limit = limit or 20
     
-    query = db.query(User)
-    
     # Filtro por role
+    roles = None
     if role:
         try:
-            role_enum = UserRole(role)
-            query = query.filter(User.role == role_enum)
+            roles = [UserRole(role)]
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Role inválida: {role}"
             )
     
-    # Filtro por status
-    if ativo is not None:
-        query = query.filter(User.ativo == ativo)
-    
-    # Busca por nome, email ou CPF
+    headers = None
+    # Busca por nome, email, CPF ou prontuário (índice de busca, ordenada por relevância)
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                User.nome.ilike(search_term),
-                User.email.ilike(search_term),
-                User.cpf.ilike(search_term)
-            )
+        users, total = user_search_service.search(
+            db, search, roles=roles, ativo=ativo, skip=skip, limit=limit
         )
-    
-    # Contagem total
-    total = query.count()
-    
-    # Paginação e ordenação
-    users = query.order_by(User.nome).offset(skip).limit(limit).all()
-    
-    return {
-        "items": [UserResponse.model_validate(u) for u in users],
+    else:
+        query = db.query(User)
+        if roles:
+            query = query.filter(User.role.in_(roles))
+        if ativo is not None:
+            query = query.filter(User.ativo == ativo)
+        # Total e último updated_at na mesma agregação: ETag antes de ler a página
+        total, ultima_alteracao = query.with_entities(func.count(User.id), func.max(User.updated_at)).one()
+        etag = etag_fraca("users", role, ativo, total, ultima_alteracao, skip, limit)
+        nao_mudou = nao_modificado(request, etag)
+        if nao_mudou:
+            return nao_mudou
+        headers = cabecalhos_etag(etag)
+        users = query.order_by(User.nome).offset(skip).limit(limit).all()
+    
+    return resposta_validada(Pagina[UserResponse], {
+        "items": users,
         "total": total,
         "skip": skip,
         "limit": limit
-    }
+    }, headers=headers)
 
 
 @admin_router.get("/available/nurses", response_model=List[UserResponse])
@@ -6,6 +6,7 @@ from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from datetime import datetime
 from app.models.models import UserRole
+from app.schemas.schemas import EmailResposta
 
 
 class PatientBase(BaseModel):
@@ -31,6 +32,7 @@ class PatientUpdate(BaseModel):
 
 
 class PatientResponse(PatientBase):
+    email: EmailResposta
     id: int
     role: UserRole
     ativo: bool
@@ -1,8 +1,13 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, WithJsonSchema
+from typing import Annotated, Generic, List, Optional, TypeVar
+from datetime import datetime, time
+from app.core.config import settings
 from app.models.models import UserRole, ConsultaStatus, ConsultaTipo, ClassificacaoUrgencia, AvailabilityStatus
 
+# E-mail em respostas: já foi validado na entrada, então não repassa pelo
+# email-validator (a maior parte do custo de serializar usuários)
+EmailResposta = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
+
 # User Schemas
 class UserBase(BaseModel):
     nome: str
@@ -35,6 +40,7 @@ class UserUpdate(BaseModel):
     ativo: Optional[bool] = None
 
 class UserResponse(UserBase):
+    email: EmailResposta
     id: int
     ativo: bool
     created_at: datetime
@@ -49,6 +55,15 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+T = TypeVar("T")
+
+class Pagina(BaseModel, Generic[T]):
+    """Página de resultados ({items, total, skip, limit})"""
+    items: List[T]
+    total: int
+    skip: int
+    limit: int
+
 # Auth Schemas
 class Token(BaseModel):
     access_token: str
@@ -98,6 +113,19 @@ class TriagemUpdate(BaseModel):
     frequencia_cardiaca: Optional[str] = None
     saturacao_oxigenio: Optional[str] = None
 
+class TriagemClassificacaoItem(BaseModel):
+    """Formulário de triagem a ser classificado (sem persistência)"""
+    id: Optional[str] = Field(None, description="Identificador do formulário no sistema de origem")
+    sintomas: str
+    temperatura: Optional[str] = None
+    saturacao_oxigenio: Optional[str] = None
+    dor_escala: Optional[int] = Field(None, ge=0, le=10)
+
+class TriagemLoteRequest(BaseModel):
+    """Lote de formulários para reclassificação"""
+    # Limite checado na validação: lotes grandes demais falham antes de validar todos os itens
+    formularios: list[TriagemClassificacaoItem] = Field(..., max_length=settings.TRIAGEM_LOTE_MAX)
+
 class TransferToProfessionalRequest(BaseModel):
     """Schema para encaminhar paciente para profissional após triagem"""
     profissional_id: int = Field(..., description="ID do profissional (médico, fisioterapeuta, etc.)")
@@ -109,6 +137,11 @@ class TriagemResponse(TriagemBase):
     paciente_id: int
     classificacao_automatica: Optional[ClassificacaoUrgencia]
     classificacao_enfermeira: Optional[ClassificacaoUrgencia]
+    temperatura_c: Optional[float] = None
+    frequencia_cardiaca_bpm: Optional[int] = None
+    saturacao_oxigenio_pct: Optional[int] = None
+    pressao_sistolica_mmhg: Optional[int] = None
+    pressao_diastolica_mmhg: Optional[int] = None
     created_at: datetime
     
     class Config:
@@ -121,6 +154,7 @@ class ConsultaBase(BaseModel):
 
 class ConsultaCreate(ConsultaBase):
     triagem: Optional[TriagemCreate] = None
+    profissional_id: Optional[int] = Field(None, description="Profissional reservado; em consultas agendadas, reserva o horário na agenda dele")
 
 class ConsultaUpdate(BaseModel):
     status: Optional[ConsultaStatus] = None
@@ -131,6 +165,14 @@ class ConsultaUpdate(BaseModel):
     observacoes: Optional[str] = None
     diagnostico: Optional[str] = None
 
+class ConsultaFinalizarRequest(BaseModel):
+    """Dados opcionais registrados ao finalizar a consulta"""
+    diagnostico: Optional[str] = None
+    observacoes: Optional[str] = None
+
+class ConsultaCancelarRequest(BaseModel):
+    motivo: Optional[str] = Field(None, max_length=500, description="Motivo do cancelamento")
+
 class ConsultaResponse(ConsultaBase):
     id: int
     paciente_id: int
@@ -138,6 +180,7 @@ class ConsultaResponse(ConsultaBase):
     medico_id: Optional[int]
     status: ConsultaStatus
     classificacao_urgencia: Optional[ClassificacaoUrgencia]
+    data_agendamento_fim: Optional[datetime] = None
     data_inicio: Optional[datetime]
     data_fim: Optional[datetime]
     duracao_minutos: Optional[int]
@@ -146,6 +189,7 @@ class ConsultaResponse(ConsultaBase):
     zoom_password: Optional[str]
     created_at: datetime
     triagem: Optional[TriagemResponse] = None
+    arquivada_em: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -155,6 +199,34 @@ class ConsultaDetailResponse(ConsultaResponse):
     enfermeira: Optional[UserResponse] = None
     medico: Optional[UserResponse] = None
 
+# Agenda Schemas
+class HorarioTrabalhoBase(BaseModel):
+    dia_semana: int = Field(..., ge=0, le=6, description="0 = segunda ... 6 = domingo")
+    hora_inicio: time
+    hora_fim: time
+    duracao_slot_minutos: int = Field(30, ge=5, le=240)
+
+class HorarioTrabalhoCreate(HorarioTrabalhoBase):
+    pass
+
+class HorarioTrabalhoResponse(HorarioTrabalhoBase):
+    id: int
+    profissional_id: int
+
+    class Config:
+        from_attributes = True
+
+class SlotResponse(BaseModel):
+    inicio: datetime
+    fim: datetime
+
+class AgendaSlotsResponse(BaseModel):
+    """Slots livres de um profissional no período (UTC)"""
+    profissional_id: int
+    nome: str
+    role: UserRole
+    slots: List[SlotResponse]
+
 # Zoom Schemas
 class ZoomMeetingCreate(BaseModel):
     topic: str
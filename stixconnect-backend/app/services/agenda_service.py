@@ -0,0 +1,404 @@
+"""
+Agenda das consultas AGENDADA.
+
+- Expediente: cada profissional tem blocos semanais (HorarioTrabalho) no fuso
+  AGENDA_FUSO_HORARIO, divididos em slots de duracao_slot_minutos.
+- Reserva: uma consulta agendada ocupa [data_agendamento, data_agendamento_fim)
+  de um slot do expediente. O conflito é verificado em um IndiceIntervalos do
+  profissional no dia (busca binária, O(log n)), montado com uma consulta
+  indexada (medico_id, data_agendamento); a linha do profissional fica
+  bloqueada (SELECT ... FOR UPDATE) até o commit, então duas reservas
+  simultâneas do mesmo profissional não passam ambas pela verificação.
+- Slots livres: listar_slots carrega, para todo o período e todos os
+  profissionais pedidos, o expediente e as reservas em duas consultas e
+  descarta os slots ocupados pelo índice.
+- Liberação: AgendaScheduler move as consultas AGENDADA para a fila do
+  profissional reservado (AGUARDANDO_MEDICO) AGENDA_LIBERAR_ANTES_MINUTOS
+  antes do horário, acordando no próximo vencimento, e enfileira um SMS
+  avisando o paciente na mesma transação.
+
+As colunas guardam UTC sem fuso; o expediente é convertido dia a dia.
+"""
+
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Consulta, ConsultaStatus, ConsultaTipo, HorarioTrabalho, User, UserRole
+from app.services.consulta_status_service import (
+    ConflitoTransicaoError, TransicaoInvalidaError, consulta_status_service,
+)
+from app.services.notificacao_service import enfileirar
+from app.services.rollup_service import utc_naive
+
+# Papéis que atendem consultas agendadas (enfermagem fica com a triagem das urgentes)
+PAPEIS_AGENDAVEIS = {
+    UserRole.DOCTOR, UserRole.PHYSIOTHERAPIST, UserRole.NUTRITIONIST, UserRole.PSYCHOLOGIST,
+    UserRole.SPEECH_THERAPIST, UserRole.ACUPUNCTURIST, UserRole.CLINICAL_PSYPEDAGOGIST,
+    UserRole.HAIRDRESSER, UserRole.CAREGIVER,
+}
+
+Intervalo = Tuple[datetime, datetime]
+
+
+class AgendaInvalidaError(Exception):
+    """Pedido de agendamento ou expediente inválido"""
+
+
+class HorarioIndisponivelError(Exception):
+    """O horário pedido já está reservado"""
+
+
+class IndiceIntervalos:
+    """
+    Intervalos ocupados [inicio, fim) de um profissional em um dia, unidos e
+    ordenados: inícios e fins ficam em ordem crescente, e conflito/inserção
+    usam busca binária.
+    """
+
+    def __init__(self, intervalos: Iterable[Intervalo] = ()):
+        self._inicios: List[datetime] = []
+        self._fins: List[datetime] = []
+        for inicio, fim in sorted(intervalos):
+            if self._fins and inicio <= self._fins[-1]:
+                self._fins[-1] = max(self._fins[-1], fim)
+            else:
+                self._inicios.append(inicio)
+                self._fins.append(fim)
+
+    def __len__(self) -> int:
+        return len(self._inicios)
+
+    def conflita(self, inicio: datetime, fim: datetime) -> bool:
+        # Último intervalo que começa antes de `fim`: só ele pode terminar depois de `inicio`
+        pos = bisect_left(self._inicios, fim)
+        return pos > 0 and self._fins[pos - 1] > inicio
+
+    def adicionar(self, inicio: datetime, fim: datetime):
+        esquerda = bisect_left(self._fins, inicio)
+        direita = bisect_right(self._inicios, fim)
+        if esquerda < direita:
+            inicio = min(inicio, self._inicios[esquerda])
+            fim = max(fim, self._fins[direita - 1])
+        self._inicios[esquerda:direita] = [inicio]
+        self._fins[esquerda:direita] = [fim]
+
+
+def fuso() -> ZoneInfo:
+    return ZoneInfo(settings.AGENDA_FUSO_HORARIO)
+
+
+def para_utc(dia: date, hora: time) -> datetime:
+    """Dia/hora locais do expediente -> UTC sem fuso"""
+    return datetime.combine(dia, hora, tzinfo=fuso()).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def dia_local(momento: datetime) -> date:
+    """Dia no fuso da agenda de um instante UTC sem fuso"""
+    return momento.replace(tzinfo=timezone.utc).astimezone(fuso()).date()
+
+
+def slots_do_bloco(dia: date, bloco: HorarioTrabalho) -> List[Intervalo]:
+    """Slots (UTC) de um bloco de expediente em um dia"""
+    duracao = timedelta(minutes=bloco.duracao_slot_minutos)
+    inicio, fim = para_utc(dia, bloco.hora_inicio), para_utc(dia, bloco.hora_fim)
+    slots = []
+    while inicio + duracao <= fim:
+        slots.append((inicio, inicio + duracao))
+        inicio += duracao
+    return slots
+
+
+class AgendaService:
+    # ---- expediente ----
+
+    def horarios(self, db: Session, profissional_id: int) -> List[HorarioTrabalho]:
+        return (
+            db.query(HorarioTrabalho)
+            .filter(HorarioTrabalho.profissional_id == profissional_id)
+            .order_by(HorarioTrabalho.dia_semana, HorarioTrabalho.hora_inicio)
+            .all()
+        )
+
+    def definir_horarios(self, db: Session, profissional: User, blocos: List[dict]) -> List[HorarioTrabalho]:
+        """
+        Substitui o expediente semanal do profissional (reservas existentes
+        são mantidas). Blocos do mesmo dia não podem se sobrepor.
+
+        Raises:
+            AgendaInvalidaError: profissional não agendável ou blocos inválidos
+        """
+        if profissional.role not in PAPEIS_AGENDAVEIS:
+            raise AgendaInvalidaError("Este usuário não atende consultas agendadas")
+        por_dia = defaultdict(list)
+        for bloco in blocos:
+            if bloco["hora_fim"] <= bloco["hora_inicio"]:
+                raise AgendaInvalidaError("hora_fim deve ser posterior a hora_inicio")
+            por_dia[bloco["dia_semana"]].append((bloco["hora_inicio"], bloco["hora_fim"]))
+        for intervalos in por_dia.values():
+            intervalos.sort()
+            if any(atual[0] < anterior[1] for anterior, atual in zip(intervalos, intervalos[1:])):
+                raise AgendaInvalidaError("Blocos de expediente sobrepostos no mesmo dia")
+
+        db.query(HorarioTrabalho).filter(HorarioTrabalho.profissional_id == profissional.id).delete(
+            synchronize_session=False
+        )
+        db.add_all(HorarioTrabalho(profissional_id=profissional.id, **bloco) for bloco in blocos)
+        db.commit()
+        return self.horarios(db, profissional.id)
+
+    # ---- reservas ----
+
+    def _ocupados(self, db: Session, profissional_ids: List[int], data_inicio: date, data_fim: date) -> Dict[Tuple[int, date], IndiceIntervalos]:
+        """Índices por (profissional, dia local) das reservas dos dias [data_inicio, data_fim]"""
+        dias = [data_inicio + timedelta(days=n) for n in range((data_fim - data_inicio).days + 1)]
+        # Meia-noite local de cada dia em UTC: o dia de uma reserva sai por busca binária
+        fronteiras = [para_utc(dia, time.min) for dia in dias] + [para_utc(data_fim + timedelta(days=1), time.min)]
+        inicio, fim = fronteiras[0], fronteiras[-1]
+        rows = (
+            db.query(Consulta.medico_id, Consulta.data_agendamento, Consulta.data_agendamento_fim)
+            .filter(
+                Consulta.medico_id.in_(profissional_ids),
+                Consulta.data_agendamento >= inicio,
+                Consulta.data_agendamento < fim,
+                Consulta.tipo == ConsultaTipo.AGENDADA,
+                Consulta.status != ConsultaStatus.CANCELADA,
+            )
+            .all()
+        )
+        por_dia = defaultdict(list)
+        for medico_id, reservado_inicio, reservado_fim in rows:
+            dia = dias[bisect_right(fronteiras, reservado_inicio) - 1]
+            por_dia[(medico_id, dia)].append((reservado_inicio, reservado_fim))
+        return {chave: IndiceIntervalos(intervalos) for chave, intervalos in por_dia.items()}
+
+    def _slot_do_expediente(self, db: Session, profissional_id: int, inicio: datetime) -> Optional[Intervalo]:
+        """O slot do expediente que começa em `inicio` (UTC), se houver"""
+        dia = dia_local(inicio)
+        blocos = (
+            db.query(HorarioTrabalho)
+            .filter(HorarioTrabalho.profissional_id == profissional_id, HorarioTrabalho.dia_semana == dia.weekday())
+            .all()
+        )
+        for bloco in blocos:
+            for slot in slots_do_bloco(dia, bloco):
+                if slot[0] == inicio:
+                    return slot
+        return None
+
+    def reservar(self, db: Session, profissional_id: Optional[int], data_agendamento: Optional[datetime]) -> Tuple[User, datetime, datetime]:
+        """
+        Valida e bloqueia o horário para uma nova consulta (sem commit: o
+        bloqueio vale até o commit do chamador). Retorna (profissional,
+        início, fim) em UTC sem fuso.
+
+        Raises:
+            AgendaInvalidaError: dados ausentes, profissional inválido, fora do expediente ou da antecedência
+            HorarioIndisponivelError: horário já reservado
+        """
+        if profissional_id is None or data_agendamento is None:
+            raise AgendaInvalidaError("Consultas agendadas exigem profissional_id e data_agendamento")
+        inicio = utc_naive(data_agendamento).replace(second=0, microsecond=0)
+        if inicio < datetime.utcnow() + timedelta(minutes=settings.AGENDA_ANTECEDENCIA_MINUTOS):
+            raise AgendaInvalidaError(
+                f"Agende com pelo menos {settings.AGENDA_ANTECEDENCIA_MINUTOS} minutos de antecedência"
+            )
+
+        # Serializa as reservas do profissional até o commit
+        profissional = db.query(User).filter(User.id == profissional_id).with_for_update().first()
+        if not profissional or not profissional.ativo or profissional.role not in PAPEIS_AGENDAVEIS:
+            raise AgendaInvalidaError("Profissional não encontrado ou não atende consultas agendadas")
+        slot = self._slot_do_expediente(db, profissional_id, inicio)
+        if slot is None:
+            raise AgendaInvalidaError("Horário fora do expediente do profissional")
+
+        dia = dia_local(inicio)
+        indice = self._ocupados(db, [profissional_id], dia, dia)
+        if indice.get((profissional_id, dia), IndiceIntervalos()).conflita(*slot):
+            raise HorarioIndisponivelError("Horário já reservado para este profissional")
+        return profissional, slot[0], slot[1]
+
+    # ---- slots livres ----
+
+    def listar_slots(
+        self,
+        db: Session,
+        data_inicio: date,
+        data_fim: date,
+        profissional_id: Optional[int] = None,
+        role: Optional[UserRole] = None,
+    ) -> List[dict]:
+        """
+        Slots livres de [data_inicio, data_fim] (dias locais, inclusive) por
+        profissional. Slots antes da antecedência mínima não são oferecidos.
+
+        Raises:
+            AgendaInvalidaError: período inválido ou maior que AGENDA_MAX_DIAS
+        """
+        dias = (data_fim - data_inicio).days + 1
+        if dias < 1:
+            raise AgendaInvalidaError("data_fim deve ser igual ou posterior a data_inicio")
+        if dias > settings.AGENDA_MAX_DIAS:
+            raise AgendaInvalidaError(f"Período máximo de {settings.AGENDA_MAX_DIAS} dias")
+
+        query = (
+            db.query(User)
+            .filter(
+                User.ativo.is_(True),
+                User.role.in_(PAPEIS_AGENDAVEIS),
+                User.id.in_(db.query(HorarioTrabalho.profissional_id)),
+            )
+        )
+        if profissional_id is not None:
+            query = query.filter(User.id == profissional_id)
+        if role is not None:
+            query = query.filter(User.role == role)
+        profissionais = query.order_by(User.nome).all()
+        if not profissionais:
+            return []
+        ids = [p.id for p in profissionais]
+
+        blocos = defaultdict(lambda: defaultdict(list))
+        for bloco in (
+            db.query(HorarioTrabalho)
+            .filter(HorarioTrabalho.profissional_id.in_(ids))
+            .order_by(HorarioTrabalho.hora_inicio)
+        ):
+            blocos[bloco.profissional_id][bloco.dia_semana].append(bloco)
+        ocupados = self._ocupados(db, ids, data_inicio, data_fim)
+
+        minimo = datetime.utcnow() + timedelta(minutes=settings.AGENDA_ANTECEDENCIA_MINUTOS)
+        vazio = IndiceIntervalos()
+        resultado = []
+        for profissional in profissionais:
+            livres = []
+            for n in range(dias):
+                dia = data_inicio + timedelta(days=n)
+                indice = ocupados.get((profissional.id, dia), vazio)
+                for bloco in blocos[profissional.id].get(dia.weekday(), []):
+                    livres.extend(
+                        {"inicio": inicio, "fim": fim}
+                        for inicio, fim in slots_do_bloco(dia, bloco)
+                        if inicio >= minimo and not indice.conflita(inicio, fim)
+                    )
+            resultado.append({
+                "profissional_id": profissional.id,
+                "nome": profissional.nome,
+                "role": profissional.role,
+                "slots": livres,
+            })
+        return resultado
+
+    # ---- liberação para a fila ----
+
+    def liberar_vencidas(self, db: Session, agora: Optional[datetime] = None, lote: int = 200) -> int:
+        """
+        Move para a fila as consultas agendadas que vencem em até
+        AGENDA_LIBERAR_ANTES_MINUTOS: direto para o profissional reservado
+        (AGUARDANDO_MEDICO) ou, sem profissional, para a fila de triagem.
+        """
+        limite = (agora or datetime.utcnow()) + timedelta(minutes=settings.AGENDA_LIBERAR_ANTES_MINUTOS)
+        consultas = (
+            db.query(Consulta)
+            .filter(Consulta.status == ConsultaStatus.AGENDADA, Consulta.data_agendamento <= limite)
+            .order_by(Consulta.data_agendamento)
+            .limit(lote)
+            .all()
+        )
+        liberadas = 0
+        for consulta in consultas:
+            destino = ConsultaStatus.AGUARDANDO_MEDICO if consulta.medico_id else ConsultaStatus.AGUARDANDO
+            try:
+                consulta_status_service.transicionar(db, consulta, destino, commit=False)
+            except (ConflitoTransicaoError, TransicaoInvalidaError):
+                db.rollback()
+                continue  # cancelada ou liberada por outro worker
+            self._avisar_paciente(db, consulta)
+            db.commit()
+            liberadas += 1
+        return liberadas
+
+    def _avisar_paciente(self, db: Session, consulta: Consulta):
+        """SMS ao paciente, na mesma transação da liberação (uma vez por consulta)"""
+        paciente = consulta.paciente
+        if paciente is None or not paciente.telefone:
+            return
+        hora_local = consulta.data_agendamento.replace(tzinfo=timezone.utc).astimezone(fuso()).strftime("%H:%M")
+        com = f" com {consulta.medico.nome}" if consulta.medico is not None else ""
+        enfileirar(
+            db,
+            paciente.telefone,
+            f"{settings.APP_NAME}: a sua consulta{com} começa às {hora_local}. Entre na aplicação para ser atendido.",
+            chave=f"consulta:{consulta.id}:inicio",
+            usuario_id=paciente.id,
+            consulta_id=consulta.id,
+        )
+
+    def proximo_vencimento(self, db: Session) -> Optional[datetime]:
+        """Momento (UTC) em que a próxima consulta agendada deve entrar na fila"""
+        proxima = db.query(func.min(Consulta.data_agendamento)).filter(
+            Consulta.status == ConsultaStatus.AGENDADA
+        ).scalar()
+        if proxima is None:
+            return None
+        return proxima - timedelta(minutes=settings.AGENDA_LIBERAR_ANTES_MINUTOS)
+
+
+agenda_service = AgendaService()
+
+
+class AgendaScheduler:
+    """
+    Libera as consultas agendadas vencidas (iniciado no lifespan). Dorme até o
+    próximo vencimento, no máximo AGENDA_INTERVALO_SEGUNDOS (reservas novas
+    de outros workers são vistas na volta seguinte).
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _executar(self) -> Optional[datetime]:
+        db = SessionLocal()
+        try:
+            agenda_service.liberar_vencidas(db)
+            return agenda_service.proximo_vencimento(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Erro ao liberar consultas agendadas: {e}")
+            return None
+        finally:
+            db.close()
+
+    async def _loop(self):
+        while True:
+            proximo = await run_in_threadpool(self._executar)
+            espera = settings.AGENDA_INTERVALO_SEGUNDOS
+            if proximo is not None:
+                espera = min(espera, max((proximo - datetime.utcnow()).total_seconds(), 1))
+            await asyncio.sleep(espera)
+
+
+agenda_scheduler = AgendaScheduler()
@@ -0,0 +1,252 @@
+"""
+Arquivamento de consultas encerradas (dados quentes/frios).
+
+Consultas FINALIZADA/CANCELADA com data_fim anterior a ARQUIVAMENTO_IDADE_DIAS
+são movidas, junto com as triagens, para consultas_arquivo/triagens_arquivo
+(mesmas colunas e mesmos ids). Cada lote de ARQUIVAMENTO_LOTE consultas é uma
+transação curta (INSERT ... SELECT seguido de DELETE por id), com uma pausa de
+ARQUIVAMENTO_PAUSA_MS entre lotes para não competir com o tráfego. Assim as
+tabelas quentes guardam só o conjunto ativo e recente, e as listagens por
+role deixam de percorrer anos de consultas encerradas.
+
+As leituras por id e o histórico do paciente recorrem ao arquivo
+(buscar_consulta / historico_paciente). As estatísticas e os rollups também
+incluem as tabelas de arquivo.
+
+Particionamento por data no MySQL não é usado: o InnoDB não aceita chaves
+estrangeiras em tabelas particionadas, e triagens referencia consultas.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import DateTime, delete, func, insert, literal, select
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Consulta, ConsultaArquivada, Triagem, TriagemArquivada
+from app.services.consulta_status_service import ESTADOS_FINAIS
+
+_COLUNAS_CONSULTA = [c.name for c in ConsultaArquivada.__table__.columns if c.name != "arquivada_em"]
+_COLUNAS_TRIAGEM = [c.name for c in TriagemArquivada.__table__.columns]
+
+
+class ArquivamentoService:
+    def __init__(self):
+        # Relatórios das últimas execuções (GET /admin/manutencao/arquivamento)
+        self.relatorios: deque = deque(maxlen=20)
+
+    # ---- job ----
+
+    def _candidatas(self, db: Session, corte: datetime, lote: int) -> List[int]:
+        # A consulta de maior id nunca é arquivada: em alguns bancos (SQLite,
+        # MySQL < 8) o auto-incremento volta a max(id) + 1 e reutilizaria o id
+        ultimo_id = select(func.max(Consulta.id)).scalar_subquery()
+        return [
+            consulta_id for (consulta_id,) in db.query(Consulta.id).filter(
+                Consulta.status.in_(ESTADOS_FINAIS),
+                Consulta.data_fim < corte,
+                Consulta.id < ultimo_id,
+            ).order_by(Consulta.data_fim).limit(lote)
+        ]
+
+    def _mover(self, db: Session, ids: List[int]) -> Tuple[int, int, float]:
+        """Move um lote em uma transação; retorna (consultas, triagens, segundos com locks)"""
+        consultas, triagens = Consulta.__table__, Triagem.__table__
+        inicio = time.perf_counter()
+        db.execute(insert(ConsultaArquivada.__table__).from_select(
+            _COLUNAS_CONSULTA + ["arquivada_em"],
+            select(*(consultas.c[nome] for nome in _COLUNAS_CONSULTA), literal(datetime.utcnow(), DateTime()))
+            .where(consultas.c.id.in_(ids)),
+        ))
+        n_triagens = db.execute(insert(TriagemArquivada.__table__).from_select(
+            _COLUNAS_TRIAGEM,
+            select(*(triagens.c[nome] for nome in _COLUNAS_TRIAGEM)).where(triagens.c.consulta_id.in_(ids)),
+        )).rowcount
+        db.execute(delete(triagens).where(triagens.c.consulta_id.in_(ids)))
+        n_consultas = db.execute(
+            delete(consultas).where(consultas.c.id.in_(ids), consultas.c.status.in_(ESTADOS_FINAIS))
+        ).rowcount
+        if n_consultas != len(ids):
+            # Alguma consulta mudou entre a seleção e o DELETE: refaz no próximo lote
+            db.rollback()
+            return 0, 0, time.perf_counter() - inicio
+        db.commit()
+        return n_consultas, n_triagens, time.perf_counter() - inicio
+
+    def executar(self, db: Session, idade_dias: Optional[int] = None, max_lotes: Optional[int] = None) -> dict:
+        """
+        Arquiva as consultas encerradas há mais de `idade_dias` (padrão
+        ARQUIVAMENTO_IDADE_DIAS). Retorna linhas movidas, linhas/s e o tempo
+        em que cada lote manteve a transação (e os locks) aberta.
+        """
+        idade = settings.ARQUIVAMENTO_IDADE_DIAS if idade_dias is None else idade_dias
+        corte = datetime.utcnow() - timedelta(days=idade)
+        tamanho = settings.ARQUIVAMENTO_LOTE
+        inicio_execucao = datetime.utcnow()
+        inicio = time.perf_counter()
+        lotes = consultas = triagens = falhas = 0
+        lock_total = lock_max = 0.0
+
+        while max_lotes is None or lotes < max_lotes:
+            ids = self._candidatas(db, corte, tamanho)
+            if not ids:
+                break
+            n_consultas, n_triagens, lock = self._mover(db, ids)
+            lotes += 1
+            falhas += 0 if n_consultas else 1
+            consultas += n_consultas
+            triagens += n_triagens
+            lock_total += lock
+            lock_max = max(lock_max, lock)
+            if len(ids) < tamanho or falhas > 3:
+                break
+            time.sleep(settings.ARQUIVAMENTO_PAUSA_MS / 1000)
+
+        segundos = time.perf_counter() - inicio
+        relatorio = {
+            "inicio": inicio_execucao.isoformat(),
+            "corte": corte.isoformat(),
+            "lotes": lotes,
+            "consultas": consultas,
+            "triagens": triagens,
+            "segundos": round(segundos, 3),
+            "linhas_por_segundo": round((consultas + triagens) / segundos, 1) if segundos else 0.0,
+            "lock_ms_total": round(lock_total * 1000, 1),
+            "lock_ms_max": round(lock_max * 1000, 1),
+            "lock_ms_medio": round(lock_total * 1000 / lotes, 1) if lotes else 0.0,
+        }
+        self.relatorios.append(relatorio)
+        if consultas:
+            print(f"Arquivamento: {consultas} consultas e {triagens} triagens em {lotes} lotes "
+                  f"({relatorio['linhas_por_segundo']} linhas/s, lock máx. {relatorio['lock_ms_max']} ms)")
+        return relatorio
+
+    # ---- leitura com fallback para o arquivo ----
+
+    def buscar_consulta(self, db: Session, consulta_id: int) -> Optional[Union[Consulta, ConsultaArquivada]]:
+        """Consulta pelo id nas tabelas quentes e, se não estiver lá, no arquivo"""
+        consulta = db.query(Consulta).filter(Consulta.id == consulta_id).first()
+        if consulta is None:
+            consulta = db.query(ConsultaArquivada).filter(ConsultaArquivada.id == consulta_id).first()
+        return consulta
+
+    def historico_paciente(self, db: Session, paciente_id: int, skip: int = 0, limit: int = 50) -> Tuple[list, int]:
+        """Consultas do paciente (quentes e arquivadas), mais recentes primeiro, e o total"""
+        partes, total = [], 0
+        for modelo in (Consulta, ConsultaArquivada):
+            query = db.query(modelo).filter(modelo.paciente_id == paciente_id)
+            total += query.count()
+            partes.extend(
+                query.options(joinedload(modelo.triagem))
+                .order_by(modelo.created_at.desc())
+                .limit(skip + limit)
+                .all()
+            )
+        partes.sort(key=lambda c: c.created_at or datetime.min, reverse=True)
+        return partes[skip:skip + limit], total
+
+
+arquivamento_service = ArquivamentoService()
+
+
+class ArquivamentoEmExecucaoError(Exception):
+    """Já existe um arquivamento manual em andamento neste processo"""
+
+
+class ArquivamentoScheduler:
+    """
+    Executa o arquivamento a cada ARQUIVAMENTO_INTERVALO_SEGUNDOS (iniciado no
+    lifespan) e as execuções pedidas pelo admin, em segundo plano.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._manual: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()  # job periódico x execução manual
+        self.ultima_execucao: Optional[dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._manual is not None:
+            self._manual.cancel()
+            await asyncio.gather(self._manual, return_exceptions=True)
+            self._manual = None
+
+    def _executar(self):
+        db = SessionLocal()
+        try:
+            with self._lock:
+                arquivamento_service.executar(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Erro no job de arquivamento de consultas: {e}")
+        finally:
+            db.close()
+
+    def arquivar(self, idade_dias: Optional[int] = None, max_lotes: Optional[int] = None) -> dict:
+        """
+        Agenda um arquivamento em segundo plano; levanta
+        ArquivamentoEmExecucaoError se já houver um.
+        """
+        if self._manual is not None and not self._manual.done():
+            raise ArquivamentoEmExecucaoError("Já existe um arquivamento em andamento")
+        self.ultima_execucao = {
+            "estado": "executando",
+            "idade_dias": idade_dias,
+            "max_lotes": max_lotes,
+            "iniciado_em": datetime.utcnow(),
+            "concluido_em": None,
+            "resultado": None,
+            "erro": None,
+        }
+        self._manual = asyncio.create_task(self._arquivar(self.ultima_execucao))
+        return self.ultima_execucao
+
+    async def _arquivar(self, registro: dict):
+        def executar():
+            db = SessionLocal()
+            try:
+                with self._lock:
+                    return arquivamento_service.executar(
+                        db, idade_dias=registro["idade_dias"], max_lotes=registro["max_lotes"]
+                    )
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        try:
+            registro["resultado"] = await run_in_threadpool(executar)
+            registro["estado"] = "concluido"
+        except Exception as e:
+            print(f"Erro no arquivamento de consultas: {e}")
+            registro.update(estado="falhou", erro=str(e))
+        finally:
+            registro["concluido_em"] = datetime.utcnow()
+
+    async def _loop(self):
+        while True:
+            await run_in_threadpool(self._executar)
+            await asyncio.sleep(settings.ARQUIVAMENTO_INTERVALO_SEGUNDOS)
+
+
+arquivamento_scheduler = ArquivamentoScheduler()
@@ -0,0 +1,171 @@
+"""
+Máquina de estados das consultas.
+
+Toda mudança de status passa por ConsultaStatusService.transicionar, que:
+- valida a transição contra TRANSICOES;
+- aplica um compare-and-set (UPDATE ... WHERE id = :id AND status = :esperado),
+  de modo que duas requisições concorrentes não executam a mesma transição;
+- preenche data_fim/duracao_minutos ao encerrar;
+- ajusta a carga (pacientes_atuais) de enfermeiros e profissionais;
+- publica "consulta.status_alterado" no outbox, na mesma transação; os
+  assinantes (ex.: sala WebSocket da consulta) recebem após o commit, pelo
+  dispatcher do outbox_service.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.models import Consulta, ConsultaStatus, User
+from app.services.estatisticas_service import registrar_alteracao_consulta
+from app.services.outbox_service import publicar
+
+EVENTO_STATUS_ALTERADO = "consulta.status_alterado"
+
+TRANSICOES: Dict[ConsultaStatus, set] = {
+    # Agendada: liberada para a fila no horário (agenda_service) ou cancelada
+    ConsultaStatus.AGENDADA: {
+        ConsultaStatus.AGUARDANDO, ConsultaStatus.EM_TRIAGEM, ConsultaStatus.AGUARDANDO_MEDICO, ConsultaStatus.CANCELADA,
+    },
+    ConsultaStatus.AGUARDANDO: {ConsultaStatus.EM_TRIAGEM, ConsultaStatus.CANCELADA},
+    ConsultaStatus.EM_TRIAGEM: {ConsultaStatus.AGUARDANDO_MEDICO, ConsultaStatus.FINALIZADA, ConsultaStatus.CANCELADA},
+    ConsultaStatus.AGUARDANDO_MEDICO: {ConsultaStatus.EM_ATENDIMENTO, ConsultaStatus.FINALIZADA, ConsultaStatus.CANCELADA},
+    ConsultaStatus.EM_ATENDIMENTO: {ConsultaStatus.FINALIZADA, ConsultaStatus.CANCELADA},
+    ConsultaStatus.FINALIZADA: set(),
+    ConsultaStatus.CANCELADA: set(),
+}
+
+ESTADOS_ATIVOS = [s for s, destinos in TRANSICOES.items() if destinos]
+ESTADOS_FINAIS = [s for s, destinos in TRANSICOES.items() if not destinos]
+
+# Status em que a consulta ocupa a enfermeira / o profissional atribuído
+_CARGA_ENFERMEIRA = {ConsultaStatus.EM_TRIAGEM}
+_CARGA_PROFISSIONAL = {ConsultaStatus.AGUARDANDO_MEDICO, ConsultaStatus.EM_ATENDIMENTO}
+
+
+class TransicaoInvalidaError(Exception):
+    """A transição não é permitida a partir do status atual"""
+
+
+class ConflitoTransicaoError(Exception):
+    """O status mudou entre a leitura e o UPDATE (outra requisição venceu)"""
+
+
+@dataclass
+class EventoConsulta:
+    consulta_id: int
+    anterior: ConsultaStatus
+    novo: ConsultaStatus
+    usuario_id: Optional[int]
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+
+    def to_message(self) -> dict:
+        return {
+            "type": "status_update",
+            "consulta_id": self.consulta_id,
+            "status_anterior": self.anterior.value,
+            "status": self.novo.value,
+            "updated_by": {"id": self.usuario_id},
+            "timestamp": self.timestamp.isoformat(),
+        }
+
+
+def _valores_estatistica(consulta: Consulta) -> dict:
+    return {
+        "created_at": consulta.created_at,
+        "status": consulta.status,
+        "classificacao_urgencia": consulta.classificacao_urgencia,
+        "medico_id": consulta.medico_id,
+        "data_inicio": consulta.data_inicio,
+        "data_fim": consulta.data_fim,
+        "duracao_minutos": consulta.duracao_minutos,
+    }
+
+
+class ConsultaStatusService:
+    def pode_transicionar(self, atual: ConsultaStatus, novo: ConsultaStatus) -> bool:
+        return novo in TRANSICOES.get(atual, set())
+
+    def ajustar_carga(self, db: Session, user_id: Optional[int], delta: int):
+        """Incrementa/decrementa pacientes_atuais no banco (atômico, nunca abaixo de 0)"""
+        if user_id is None:
+            return
+        query = update(User).where(User.id == user_id).values(pacientes_atuais=User.pacientes_atuais + delta)
+        if delta < 0:
+            query = query.where(User.pacientes_atuais > 0)
+        db.execute(query)
+
+    def transicionar(
+        self,
+        db: Session,
+        consulta: Consulta,
+        novo: ConsultaStatus,
+        usuario_id: Optional[int] = None,
+        valores: Optional[dict] = None,
+        commit: bool = True,
+    ) -> Consulta:
+        """
+        Move a consulta para `novo` se ela ainda estiver no status lido.
+        `valores` são colunas gravadas no mesmo UPDATE (ex.: medico_id).
+
+        Raises:
+            TransicaoInvalidaError: transição não permitida
+            ConflitoTransicaoError: status alterado concorrentemente. Nada é
+                desfeito: a transação (e o que estiver pendente nela) fica
+                com o chamador, que decide entre rollback e seguir adiante.
+        """
+        atual = consulta.status
+        if not self.pode_transicionar(atual, novo):
+            raise TransicaoInvalidaError(f"Transição inválida: {atual.value} -> {novo.value}")
+
+        valores = dict(valores or {})
+        valores["status"] = novo
+        agora = datetime.utcnow()
+        if novo in ESTADOS_FINAIS:
+            valores["data_fim"] = agora
+            inicio = valores.get("data_inicio", consulta.data_inicio)
+            if novo == ConsultaStatus.FINALIZADA and inicio is not None:
+                valores["duracao_minutos"] = max(round((agora - inicio).total_seconds() / 60), 0)
+
+        antes = _valores_estatistica(consulta)
+        resultado = db.execute(
+            update(Consulta)
+            .where(Consulta.id == consulta.id, Consulta.status == atual)
+            .values(**valores, updated_at=agora)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount != 1:
+            raise ConflitoTransicaoError(
+                f"A consulta foi alterada por outra requisição (não está mais em {atual.value})"
+            )
+
+        # Carga: a consulta deixa de ocupar quem a tinha e passa a ocupar o novo responsável
+        enfermeira_id = valores.get("enfermeira_id", consulta.enfermeira_id)
+        medico_id = valores.get("medico_id", consulta.medico_id)
+        if atual in _CARGA_ENFERMEIRA and novo not in _CARGA_ENFERMEIRA:
+            self.ajustar_carga(db, consulta.enfermeira_id, -1)
+        elif novo in _CARGA_ENFERMEIRA and atual not in _CARGA_ENFERMEIRA:
+            self.ajustar_carga(db, enfermeira_id, +1)
+        if atual in _CARGA_PROFISSIONAL and novo not in _CARGA_PROFISSIONAL:
+            self.ajustar_carga(db, consulta.medico_id, -1)
+        elif novo in _CARGA_PROFISSIONAL and atual not in _CARGA_PROFISSIONAL:
+            self.ajustar_carga(db, medico_id, +1)
+
+        # O UPDATE direto não passa pelo flush do ORM: sincroniza o objeto e as estatísticas
+        for coluna, valor in valores.items():
+            set_committed_value(consulta, coluna, valor)
+        registrar_alteracao_consulta(db, antes, _valores_estatistica(consulta))
+
+        evento = EventoConsulta(consulta.id, atual, novo, usuario_id, agora)
+        publicar(db, EVENTO_STATUS_ALTERADO, evento.to_message(), agregado_id=consulta.id)
+        if commit:
+            db.commit()
+        return consulta
+
+
+consulta_status_service = ConsultaStatusService()
+
@@ -0,0 +1,295 @@
+"""
+Estatísticas de consultas mantidas incrementalmente.
+
+Contadores em memória por dia (created_at), status, urgência e
+profissional, mais somas de tempo de espera (created_at -> data_inicio) e de
+duração (duracao_minutos ou data_inicio -> data_fim). Cada commit que cria,
+altera ou remove consultas aplica a diferença entre a contribuição anterior
+e a nova de cada consulta (histórico de atributos do SQLAlchemy), então a
+leitura é O(1) e não varre a tabela.
+
+As consultas arquivadas (consultas_arquivo) continuam contadas: o arquivamento
+só move linhas e não altera os totais.
+
+Os contadores são reconstruídos do banco (um GROUP BY) na primeira leitura e
+reconciliados em segundo plano a cada ESTATISTICAS_RECONCILIAR_SEGUNDOS, o que corrige
+alterações feitas por outros processos (workers) ou fora do ORM.
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Consulta, ConsultaArquivada
+
+# Atributos de Consulta que alteram as estatísticas
+_CAMPOS = ("created_at", "status", "classificacao_urgencia", "medico_id",
+           "data_inicio", "data_fim", "duracao_minutos")
+
+
+class Contribuicao(NamedTuple):
+    """Parcela de uma consulta nos contadores"""
+    dia: Optional[date]
+    status: Optional[str]
+    urgencia: Optional[str]
+    profissional_id: Optional[int]
+    espera_segundos: Optional[float]
+    duracao_minutos: Optional[float]
+
+
+def _valor(enum_ou_valor):
+    return getattr(enum_ou_valor, "value", enum_ou_valor)
+
+
+def contribuicao(created_at, status, urgencia, medico_id, data_inicio, data_fim, duracao_minutos) -> Contribuicao:
+    espera = None
+    if created_at and data_inicio:
+        espera = (data_inicio - created_at).total_seconds()
+    if duracao_minutos is None and data_inicio and data_fim:
+        duracao_minutos = (data_fim - data_inicio).total_seconds() / 60
+    return Contribuicao(
+        dia=created_at.date() if created_at else None,
+        status=_valor(status),
+        urgencia=_valor(urgencia),
+        profissional_id=medico_id,
+        espera_segundos=espera,
+        duracao_minutos=duracao_minutos,
+    )
+
+
+class ContadoresConsultas:
+    """Totais agregados; aplicar(c, +1) inclui uma consulta e aplicar(c, -1) a retira"""
+
+    def __init__(self):
+        self.total = 0
+        self.por_dia: Counter = Counter()
+        self.por_status: Counter = Counter()
+        self.por_urgencia: Counter = Counter()
+        self.por_profissional: Counter = Counter()
+        self.por_dia_status: Counter = Counter()
+        self.soma_espera = 0.0
+        self.n_espera = 0
+        self.soma_duracao = 0.0
+        self.n_duracao = 0
+
+    def aplicar(self, c: Contribuicao, sinal: int):
+        self.adicionar_grupo(
+            c.dia, c.status, c.urgencia, c.profissional_id, sinal,
+            sinal * (c.espera_segundos or 0.0), sinal if c.espera_segundos is not None else 0,
+            sinal * (c.duracao_minutos or 0.0), sinal if c.duracao_minutos is not None else 0,
+        )
+
+    def adicionar_grupo(self, dia, status, urgencia, profissional_id, quantidade: int,
+                        soma_espera: float, n_espera: int, soma_duracao: float, n_duracao: int):
+        self.total += quantidade
+        self.por_dia[dia] += quantidade
+        self.por_status[status] += quantidade
+        self.por_urgencia[urgencia] += quantidade
+        self.por_dia_status[(dia, status)] += quantidade
+        if profissional_id is not None:
+            self.por_profissional[profissional_id] += quantidade
+        self.soma_espera += soma_espera
+        self.n_espera += n_espera
+        self.soma_duracao += soma_duracao
+        self.n_duracao += n_duracao
+
+
+def _segundos_entre(dialeto: str, inicio, fim):
+    """Expressão SQL com os segundos de `inicio` a `fim` (NULL se algum for NULL)"""
+    if dialeto == "sqlite":
+        return (func.julianday(fim) - func.julianday(inicio)) * 86400.0
+    if dialeto == "mysql":
+        return func.timestampdiff(text("SECOND"), inicio, fim)
+    return func.extract("epoch", fim - inicio)
+
+
+def _sem_zeros(contador: Counter) -> Dict:
+    return {chave: n for chave, n in contador.items() if n and chave is not None}
+
+
+class EstatisticasService:
+    def __init__(self):
+        self._contadores: Optional[ContadoresConsultas] = None
+        self._lock = threading.Lock()
+        self._carga = threading.Lock()
+        self._reconciliado_em: Optional[datetime] = None
+        self._proxima_reconciliacao = 0.0
+        self._reconciliando = False
+
+    # ---- atualização incremental (hooks de sessão) ----
+
+    def aplicar_alteracoes(self, alteracoes):
+        """[(contribuição anterior ou None, nova ou None)] de um commit; None = desconhecida"""
+        if self._contadores is None:
+            return  # será construído do banco na primeira leitura
+        with self._lock:
+            for alteracao in alteracoes:
+                if alteracao is None:
+                    # Valor anterior não carregado: reconciliar na próxima leitura
+                    self._proxima_reconciliacao = 0.0
+                    continue
+                anterior, nova = alteracao
+                if anterior is not None:
+                    self._contadores.aplicar(anterior, -1)
+                if nova is not None:
+                    self._contadores.aplicar(nova, +1)
+
+    # ---- reconstrução e reconciliação ----
+
+    def _calcular(self, db: Session) -> ContadoresConsultas:
+        """Um GROUP BY por (dia, status, urgência, profissional) em consultas e no arquivo"""
+        dialeto = db.get_bind().dialect.name
+        contadores = ContadoresConsultas()
+        for modelo in (Consulta, ConsultaArquivada):
+            espera = _segundos_entre(dialeto, modelo.created_at, modelo.data_inicio)
+            duracao = func.coalesce(
+                modelo.duracao_minutos, _segundos_entre(dialeto, modelo.data_inicio, modelo.data_fim) / 60.0
+            )
+            dia = func.date(modelo.created_at)
+            rows = db.query(
+                dia, modelo.status, modelo.classificacao_urgencia, modelo.medico_id,
+                func.count(modelo.id),
+                func.coalesce(func.sum(espera), 0), func.count(espera),
+                func.coalesce(func.sum(duracao), 0), func.count(duracao),
+            ).group_by(dia, modelo.status, modelo.classificacao_urgencia, modelo.medico_id)
+
+            for dia_valor, status, urgencia, medico_id, n, s_espera, n_espera, s_duracao, n_duracao in rows:
+                if isinstance(dia_valor, str):
+                    dia_valor = date.fromisoformat(dia_valor)  # SQLite devolve texto
+                contadores.adicionar_grupo(
+                    dia_valor, _valor(status), _valor(urgencia), medico_id, n,
+                    float(s_espera), n_espera, float(s_duracao), n_duracao,
+                )
+        return contadores
+
+    def _substituir(self, contadores: ContadoresConsultas):
+        with self._lock:
+            self._contadores = contadores
+            self._reconciliado_em = datetime.utcnow()
+            self._proxima_reconciliacao = time.monotonic() + settings.ESTATISTICAS_RECONCILIAR_SEGUNDOS
+
+    def reconciliar(self):
+        """Recalcula os contadores do banco (executado em segundo plano)"""
+        db = SessionLocal()
+        try:
+            self._substituir(self._calcular(db))
+        except Exception as e:
+            print(f"Erro ao reconciliar estatísticas: {e}")
+        finally:
+            db.close()
+            self._reconciliando = False
+
+    def _garantir(self, db: Session):
+        if self._contadores is None:
+            with self._carga:
+                if self._contadores is None:
+                    self._substituir(self._calcular(db))
+        elif time.monotonic() >= self._proxima_reconciliacao and not self._reconciliando:
+            self._reconciliando = True
+            threading.Thread(target=self.reconciliar, name="estatisticas-reconciliar", daemon=True).start()
+
+    # ---- leitura ----
+
+    def resumo(self, db: Session, hoje: Optional[date] = None) -> dict:
+        self._garantir(db)
+        hoje = hoje or datetime.utcnow().date()
+        with self._lock:
+            c = self._contadores
+            hoje_por_status = {
+                status: c.por_dia_status[(hoje, status)]
+                for status in c.por_status if status is not None and c.por_dia_status[(hoje, status)]
+            }
+            return {
+                "total_consultas": c.total,
+                "consultas_hoje": c.por_dia[hoje],
+                "por_status": _sem_zeros(c.por_status),
+                "por_urgencia": _sem_zeros(c.por_urgencia),
+                "hoje_por_status": hoje_por_status,
+                "por_profissional": _sem_zeros(c.por_profissional),
+                "tempo_medio_espera_minutos": round(c.soma_espera / c.n_espera / 60, 1) if c.n_espera else None,
+                "duracao_media_minutos": round(c.soma_duracao / c.n_duracao, 1) if c.n_duracao else None,
+                "atualizado_em": self._reconciliado_em.isoformat() if self._reconciliado_em else None,
+            }
+
+
+estatisticas_service = EstatisticasService()
+
+
+def _valores(obj: Consulta, novo: bool):
+    """
+    (valores anteriores, valores atuais) dos campos de estatística, ou None
+    se algum valor anterior não estava carregado (atributo expirado).
+    """
+    estado = inspect(obj)
+    anteriores, atuais = [], []
+    for campo in _CAMPOS:
+        hist = estado.attrs[campo].history
+        if hist.unchanged:
+            anteriores.append(hist.unchanged[0])
+            atuais.append(hist.unchanged[0])
+        elif hist.added and (hist.deleted or novo):
+            anteriores.append(hist.deleted[0] if hist.deleted else None)
+            atuais.append(hist.added[0])
+        elif novo:
+            anteriores.append(None)
+            atuais.append(None)
+        else:
+            return None
+    return anteriores, atuais
+
+
+def registrar_alteracao_consulta(session: Session, antes: dict, depois: dict):
+    """
+    Registra a diferença de uma consulta alterada por UPDATE direto (fora do
+    flush do ORM); aplicada no commit da sessão. antes/depois: valores de _CAMPOS.
+    """
+    alteracoes = session.info.setdefault("estatisticas_alteracoes", [])
+    alteracoes.append((
+        contribuicao(*(antes[campo] for campo in _CAMPOS)),
+        contribuicao(*(depois[campo] for campo in _CAMPOS)),
+    ))
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _coletar_consultas(session, flush_context):
+    alteracoes = session.info.setdefault("estatisticas_alteracoes", [])
+    for obj in session.new:
+        if isinstance(obj, Consulta):
+            _, atuais = _valores(obj, novo=True)
+            alteracoes.append((None, contribuicao(*atuais)))
+    for obj in session.dirty:
+        if isinstance(obj, Consulta) and session.is_modified(obj, include_collections=False):
+            valores = _valores(obj, novo=False)
+            if valores is None:
+                alteracoes.append(None)  # diferença desconhecida: reconciliar
+                continue
+            antes, depois = contribuicao(*valores[0]), contribuicao(*valores[1])
+            if antes != depois:
+                alteracoes.append((antes, depois))
+    for obj in session.deleted:
+        if isinstance(obj, Consulta):
+            valores = _valores(obj, novo=False)
+            alteracoes.append((contribuicao(*valores[0]), None) if valores else None)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _aplicar_consultas(session):
+    alteracoes = session.info.pop("estatisticas_alteracoes", None)
+    if not alteracoes:
+        return
+    try:
+        estatisticas_service.aplicar_alteracoes(alteracoes)
+    except Exception as e:
+        print(f"Erro ao atualizar estatísticas: {e}")
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_consultas(session):
+    session.info.pop("estatisticas_alteracoes", None)
@@ -0,0 +1,155 @@
+"""
+Serviço de arquivos com deduplicação por conteúdo.
+
+Cada upload é identificado pelo SHA-256 do conteúdo. Uploads repetidos
+reaproveitam o mesmo ArquivoBlob (ref_count) e não são reenviados ao
+armazenamento; o blob só é removido quando a última referência é apagada.
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import UploadFile
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.models import Arquivo, ArquivoBlob
+from app.services.s3_service import BaseStorageService
+
+# Tamanho dos blocos lidos do upload
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class FileTooLargeError(Exception):
+    """Upload excede o tamanho máximo permitido"""
+
+
+class FileService:
+    """Encapsula armazenamento e contagem de referências dos arquivos."""
+
+    async def read_upload(self, upload: UploadFile, max_size: int) -> tuple[bytes, str]:
+        """
+        Lê o upload em blocos calculando o SHA-256 durante a leitura.
+        Interrompe assim que o limite de tamanho é ultrapassado.
+
+        Returns:
+            (conteúdo, sha256 em hexadecimal)
+        """
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(buffer) + len(chunk) > max_size:
+                raise FileTooLargeError()
+            digest.update(chunk)
+            buffer += chunk
+        return bytes(buffer), digest.hexdigest()
+
+    def _acquire_existing(self, db: Session, sha256: str) -> Optional[ArquivoBlob]:
+        """Incrementa a referência de um blob existente (se ainda estiver vivo)"""
+        blob = db.query(ArquivoBlob).filter(ArquivoBlob.sha256 == sha256).first()
+        if not blob:
+            return None
+        result = db.execute(
+            update(ArquivoBlob)
+            .where(ArquivoBlob.id == blob.id, ArquivoBlob.ref_count > 0)
+            .values(ref_count=ArquivoBlob.ref_count + 1)
+        )
+        if result.rowcount == 0:
+            return None
+        db.refresh(blob)
+        return blob
+
+    async def store(
+        self,
+        db: Session,
+        storage: BaseStorageService,
+        data: bytes,
+        sha256: str,
+        original_name: str,
+        content_type: str,
+        uploaded_by: int,
+        patient_id: Optional[int] = None,
+    ) -> tuple[Arquivo, bool]:
+        """
+        Registra um upload, enviando o conteúdo ao armazenamento apenas
+        se o SHA-256 ainda não existir.
+
+        Returns:
+            (arquivo, deduplicado)
+        """
+        blob = self._acquire_existing(db, sha256)
+        deduplicated = blob is not None
+
+        if blob is None:
+            key = storage.content_key(sha256)
+            await storage.upload_file(data, original_name, content_type, key=key)
+            try:
+                with db.begin_nested():
+                    blob = ArquivoBlob(
+                        sha256=sha256,
+                        storage_key=key,
+                        content_type=content_type,
+                        size=len(data),
+                        ref_count=1,
+                    )
+                    db.add(blob)
+            except IntegrityError:
+                # Outro upload concorrente registrou o mesmo conteúdo
+                blob = self._acquire_existing(db, sha256)
+                if blob is None:
+                    raise
+                deduplicated = True
+
+        arquivo = Arquivo(
+            blob_id=blob.id,
+            patient_id=patient_id,
+            uploaded_by=uploaded_by,
+            original_name=original_name,
+        )
+        db.add(arquivo)
+        db.commit()
+        db.refresh(arquivo)
+        return arquivo, deduplicated
+
+    async def release(self, db: Session, storage: BaseStorageService, arquivo: Arquivo) -> bool:
+        """
+        Remove um upload e decrementa a referência do blob.
+        Retorna True se o conteúdo (e seus derivados) foi removido do armazenamento.
+
+        O conteúdo é apagado do armazenamento antes do commit, com a linha do
+        blob ainda bloqueada pelo UPDATE: como a chave é derivada do SHA-256,
+        um upload concorrente do mesmo conteúdo espera o bloqueio, não encontra
+        mais o blob e grava o objeto de novo depois da remoção (nunca antes).
+        Se a remoção falhar, nada é desfeito no banco.
+        """
+        blob_id = arquivo.blob_id
+        blob = arquivo.blob
+        keys = [k for k in (blob.storage_key, blob.thumbnail_key, blob.preview_key) if k]
+
+        db.delete(arquivo)
+        db.flush()
+        db.execute(
+            update(ArquivoBlob)
+            .where(ArquivoBlob.id == blob_id)
+            .values(ref_count=ArquivoBlob.ref_count - 1)
+        )
+        orphan = db.execute(
+            delete(ArquivoBlob)
+            .where(ArquivoBlob.id == blob_id, ArquivoBlob.ref_count <= 0)
+            .execution_options(synchronize_session=False)
+        )
+        if orphan.rowcount:
+            try:
+                await storage.delete_files(keys)
+            except Exception:
+                db.rollback()
+                raise
+        db.commit()
+        return bool(orphan.rowcount)
+
+
+file_service = FileService()
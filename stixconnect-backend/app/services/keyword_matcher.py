@@ -0,0 +1,126 @@
+"""
+Busca de palavras-chave clínicas em texto livre.
+
+As palavras-chave são normalizadas (minúsculas, sem acentos) e compiladas
+uma única vez em uma expressão regular fatorada por prefixos (trie), com
+limites de palavra. Uma única varredura do texto encontra todos os termos,
+independentemente do tamanho da lista.
+"""
+
+import json
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Set
+
+from app.core.texto import fold_text
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "data" / "triagem_regras.json"
+
+
+def normalize_text(text: str) -> str:
+    """Como fold_text, colapsando também os espaços"""
+    return _WHITESPACE_RE.sub(" ", fold_text(text)).strip()
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Monta uma alternância fatorada por prefixos (evita backtracking entre termos)"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        terminal = "" in node
+        branches = []
+        for char in sorted(k for k in node if k):
+            # Espaço entre palavras aceita qualquer sequência de espaços
+            token = r"\s+" if char == " " else re.escape(char)
+            branches.append(token + build(node[char]))
+        if not branches:
+            return ""
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if terminal else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Conjunto de palavras-chave por categoria, compilado em uma regex"""
+
+    def __init__(self, categories: Dict[str, Iterable[str]], version: Optional[str] = None):
+        self.version = version
+        self.term_category: Dict[str, str] = {}
+        for category, terms in categories.items():
+            for term in terms:
+                normalized = normalize_text(term)
+                if normalized:
+                    # Em caso de termo repetido, vale a primeira categoria
+                    self.term_category.setdefault(normalized, category)
+
+        if self.term_category:
+            pattern = r"\b" + _trie_pattern(self.term_category) + r"\b"
+        else:
+            pattern = r"(?!x)x"  # nunca casa
+        self.regex = re.compile(pattern, re.ASCII)
+
+    def __len__(self) -> int:
+        return len(self.term_category)
+
+    def find_normalized(self, normalized_text: str) -> Dict[str, Set[str]]:
+        """Termos encontrados por categoria, para texto já passado por fold_text"""
+        found: Dict[str, Set[str]] = {}
+        for match in self.regex.finditer(normalized_text):
+            term = match.group(0)
+            category = self.term_category.get(term) or self.term_category.get(_WHITESPACE_RE.sub(" ", term))
+            if category:
+                found.setdefault(category, set()).add(term)
+        return found
+
+    def find(self, text: str) -> Dict[str, Set[str]]:
+        """Termos encontrados por categoria"""
+        return self.find_normalized(fold_text(text))
+
+    def find_many(self, texts: Sequence[str]) -> Dict[int, Dict[str, Set[str]]]:
+        """
+        Termos encontrados por categoria, indexados pela posição do texto
+        (apenas textos com algum termo), com uma única varredura sobre os
+        textos concatenados (separados por NUL).
+        """
+        if not texts:
+            return {}
+
+        joined = fold_text("\0".join(texts))
+        parts = joined.split("\0")
+        if len(parts) != len(texts):
+            # Algum texto continha NUL: volta à busca individual
+            return {i: found for i, t in enumerate(texts) if (found := self.find(t))}
+        starts = list(accumulate((len(p) + 1 for p in parts[:-1]), initial=0))
+
+        results: Dict[int, Dict[str, Set[str]]] = {}
+        for match in self.regex.finditer(joined):
+            term = match.group(0)
+            category = self.term_category.get(term) or self.term_category.get(_WHITESPACE_RE.sub(" ", term))
+            if category:
+                row = bisect_right(starts, match.start()) - 1
+                results.setdefault(row, {}).setdefault(category, set()).add(term)
+        return results
+
+    @classmethod
+    def from_file(cls, path: Optional[Path] = None) -> "KeywordMatcher":
+        """
+        Carrega regras de um arquivo JSON versionado:
+        {"versao": "...", "categorias": {"critico": [...], "alto": [...]}}
+        """
+        path = Path(path or DEFAULT_RULES_PATH)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["categorias"], version=data.get("versao"))
+
@@ -0,0 +1,529 @@
+"""
+Migração em lote do banco MySQL legado (tb_usuario, tb_consultas, tb_triagem)
+para o schema atual.
+
+Cada tabela é lida em ordem de id, em blocos de `tamanho_bloco` linhas por
+paginação de chave (id > último id lido, LIMIT n): a memória fica limitada a um
+bloco em qualquer driver (o dialeto mysql-connector do SQLAlchemy sempre
+bufferiza o resultado inteiro de um cursor, então um único SELECT com
+stream_results não bastaria) e nenhuma transação longa fica aberta no legado.
+Para cada bloco:
+- os ids legados são convertidos para ids novos: id legado + deslocamento da
+  tabela (o maior id do destino quando a tabela começou a ser migrada; 0 em
+  um destino vazio), e as chaves estrangeiras seguem o mesmo mapeamento. Assim
+  linhas já existentes no destino (ex.: o admin de create_admin_user.py) não
+  colidem com as legadas;
+- um usuário legado cujo email já existe no destino não é inserido: as
+  consultas e triagens dele passam a apontar para o usuário existente. Conflito
+  apenas de cpf/prontuário (email diferente) é erro, e as linhas que o
+  referenciam também;
+- a existência é verificada com uma consulta IN por chave, em vez de um
+  SELECT por linha. Um id novo que já existe no destino com outro conteúdo
+  (email, paciente, consulta) interrompe a migração (MigracaoConflitoError);
+  com o mesmo conteúdo é uma linha de uma execução anterior e é pulada;
+- as linhas novas são gravadas com um único INSERT em lote (executemany);
+- a transação é confirmada e o último id vira o checkpoint da tabela.
+
+O checkpoint (arquivo JSON) guarda o último id, o deslocamento de cada tabela
+e os usuários reaproveitados, e permite retomar a migração de onde parou. Se o
+INSERT em lote falhar (ex.: chave estrangeira ausente), o bloco é refeito linha
+a linha e apenas as linhas com erro são descartadas. No fim, as sequências de
+id do PostgreSQL são ajustadas ao maior id (INSERT com id explícito não as
+avança; no MySQL o AUTO_INCREMENT já acompanha).
+
+Credenciais do banco legado: LEGACY_DATABASE_URL ou DB_HOST/DB_USER/
+DB_PASSWORD/DB_NAME/DB_PORT (ver app/core/config.py). Os scripts
+scripts/migrate_data.py usam main() deste módulo.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.engine import URL, Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.models.models import (
+    ClassificacaoUrgencia, Consulta, ConsultaStatus, ConsultaTipo, Triagem, User, UserRole,
+    normalizar_nome, somente_digitos,
+)
+from app.services.sinais_vitais import normalizar_sinais_vitais
+
+logger = logging.getLogger("stixconnect.migracao")
+
+TAMANHO_BLOCO_PADRAO = 5000
+CHECKPOINT_PADRAO = "migracao_checkpoint.json"
+
+# Mapeamento de tb_profile.nome (legado) para UserRole
+ROLES_POR_NOME = {
+    "Administrador": UserRole.ADMIN,
+    "Supervisor": UserRole.SUPERVISOR,
+    "Médico": UserRole.DOCTOR,
+    "Enfermeiro": UserRole.NURSE,
+    "Atendente": UserRole.RECEPTIONIST,
+    "Fisioterapeuta": UserRole.PHYSIOTHERAPIST,
+    "Nutricionista": UserRole.NUTRITIONIST,
+    "Cabeleireiro": UserRole.HAIRDRESSER,
+    "Psicóloga": UserRole.PSYCHOLOGIST,
+    "Fonoaudióloga": UserRole.SPEECH_THERAPIST,
+    "Acupuntura": UserRole.ACUPUNCTURIST,
+    "Psicopedagoga_clinica": UserRole.CLINICAL_PSYPEDAGOGIST,
+    "Cuidador": UserRole.CAREGIVER,
+    "Paciente": UserRole.PATIENT,
+}
+
+# Mapeamento de codPerfil (legado) para UserRole, quando o perfil não tem nome
+ROLES_POR_CODIGO = {
+    1: UserRole.ADMIN,              # Administrador
+    2: UserRole.DOCTOR,             # Médico
+    3: UserRole.NURSE,              # Enfermeiro
+    4: UserRole.RECEPTIONIST,       # Atendente
+    5: UserRole.PHYSIOTHERAPIST,    # Fisioterapeuta
+    6: UserRole.NUTRITIONIST,       # Nutricionista
+    7: UserRole.HAIRDRESSER,        # Cabeleireiro
+    8: UserRole.PSYCHOLOGIST,       # Psicóloga
+    9: UserRole.SPEECH_THERAPIST,   # Fonoaudióloga
+    10: UserRole.ACUPUNCTURIST,     # Acupuntura
+    11: UserRole.CLINICAL_PSYPEDAGOGIST,  # Psicopedagoga_clinica
+    12: UserRole.CAREGIVER,         # Cuidador
+    13: UserRole.PATIENT,           # Paciente
+    14: UserRole.SUPERVISOR,        # Supervisor
+}
+
+
+class MigracaoConflitoError(Exception):
+    """Um id novo já existe no destino com outro conteúdo; o mapeamento de ids não é confiável"""
+
+
+def map_role(cod_perfil: Optional[int], nome_perfil: Optional[str] = None) -> UserRole:
+    """Role pelo nome do perfil, depois pelo código; PATIENT se nenhum casar"""
+    return ROLES_POR_NOME.get(nome_perfil) or ROLES_POR_CODIGO.get(cod_perfil, UserRole.PATIENT)
+
+
+def url_legado() -> URL:
+    """URL do banco legado a partir da configuração (nunca fixa no código)"""
+    if settings.LEGACY_DATABASE_URL:
+        return settings.LEGACY_DATABASE_URL
+    if not (settings.DB_HOST and settings.DB_USER and settings.DB_NAME):
+        raise RuntimeError(
+            "Banco legado não configurado: defina LEGACY_DATABASE_URL ou DB_HOST/DB_USER/DB_PASSWORD/DB_NAME"
+        )
+    return URL.create(
+        "mysql+mysqlconnector",
+        username=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+    )
+
+
+def _data(valor):
+    """Datas do legado como datetime (SQLite devolve texto; DATE vira meia-noite)"""
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, str):
+        return datetime.fromisoformat(valor)
+    if isinstance(valor, date) and not isinstance(valor, datetime):
+        return datetime.combine(valor, datetime.min.time())
+    return valor
+
+
+def _enum(classe, valor, padrao=None):
+    try:
+        return classe(valor) if valor is not None else padrao
+    except ValueError:
+        return padrao
+
+
+# ---- conversão linha legada -> colunas do schema atual ----
+
+class _Conversor:
+    def __init__(self):
+        self._senha_temporaria: Optional[str] = None
+
+    def senha_temporaria(self) -> str:
+        # Um único hash por execução (bcrypt é caro demais para calcular por linha)
+        if self._senha_temporaria is None:
+            self._senha_temporaria = get_password_hash("temp123")
+        return self._senha_temporaria
+
+    def usuario(self, row: dict) -> dict:
+        agora = datetime.utcnow()
+        prontuario = row.get("nroMatricula") or row.get("num_prontuario")
+        ativo = row.get("ativo")
+        return {
+            "id": row["id"],
+            "nome": row.get("nome") or "Sem nome",
+            "email": row["email"],
+            "senha_hash": row.get("password") or self.senha_temporaria(),
+            "role": map_role(row.get("codPerfil"), row.get("nomePerfil")),
+            "telefone": row.get("telefone"),
+            "cpf": row.get("cpf") or None,
+            "data_nascimento": _data(row.get("data_nascimento")),
+            "ativo": True if ativo is None else bool(int(ativo)),
+            "num_prontuario": prontuario or None,
+            "endereco": row.get("endereco"),
+            "especialidade": row.get("especialidade"),
+            "crm": row.get("crm"),
+            # Mesmos campos de busca preenchidos por _normalizar_campos_busca no ORM
+            "nome_busca": normalizar_nome(row.get("nome")),
+            "email_busca": row["email"].lower(),
+            "cpf_digitos": somente_digitos(row.get("cpf")),
+            "prontuario_digitos": somente_digitos(prontuario),
+            "created_at": _data(row.get("created_at")) or agora,
+            "updated_at": _data(row.get("updated_at")) or agora,
+        }
+
+    def consulta(self, row: dict) -> dict:
+        agora = datetime.utcnow()
+        return {
+            "id": row["id"],
+            "paciente_id": row.get("paciente_id"),
+            "enfermeira_id": row.get("enfermeira_id"),
+            "medico_id": row.get("medico_id"),
+            "tipo": ConsultaTipo.URGENTE if row.get("tipo") == "urgente" else ConsultaTipo.AGENDADA,
+            "status": _enum(ConsultaStatus, row.get("status"), ConsultaStatus.AGUARDANDO),
+            "classificacao_urgencia": _enum(ClassificacaoUrgencia, row.get("classificacao_urgencia")),
+            "data_agendamento": _data(row.get("data_agendamento")),
+            "data_inicio": _data(row.get("data_inicio")),
+            "data_fim": _data(row.get("data_fim")),
+            "duracao_minutos": row.get("duracao_minutos"),
+            "zoom_meeting_id": row.get("zoom_meeting_id") or None,
+            "zoom_join_url": row.get("zoom_join_url"),
+            "zoom_start_url": row.get("zoom_start_url"),
+            "zoom_password": row.get("zoom_password"),
+            "observacoes": row.get("observacoes"),
+            "diagnostico": row.get("diagnostico"),
+            "created_at": _data(row.get("created_at")) or agora,
+            "updated_at": _data(row.get("updated_at")) or agora,
+        }
+
+    def triagem(self, row: dict) -> dict:
+        agora = datetime.utcnow()
+        valores = SimpleNamespace(
+            temperatura=row.get("temperatura"),
+            pressao_arterial=row.get("pressao_arterial"),
+            frequencia_cardiaca=row.get("frequencia_cardiaca"),
+            saturacao_oxigenio=row.get("saturacao_oxigenio"),
+        )
+        normalizar_sinais_vitais(valores)
+        return {
+            "id": row["id"],
+            "consulta_id": row.get("consulta_id"),
+            "paciente_id": row.get("paciente_id"),
+            "sintomas": row.get("sintomas") or "",
+            "dor_escala": row.get("dor_escala"),
+            "historico_medico": row.get("historico_medico"),
+            "medicamentos_uso": row.get("medicamentos_uso"),
+            "alergias": row.get("alergias"),
+            "classificacao_automatica": _enum(ClassificacaoUrgencia, row.get("classificacao_automatica")),
+            "classificacao_enfermeira": _enum(ClassificacaoUrgencia, row.get("classificacao_enfermeira")),
+            **vars(valores),
+            "created_at": _data(row.get("created_at")) or agora,
+            "updated_at": _data(row.get("updated_at")) or agora,
+        }
+
+
+@dataclass
+class Etapa:
+    """Uma tabela legada migrada para uma tabela do schema atual"""
+    nome: str
+    consulta: str                               # SELECT com :ultimo_id e :limite, ordenado por id
+    modelo: type
+    converter: Callable[[dict], dict]
+    chaves_unicas: tuple = ()                   # além do id
+    referencias: Dict[str, str] = field(default_factory=dict)  # coluna -> etapa cujo id ela referencia
+    conferir: Optional[str] = None              # coluna que deve coincidir quando o id novo já existe
+    reaproveitar: Optional[str] = None          # chave que, já existente no destino, reaproveita a linha
+
+
+@dataclass
+class Relatorio:
+    lidas: int = 0
+    inseridas: int = 0
+    puladas: int = 0
+    reaproveitadas: int = 0
+    erros: int = 0
+    blocos: int = 0
+    segundos: float = 0.0
+    ultimo_id: Optional[int] = None
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return round(self.lidas / self.segundos, 1) if self.segundos else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "lidas": self.lidas, "inseridas": self.inseridas, "puladas": self.puladas,
+            "reaproveitadas": self.reaproveitadas, "erros": self.erros,
+            "blocos": self.blocos, "segundos": round(self.segundos, 2),
+            "linhas_por_segundo": self.linhas_por_segundo, "ultimo_id": self.ultimo_id,
+        }
+
+
+@dataclass
+class MigradorLegado:
+    origem: Engine
+    destino: Engine
+    tamanho_bloco: int = TAMANHO_BLOCO_PADRAO
+    checkpoint_path: Optional[str] = CHECKPOINT_PADRAO
+    checkpoint: Dict[str, int] = field(default_factory=dict)      # etapa -> último id legado lido
+    deslocamentos: Dict[str, int] = field(default_factory=dict)   # etapa -> id novo = id legado + deslocamento
+    mapa: Dict[str, Dict[str, Optional[int]]] = field(default_factory=dict)  # exceções: etapa -> {id legado: id novo}
+
+    def __post_init__(self):
+        self._conversor = _Conversor()
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                salvo = json.load(f)
+            if "ultimo_id" in salvo:
+                self.checkpoint = salvo["ultimo_id"]
+                self.deslocamentos = salvo.get("deslocamentos", {})
+                self.mapa = salvo.get("mapa", {})
+            else:
+                # Formato antigo (só o último id): os ids legados eram mantidos
+                self.checkpoint = salvo
+                self.deslocamentos = {nome: 0 for nome in salvo}
+            logger.info(f"Retomando do checkpoint {self.checkpoint_path}: {self.checkpoint}")
+
+    def etapas(self) -> List[Etapa]:
+        c = self._conversor
+        return [
+            Etapa(
+                "usuarios",
+                """
+                SELECT u.*, p.nome AS nomePerfil
+                FROM tb_usuario u
+                LEFT JOIN tb_profile p ON p.idProfile = u.codPerfil
+                WHERE u.id > :ultimo_id
+                ORDER BY u.id
+                LIMIT :limite
+                """,
+                User, c.usuario, ("email", "cpf", "num_prontuario"),
+                conferir="email", reaproveitar="email",
+            ),
+            Etapa(
+                "consultas",
+                "SELECT * FROM tb_consultas WHERE id > :ultimo_id ORDER BY id LIMIT :limite",
+                Consulta, c.consulta, ("zoom_meeting_id",),
+                referencias={"paciente_id": "usuarios", "enfermeira_id": "usuarios", "medico_id": "usuarios"},
+                conferir="paciente_id",
+            ),
+            Etapa(
+                "triagens",
+                "SELECT * FROM tb_triagem WHERE id > :ultimo_id ORDER BY id LIMIT :limite",
+                Triagem, c.triagem,
+                referencias={"consulta_id": "consultas", "paciente_id": "usuarios"},
+                conferir="consulta_id",
+            ),
+        ]
+
+    def _salvar_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        temporario = f"{self.checkpoint_path}.tmp"
+        with open(temporario, "w") as f:
+            json.dump({"ultimo_id": self.checkpoint, "deslocamentos": self.deslocamentos, "mapa": self.mapa}, f)
+        os.replace(temporario, self.checkpoint_path)
+
+    def _id_novo(self, etapa: str, id_legado: Optional[int]) -> Optional[int]:
+        """Id no destino de uma linha legada (None se ela não foi migrada)"""
+        if id_legado is None:
+            return None
+        excecoes = self.mapa.get(etapa, {})
+        if str(id_legado) in excecoes:
+            return excecoes[str(id_legado)]
+        return id_legado + self.deslocamentos.get(etapa, 0)
+
+    def _mapear_ids(self, etapa: Etapa, linhas: List[dict], relatorio: Relatorio) -> List[dict]:
+        """Troca o id e as chaves estrangeiras legadas pelos ids novos"""
+        mapeadas = []
+        for linha in linhas:
+            linha["_id_legado"] = linha["id"]
+            linha["id"] = self._id_novo(etapa.nome, linha["id"])
+            ausentes = []
+            for coluna, referencia in etapa.referencias.items():
+                legado = linha[coluna]
+                linha[coluna] = self._id_novo(referencia, legado)
+                if legado is not None and linha[coluna] is None:
+                    ausentes.append(f"{coluna}={legado}")
+            if ausentes:
+                relatorio.erros += 1
+                logger.error(f"{etapa.nome}: id {linha['_id_legado']} não migrado: referencia linha não migrada ({', '.join(ausentes)})")
+                continue
+            mapeadas.append(linha)
+        return mapeadas
+
+    def _filtrar_existentes(self, conn: Connection, etapa: Etapa, linhas: List[dict], relatorio: Relatorio) -> List[dict]:
+        """
+        Descarta linhas já existentes no destino (um IN por chave) ou repetidas
+        no próprio bloco; reaproveita as que casam pela chave `reaproveitar`.
+        """
+        tabela = etapa.modelo.__table__
+        ids = [linha["id"] for linha in linhas]
+        coluna_conferir = tabela.c[etapa.conferir] if etapa.conferir else tabela.c.id
+        ja_migradas = dict(conn.execute(select(tabela.c.id, coluna_conferir).where(tabela.c.id.in_(ids))).all()) if ids else {}
+        for linha in linhas:
+            if linha["id"] in ja_migradas and etapa.conferir and ja_migradas[linha["id"]] != linha[etapa.conferir]:
+                raise MigracaoConflitoError(
+                    f"{etapa.nome}: id legado {linha['_id_legado']} -> {linha['id']} já existe no destino com "
+                    f"{etapa.conferir}={ja_migradas[linha['id']]!r} (legado: {linha[etapa.conferir]!r})"
+                )
+
+        existentes = {}
+        for chave in etapa.chaves_unicas:
+            valores = {linha[chave] for linha in linhas if linha[chave] is not None}
+            coluna = tabela.c[chave]
+            existentes[chave] = dict(conn.execute(select(coluna, tabela.c.id).where(coluna.in_(valores))).all()) if valores else {}
+
+        excecoes = self.mapa.setdefault(etapa.nome, {})
+        novas = []
+        for linha in linhas:
+            if linha["id"] in ja_migradas:
+                relatorio.puladas += 1  # gravada por uma execução anterior
+                continue
+            chave = etapa.reaproveitar
+            if chave and linha[chave] is not None and linha[chave] in existentes[chave]:
+                excecoes[str(linha["_id_legado"])] = existentes[chave][linha[chave]]
+                relatorio.reaproveitadas += 1
+                continue
+            conflitos = [c for c in etapa.chaves_unicas if linha[c] is not None and linha[c] in existentes[c]]
+            if conflitos:
+                excecoes[str(linha["_id_legado"])] = None
+                relatorio.erros += 1
+                logger.error(f"{etapa.nome}: id {linha['_id_legado']} não migrado: {', '.join(conflitos)} já existe no destino")
+                continue
+            for c in etapa.chaves_unicas:
+                if linha[c] is not None:
+                    existentes[c][linha[c]] = linha["id"]
+            novas.append(linha)
+        return novas
+
+    def _gravar_bloco(self, etapa: Etapa, linhas: List[dict], relatorio: Relatorio):
+        tabela = etapa.modelo.__table__
+        linhas = self._mapear_ids(etapa, linhas, relatorio)
+        with self.destino.connect() as conn:
+            novas = self._filtrar_existentes(conn, etapa, linhas, relatorio)
+            for linha in novas:
+                del linha["_id_legado"]
+            if not novas:
+                return
+            try:
+                conn.execute(insert(tabela), novas)
+                conn.commit()
+                relatorio.inseridas += len(novas)
+                return
+            except IntegrityError as e:
+                conn.rollback()
+                logger.warning(f"{etapa.nome}: bloco rejeitado ({e.orig}); gravando linha a linha")
+            for linha in novas:
+                try:
+                    conn.execute(insert(tabela), [linha])
+                    conn.commit()
+                    relatorio.inseridas += 1
+                except IntegrityError as e:
+                    conn.rollback()
+                    relatorio.erros += 1
+                    logger.error(f"{etapa.nome}: id {linha['id']} (novo) não migrado: {e.orig}")
+
+    def migrar(self, etapa: Etapa) -> Relatorio:
+        relatorio = Relatorio(ultimo_id=self.checkpoint.get(etapa.nome))
+        inicio = time.perf_counter()
+        if etapa.nome not in self.deslocamentos:
+            with self.destino.connect() as conn:
+                self.deslocamentos[etapa.nome] = conn.scalar(select(func.max(etapa.modelo.__table__.c.id))) or 0
+            self._salvar_checkpoint()
+            logger.info(f"{etapa.nome}: ids legados + {self.deslocamentos[etapa.nome]}")
+        while True:
+            with self.origem.connect() as conn:
+                bloco = conn.execute(
+                    text(etapa.consulta), {"ultimo_id": relatorio.ultimo_id or 0, "limite": self.tamanho_bloco}
+                ).mappings().all()
+            if not bloco:
+                break
+            linhas = []
+            for row in bloco:
+                try:
+                    linhas.append(etapa.converter(dict(row)))
+                except Exception as e:
+                    relatorio.erros += 1
+                    logger.error(f"{etapa.nome}: id {row.get('id')} inválido: {e}")
+            self._gravar_bloco(etapa, linhas, relatorio)
+
+            relatorio.lidas += len(bloco)
+            relatorio.blocos += 1
+            relatorio.ultimo_id = bloco[-1]["id"]
+            relatorio.segundos = time.perf_counter() - inicio
+            self.checkpoint[etapa.nome] = relatorio.ultimo_id
+            self._salvar_checkpoint()
+            logger.info(
+                f"{etapa.nome}: {relatorio.lidas} lidas, {relatorio.inseridas} inseridas, "
+                f"{relatorio.puladas} puladas ({relatorio.linhas_por_segundo} linhas/s)"
+            )
+            if len(bloco) < self.tamanho_bloco:
+                break
+        relatorio.segundos = time.perf_counter() - inicio
+        return relatorio
+
+    def ajustar_sequencias(self):
+        """Leva as sequências de id do PostgreSQL ao maior id gravado"""
+        if self.destino.dialect.name != "postgresql":
+            return
+        with self.destino.connect() as conn:
+            for etapa in self.etapas():
+                tabela = etapa.modelo.__tablename__
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {tabela}), 1), (SELECT MAX(id) FROM {tabela}) IS NOT NULL)"
+                ))
+            conn.commit()
+
+    def executar(self) -> Dict[str, dict]:
+        relatorio = {etapa.nome: self.migrar(etapa).to_dict() for etapa in self.etapas()}
+        self.ajustar_sequencias()
+        return relatorio
+
+
+def main(argv: Optional[List[str]] = None) -> bool:
+    parser = argparse.ArgumentParser(description="Migra usuários, consultas e triagens do banco legado")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO_PADRAO, help="linhas por bloco/transação")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PADRAO, help="arquivo JSON de checkpoint")
+    parser.add_argument("--reiniciar", action="store_true", help="ignora o checkpoint e começa do início (o checkpoint guarda o mapeamento de ids: "
+                             "só use com um destino sem dados já migrados)")
+    parser.add_argument("--origem", help="URL do banco legado (padrão: configuração)")
+    parser.add_argument("--destino", help="URL do banco novo (padrão: DATABASE_URL)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.reiniciar and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    origem = create_engine(args.origem or url_legado())
+    if args.destino:
+        destino = create_engine(args.destino)
+    else:
+        from app.core.database import engine as destino
+    from app.core.database import Base
+    Base.metadata.create_all(bind=destino)
+
+    try:
+        relatorio = MigradorLegado(origem, destino, args.bloco, args.checkpoint).executar()
+    except Exception as e:
+        logger.error(f"Falha na migração (retome com o mesmo --checkpoint): {e}")
+        return False
+    finally:
+        origem.dispose()
+
+    for nome, dados in relatorio.items():
+        logger.info(f"{nome}: {dados}")
+    return True
@@ -0,0 +1,370 @@
+"""
+Notificações por SMS: fila persistente e envio em lotes.
+
+enfileirar(db, destino, mensagem, chave) grava uma Notificacao na sessão do
+chamador (sem commit): o SMS só sai se a alteração que o gerou for
+confirmada, e a requisição não espera o provedor. Com `chave`, o mesmo aviso
+não é enfileirado de novo enquanto houver um pendente ou já enviado.
+
+NotificacaoDispatcher (iniciado no lifespan):
+- acorda logo após cada commit que enfileirou SMS e, fora isso, a cada
+  NOTIFICACOES_INTERVALO_SEGUNDOS;
+- reserva um lote de pendentes com um UPDATE (reservado_por + disponivel_em
+  no futuro), como o OutboxDispatcher. O lote é limitado ao que o provedor
+  aceita em metade de NOTIFICACOES_RESERVA_SEGUNDOS, para a reserva não
+  expirar durante o envio;
+- na reserva, SMS cuja chave já foi enviada (ou se repete no lote) ficam
+  "duplicada" sem chamar o provedor;
+- envia em ondas de até NOTIFICACOES_CONCORRENCIA chamadas simultâneas
+  (transporte síncrono no threadpool); cada chamada tira antes uma ficha do
+  balde do provedor (NOTIFICACOES_TAXA_POR_SEGUNDO), no armazém do limite de
+  taxa, que é compartilhado entre workers quando o Redis está configurado;
+- grava o resultado de cada onda em uma transação: erro temporário volta a
+  "pendente" com backoff exponencial até NOTIFICACOES_MAX_TENTATIVAS; recusa
+  do provedor fica "falhou" na hora; erro de configuração do transporte
+  (credenciais recusadas) volta a "pendente" sem gastar tentativa e pausa os
+  envios por NOTIFICACOES_BACKOFF_MAX_SEGUNDOS;
+- com o transporte desativado (sem provedor configurado), nada é reservado:
+  os SMS ficam pendentes;
+- apaga notificações concluídas há mais de NOTIFICACOES_RETENCAO_DIAS.
+"""
+
+import asyncio
+import re
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import anyio
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.limite_taxa import armazem
+from app.models.models import Notificacao
+from app.services.notificacao_transporte import (
+    ErroConfiguracaoTransporte, ErroPermanenteEnvio, TransporteDesativado, criar_transporte,
+)
+
+PENDENTE = "pendente"
+ENVIADA = "enviada"
+FALHOU = "falhou"
+DUPLICADA = "duplicada"
+
+
+def normalizar_telefone(telefone: Optional[str]) -> Optional[str]:
+    """Número no formato E.164 (+<país><número>) ou None se não parecer um telefone"""
+    if not telefone:
+        return None
+    digitos = re.sub(r"\D", "", telefone)
+    if telefone.strip().startswith("00"):
+        digitos = digitos[2:]
+    elif not telefone.strip().startswith("+") and len(digitos) <= 9:
+        digitos = settings.NOTIFICACOES_CODIGO_PAIS + digitos
+    if not 8 <= len(digitos) <= 15:
+        return None
+    return "+" + digitos
+
+
+def enfileirar(
+    db: Session,
+    destino: Optional[str],
+    mensagem: str,
+    chave: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+    consulta_id: Optional[int] = None,
+) -> Optional[Notificacao]:
+    """
+    Grava o SMS na transação corrente de `db` (sem commit). Retorna None se o
+    destino não é um telefone válido; com `chave` já enfileirada ou enviada,
+    retorna a notificação existente.
+    """
+    numero = normalizar_telefone(destino)
+    if numero is None:
+        return None
+    if chave:
+        existente = db.query(Notificacao).filter(
+            Notificacao.chave_dedup == chave, Notificacao.estado.in_([PENDENTE, ENVIADA])
+        ).first()
+        if existente is not None:
+            return existente
+    notificacao = Notificacao(
+        canal="sms",
+        destino=numero,
+        mensagem=mensagem,
+        chave_dedup=chave,
+        usuario_id=usuario_id,
+        consulta_id=consulta_id,
+        estado=PENDENTE,
+        disponivel_em=datetime.utcnow(),
+    )
+    db.add(notificacao)
+    db.info["notificacao_enfileirada"] = True
+    return notificacao
+
+
+class NotificacaoDispatcher:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._acordar: Optional[asyncio.Event] = None
+        self._limpeza_em = 0.0
+        self._pausado_ate = 0.0  # erro de configuração do transporte (monotonic)
+        self._transporte = None
+        self.enviadas = 0
+        self.falhas = 0
+        self.duplicadas = 0
+        self.ultimas_falhas: deque = deque(maxlen=20)
+
+    @property
+    def transporte(self):
+        if self._transporte is None:
+            self._transporte = criar_transporte()
+        return self._transporte
+
+    @transporte.setter
+    def transporte(self, transporte):
+        self._transporte = transporte
+        self._pausado_ate = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def tamanho_lote(self) -> int:
+        taxa = settings.NOTIFICACOES_TAXA_POR_SEGUNDO
+        if taxa <= 0:
+            return settings.NOTIFICACOES_LOTE
+        return max(1, min(settings.NOTIFICACOES_LOTE, int(taxa * settings.NOTIFICACOES_RESERVA_SEGUNDOS / 2)))
+
+    async def start(self):
+        if not self.running:
+            self._loop = asyncio.get_running_loop()
+            self._acordar = asyncio.Event()
+            self._task = asyncio.create_task(self._executar())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._loop = None
+
+    def acordar(self):
+        """Antecipa o próximo lote (chamado de qualquer thread após um commit com SMS)"""
+        loop, acordar = self._loop, self._acordar
+        if loop is None or acordar is None:
+            return
+        try:
+            loop.call_soon_threadsafe(acordar.set)
+        except RuntimeError:
+            pass  # loop já encerrado
+
+    async def _executar(self):
+        while True:
+            self._acordar.clear()
+            try:
+                quantidade = await self.processar_lote()
+                if time.monotonic() >= self._limpeza_em:
+                    await run_in_threadpool(self._limpar)
+                    self._limpeza_em = time.monotonic() + 3600
+            except Exception as e:
+                print(f"Erro no dispatcher de notificações: {e}")
+                quantidade = 0
+            if quantidade >= self.tamanho_lote:
+                continue  # ainda há pendentes
+            try:
+                await asyncio.wait_for(self._acordar.wait(), settings.NOTIFICACOES_INTERVALO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def processar_lote(self) -> int:
+        """Reserva e envia um lote; retorna o número de notificações reservadas"""
+        if isinstance(self.transporte, TransporteDesativado) or time.monotonic() < self._pausado_ate:
+            return 0
+        notificacoes, reservadas = await run_in_threadpool(self._reservar)
+        onda = max(1, settings.NOTIFICACOES_CONCORRENCIA)
+        for i in range(0, len(notificacoes), onda):
+            parte = notificacoes[i:i + onda]
+            if time.monotonic() < self._pausado_ate:
+                # Transporte indisponível no meio do lote: devolve o resto sem enviar
+                for notificacao in parte:
+                    notificacao.update(erro="Envios pausados (transporte indisponível)",
+                                       permanente=False, configuracao=True)
+            else:
+                await asyncio.gather(*(self._enviar(n) for n in parte))
+            await run_in_threadpool(self._concluir, parte)
+        return reservadas
+
+    async def _ficha(self):
+        """Espera uma ficha do balde do provedor (NOTIFICACOES_TAXA_POR_SEGUNDO)"""
+        taxa = settings.NOTIFICACOES_TAXA_POR_SEGUNDO
+        if taxa <= 0:
+            return
+        balde = [(f"notificacoes:{self.transporte.nome}", max(1.0, taxa), taxa)]
+        while True:
+            if armazem.bloqueante:
+                espera = await anyio.to_thread.run_sync(armazem.consumir, balde)
+            else:
+                espera = armazem.consumir(balde)
+            if not espera:
+                return
+            await asyncio.sleep(espera)
+
+    async def _enviar(self, notificacao: dict):
+        await self._ficha()
+        try:
+            notificacao["provedor_id"] = await run_in_threadpool(
+                self.transporte.enviar, notificacao["destino"], notificacao["mensagem"]
+            )
+            self.enviadas += 1
+        except Exception as e:
+            notificacao["erro"] = f"{type(e).__name__}: {e}"
+            notificacao["permanente"] = isinstance(e, ErroPermanenteEnvio)
+            notificacao["configuracao"] = isinstance(e, ErroConfiguracaoTransporte)
+            if notificacao["configuracao"] and time.monotonic() >= self._pausado_ate:
+                self._pausado_ate = time.monotonic() + settings.NOTIFICACOES_BACKOFF_MAX_SEGUNDOS
+                print(f"Aviso: transporte de SMS {self.transporte.nome} indisponível ({e}); "
+                      f"envios pausados por {settings.NOTIFICACOES_BACKOFF_MAX_SEGUNDOS}s")
+            self.falhas += 1
+            self.ultimas_falhas.append({
+                "notificacao_id": notificacao["id"], "destino": notificacao["destino"],
+                "erro": notificacao["erro"], "em": datetime.utcnow().isoformat(),
+            })
+
+    def _reservar(self):
+        """Reserva um lote; marca as duplicadas e retorna (a enviar, total reservado)"""
+        db = SessionLocal()
+        try:
+            agora = datetime.utcnow()
+            ids = [i for (i,) in (
+                db.query(Notificacao.id)
+                .filter(Notificacao.estado == PENDENTE, Notificacao.disponivel_em <= agora)
+                .order_by(Notificacao.id)
+                .limit(self.tamanho_lote)
+            )]
+            if not ids:
+                return [], 0
+            token = uuid.uuid4().hex
+            db.execute(
+                update(Notificacao)
+                .where(Notificacao.id.in_(ids), Notificacao.estado == PENDENTE, Notificacao.disponivel_em <= agora)
+                .values(reservado_por=token,
+                        disponivel_em=agora + timedelta(seconds=settings.NOTIFICACOES_RESERVA_SEGUNDOS))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            linhas = (
+                db.query(Notificacao.id, Notificacao.destino, Notificacao.mensagem,
+                         Notificacao.chave_dedup, Notificacao.tentativas)
+                .filter(Notificacao.reservado_por == token)
+                .order_by(Notificacao.id)
+                .all()
+            )
+            chaves = {linha.chave_dedup for linha in linhas if linha.chave_dedup}
+            vistas = set()
+            if chaves:
+                vistas = {c for (c,) in db.query(Notificacao.chave_dedup).filter(
+                    Notificacao.chave_dedup.in_(chaves), Notificacao.estado == ENVIADA
+                ).distinct()}
+            enviar, duplicadas = [], []
+            for linha in linhas:
+                if linha.chave_dedup and linha.chave_dedup in vistas:
+                    duplicadas.append(linha.id)
+                    continue
+                if linha.chave_dedup:
+                    vistas.add(linha.chave_dedup)
+                enviar.append({
+                    "id": linha.id, "destino": linha.destino, "mensagem": linha.mensagem,
+                    "tentativas": linha.tentativas, "token": token,
+                })
+            if duplicadas:
+                db.execute(
+                    update(Notificacao)
+                    .where(Notificacao.id.in_(duplicadas), Notificacao.reservado_por == token)
+                    .values(estado=DUPLICADA, reservado_por=None)
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+                self.duplicadas += len(duplicadas)
+            return enviar, len(linhas)
+        finally:
+            db.close()
+
+    def _concluir(self, notificacoes: List[dict]):
+        """Grava o resultado de uma onda em uma transação"""
+        agora = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            for notificacao in notificacoes:
+                valores = {"reservado_por": None}
+                if "erro" not in notificacao:
+                    valores.update(estado=ENVIADA, enviada_em=agora, provedor_id=notificacao["provedor_id"], erro=None)
+                elif notificacao["configuracao"]:
+                    # Problema do transporte: a mensagem não gasta tentativa
+                    espera = settings.NOTIFICACOES_BACKOFF_MAX_SEGUNDOS
+                    valores.update(estado=PENDENTE, erro=notificacao["erro"],
+                                   disponivel_em=agora + timedelta(seconds=espera))
+                else:
+                    tentativas = notificacao["tentativas"] + 1
+                    valores.update(tentativas=tentativas, erro=notificacao["erro"])
+                    if notificacao["permanente"] or tentativas >= settings.NOTIFICACOES_MAX_TENTATIVAS:
+                        valores["estado"] = FALHOU
+                    else:
+                        espera = min(2 ** tentativas, settings.NOTIFICACOES_BACKOFF_MAX_SEGUNDOS)
+                        valores.update(estado=PENDENTE, disponivel_em=agora + timedelta(seconds=espera))
+                db.execute(
+                    update(Notificacao)
+                    .where(Notificacao.id == notificacao["id"], Notificacao.reservado_por == notificacao["token"])
+                    .values(**valores)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def _limpar(self):
+        db = SessionLocal()
+        try:
+            limite = datetime.utcnow() - timedelta(days=settings.NOTIFICACOES_RETENCAO_DIAS)
+            db.query(Notificacao).filter(
+                Notificacao.estado != PENDENTE, Notificacao.created_at < limite
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def resumo(self, db: Session) -> dict:
+        """Notificações por estado, pendentes atrasadas e falhas recentes (admin)"""
+        por_estado = dict(db.query(Notificacao.estado, func.count(Notificacao.id)).group_by(Notificacao.estado).all())
+        mais_antiga = db.query(func.min(Notificacao.created_at)).filter(Notificacao.estado == PENDENTE).scalar()
+        return {
+            "rodando": self.running,
+            "transporte": self.transporte.nome,
+            "pausado": time.monotonic() < self._pausado_ate,
+            "por_estado": por_estado,
+            "pendente_mais_antiga": mais_antiga,
+            "enviadas": self.enviadas,
+            "falhas": self.falhas,
+            "duplicadas": self.duplicadas,
+            "ultimas_falhas": list(self.ultimas_falhas),
+        }
+
+
+notificacao_dispatcher = NotificacaoDispatcher()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _acordar_dispatcher(session):
+    if session.info.pop("notificacao_enfileirada", False):
+        notificacao_dispatcher.acordar()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_enfileiramento(session):
+    session.info.pop("notificacao_enfileirada", None)
@@ -0,0 +1,131 @@
+"""
+Transportes de SMS usados pelo NotificacaoDispatcher.
+
+Um transporte tem `nome` (chave do limite de taxa por provedor) e
+`enviar(destino, mensagem) -> id no provedor`, síncrono (roda no threadpool).
+Erros:
+- ErroPermanenteEnvio: o provedor recusou a mensagem (número inválido etc.);
+  não adianta tentar de novo;
+- ErroConfiguracaoTransporte: o problema é do transporte, não da mensagem
+  (credenciais recusadas, conta suspensa); as mensagens continuam pendentes,
+  sem gastar tentativas, e o dispatcher pausa os envios;
+- qualquer outra exceção é tratada como temporária (nova tentativa com backoff).
+
+NOTIFICACOES_TRANSPORTE escolhe o transporte: "twilio", "fake", "desativado"
+ou "auto" (Twilio quando as credenciais TWILIO_* estão configuradas; sem
+elas, desativado com um aviso no log: nada é enviado e os SMS ficam
+pendentes até o transporte ser configurado).
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import medir_externo
+
+
+class ErroPermanenteEnvio(Exception):
+    """O provedor recusou a mensagem; não será reenviada"""
+
+
+class ErroConfiguracaoTransporte(Exception):
+    """O transporte não está utilizável (credenciais, conta); a mensagem continua pendente"""
+
+
+class TransporteTwilio:
+    """API REST de mensagens da Twilio (uma requisição por SMS, sessão keep-alive)"""
+
+    nome = "twilio"
+
+    def __init__(self, account_sid: str, auth_token: str, remetente: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.remetente = remetente
+        self.url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self._session = None
+
+    @property
+    def session(self):
+        """Sessão HTTP criada no primeiro uso; `requests` só é importado aqui"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def enviar(self, destino: str, mensagem: str) -> str:
+        with medir_externo("twilio"):
+            resposta = self.session.post(
+                self.url,
+                data={"To": destino, "From": self.remetente, "Body": mensagem},
+                auth=(self.account_sid, self.auth_token),
+                timeout=15,
+            )
+        if resposta.status_code == 429 or resposta.status_code >= 500:
+            raise RuntimeError(f"Twilio indisponível ({resposta.status_code})")
+        if resposta.status_code >= 400:
+            try:
+                detalhe = resposta.json().get("message", "")
+            except ValueError:
+                detalhe = resposta.text[:200]
+            if resposta.status_code in (401, 403):
+                # Credenciais ou conta: vale para todas as mensagens
+                raise ErroConfiguracaoTransporte(f"Twilio recusou as credenciais ({resposta.status_code}): {detalhe}")
+            raise ErroPermanenteEnvio(f"Twilio recusou a mensagem ({resposta.status_code}): {detalhe}")
+        return resposta.json()["sid"]
+
+
+class TransporteFake:
+    """
+    Transporte local para desenvolvimento, testes e benchmark: guarda as
+    últimas mensagens em memória, com latência e falhas temporárias opcionais.
+    """
+
+    nome = "fake"
+
+    # Mensagens guardadas (as mais antigas são descartadas)
+    MAX_ENVIADAS = 1000
+
+    def __init__(self, latencia_segundos: float = 0.0, falhas: int = 0):
+        self.latencia_segundos = latencia_segundos
+        self.falhas = falhas  # próximas N chamadas levantam erro temporário
+        self.enviadas: Deque[Tuple[str, str, str]] = deque(maxlen=self.MAX_ENVIADAS)
+        self._lock = threading.Lock()
+
+    def enviar(self, destino: str, mensagem: str) -> str:
+        if self.latencia_segundos:
+            time.sleep(self.latencia_segundos)
+        with self._lock:
+            if self.falhas > 0:
+                self.falhas -= 1
+                raise RuntimeError("falha simulada do transporte fake")
+            if not destino.startswith("+"):
+                raise ErroPermanenteEnvio(f"Número inválido: {destino}")
+            identificador = f"FAKE{uuid.uuid4().hex[:16]}"
+            self.enviadas.append((identificador, destino, mensagem))
+        return identificador
+
+
+class TransporteDesativado:
+    """Sem provedor configurado: não envia nada (o dispatcher deixa os SMS pendentes)"""
+
+    nome = "desativado"
+
+    def enviar(self, destino: str, mensagem: str) -> str:
+        raise ErroConfiguracaoTransporte("Transporte de SMS desativado (NOTIFICACOES_TRANSPORTE/TWILIO_*)")
+
+
+def criar_transporte(nome: Optional[str] = None):
+    nome = nome or settings.NOTIFICACOES_TRANSPORTE
+    credenciais = settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_PHONE_NUMBER
+    if nome == "twilio" or (nome == "auto" and credenciais):
+        return TransporteTwilio(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER)
+    if nome == "fake":
+        return TransporteFake()
+    if nome == "auto":
+        print("Aviso: credenciais TWILIO_* ausentes; envio de SMS desativado (as notificações ficam pendentes)")
+    elif nome != "desativado":
+        print(f"Aviso: NOTIFICACOES_TRANSPORTE desconhecido ({nome!r}); envio de SMS desativado")
+    return TransporteDesativado()
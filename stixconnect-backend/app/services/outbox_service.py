@@ -0,0 +1,263 @@
+"""
+Transactional outbox e barramento de eventos em processo.
+
+publicar(db, tipo, payload) grava um EventoOutbox na sessão do chamador: o
+evento existe se e somente se a transação da alteração for confirmada, e a
+requisição paga apenas o INSERT. Os efeitos colaterais (push WebSocket,
+reunião Zoom...) ficam nos assinantes, registrados com @assinar(tipo, nome).
+
+OutboxDispatcher (iniciado no lifespan):
+- acorda logo após cada commit que publicou eventos e, fora isso, a cada
+  OUTBOX_INTERVALO_SEGUNDOS;
+- reserva um lote de até OUTBOX_LOTE eventos pendentes com um UPDATE
+  (reservado_por + disponivel_em no futuro), para que vários workers não
+  peguem os mesmos eventos; a reserva expira em OUTBOX_RESERVA_SEGUNDOS;
+- entrega os eventos do lote em paralelo entre agregados (até
+  OUTBOX_CONCORRENCIA) e em ordem de id dentro do mesmo agregado; assinantes
+  síncronos rodam no threadpool;
+- entrega ao menos uma vez: um evento só vira "processado" depois que todos
+  os assinantes retornaram. Quem falhou recebe de novo com backoff
+  exponencial (quem já recebeu fica em `entregues` e não é chamado outra vez);
+  depois de OUTBOX_MAX_TENTATIVAS o evento fica "falhou", com o erro gravado;
+- apaga eventos processados há mais de OUTBOX_RETENCAO_HORAS.
+
+Assinantes devem ser idempotentes (podem receber o mesmo evento de novo).
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import EventoOutbox
+
+PENDENTE = "pendente"
+PROCESSADO = "processado"
+FALHOU = "falhou"
+
+_assinantes: Dict[str, List[Tuple[str, Callable[[dict], Any]]]] = defaultdict(list)
+
+
+def assinar(tipo: str, nome: str):
+    """Registra a função (síncrona ou async) como assinante `nome` dos eventos `tipo`"""
+    def decorador(funcao):
+        _assinantes[tipo].append((nome, funcao))
+        return funcao
+    return decorador
+
+
+def publicar(db: Session, tipo: str, payload: dict, agregado_id: Optional[int] = None) -> EventoOutbox:
+    """Grava o evento na transação corrente de `db` (sem commit)"""
+    evento = EventoOutbox(
+        tipo=tipo,
+        agregado_id=agregado_id,
+        payload=json.dumps(payload, default=str),
+        estado=PENDENTE,
+        disponivel_em=datetime.utcnow(),
+    )
+    db.add(evento)
+    db.info["outbox_publicado"] = True
+    return evento
+
+
+class OutboxDispatcher:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._acordar: Optional[asyncio.Event] = None
+        self._limpeza_em = 0.0
+        self.entregas = 0
+        self.falhas = 0
+        self.ultimas_falhas: deque = deque(maxlen=20)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.running:
+            self._loop = asyncio.get_running_loop()
+            self._acordar = asyncio.Event()
+            self._task = asyncio.create_task(self._executar())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._loop = None
+
+    def acordar(self):
+        """Antecipa o próximo lote (chamado de qualquer thread após um commit com eventos)"""
+        loop, acordar = self._loop, self._acordar
+        if loop is None or acordar is None:
+            return
+        try:
+            loop.call_soon_threadsafe(acordar.set)
+        except RuntimeError:
+            pass  # loop já encerrado
+
+    async def _executar(self):
+        while True:
+            self._acordar.clear()
+            try:
+                quantidade = await self.processar_lote()
+                if time.monotonic() >= self._limpeza_em:
+                    await run_in_threadpool(self._limpar)
+                    self._limpeza_em = time.monotonic() + 600
+            except Exception as e:
+                print(f"Erro no dispatcher do outbox: {e}")
+                quantidade = 0
+            if quantidade >= settings.OUTBOX_LOTE:
+                continue  # ainda há pendentes
+            try:
+                await asyncio.wait_for(self._acordar.wait(), settings.OUTBOX_INTERVALO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def processar_lote(self) -> int:
+        """Reserva e entrega um lote; retorna o número de eventos reservados"""
+        eventos = await run_in_threadpool(self._reservar)
+        if not eventos:
+            return 0
+        por_agregado = defaultdict(list)
+        for evento in eventos:
+            por_agregado[(evento["tipo"].split(".")[0], evento["agregado_id"])].append(evento)
+        semaforo = asyncio.Semaphore(settings.OUTBOX_CONCORRENCIA)
+
+        async def entregar_em_ordem(lista: List[dict]):
+            async with semaforo:
+                for evento in lista:
+                    await self._entregar(evento)
+
+        await asyncio.gather(*(entregar_em_ordem(lista) for lista in por_agregado.values()))
+        await run_in_threadpool(self._concluir, eventos)
+        return len(eventos)
+
+    def _reservar(self) -> List[dict]:
+        db = SessionLocal()
+        try:
+            agora = datetime.utcnow()
+            ids = [i for (i,) in (
+                db.query(EventoOutbox.id)
+                .filter(EventoOutbox.estado == PENDENTE, EventoOutbox.disponivel_em <= agora)
+                .order_by(EventoOutbox.id)
+                .limit(settings.OUTBOX_LOTE)
+            )]
+            if not ids:
+                return []
+            token = uuid.uuid4().hex
+            db.execute(
+                update(EventoOutbox)
+                .where(EventoOutbox.id.in_(ids), EventoOutbox.estado == PENDENTE, EventoOutbox.disponivel_em <= agora)
+                .values(reservado_por=token, disponivel_em=agora + timedelta(seconds=settings.OUTBOX_RESERVA_SEGUNDOS))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            linhas = (
+                db.query(EventoOutbox.id, EventoOutbox.tipo, EventoOutbox.agregado_id, EventoOutbox.payload,
+                         EventoOutbox.entregues, EventoOutbox.tentativas)
+                .filter(EventoOutbox.reservado_por == token)
+                .order_by(EventoOutbox.id)
+                .all()
+            )
+            return [{
+                "id": linha.id, "tipo": linha.tipo, "agregado_id": linha.agregado_id,
+                "payload": json.loads(linha.payload), "entregues": set(json.loads(linha.entregues or "[]")),
+                "tentativas": linha.tentativas, "token": token, "falhas": {},
+            } for linha in linhas]
+        finally:
+            db.close()
+
+    async def _entregar(self, evento: dict):
+        for nome, funcao in list(_assinantes.get(evento["tipo"], [])):
+            if nome in evento["entregues"]:
+                continue
+            try:
+                if asyncio.iscoroutinefunction(funcao):
+                    await funcao(evento["payload"])
+                else:
+                    await run_in_threadpool(funcao, evento["payload"])
+                evento["entregues"].add(nome)
+                self.entregas += 1
+            except Exception as e:
+                evento["falhas"][nome] = f"{type(e).__name__}: {e}"
+                self.falhas += 1
+                self.ultimas_falhas.append({
+                    "evento_id": evento["id"], "tipo": evento["tipo"], "assinante": nome,
+                    "erro": evento["falhas"][nome], "em": datetime.utcnow().isoformat(),
+                })
+
+    def _concluir(self, eventos: List[dict]):
+        """Grava o resultado do lote em uma transação"""
+        agora = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            for evento in eventos:
+                valores = {"entregues": json.dumps(sorted(evento["entregues"])), "reservado_por": None}
+                if not evento["falhas"]:
+                    valores.update(estado=PROCESSADO, processado_em=agora, erro=None)
+                else:
+                    tentativas = evento["tentativas"] + 1
+                    valores.update(tentativas=tentativas, erro=json.dumps(evento["falhas"]))
+                    if tentativas >= settings.OUTBOX_MAX_TENTATIVAS:
+                        valores.update(estado=FALHOU, processado_em=agora)
+                    else:
+                        espera = min(2 ** tentativas, settings.OUTBOX_BACKOFF_MAX_SEGUNDOS)
+                        valores["disponivel_em"] = agora + timedelta(seconds=espera)
+                db.execute(
+                    update(EventoOutbox)
+                    .where(EventoOutbox.id == evento["id"], EventoOutbox.reservado_por == evento["token"])
+                    .values(**valores)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def _limpar(self):
+        db = SessionLocal()
+        try:
+            limite = datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENCAO_HORAS)
+            db.query(EventoOutbox).filter(
+                EventoOutbox.estado == PROCESSADO, EventoOutbox.processado_em < limite
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def resumo(self, db: Session) -> dict:
+        """Eventos por estado, pendentes atrasados e falhas recentes (admin)"""
+        por_estado = dict(db.query(EventoOutbox.estado, func.count(EventoOutbox.id)).group_by(EventoOutbox.estado).all())
+        mais_antigo = db.query(func.min(EventoOutbox.created_at)).filter(EventoOutbox.estado == PENDENTE).scalar()
+        return {
+            "rodando": self.running,
+            "por_estado": por_estado,
+            "pendente_mais_antigo": mais_antigo,
+            "entregas": self.entregas,
+            "falhas": self.falhas,
+            "ultimas_falhas": list(self.ultimas_falhas),
+        }
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _acordar_dispatcher(session):
+    if session.info.pop("outbox_publicado", False):
+        outbox_dispatcher.acordar()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_publicacao(session):
+    session.info.pop("outbox_publicado", None)
@@ -0,0 +1,259 @@
+"""
+Pipeline de miniaturas e pré-visualizações de exames.
+
+Após o upload, o blob é enfileirado (fila limitada) e processado em um pool
+de processos: imagens JPEG/PNG, primeira página de PDFs e DICOM (extração
+dos pixels) geram uma miniatura e uma pré-visualização JPEG, armazenadas
+ao lado do original. Bibliotecas: Pillow, pypdfium2 e pydicom.
+
+Blobs que ficaram PENDENTE (fila cheia, reinício do processo) são
+reenfileirados por uma varredura na inicialização e a cada
+PREVIEW_VARREDURA_SEGUNDOS.
+"""
+
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import ArquivoBlob, PreviewStatus
+from app.services.s3_service import BaseStorageService, get_storage_service
+
+IMAGE_TYPES = {"image/jpeg", "image/jpg", "image/png"}
+DICOM_TYPES = {"image/dicom", "application/dicom"}
+PDF_TYPES = {"application/pdf"}
+
+
+def _open_image(data: bytes, content_type: str, target_size: int):
+    """Converte o conteúdo em uma imagem PIL (None se o tipo não for suportado)"""
+    from PIL import Image
+
+    if content_type in IMAGE_TYPES:
+        return Image.open(io.BytesIO(data))
+
+    if content_type in PDF_TYPES:
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(data)
+        try:
+            page = pdf[0]
+            # Escala suficiente para a maior dimensão da pré-visualização
+            width, height = page.get_size()
+            scale = max(target_size / max(width, height), 0.1)
+            return page.render(scale=scale).to_pil()
+        finally:
+            pdf.close()
+
+    if content_type in DICOM_TYPES:
+        import numpy as np
+        import pydicom
+
+        ds = pydicom.dcmread(io.BytesIO(data))
+        pixels = ds.pixel_array
+        # Multi-frame: usa o primeiro quadro
+        if pixels.ndim == 3 and pixels.shape[-1] not in (3, 4):
+            pixels = pixels[0]
+        pixels = pixels.astype("float32")
+        low, high = float(pixels.min()), float(pixels.max())
+        if high > low:
+            pixels = (pixels - low) / (high - low) * 255.0
+        return Image.fromarray(np.clip(pixels, 0, 255).astype("uint8"))
+
+    return None
+
+
+def _to_jpeg(image, size: int) -> bytes:
+    image = image.copy()
+    image.thumbnail((size, size))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=80, optimize=True)
+    return out.getvalue()
+
+
+def render_derivatives(data: bytes, content_type: str, thumbnail_size: int, preview_size: int) -> Optional[Dict[str, bytes]]:
+    """
+    Gera miniatura e pré-visualização (executa no pool de processos).
+    Retorna None quando o tipo não é suportado ou a biblioteca não está instalada.
+    """
+    try:
+        image = _open_image(data, content_type, preview_size)
+    except ImportError:
+        return None
+    if image is None:
+        return None
+
+    image.load()
+    return {
+        "thumbnail": _to_jpeg(image, thumbnail_size),
+        "preview": _to_jpeg(image, preview_size),
+    }
+
+
+@dataclass
+class PreviewJob:
+    storage: BaseStorageService
+    blob_id: int
+    storage_key: str
+    content_type: str
+
+
+class PreviewPipeline:
+    """Fila limitada + consumidores assíncronos + pool de processos."""
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.workers = workers or settings.PREVIEW_WORKERS
+        self.queue_size = queue_size or settings.PREVIEW_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks = []
+        self._na_fila: Set[int] = set()  # blobs enfileirados ou em processamento
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._varrer_periodicamente()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._queue = None
+        self._na_fila.clear()
+
+    async def join(self):
+        """Aguarda o processamento de todos os jobs enfileirados"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def submit(self, storage: BaseStorageService, blob: ArquivoBlob) -> bool:
+        """
+        Enfileira a geração dos derivados de um blob.
+        Retorna False se o pipeline estiver parado ou a fila cheia
+        (o blob permanece PENDENTE e pode ser reprocessado depois).
+        """
+        if not self.running:
+            return False
+        if blob.id in self._na_fila:
+            return True
+        try:
+            self._queue.put_nowait(PreviewJob(storage, blob.id, blob.storage_key, blob.content_type))
+        except asyncio.QueueFull:
+            print(f"Fila de pré-visualizações cheia, blob {blob.id} ficará pendente")
+            return False
+        self._na_fila.add(blob.id)
+        return True
+
+    def _pendentes(self, limite: int, ignorar: Set[int]):
+        db = SessionLocal()
+        try:
+            consulta = db.query(ArquivoBlob).filter(ArquivoBlob.preview_status == PreviewStatus.PENDENTE)
+            if ignorar:
+                consulta = consulta.filter(ArquivoBlob.id.notin_(ignorar))
+            blobs = consulta.order_by(ArquivoBlob.id).limit(limite).all()
+            db.expunge_all()
+            return blobs
+        finally:
+            db.close()
+
+    async def varrer_pendentes(self) -> int:
+        """Reenfileira blobs PENDENTE que não estão na fila (até o espaço livre dela)"""
+        if not self.running:
+            return 0
+        livres = self._queue.maxsize - self._queue.qsize()
+        if livres <= 0:
+            return 0
+        blobs = await run_in_threadpool(self._pendentes, livres, set(self._na_fila))
+        storage = get_storage_service()
+        return sum(1 for blob in blobs if blob.id not in self._na_fila and self.submit(storage, blob))
+
+    async def _varrer_periodicamente(self):
+        while True:
+            try:
+                quantidade = await self.varrer_pendentes()
+                if quantidade:
+                    print(f"{quantidade} pré-visualizações pendentes reenfileiradas")
+            except Exception as e:
+                print(f"Erro na varredura de pré-visualizações pendentes: {e}")
+            await asyncio.sleep(settings.PREVIEW_VARREDURA_SEGUNDOS)
+
+    async def _consume(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                print(f"Erro ao gerar pré-visualização do blob {job.blob_id}: {e}")
+                await run_in_threadpool(self._save, job, PreviewStatus.FALHOU, None, None)
+            finally:
+                self._na_fila.discard(job.blob_id)
+                self._queue.task_done()
+
+    async def _process(self, job: PreviewJob):
+        data = await job.storage.read_file(job.storage_key)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self._executor,
+            render_derivatives,
+            data,
+            job.content_type,
+            settings.THUMBNAIL_SIZE,
+            settings.PREVIEW_SIZE,
+        )
+        if result is None:
+            await run_in_threadpool(self._save, job, PreviewStatus.NAO_SUPORTADO, None, None)
+            return
+
+        thumbnail_key = f"{job.storage_key}.thumb.jpg"
+        preview_key = f"{job.storage_key}.preview.jpg"
+        await asyncio.gather(
+            job.storage.upload_file(result["thumbnail"], "thumb.jpg", "image/jpeg", key=thumbnail_key),
+            job.storage.upload_file(result["preview"], "preview.jpg", "image/jpeg", key=preview_key),
+        )
+        saved = await run_in_threadpool(self._save, job, PreviewStatus.PRONTO, thumbnail_key, preview_key)
+        if not saved:
+            # Blob removido enquanto o job rodava
+            await job.storage.delete_files([thumbnail_key, preview_key])
+
+    def _save(self, job: PreviewJob, status: PreviewStatus,
+              thumbnail_key: Optional[str], preview_key: Optional[str]) -> bool:
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(ArquivoBlob)
+                .where(ArquivoBlob.id == job.blob_id)
+                .values(preview_status=status, thumbnail_key=thumbnail_key, preview_key=preview_key)
+            )
+            db.commit()
+            return result.rowcount > 0
+        finally:
+            db.close()
+
+
+_preview_pipeline: Optional[PreviewPipeline] = None
+
+
+def get_preview_pipeline() -> PreviewPipeline:
+    """Retorna instância singleton do PreviewPipeline"""
+    global _preview_pipeline
+    if _preview_pipeline is None:
+        _preview_pipeline = PreviewPipeline()
+    return _preview_pipeline
@@ -0,0 +1,94 @@
+"""
+Sketch de quantis mesclável (DDSketch).
+
+Valores positivos caem em buckets logarítmicos: o bucket i cobre
+(gamma^(i-1), gamma^i], com gamma = (1 + α) / (1 - α). Qualquer quantil é
+estimado com erro relativo de no máximo α, e dois sketches se combinam somando
+as contagens dos buckets. Assim os agregados por hora podem ser mesclados em
+qualquer intervalo sem voltar às linhas originais.
+"""
+
+import json
+import math
+from typing import Dict, Iterable, Optional
+
+# Erro relativo máximo dos quantis estimados
+ALPHA_PADRAO = 0.01
+
+
+class DDSketch:
+    def __init__(self, alpha: float = ALPHA_PADRAO):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0          # valores <= 0, estimados como 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, valor: float, quantidade: int = 1):
+        if valor > 0:
+            indice = math.ceil(math.log(valor) / self._log_gamma)
+            self.buckets[indice] = self.buckets.get(indice, 0) + quantidade
+        else:
+            self.zeros += quantidade
+        self.count += quantidade
+        self.sum += valor * quantidade
+        self.min = valor if self.min is None else min(self.min, valor)
+        self.max = valor if self.max is None else max(self.max, valor)
+
+    def merge(self, outro: "DDSketch"):
+        if outro.alpha != self.alpha:
+            raise ValueError("Sketches com precisões diferentes não podem ser mesclados")
+        for indice, quantidade in outro.buckets.items():
+            self.buckets[indice] = self.buckets.get(indice, 0) + quantidade
+        self.zeros += outro.zeros
+        self.count += outro.count
+        self.sum += outro.sum
+        if outro.min is not None:
+            self.min = outro.min if self.min is None else min(self.min, outro.min)
+            self.max = outro.max if self.max is None else max(self.max, outro.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantil q (0..1), com erro relativo <= alpha; None se vazio"""
+        if self.count == 0:
+            return None
+        posicao = q * (self.count - 1)
+        acumulado = self.zeros
+        if posicao < acumulado:
+            return 0.0
+        for indice in sorted(self.buckets):
+            acumulado += self.buckets[indice]
+            if posicao < acumulado:
+                estimativa = 2 * self.gamma ** indice / (self.gamma + 1)
+                return min(max(estimativa, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "a": self.alpha, "z": self.zeros,
+            "b": {str(i): n for i, n in self.buckets.items()},
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, dados: str, count: int, soma: float, minimo: Optional[float], maximo: Optional[float]) -> "DDSketch":
+        """Reconstrói o sketch; contagem, soma e extremos vêm das colunas do rollup"""
+        bruto = json.loads(dados)
+        sketch = cls(bruto["a"])
+        sketch.zeros = bruto["z"]
+        sketch.buckets = {int(i): n for i, n in bruto["b"].items()}
+        sketch.count, sketch.sum, sketch.min, sketch.max = count, soma, minimo, maximo
+        return sketch
+
+    @classmethod
+    def from_values(cls, valores: Iterable[float], alpha: float = ALPHA_PADRAO) -> "DDSketch":
+        sketch = cls(alpha)
+        for valor in valores:
+            sketch.add(valor)
+        return sketch
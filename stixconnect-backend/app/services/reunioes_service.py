@@ -0,0 +1,78 @@
+"""
+Provisionamento das reuniões Zoom das consultas, fora da requisição.
+
+As rotas chamam solicitar_reuniao na transação da própria alteração (publica
+"consulta.zoom_solicitada" no outbox); o assinante "zoom" cria a reunião,
+grava os campos zoom_* e publica "consulta.zoom_provisionada", que a sala
+WebSocket da consulta recebe. Reentregas não criam outra reunião: a gravação
+só acontece se a consulta ainda estiver sem reunião.
+
+As rotas não esperam a reunião: respondem com zoom_status "pendente" e o
+cliente recebe "zoom_ready" pela sala (ou consulta a consulta de novo).
+"""
+
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.models import Consulta
+from app.services.consulta_status_service import ESTADOS_FINAIS
+from app.services.outbox_service import assinar, publicar
+from app.services.zoom_service import zoom_service
+
+EVENTO_ZOOM_SOLICITADA = "consulta.zoom_solicitada"
+EVENTO_ZOOM_PROVISIONADA = "consulta.zoom_provisionada"
+
+
+def solicitar_reuniao(db: Session, consulta: Consulta, topic: str, medico_id: Optional[int] = None, nova: bool = False):
+    """
+    Agenda a criação da reunião (sem commit). Com `nova`, descarta a reunião
+    atual (ex.: encaminhamento para outro profissional).
+    """
+    if nova:
+        consulta.zoom_meeting_id = None
+        consulta.zoom_join_url = None
+        consulta.zoom_start_url = None
+        consulta.zoom_password = None
+    publicar(db, EVENTO_ZOOM_SOLICITADA, {
+        "consulta_id": consulta.id,
+        "topic": topic,
+        "medico_id": medico_id,
+    }, agregado_id=consulta.id)
+
+
+@assinar(EVENTO_ZOOM_SOLICITADA, "zoom")
+def provisionar_reuniao(payload: dict):
+    """Cria a reunião pedida, se ainda fizer sentido para a consulta"""
+    db = SessionLocal()
+    try:
+        consulta = db.get(Consulta, payload["consulta_id"])
+        if consulta is None or consulta.status in ESTADOS_FINAIS or consulta.zoom_meeting_id:
+            return  # arquivada, encerrada ou já provisionada (reentrega)
+        if payload.get("medico_id") is not None and consulta.medico_id != payload["medico_id"]:
+            return  # encaminhada de novo depois deste pedido
+
+        meeting = zoom_service.create_meeting(topic=payload["topic"], duration=60)
+        resultado = db.execute(
+            update(Consulta)
+            .where(Consulta.id == consulta.id, Consulta.zoom_meeting_id.is_(None))
+            .values(
+                zoom_meeting_id=meeting["meeting_id"],
+                zoom_join_url=meeting["join_url"],
+                zoom_start_url=meeting["start_url"],
+                zoom_password=meeting["password"],
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 1:
+            publicar(db, EVENTO_ZOOM_PROVISIONADA, {
+                "type": "zoom_ready",
+                "consulta_id": consulta.id,
+                "zoom_join_url": meeting["join_url"],
+                "zoom_password": meeting["password"],
+            }, agregado_id=consulta.id)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,344 @@
+"""
+Rollups horários de tempo de espera e duração das consultas.
+
+Um job periódico agrega as consultas encerradas (data_fim preenchida) em
+buckets de uma hora por role do profissional e urgência, gravando em
+consulta_rollups_horarios a contagem, soma, extremos e um DDSketch de cada
+métrica. Dias completos recebem também um rollup diário, obtido mesclando os
+horários. Cada execução recalcula por completo as horas fechadas desde o
+último rollup (menos ROLLUP_REPROCESSAR_HORAS, para absorver atualizações
+tardias), então o job é idempotente e pode rodar em vários workers.
+
+As consultas por intervalo mesclam os sketches dos rollups diários (dias
+completos) e horários (pontas do intervalo); as linhas de consultas não são
+lidas.
+
+O reprocessamento pedido pelo admin (POST /admin/analytics/rollup) roda em
+segundo plano, um por vez; o job periódico e o reprocessamento não rodam ao
+mesmo tempo no mesmo processo.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Consulta, ConsultaArquivada, ConsultaRollupHorario, ConsultaStatus, User
+from app.services.quantile_sketch import DDSketch
+
+METRICAS = ("espera", "duracao")
+QUANTIS = (0.5, 0.9, 0.95, 0.99)
+
+GRANULARIDADE_HORA = "hora"
+GRANULARIDADE_DIA = "dia"
+
+SEM_PROFISSIONAL = "nenhum"
+SEM_URGENCIA = "nenhuma"
+
+
+def utc_naive(momento: datetime) -> datetime:
+    """As colunas DateTime guardam UTC sem fuso"""
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento
+
+
+def truncar_hora(momento: datetime) -> datetime:
+    return utc_naive(momento).replace(minute=0, second=0, microsecond=0)
+
+
+def truncar_dia(momento: datetime) -> datetime:
+    return utc_naive(momento).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _medidas(created_at, data_inicio, data_fim, duracao_minutos, status) -> Dict[str, float]:
+    """Segundos de espera (criação -> início) e de duração (só finalizadas)"""
+    medidas = {}
+    if created_at and data_inicio:
+        medidas["espera"] = (data_inicio - created_at).total_seconds()
+    if status == ConsultaStatus.FINALIZADA:
+        if duracao_minutos is not None:
+            medidas["duracao"] = duracao_minutos * 60.0
+        elif data_inicio and data_fim:
+            medidas["duracao"] = (data_fim - data_inicio).total_seconds()
+    return medidas
+
+
+class RollupService:
+    # ---- agregação ----
+
+    def _agregar(self, db: Session, inicio: datetime, fim: datetime) -> Dict[Tuple, DDSketch]:
+        """Sketches horários a partir das consultas (e do arquivo) encerradas em [inicio, fim)"""
+        medico = aliased(User)
+        sketches: Dict[Tuple, DDSketch] = defaultdict(DDSketch)
+        for modelo in (Consulta, ConsultaArquivada):
+            rows = (
+                db.query(
+                    modelo.created_at, modelo.data_inicio, modelo.data_fim, modelo.duracao_minutos,
+                    modelo.status, modelo.classificacao_urgencia, modelo.enfermeira_id, medico.role,
+                )
+                .outerjoin(medico, medico.id == modelo.medico_id)
+                .filter(modelo.data_fim >= inicio, modelo.data_fim < fim)
+                .yield_per(10000)
+            )
+            for created_at, data_inicio, data_fim, duracao, status, urgencia, enfermeira_id, role in rows:
+                if role is not None:
+                    role = role.value
+                else:
+                    role = "nurse" if enfermeira_id else SEM_PROFISSIONAL
+                urgencia = urgencia.value if urgencia else SEM_URGENCIA
+                hora = truncar_hora(data_fim)
+                for metrica, valor in _medidas(created_at, data_inicio, data_fim, duracao, status).items():
+                    sketches[(hora, role, urgencia, metrica)].add(valor)
+        return sketches
+
+    def _mesclar_dias(self, db: Session, inicio: datetime, fim: datetime) -> Dict[Tuple, DDSketch]:
+        """Sketches diários mesclando os horários dos dias em [inicio, fim)"""
+        sketches: Dict[Tuple, DDSketch] = defaultdict(DDSketch)
+        for row in self._rollups(db, GRANULARIDADE_HORA, inicio, fim):
+            sketches[(truncar_dia(row.hora), row.role, row.urgencia, row.metrica)].merge(_sketch(row))
+        return sketches
+
+    def _gravar(self, db: Session, granularidade: str, inicio: datetime, fim: datetime, sketches: Dict[Tuple, DDSketch]):
+        r = ConsultaRollupHorario
+        db.query(r).filter(
+            r.granularidade == granularidade, r.hora >= inicio, r.hora < fim
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(r, [
+            {
+                "granularidade": granularidade, "hora": hora, "role": role, "urgencia": urgencia, "metrica": metrica,
+                "quantidade": sketch.count, "soma": sketch.sum,
+                "minimo": sketch.min, "maximo": sketch.max, "sketch": sketch.to_json(),
+            }
+            for (hora, role, urgencia, metrica), sketch in sketches.items()
+        ])
+
+    def recalcular(self, db: Session, inicio: datetime, fim: datetime) -> int:
+        """
+        Substitui os rollups horários de [inicio, fim) e os diários dos dias
+        completos nesse intervalo; retorna os buckets horários gravados.
+        """
+        sketches = self._agregar(db, inicio, fim)
+        self._gravar(db, GRANULARIDADE_HORA, inicio, fim, sketches)
+        db.flush()
+        dia_inicio = truncar_dia(inicio)
+        dia_fim = truncar_dia(fim)
+        if dia_inicio < dia_fim:
+            self._gravar(db, GRANULARIDADE_DIA, dia_inicio, dia_fim, self._mesclar_dias(db, dia_inicio, dia_fim))
+        db.commit()
+        return len(sketches)
+
+    def executar(self, db: Session, desde: Optional[datetime] = None, ate: Optional[datetime] = None) -> dict:
+        """
+        Agrega as horas fechadas pendentes (ou [desde, ate) para reprocessar),
+        em transações de até um dia.
+        """
+        fim = truncar_hora(ate or datetime.utcnow())
+        if desde is not None:
+            inicio = truncar_hora(desde)
+        else:
+            ultima = db.query(func.max(ConsultaRollupHorario.hora)).filter(
+                ConsultaRollupHorario.granularidade == GRANULARIDADE_HORA
+            ).scalar()
+            if ultima is not None:
+                inicio = ultima + timedelta(hours=1) - timedelta(hours=settings.ROLLUP_REPROCESSAR_HORAS)
+            else:
+                datas = [db.query(func.min(m.data_fim)).scalar() for m in (Consulta, ConsultaArquivada)]
+                primeira = min((d for d in datas if d is not None), default=None)
+                if primeira is None:
+                    return {"horas": 0, "buckets": 0}
+                inicio = truncar_hora(primeira)
+
+        horas = buckets = 0
+        while inicio < fim:
+            # Lotes alinhados ao dia: cada transação fecha o rollup diário do dia anterior
+            lote_fim = min(truncar_dia(inicio) + timedelta(days=1), fim)
+            buckets += self.recalcular(db, inicio, lote_fim)
+            horas += int((lote_fim - inicio).total_seconds() // 3600)
+            inicio = lote_fim
+        return {"horas": horas, "buckets": buckets}
+
+    # ---- consultas por intervalo ----
+
+    def _rollups(self, db: Session, granularidade: str, inicio: datetime, fim: datetime,
+                 role: Optional[str] = None, urgencia: Optional[str] = None):
+        r = ConsultaRollupHorario
+        query = db.query(
+            r.hora, r.role, r.urgencia, r.metrica, r.quantidade, r.soma, r.minimo, r.maximo, r.sketch,
+        ).filter(r.granularidade == granularidade, r.hora >= inicio, r.hora < fim)
+        if role:
+            query = query.filter(r.role == role)
+        if urgencia:
+            query = query.filter(r.urgencia == urgencia)
+        return query.yield_per(5000)
+
+    def consultar(
+        self,
+        db: Session,
+        inicio: datetime,
+        fim: datetime,
+        agrupar: str = "total",
+        role: Optional[str] = None,
+        urgencia: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Quantis de espera e duração (minutos) em [inicio, fim), mesclando os
+        rollups: diários para os dias completos e horários para as pontas.
+        agrupar: "total", "hora", "dia", "role" ou "urgencia".
+        """
+        inicio, fim = truncar_hora(inicio), utc_naive(fim)
+        intervalos = [(GRANULARIDADE_HORA, inicio, fim)]
+        if agrupar != "hora":
+            dia_inicio = truncar_dia(inicio + timedelta(days=1) - timedelta(microseconds=1))
+            ultimo_dia = db.query(func.max(ConsultaRollupHorario.hora)).filter(
+                ConsultaRollupHorario.granularidade == GRANULARIDADE_DIA
+            ).scalar()
+            dia_fim = min(truncar_dia(fim), ultimo_dia + timedelta(days=1)) if ultimo_dia else dia_inicio
+            if dia_inicio < dia_fim:
+                intervalos = [
+                    (GRANULARIDADE_HORA, inicio, dia_inicio),
+                    (GRANULARIDADE_DIA, dia_inicio, dia_fim),
+                    (GRANULARIDADE_HORA, dia_fim, fim),
+                ]
+
+        chave = _CHAVES[agrupar]
+        grupos: Dict[str, Dict[str, DDSketch]] = defaultdict(lambda: {m: DDSketch() for m in METRICAS})
+        for granularidade, de, ate in intervalos:
+            if de >= ate:
+                continue
+            for row in self._rollups(db, granularidade, de, ate, role, urgencia):
+                grupos[chave(row)][row.metrica].merge(_sketch(row))
+
+        return [
+            {"grupo": grupo, **{metrica: _resumo(sketch) for metrica, sketch in metricas.items()}}
+            for grupo, metricas in sorted(grupos.items())
+        ]
+
+
+def _sketch(row) -> DDSketch:
+    return DDSketch.from_json(row.sketch, row.quantidade, row.soma, row.minimo, row.maximo)
+
+
+_CHAVES: Dict[str, Callable[[ConsultaRollupHorario], str]] = {
+    "total": lambda r: "total",
+    "hora": lambda r: r.hora.isoformat(),
+    "dia": lambda r: r.hora.date().isoformat(),
+    "role": lambda r: r.role,
+    "urgencia": lambda r: r.urgencia,
+}
+
+
+def _minutos(segundos: Optional[float]) -> Optional[float]:
+    return round(segundos / 60, 1) if segundos is not None else None
+
+
+def _resumo(sketch: DDSketch) -> dict:
+    return {
+        "quantidade": sketch.count,
+        "media_minutos": _minutos(sketch.mean),
+        **{f"p{int(q * 100)}_minutos": _minutos(sketch.quantile(q)) for q in QUANTIS},
+        "max_minutos": _minutos(sketch.max),
+    }
+
+
+rollup_service = RollupService()
+
+
+class RollupEmExecucaoError(Exception):
+    """Já existe um reprocessamento em andamento neste processo"""
+
+
+class RollupScheduler:
+    """
+    Executa o job de rollup a cada ROLLUP_INTERVALO_SEGUNDOS (iniciado no
+    lifespan) e os reprocessamentos pedidos pelo admin, em segundo plano.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._reprocessamento: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()  # job periódico x reprocessamento
+        self.ultimo_reprocessamento: Optional[dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._reprocessamento is not None:
+            self._reprocessamento.cancel()
+            await asyncio.gather(self._reprocessamento, return_exceptions=True)
+            self._reprocessamento = None
+
+    def _executar(self):
+        db = SessionLocal()
+        try:
+            with self._lock:
+                rollup_service.executar(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Erro no job de rollup de consultas: {e}")
+        finally:
+            db.close()
+
+    def reprocessar(self, desde: Optional[datetime] = None) -> dict:
+        """
+        Agenda o reprocessamento a partir de `desde` (ou das horas pendentes)
+        em segundo plano; levanta RollupEmExecucaoError se já houver um.
+        """
+        if self._reprocessamento is not None and not self._reprocessamento.done():
+            raise RollupEmExecucaoError("Já existe um reprocessamento de rollups em andamento")
+        self.ultimo_reprocessamento = {
+            "estado": "executando",
+            "desde": desde,
+            "iniciado_em": datetime.utcnow(),
+            "concluido_em": None,
+            "resultado": None,
+            "erro": None,
+        }
+        self._reprocessamento = asyncio.create_task(self._reprocessar(self.ultimo_reprocessamento))
+        return self.ultimo_reprocessamento
+
+    async def _reprocessar(self, registro: dict):
+        def executar():
+            db = SessionLocal()
+            try:
+                with self._lock:
+                    return rollup_service.executar(db, desde=registro["desde"])
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        try:
+            registro["resultado"] = await run_in_threadpool(executar)
+            registro["estado"] = "concluido"
+        except Exception as e:
+            print(f"Erro no reprocessamento de rollups: {e}")
+            registro.update(estado="falhou", erro=str(e))
+        finally:
+            registro["concluido_em"] = datetime.utcnow()
+
+    async def _loop(self):
+        while True:
+            await run_in_threadpool(self._executar)
+            await asyncio.sleep(settings.ROLLUP_INTERVALO_SEGUNDOS)
+
+
+rollup_scheduler = RollupScheduler()
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.models.models import User, UserRole, AvailabilityStatus, Consulta, ConsultaStatus
+from app.services.consulta_status_service import consulta_status_service
 
 
 class RoutingService:
@@ -60,17 +61,13 @@ class RoutingService:
         nurse: User,
     ) -> Consulta:
         """
-        Atribui consulta a um enfermeiro, incrementando contador de pacientes.
+        Atribui consulta a um enfermeiro, incrementando contador de pacientes
+        (transição AGUARDANDO -> EM_TRIAGEM).
         """
-        consulta.enfermeira_id = nurse.id
-        consulta.status = ConsultaStatus.EM_TRIAGEM
-        nurse.pacientes_atuais = (nurse.pacientes_atuais or 0) + 1
-
-        db.add(consulta)
-        db.add(nurse)
-        db.commit()
+        consulta_status_service.transicionar(
+            db, consulta, ConsultaStatus.EM_TRIAGEM, valores={"enfermeira_id": nurse.id}
+        )
         db.refresh(consulta)
-
         return consulta
 
     def transfer_to_professional(
@@ -82,19 +79,15 @@ class RoutingService:
         """
         Transfere consulta para profissional (médico, fisioterapeuta, etc.).
         Usa o campo medico_id para armazenar o ID de qualquer profissional.
+        A transição (EM_TRIAGEM -> AGUARDANDO_MEDICO) libera a carga da
+        enfermeira e ocupa o profissional; a transação fica com o chamador.
         """
-        consulta.medico_id = professional.id
-        consulta.status = ConsultaStatus.AGUARDANDO_MEDICO
-        
-        # Incrementar contador de pacientes do profissional
-        professional.pacientes_atuais = (professional.pacientes_atuais or 0) + 1
-
-        db.add(consulta)
-        db.add(professional)
-        db.commit()
-        db.refresh(consulta)
-
-        return consulta
+        return consulta_status_service.transicionar(
+            db, consulta, ConsultaStatus.AGUARDANDO_MEDICO,
+            usuario_id=consulta.enfermeira_id,
+            valores={"medico_id": professional.id},
+            commit=False,
+        )
 
 
 routing_service = RoutingService()
@@ -1,137 +1,442 @@
 """
-Serviço de integração com AWS S3 para upload de arquivos
+Serviço de armazenamento de arquivos (AWS S3, disco local ou memória)
+
+Todas as implementações expõem a mesma interface assíncrona. As chamadas
+bloqueantes (boto3 e I/O de disco) são executadas em um pool de threads
+dedicado e limitado, para não travar o event loop. O boto3 só é importado
+quando o cliente S3 é usado pela primeira vez.
 """
 
-import boto3
-from botocore.exceptions import NoCredentialsError, ClientError
-from typing import Optional, Tuple
+import asyncio
+import os
+import threading
 import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
 from app.core.config import settings
+from app.core.metrics import medir_externo
 
 
-class S3Service:
-    """Serviço para gerenciar uploads no AWS S3"""
-    
-    def __init__(self):
-        self.bucket = settings.AWS_S3_BUCKET
-        self.region = settings.AWS_REGION
-        self.s3_client = None
-        
-        # Inicializar cliente S3 se credenciais disponíveis
-        if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
-            try:
-                self.s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                    region_name=self.region
-                )
-            except Exception as e:
-                print(f"Erro ao inicializar cliente S3: {e}")
-                self.s3_client = None
-    
+# Limite da API DeleteObjects do S3
+S3_DELETE_BATCH_SIZE = 1000
+
+# Prefixo das chaves endereçadas por conteúdo (imutáveis)
+CONTENT_KEY_PREFIX = "blobs/sha256/"
+
+
+class StorageError(Exception):
+    """Erro ao acessar o armazenamento de arquivos"""
+
+
+def _erros_boto():
+    """
+    Erros do boto3 a converter em StorageError: ClientError (resposta de erro
+    do S3) e BotoCoreError (rede, endpoint inacessível, credenciais, timeout).
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+    return ClientError, BotoCoreError
+
+
+class BaseStorageService(ABC):
+    """Interface comum dos backends de armazenamento"""
+
+    backend_name = "base"
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.STORAGE_MAX_CONCURRENCY
+        self._executor: Optional[ThreadPoolExecutor] = None
+
     def is_configured(self) -> bool:
-        """Verifica se o S3 está configurado"""
-        return self.s3_client is not None
-    
+        return True
+
     def generate_key(self, patient_id: Optional[int], filename: str) -> str:
-        """Gera chave única para o arquivo no S3"""
+        """Gera chave única para o arquivo"""
         now = datetime.utcnow()
         unique_id = str(uuid.uuid4())[:8]
-        
+
         # Sanitizar nome do arquivo
         safe_filename = "".join(c for c in filename if c.isalnum() or c in '.-_')
-        
+
         if patient_id:
             return f"patients/{patient_id}/{now.year}/{now.month:02d}/{unique_id}_{safe_filename}"
         else:
             return f"uploads/{now.year}/{now.month:02d}/{unique_id}_{safe_filename}"
-    
+
+    def content_key(self, sha256: str) -> str:
+        """Chave endereçada por conteúdo (mesmo SHA-256 => mesma chave)"""
+        return f"{CONTENT_KEY_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    @staticmethod
+    def is_immutable(key: str) -> bool:
+        """Chaves endereçadas por conteúdo (e seus derivados) nunca mudam"""
+        return key.startswith(CONTENT_KEY_PREFIX)
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        """URL de acesso a um arquivo já armazenado"""
+
+    async def _run(self, func, *args, **kwargs):
+        """Executa uma chamada bloqueante no pool limitado do serviço"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix=f"storage-{self.backend_name}",
+            )
+        loop = asyncio.get_running_loop()
+        with medir_externo(f"storage_{self.backend_name}"):
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    @abstractmethod
     async def upload_file(
         self,
         file_data: bytes,
         filename: str,
         content_type: str,
-        patient_id: Optional[int] = None
+        patient_id: Optional[int] = None,
+        key: Optional[str] = None,
     ) -> Tuple[str, str]:
         """
-        Faz upload de arquivo para S3
-        
+        Faz upload de um arquivo
+
         Returns:
-            (url, key) - URL pública e chave S3 do arquivo
+            (url, key) - URL de acesso e chave do arquivo
+        """
+
+    @abstractmethod
+    async def read_file(self, key: str) -> bytes:
+        """Lê o conteúdo completo de um arquivo"""
+
+    @abstractmethod
+    async def delete_file(self, key: str) -> bool:
+        """Remove um arquivo; False se ele não existia"""
+
+    async def delete_files(self, keys: Iterable[str]) -> int:
+        """Remove vários arquivos e retorna quantos foram removidos"""
+        results = await asyncio.gather(*(self.delete_file(k) for k in set(keys)))
+        return sum(1 for r in results if r)
+
+    @abstractmethod
+    async def get_presigned_url(self, key: str, expiration: int = 3600) -> str:
+        """URL temporária de download"""
+
+    @abstractmethod
+    async def file_exists(self, key: str) -> bool:
+        """Verifica se um arquivo existe"""
+
+    def close(self):
+        """Libera o pool de threads do serviço"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class S3Service(BaseStorageService):
+    """Serviço para gerenciar uploads no AWS S3"""
+
+    backend_name = "s3"
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        super().__init__(max_concurrency)
+        self.bucket = settings.AWS_S3_BUCKET
+        self.region = settings.AWS_REGION
+        self._s3_client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def s3_client(self):
+        """
+        Cliente compartilhado (boto3 clients são thread-safe), criado no
+        primeiro uso; o pool de conexões acompanha o limite de concorrência.
         """
-        if not self.is_configured():
-            raise Exception("S3 não configurado. Configure AWS_ACCESS_KEY_ID e AWS_SECRET_ACCESS_KEY.")
-        
-        key = self.generate_key(patient_id, filename)
-        
+        if self._s3_client is None and self.is_configured():
+            with self._client_lock:
+                if self._s3_client is None:
+                    import boto3
+                    from botocore.config import Config
+
+                    try:
+                        self._s3_client = boto3.client(
+                            's3',
+                            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                            region_name=self.region,
+                            config=Config(max_pool_connections=self.max_concurrency),
+                        )
+                    except Exception as e:
+                        print(f"Erro ao inicializar cliente S3: {e}")
+        return self._s3_client
+
+    def is_configured(self) -> bool:
+        """Verifica se o S3 está configurado (credenciais presentes)"""
+        return bool(settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY)
+
+    def _require_client(self):
+        if self.s3_client is None:
+            raise StorageError("S3 não configurado. Configure AWS_ACCESS_KEY_ID e AWS_SECRET_ACCESS_KEY.")
+
+    async def upload_file(
+        self,
+        file_data: bytes,
+        filename: str,
+        content_type: str,
+        patient_id: Optional[int] = None,
+        key: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        self._require_client()
+        key = key or self.generate_key(patient_id, filename)
+
         try:
-            self.s3_client.put_object(
+            await self._run(
+                self.s3_client.put_object,
                 Bucket=self.bucket,
                 Key=key,
                 Body=file_data,
                 ContentType=content_type,
                 ACL='private'  # Arquivos privados por padrão
             )
-            
-            # Gerar URL pública (ou presigned URL para privados)
-            url = f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
-            
-            return url, key
-        
-        except ClientError as e:
-            raise Exception(f"Erro ao fazer upload para S3: {str(e)}")
-    
+        except _erros_boto() as e:
+            raise StorageError(f"Erro ao fazer upload para S3: {str(e)}")
+
+        return self.url_for(key), key
+
+    def url_for(self, key: str) -> str:
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+
+    def _get_object_body(self, key: str) -> bytes:
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        return response["Body"].read()
+
+    async def read_file(self, key: str) -> bytes:
+        self._require_client()
+        try:
+            return await self._run(self._get_object_body, key)
+        except _erros_boto() as e:
+            raise StorageError(f"Erro ao ler arquivo do S3: {str(e)}")
+
     async def delete_file(self, key: str) -> bool:
         """Deleta um arquivo do S3"""
-        if not self.is_configured():
+        if self.s3_client is None:
             return False
-        
+        from botocore.exceptions import BotoCoreError, ClientError
+
         try:
-            self.s3_client.delete_object(Bucket=self.bucket, Key=key)
+            await self._run(self.s3_client.delete_object, Bucket=self.bucket, Key=key)
             return True
         except ClientError:
             return False
-    
+        except BotoCoreError as e:
+            raise StorageError(f"Erro ao deletar arquivo do S3: {str(e)}")
+
+    def _delete_batch(self, keys: List[str]) -> int:
+        response = self.s3_client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+        )
+        return len(keys) - len(response.get("Errors", []))
+
+    async def delete_files(self, keys: Iterable[str]) -> int:
+        """Deleta arquivos em lotes de até 1000 chaves por requisição"""
+        if self.s3_client is None:
+            return 0
+
+        keys = sorted(set(keys))
+        batches = [keys[i:i + S3_DELETE_BATCH_SIZE] for i in range(0, len(keys), S3_DELETE_BATCH_SIZE)]
+        try:
+            results = await asyncio.gather(*(self._run(self._delete_batch, b) for b in batches))
+        except _erros_boto() as e:
+            raise StorageError(f"Erro ao deletar arquivos do S3: {str(e)}")
+        return sum(results)
+
     async def get_presigned_url(self, key: str, expiration: int = 3600) -> str:
         """
         Gera URL pré-assinada para download temporário
-        
+
         Args:
             key: Chave do arquivo no S3
             expiration: Tempo de expiração em segundos (padrão: 1 hora)
-        
+
         Returns:
             URL pré-assinada
         """
-        if not self.is_configured():
-            raise Exception("S3 não configurado")
-        
+        self._require_client()
+
         try:
-            url = self.s3_client.generate_presigned_url(
+            return await self._run(
+                self.s3_client.generate_presigned_url,
                 'get_object',
                 Params={'Bucket': self.bucket, 'Key': key},
                 ExpiresIn=expiration
             )
-            return url
-        except ClientError as e:
-            raise Exception(f"Erro ao gerar URL pré-assinada: {str(e)}")
-    
+        except _erros_boto() as e:
+            raise StorageError(f"Erro ao gerar URL pré-assinada: {str(e)}")
+
     async def file_exists(self, key: str) -> bool:
         """Verifica se um arquivo existe no S3"""
-        if not self.is_configured():
+        if self.s3_client is None:
             return False
-        
+        from botocore.exceptions import BotoCoreError, ClientError
+
         try:
-            self.s3_client.head_object(Bucket=self.bucket, Key=key)
+            await self._run(self.s3_client.head_object, Bucket=self.bucket, Key=key)
             return True
         except ClientError:
             return False
+        except BotoCoreError as e:
+            # Sem resposta do S3 não dá para afirmar que o arquivo não existe
+            raise StorageError(f"Erro ao consultar arquivo no S3: {str(e)}")
+
+
+class LocalStorageService(BaseStorageService):
+    """Armazenamento em disco local (desenvolvimento / on-premise)"""
+
+    backend_name = "local"
+
+    def __init__(self, base_dir: Optional[str] = None, url_prefix: str = "/uploads",
+                 max_concurrency: Optional[int] = None):
+        super().__init__(max_concurrency)
+        self.base_dir = base_dir or settings.UPLOAD_DIR
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def path_for(self, key: str) -> str:
+        """
+        Caminho do arquivo no disco. A chave vira uma hierarquia de diretórios
+        (chaves de conteúdo já vêm fragmentadas em blobs/sha256/aa/bb/),
+        evitando um único diretório com todos os arquivos.
+        """
+        parts = [p for p in key.split("/") if p]
+        if not parts or any(p in (".", "..") or "\\" in p for p in parts):
+            raise StorageError(f"Chave de arquivo inválida: {key}")
+        return os.path.join(self.base_dir, *parts)
+
+    def legacy_path_for(self, key: str) -> str:
+        """Caminho no layout antigo (plano, com '/' trocado por '_')"""
+        return os.path.join(self.base_dir, key.replace("/", "_"))
+
+    def resolve(self, key: str) -> Optional[str]:
+        """Caminho existente para a chave (layout fragmentado ou legado)"""
+        try:
+            path = self.path_for(key)
+        except StorageError:
+            return None
+        if os.path.isfile(path):
+            return path
+        legacy = self.legacy_path_for(key)
+        if "/" not in key.strip("/") or not os.path.isfile(legacy):
+            return None
+        return legacy
 
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
 
-# Instância singleton
+    def _write(self, key: str, file_data: bytes):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escrita atômica: o arquivo só aparece completo
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(file_data)
+        os.replace(tmp_path, path)
+
+    def _read(self, key: str) -> bytes:
+        path = self.resolve(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _remove(self, key: str) -> bool:
+        path = self.resolve(key)
+        if path is None:
+            return False
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def upload_file(
+        self,
+        file_data: bytes,
+        filename: str,
+        content_type: str,
+        patient_id: Optional[int] = None,
+        key: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        key = key or self.generate_key(patient_id, filename)
+        try:
+            await self._run(self._write, key, file_data)
+        except OSError as e:
+            raise StorageError(f"Erro ao salvar arquivo localmente: {str(e)}")
+        return self.url_for(key), key
+
+    async def read_file(self, key: str) -> bytes:
+        try:
+            return await self._run(self._read, key)
+        except OSError as e:
+            raise StorageError(f"Erro ao ler arquivo local: {str(e)}")
+
+    async def delete_file(self, key: str) -> bool:
+        return await self._run(self._remove, key)
+
+    async def delete_files(self, keys: Iterable[str]) -> int:
+        def remove_all(batch: List[str]) -> int:
+            return sum(1 for k in batch if self._remove(k))
+        return await self._run(remove_all, sorted(set(keys)))
+
+    async def get_presigned_url(self, key: str, expiration: int = 3600) -> str:
+        return self.url_for(key)
+
+    async def file_exists(self, key: str) -> bool:
+        return await self._run(self.resolve, key) is not None
+
+
+class InMemoryStorageService(BaseStorageService):
+    """Armazenamento em memória, para testes"""
+
+    backend_name = "memory"
+
+    def __init__(self, url_prefix: str = "memory://"):
+        super().__init__(max_concurrency=1)
+        self.url_prefix = url_prefix
+        self.objects: Dict[str, Tuple[bytes, str]] = {}
+
+    async def upload_file(
+        self,
+        file_data: bytes,
+        filename: str,
+        content_type: str,
+        patient_id: Optional[int] = None,
+        key: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        key = key or self.generate_key(patient_id, filename)
+        self.objects[key] = (bytes(file_data), content_type)
+        return self.url_for(key), key
+
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}{key}"
+
+    async def read_file(self, key: str) -> bytes:
+        if key not in self.objects:
+            raise StorageError(f"Arquivo não encontrado: {key}")
+        return self.objects[key][0]
+
+    async def delete_file(self, key: str) -> bool:
+        return self.objects.pop(key, None) is not None
+
+    async def get_presigned_url(self, key: str, expiration: int = 3600) -> str:
+        return self.url_for(key)
+
+    async def file_exists(self, key: str) -> bool:
+        return key in self.objects
+
+
+# Instâncias singleton
 _s3_service: Optional[S3Service] = None
+_storage_service: Optional[BaseStorageService] = None
 
 
 def get_s3_service() -> S3Service:
@@ -140,3 +445,26 @@ def get_s3_service() -> S3Service:
     if _s3_service is None:
         _s3_service = S3Service()
     return _s3_service
+
+
+def get_storage_service() -> BaseStorageService:
+    """
+    Retorna o backend de armazenamento configurado em STORAGE_BACKEND.
+
+    Com "auto", usa o S3 quando houver credenciais e o disco local caso contrário.
+    Usado como dependência nos routers (sobrescrevível em testes).
+    """
+    global _storage_service
+    if _storage_service is None:
+        backend = settings.STORAGE_BACKEND
+        if backend == "memory":
+            _storage_service = InMemoryStorageService()
+        elif backend == "local":
+            _storage_service = LocalStorageService()
+        else:
+            s3 = get_s3_service()
+            if backend == "s3" or s3.is_configured():
+                _storage_service = s3
+            else:
+                _storage_service = LocalStorageService()
+    return _storage_service
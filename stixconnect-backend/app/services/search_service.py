@@ -0,0 +1,377 @@
+"""
+Busca de usuários (pacientes e profissionais) por nome, CPF, email e prontuário.
+
+Nomes são buscados pela coluna normalizada `nome_busca` (minúsculas, sem
+acentos), token a token, com casamento por prefixo:
+- MySQL: índice FULLTEXT (MATCH ... AGAINST em modo booleano, "jos*")
+- PostgreSQL: índice de trigramas (pg_trgm) em `nome_busca`
+- demais (SQLite): índice de n-gramas em memória, mantido a cada commit
+
+CPF e prontuário são buscados pelos dígitos (colunas indexadas, por prefixo)
+e email por prefixo na coluna `email_busca` (minúsculas), com busca por
+trecho ("silva@") quando nenhum email começa com o termo. Os resultados
+são ordenados por relevância e, em seguida, pelos cadastros mais recentes.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from heapq import nlargest
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, event, func
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.models import User, UserRole, normalizar_nome, somente_digitos
+
+# Mínimo de dígitos para tratar a busca como CPF/prontuário
+MIN_DIGITOS = 3
+
+
+def tokenizar(termo: str) -> List[str]:
+    """Tokens normalizados da busca ("José  Silva" -> ["jose", "silva"])"""
+    return (normalizar_nome(termo) or "").split()
+
+
+def _depois_do_prefixo(prefixo: str) -> str:
+    """Menor string maior que todas as que começam com o prefixo (para range scan)"""
+    return prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+
+class NgramIndex:
+    """
+    Índice de busca por nome em memória.
+
+    Os nomes repetem muitos tokens ("maria", "silva"), então a busca é feita
+    primeiro sobre o vocabulário de tokens distintos: prefixos por bisect na
+    lista ordenada e trechos por trigramas. Cada token do vocabulário aponta
+    para o conjunto de usuários que o contém; filtros, contagem e ranking são
+    operações de conjunto, sem pontuar usuário a usuário.
+
+    Prefixos de até PREFIXO_CURTO caracteres ("s", "si"), que casam com
+    milhares de tokens, têm o conjunto de usuários mantido diretamente.
+
+    Pontuação por token buscado: 3 igual, 2 prefixo, 1 trecho (apenas para
+    buscas com 3+ caracteres). Empates são decididos pelo cadastro mais recente.
+    """
+
+    PREFIXO_CURTO = 2
+
+    def __init__(self):
+        self._docs: Dict[int, Tuple[Tuple[str, ...], str]] = {}
+        self._por_token: Dict[str, Set[int]] = {}
+        self._por_prefixo: Dict[str, Set[int]] = {}
+        self._por_role: Dict[str, Set[int]] = {}
+        self._inativos: Set[int] = set()
+        self._vocabulario: List[str] = []
+        self._trigramas: Dict[str, Set[str]] = {}
+        self._maior_id = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _trigramas_de(token: str) -> Set[str]:
+        return {token[i:i + 3] for i in range(len(token) - 2)}
+
+    def _prefixos_curtos(self, tokens: Sequence[str]) -> Set[str]:
+        return {t[:n] for t in tokens for n in range(1, min(len(t), self.PREFIXO_CURTO) + 1)}
+
+    def upsert(self, user_id: int, nome_busca: Optional[str], role: str, ativo: bool):
+        self.remove(user_id)
+        tokens = tuple(dict.fromkeys((nome_busca or "").split()))
+        self._docs[user_id] = (tokens, role)
+        self._maior_id = max(self._maior_id, user_id)
+        for token in tokens:
+            docs = self._por_token.get(token)
+            if docs is None:
+                docs = self._por_token[token] = set()
+                insort(self._vocabulario, token)
+                for gram in self._trigramas_de(token):
+                    self._trigramas.setdefault(gram, set()).add(token)
+            docs.add(user_id)
+        for prefixo in self._prefixos_curtos(tokens):
+            self._por_prefixo.setdefault(prefixo, set()).add(user_id)
+        self._por_role.setdefault(role, set()).add(user_id)
+        if not ativo:
+            self._inativos.add(user_id)
+
+    def remove(self, user_id: int):
+        doc = self._docs.pop(user_id, None)
+        if doc is None:
+            return
+        tokens, role = doc
+        for token in tokens:
+            docs = self._por_token[token]
+            docs.discard(user_id)
+            if not docs:
+                del self._por_token[token]
+                del self._vocabulario[bisect_left(self._vocabulario, token)]
+                for gram in self._trigramas_de(token):
+                    vocabulos = self._trigramas[gram]
+                    vocabulos.discard(token)
+                    if not vocabulos:
+                        del self._trigramas[gram]
+        for prefixo in self._prefixos_curtos(tokens):
+            docs = self._por_prefixo[prefixo]
+            docs.discard(user_id)
+            if not docs:
+                del self._por_prefixo[prefixo]
+        self._por_role[role].discard(user_id)
+        self._inativos.discard(user_id)
+
+    def _niveis(self, busca: str) -> Dict[int, Set[int]]:
+        """Usuários por pontuação (3/2/1, disjuntos) para um token buscado"""
+        niveis = {3: self._por_token.get(busca, set())}
+        if len(busca) <= self.PREFIXO_CURTO:
+            niveis[2] = self._por_prefixo.get(busca, set()) - niveis[3]
+        else:
+            prefixados = []
+            i = bisect_left(self._vocabulario, busca)
+            while i < len(self._vocabulario) and self._vocabulario[i].startswith(busca):
+                if self._vocabulario[i] != busca:
+                    prefixados.append(self._por_token[self._vocabulario[i]])
+                i += 1
+            niveis[2] = set().union(*prefixados) - niveis[3]
+
+        if len(busca) >= 3:
+            grams = sorted((self._trigramas.get(g, set()) for g in self._trigramas_de(busca)), key=len)
+            vocabulos = grams[0].intersection(*grams[1:])
+            trechos = [self._por_token[t] for t in vocabulos if busca in t and not t.startswith(busca)]
+            niveis[1] = set().union(*trechos) - niveis[3] - niveis[2]
+        return {pontos: docs for pontos, docs in niveis.items() if docs}
+
+    def _mais_recentes(self, docs: Set[int], quantidade: int) -> List[int]:
+        """Maiores ids do conjunto; em conjuntos densos, varre os ids do mais recente para trás"""
+        if len(docs) * 8 < self._maior_id:
+            return nlargest(quantidade, docs)
+        resultado = []
+        user_id = self._maior_id
+        while user_id > 0 and len(resultado) < quantidade:
+            if user_id in docs:
+                resultado.append(user_id)
+            user_id -= 1
+        return resultado
+
+    def search(
+        self,
+        tokens: Sequence[str],
+        roles: Optional[Set[str]] = None,
+        ativo: Optional[bool] = None,
+        skip: int = 0,
+        limit: int = 20,
+    ) -> Tuple[List[int], int]:
+        """Página de user_ids (relevância, depois mais recentes) e total de resultados"""
+        niveis_por_token = [self._niveis(t) for t in dict.fromkeys(tokens)]
+        if not niveis_por_token or not all(niveis_por_token):
+            return [], 0
+
+        casados = sorted((set().union(*n.values()) for n in niveis_por_token), key=len)
+        candidatos = casados[0].intersection(*casados[1:])
+        if roles is not None:
+            candidatos = set().union(*(candidatos & self._por_role.get(r, set()) for r in roles))
+        if ativo is True:
+            candidatos -= self._inativos
+        elif ativo is False:
+            candidatos &= self._inativos
+        total = len(candidatos)
+
+        # Agrupa por pontuação total: cada combinação de níveis é um subconjunto disjunto
+        por_pontuacao: Dict[int, List[Set[int]]] = {}
+        for combinacao in product(*(n.items() for n in niveis_por_token)):
+            conjuntos = sorted((docs for _, docs in combinacao), key=len)
+            docs = candidatos.intersection(*conjuntos)
+            if docs:
+                por_pontuacao.setdefault(sum(p for p, _ in combinacao), []).append(docs)
+
+        pagina: List[int] = []
+        for pontos in sorted(por_pontuacao, reverse=True):
+            docs = set().union(*por_pontuacao[pontos])
+            if skip >= len(docs):
+                skip -= len(docs)
+                continue
+            pagina.extend(self._mais_recentes(docs, skip + limit - len(pagina))[skip:])
+            skip = 0
+            if len(pagina) >= limit:
+                break
+        return pagina, total
+
+
+# Índices em memória alimentados pelos commits de usuários (ver _registrar_hooks)
+_indices_usuarios: List[Callable[[List[dict]], None]] = []
+
+
+def registrar_indice_usuarios(aplicar: Callable[[List[dict]], None]):
+    """
+    Registra uma função chamada após cada commit que altere usuários, com
+    snapshots {"id", "nome", "nome_busca", "role", "ativo", "created_at", "removido"}.
+    """
+    _indices_usuarios.append(aplicar)
+
+
+def _snapshot(user: User, removido: bool = False) -> dict:
+    role = user.role.value if isinstance(user.role, UserRole) else user.role
+    return {
+        "id": user.id,
+        "nome": user.nome,
+        "nome_busca": user.nome_busca,
+        "role": role,
+        "ativo": user.ativo is not False,
+        "created_at": user.created_at,
+        "removido": removido,
+    }
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _coletar_usuarios(session, flush_context):
+    pendentes = session.info.setdefault("usuarios_alterados", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, User) and obj.id is not None:
+            pendentes[obj.id] = _snapshot(obj)
+    for obj in session.deleted:
+        if isinstance(obj, User) and obj.id is not None:
+            pendentes[obj.id] = _snapshot(obj, removido=True)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _aplicar_usuarios(session):
+    pendentes = session.info.pop("usuarios_alterados", None)
+    if not pendentes:
+        return
+    snapshots = list(pendentes.values())
+    for aplicar in _indices_usuarios:
+        try:
+            aplicar(snapshots)
+        except Exception as e:
+            print(f"Erro ao atualizar índice de usuários: {e}")
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_usuarios(session):
+    session.info.pop("usuarios_alterados", None)
+
+
+class UserSearchService:
+    def __init__(self):
+        self._ngram: Optional[NgramIndex] = None
+        self._lock = threading.Lock()
+        registrar_indice_usuarios(self._aplicar)
+
+    def _aplicar(self, snapshots: List[dict]):
+        if self._ngram is None:
+            return  # será construído do banco na primeira busca
+        with self._lock:
+            for snap in snapshots:
+                if snap["removido"]:
+                    self._ngram.remove(snap["id"])
+                else:
+                    self._ngram.upsert(snap["id"], snap["nome_busca"], snap["role"], snap["ativo"])
+
+    def _ngram_index(self, db: Session) -> NgramIndex:
+        if self._ngram is None:
+            with self._lock:
+                if self._ngram is None:
+                    index = NgramIndex()
+                    rows = db.query(User.id, User.nome_busca, User.role, User.ativo).yield_per(10000)
+                    for user_id, nome_busca, role, ativo in rows:
+                        index.upsert(user_id, nome_busca, role.value, ativo is not False)
+                    self._ngram = index
+        return self._ngram
+
+    def search(
+        self,
+        db: Session,
+        termo: str,
+        roles: Optional[Iterable[UserRole]] = None,
+        ativo: Optional[bool] = None,
+        skip: int = 0,
+        limit: int = 20,
+    ) -> Tuple[List[User], int]:
+        """Usuários que casam com o termo, ordenados por relevância (e total)"""
+        roles = list(roles) if roles is not None else None
+        termo = termo.strip()
+        digitos = somente_digitos(termo)
+
+        if "@" in termo:
+            return self._buscar_email(db, termo.lower(), roles, ativo, skip, limit)
+        if digitos and len(digitos) >= MIN_DIGITOS and not any(c.isalpha() for c in termo):
+            return self._buscar_documento(db, digitos, roles, ativo, skip, limit)
+
+        tokens = tokenizar(termo)
+        if not tokens:
+            return [], 0
+
+        dialeto = db.get_bind().dialect.name
+        if dialeto == "mysql":
+            return self._buscar_fulltext(db, tokens, roles, ativo, skip, limit)
+        if dialeto == "postgresql":
+            return self._buscar_trigramas(db, tokens, roles, ativo, skip, limit)
+        return self._buscar_memoria(db, tokens, roles, ativo, skip, limit)
+
+    @staticmethod
+    def _filtrar(query, roles, ativo):
+        if roles is not None:
+            query = query.filter(User.role.in_(roles))
+        if ativo is not None:
+            query = query.filter(User.ativo == ativo)
+        return query
+
+    def _buscar_email(self, db, prefixo, roles, ativo, skip, limit):
+        query = self._filtrar(
+            db.query(User).filter(User.email_busca >= prefixo, User.email_busca < _depois_do_prefixo(prefixo)),
+            roles, ativo,
+        )
+        total = query.count()
+        if not total:
+            # Sem prefixo: busca por trecho (varredura, só quando o prefixo falha)
+            trecho = prefixo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = self._filtrar(
+                db.query(User).filter(User.email_busca.like(f"%{trecho}%", escape="\\")),
+                roles, ativo,
+            )
+            total = query.count()
+        users = query.order_by((User.email_busca == prefixo).desc(), User.id.desc()).offset(skip).limit(limit).all()
+        return users, total
+
+    def _buscar_documento(self, db, digitos, roles, ativo, skip, limit):
+        fim = _depois_do_prefixo(digitos)
+        cpf = (User.cpf_digitos >= digitos) & (User.cpf_digitos < fim)
+        prontuario = (User.prontuario_digitos >= digitos) & (User.prontuario_digitos < fim)
+        query = self._filtrar(db.query(User).filter(cpf | prontuario), roles, ativo)
+        total = query.count()
+        exato = case(((User.cpf_digitos == digitos) | (User.prontuario_digitos == digitos), 1), else_=0)
+        users = query.order_by(exato.desc(), User.id.desc()).offset(skip).limit(limit).all()
+        return users, total
+
+    def _buscar_fulltext(self, db, tokens, roles, ativo, skip, limit):
+        from sqlalchemy.dialects.mysql import match
+
+        relevancia = match(User.nome_busca, against=" ".join(f"+{t}*" for t in tokens)).in_boolean_mode()
+        query = self._filtrar(db.query(User).filter(relevancia > 0), roles, ativo)
+        total = query.count()
+        users = query.order_by(relevancia.desc(), User.id.desc()).offset(skip).limit(limit).all()
+        return users, total
+
+    def _buscar_trigramas(self, db, tokens, roles, ativo, skip, limit):
+        query = db.query(User)
+        for token in tokens:
+            query = query.filter(User.nome_busca.like(f"%{token}%"))
+        query = self._filtrar(query, roles, ativo)
+        total = query.count()
+        similaridade = func.similarity(User.nome_busca, " ".join(tokens))
+        users = query.order_by(similaridade.desc(), User.id.desc()).offset(skip).limit(limit).all()
+        return users, total
+
+    def _buscar_memoria(self, db, tokens, roles, ativo, skip, limit):
+        index = self._ngram_index(db)
+        roles_valores = {r.value for r in roles} if roles is not None else None
+        with self._lock:
+            pagina, total = index.search(tokens, roles_valores, ativo, skip, limit)
+        if not pagina:
+            return [], total
+        por_id = {u.id: u for u in db.query(User).filter(User.id.in_(pagina))}
+        return [por_id[i] for i in pagina if i in por_id], total
+
+
+user_search_service = UserSearchService()
@@ -0,0 +1,90 @@
+"""
+Normalização dos sinais vitais da triagem.
+
+Os valores chegam como texto livre ("38,5", "37.8°C", "95%", "120/80",
+"12x8", "88 bpm"). São interpretados uma única vez, na escrita, e gravados
+em colunas numéricas (°C, bpm, %, mmHg) que podem ser indexadas e
+consultadas por faixa. Valores ilegíveis ou fora da faixa fisiológica
+plausível ficam como NULL; o texto original é sempre preservado.
+"""
+
+import re
+from typing import Optional, Tuple
+
+_NUMERO_RE = re.compile(r"\d+(?:[.,]\d+)?")
+# Unidade Fahrenheit explícita logo após o número ("100.4F", "100,4 °F");
+# um "f" solto no texto ("38 febril") não conta
+_FAHRENHEIT_RE = re.compile(r"\d\s*[°º]?\s*F\b", re.IGNORECASE)
+_PRESSAO_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:/|x|X|por)\s*(\d+(?:[.,]\d+)?)")
+
+# Faixas plausíveis (fora delas o valor é tratado como erro de digitação)
+TEMPERATURA_FAIXA = (25.0, 45.0)
+FREQUENCIA_CARDIACA_FAIXA = (20, 300)
+SATURACAO_FAIXA = (30, 100)
+SISTOLICA_FAIXA = (40, 300)
+DIASTOLICA_FAIXA = (20, 200)
+
+
+def _numero(valor: Optional[str]) -> Optional[float]:
+    if not valor:
+        return None
+    match = _NUMERO_RE.search(valor)
+    if not match:
+        return None
+    return float(match.group(0).replace(",", "."))
+
+
+def _na_faixa(valor: Optional[float], faixa) -> bool:
+    return valor is not None and faixa[0] <= valor <= faixa[1]
+
+
+def parse_temperatura(valor: Optional[str]) -> Optional[float]:
+    """Temperatura em °C ("38,5", "37.8°C"; valores em °F são convertidos)"""
+    temp = _numero(valor)
+    if temp is None:
+        return None
+    if _FAHRENHEIT_RE.search(valor) or temp > TEMPERATURA_FAIXA[1]:
+        temp = (temp - 32) * 5 / 9
+    temp = round(temp, 1)
+    return temp if _na_faixa(temp, TEMPERATURA_FAIXA) else None
+
+
+def parse_frequencia_cardiaca(valor: Optional[str]) -> Optional[int]:
+    """Frequência cardíaca em bpm ("88", "88 bpm")"""
+    fc = _numero(valor)
+    return int(round(fc)) if _na_faixa(fc, FREQUENCIA_CARDIACA_FAIXA) else None
+
+
+def parse_saturacao(valor: Optional[str]) -> Optional[int]:
+    """Saturação de oxigênio em % ("95", "95%")"""
+    sat = _numero(valor)
+    return int(round(sat)) if _na_faixa(sat, SATURACAO_FAIXA) else None
+
+
+def parse_pressao_arterial(valor: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Pressão arterial (sistólica, diastólica) em mmHg.
+    Aceita "120/80", "120x80" e a notação em cmHg ("12x8", "12/8").
+    """
+    if not valor:
+        return None, None
+    match = _PRESSAO_RE.search(valor)
+    if not match:
+        return None, None
+    sistolica, diastolica = (float(g.replace(",", ".")) for g in match.groups())
+    if sistolica < 30 and diastolica < 30:
+        # cmHg -> mmHg
+        sistolica, diastolica = sistolica * 10, diastolica * 10
+    if not (_na_faixa(sistolica, SISTOLICA_FAIXA) and _na_faixa(diastolica, DIASTOLICA_FAIXA)):
+        return None, None
+    if diastolica >= sistolica:
+        return None, None
+    return int(round(sistolica)), int(round(diastolica))
+
+
+def normalizar_sinais_vitais(triagem) -> None:
+    """Preenche as colunas numéricas da triagem a partir dos campos de texto"""
+    triagem.temperatura_c = parse_temperatura(triagem.temperatura)
+    triagem.frequencia_cardiaca_bpm = parse_frequencia_cardiaca(triagem.frequencia_cardiaca)
+    triagem.saturacao_oxigenio_pct = parse_saturacao(triagem.saturacao_oxigenio)
+    triagem.pressao_sistolica_mmhg, triagem.pressao_diastolica_mmhg = parse_pressao_arterial(triagem.pressao_arterial)
@@ -0,0 +1,227 @@
+"""
+Sugestões de nomes enquanto o usuário digita (typeahead).
+
+Uma trie por role sobre os tokens de `nome_busca` de usuários ativos. Cada
+nó guarda os K usuários mais recentes da sua subárvore, então a consulta de
+um prefixo é uma descida na trie mais a leitura de uma lista já ordenada.
+O índice é construído do banco na primeira consulta e atualizado a cada
+commit que cria, altera ou desativa usuários (registrar_indice_usuarios).
+A cada SUGESTOES_RECONCILIAR_SEGUNDOS é reconstruído em segundo plano, o que
+corrige alterações feitas por outros processos (workers) ou fora do ORM.
+"""
+
+import threading
+import time
+from heapq import merge, nlargest
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import User, UserRole, normalizar_nome
+from app.services.search_service import registrar_indice_usuarios
+
+# Usuários mais recentes mantidos em cada nó da trie
+TOP_K = 64
+
+
+class _No:
+    __slots__ = ("filhos", "ids", "top", "sujo")
+
+    def __init__(self):
+        self.filhos: Dict[str, "_No"] = {}
+        self.ids: Set[int] = set()      # usuários com exatamente este token
+        self.top: List[int] = []        # até TOP_K ids da subárvore, do mais recente
+        self.sujo = False               # top precisa ser recalculado (após remoção)
+
+
+class PrefixTrie:
+    """Trie de tokens com os K ids mais recentes (maiores) por prefixo"""
+
+    def __init__(self):
+        self._raiz = _No()
+
+    def _caminho(self, token: str, criar: bool = False) -> List[_No]:
+        no = self._raiz
+        caminho = [no]
+        for char in token:
+            proximo = no.filhos.get(char)
+            if proximo is None:
+                if not criar:
+                    return []
+                proximo = no.filhos[char] = _No()
+            no = proximo
+            caminho.append(no)
+        return caminho
+
+    def add(self, token: str, user_id: int):
+        caminho = self._caminho(token, criar=True)
+        caminho[-1].ids.add(user_id)
+        for no in caminho:
+            top = no.top
+            if not top or user_id > top[0]:
+                # Caso comum: o usuário mais recente
+                top.insert(0, user_id)
+            elif user_id in top or (len(top) >= TOP_K and user_id < top[-1]):
+                continue
+            else:
+                # Listas curtas (K): inserção ordenada decrescente
+                i = 0
+                while i < len(top) and top[i] > user_id:
+                    i += 1
+                top.insert(i, user_id)
+            del top[TOP_K:]
+
+    def remove(self, token: str, user_id: int):
+        caminho = self._caminho(token)
+        if not caminho:
+            return
+        caminho[-1].ids.discard(user_id)
+        for no in caminho:
+            if user_id in no.top:
+                no.top.remove(user_id)
+                no.sujo = True
+
+    def _limpar(self, no: _No):
+        if not no.sujo:
+            return
+        for filho in no.filhos.values():
+            self._limpar(filho)
+        no.top = nlargest(TOP_K, set(chain(no.ids, *(f.top for f in no.filhos.values()))))
+        no.sujo = False
+
+    def top(self, prefixo: str) -> List[int]:
+        caminho = self._caminho(prefixo)
+        if not caminho:
+            return []
+        no = caminho[-1]
+        self._limpar(no)
+        return no.top
+
+
+class SuggestService:
+    def __init__(self):
+        self._tries: Optional[Dict[str, PrefixTrie]] = None
+        self._usuarios: Dict[int, Tuple[str, str, Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+        self._carga = threading.Lock()
+        self._proxima_reconciliacao = 0.0
+        self._reconciliando = False
+        # Commits recebidos durante uma reconstrução, reaplicados no índice novo
+        self._pendentes: Optional[List[dict]] = None
+        registrar_indice_usuarios(self._aplicar)
+
+    @staticmethod
+    def _adicionar(tries: Dict[str, PrefixTrie], usuarios: dict, user_id: int, nome: str, role: str, nome_busca: Optional[str]):
+        tokens = tuple(dict.fromkeys((nome_busca or "").split()))
+        usuarios[user_id] = (nome, role, tokens)
+        trie = tries.setdefault(role, PrefixTrie())
+        for token in tokens:
+            trie.add(token, user_id)
+
+    @staticmethod
+    def _remover(tries: Dict[str, PrefixTrie], usuarios: dict, user_id: int):
+        atual = usuarios.pop(user_id, None)
+        if atual is None:
+            return
+        _, role, tokens = atual
+        for token in tokens:
+            tries[role].remove(token, user_id)
+
+    def _aplicar_em(self, tries: Dict[str, PrefixTrie], usuarios: dict, snapshots: List[dict]):
+        for snap in snapshots:
+            self._remover(tries, usuarios, snap["id"])
+            if snap["ativo"] and not snap["removido"]:
+                self._adicionar(tries, usuarios, snap["id"], snap["nome"], snap["role"], snap["nome_busca"])
+
+    def _aplicar(self, snapshots: List[dict]):
+        with self._lock:
+            if self._pendentes is not None:
+                self._pendentes.extend(snapshots)
+            if self._tries is not None:
+                self._aplicar_em(self._tries, self._usuarios, snapshots)
+
+    def _construir(self, db: Session) -> Tuple[Dict[str, PrefixTrie], dict]:
+        tries: Dict[str, PrefixTrie] = {}
+        usuarios: dict = {}
+        rows = (
+            db.query(User.id, User.nome, User.role, User.nome_busca)
+            .filter(User.ativo.is_(True))
+            .order_by(User.id)
+            .yield_per(10000)
+        )
+        for user_id, nome, role, nome_busca in rows:
+            self._adicionar(tries, usuarios, user_id, nome, role.value, nome_busca)
+        return tries, usuarios
+
+    def _reconstruir(self, db: Session):
+        with self._lock:
+            self._pendentes = []
+        try:
+            tries, usuarios = self._construir(db)
+        except Exception:
+            with self._lock:
+                self._pendentes = None
+            raise
+        with self._lock:
+            self._aplicar_em(tries, usuarios, self._pendentes)
+            self._pendentes = None
+            self._tries, self._usuarios = tries, usuarios
+            self._proxima_reconciliacao = time.monotonic() + settings.SUGESTOES_RECONCILIAR_SEGUNDOS
+
+    def reconciliar(self):
+        """Reconstrói o índice do banco (executado em segundo plano)"""
+        db = SessionLocal()
+        try:
+            self._reconstruir(db)
+        except Exception as e:
+            print(f"Erro ao reconciliar o índice de sugestões: {e}")
+        finally:
+            db.close()
+            self._reconciliando = False
+
+    def _garantir(self, db: Session):
+        if self._tries is None:
+            with self._carga:
+                if self._tries is None:
+                    self._reconstruir(db)
+        elif time.monotonic() >= self._proxima_reconciliacao and not self._reconciliando:
+            self._reconciliando = True
+            threading.Thread(target=self.reconciliar, name="sugestoes-reconciliar", daemon=True).start()
+
+    def suggest(self, db: Session, termo: str, roles: Iterable[UserRole], limit: int = 10) -> List[dict]:
+        """
+        Até `limit` usuários cujo nome tem tokens começando com os da busca,
+        dos mais recentes para os mais antigos. Com mais de um token, os
+        candidatos são os TOP_K mais recentes do token sendo digitado.
+        """
+        tokens = (normalizar_nome(termo) or "").split()
+        if not tokens:
+            return []
+        self._garantir(db)
+
+        # O último token é o que está sendo digitado; os demais filtram os candidatos
+        prefixo, filtros = tokens[-1], tokens[:-1]
+        with self._lock:
+            listas = [self._tries[r.value].top(prefixo) for r in roles if r.value in self._tries]
+            resultado = []
+            for user_id in merge(*listas, reverse=True):
+                nome, role, tokens_usuario = self._usuarios[user_id]
+                if all(any(t.startswith(f) for t in tokens_usuario) for f in filtros):
+                    resultado.append({"id": user_id, "nome": nome, "role": role})
+                    if len(resultado) >= limit:
+                        break
+        return resultado
+
+
+_suggest_service: Optional[SuggestService] = None
+
+
+def get_suggest_service() -> SuggestService:
+    """Retorna instância singleton do SuggestService"""
+    global _suggest_service
+    if _suggest_service is None:
+        _suggest_service = SuggestService()
+    return _suggest_service
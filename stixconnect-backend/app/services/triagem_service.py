@@ -1,15 +1,35 @@
+from typing import List, Optional, Sequence
+from app.core.config import settings
 from app.models.models import ClassificacaoUrgencia
+from app.services.keyword_matcher import KeywordMatcher
+
+_keyword_matcher: Optional[KeywordMatcher] = None
+
+# Índice de cada nível usado na classificação em lote
+_NIVEIS = [
+    ClassificacaoUrgencia.BAIXA,
+    ClassificacaoUrgencia.MEDIA,
+    ClassificacaoUrgencia.ALTA,
+    ClassificacaoUrgencia.CRITICA,
+]
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """Regras de palavras-chave compiladas uma única vez (arquivo versionado)"""
+    global _keyword_matcher
+    if _keyword_matcher is None:
+        _keyword_matcher = KeywordMatcher.from_file(settings.TRIAGEM_RULES_PATH)
+    return _keyword_matcher
+
 
 class TriagemService:
     @staticmethod
-    def classificar_urgencia(sintomas: str, dor_escala: int = None, temperatura: str = None, saturacao_oxigenio: str = None) -> ClassificacaoUrgencia:
-        sintomas_lower = sintomas.lower()
+    def classificar_urgencia(sintomas: str, dor_escala: int = None, temperatura: str = None, saturacao_oxigenio: str = None, matcher: Optional[KeywordMatcher] = None) -> ClassificacaoUrgencia:
+        # Uma única varredura do texto normalizado (sem acentos, com limite de palavra)
+        encontrados = (matcher or get_keyword_matcher()).find(sintomas)
         pontos = 0
-        sintomas_criticos = ["dor no peito", "falta de ar severa", "perda de consciência", "convulsão", "hemorragia", "acidente", "trauma grave", "avc", "derrame", "infarto"]
-        sintomas_altos = ["febre alta", "vomito persistente", "diarreia severa", "dificuldade respiratoria", "dor intensa", "confusão mental"]
-        for sintoma in sintomas_criticos:
-            if sintoma in sintomas_lower:
-                return ClassificacaoUrgencia.CRITICA
+        if encontrados.get("critico"):
+            return ClassificacaoUrgencia.CRITICA
         if temperatura:
             try:
                 temp = float(temperatura.replace(",", "."))
@@ -33,9 +53,7 @@ class TriagemService:
                 pontos += 3
             elif dor_escala >= 6:
                 pontos += 2
-        for sintoma in sintomas_altos:
-            if sintoma in sintomas_lower:
-                pontos += 2
+        pontos += 2 * len(encontrados.get("alto", ()))
         if pontos >= 5:
             return ClassificacaoUrgencia.CRITICA
         elif pontos >= 3:
@@ -45,4 +63,69 @@ class TriagemService:
         else:
             return ClassificacaoUrgencia.BAIXA
 
+    @staticmethod
+    def classificar_lote(
+        sintomas: Sequence[str],
+        temperaturas: Sequence[Optional[str]],
+        saturacoes: Sequence[Optional[str]],
+        dores: Sequence[Optional[int]],
+        matcher: Optional[KeywordMatcher] = None,
+    ) -> List[ClassificacaoUrgencia]:
+        """
+        Mesma regra de classificar_urgencia, aplicada a um lote em formato colunar.
+        As palavras-chave são buscadas em uma única varredura do lote e os limiares
+        dos sinais vitais são calculados como operações vetoriais (NumPy).
+        """
+        import numpy as np
+
+        matcher = matcher or get_keyword_matcher()
+        total = len(sintomas)
+
+        critico = np.zeros(total, dtype=bool)
+        altos = np.zeros(total, dtype=np.int16)
+        for i, encontrados in matcher.find_many(sintomas).items():
+            critico[i] = "critico" in encontrados
+            altos[i] = len(encontrados.get("alto", ()))
+
+        # Cada valor distinto é interpretado uma única vez
+        temp = _coluna(temperaturas, _parse_temperatura, np.float64, total)
+        sat = _coluna(saturacoes, _parse_saturacao, np.float64, total)
+        dor = _coluna(dores, lambda d: d or 0, np.int16, total)
+
+        # Comparações com NaN (valor ausente/inválido) são sempre falsas
+        pontos = np.where((temp >= 39.5) | (temp <= 35.0), 3, np.where(temp >= 38.5, 2, 0))
+        pontos += np.where(sat < 95, 2, 0)
+        pontos += np.where(dor >= 8, 3, np.where(dor >= 6, 2, 0))
+        pontos += 2 * altos
+
+        nivel = np.select([pontos >= 5, pontos >= 3, pontos >= 1], [3, 2, 1], default=0)
+        nivel[critico | (sat < 90)] = 3
+        return [_NIVEIS[n] for n in nivel.tolist()]
+
+
+def _coluna(valores, parse, dtype, total):
+    import numpy as np
+
+    convertidos = {v: parse(v) for v in set(valores)}
+    return np.fromiter(map(convertidos.__getitem__, valores), dtype=dtype, count=total)
+
+
+def _parse_temperatura(valor: Optional[str]) -> float:
+    if not valor:
+        return float("nan")
+    try:
+        return float(valor.replace(",", "."))
+    except (ValueError, AttributeError):
+        return float("nan")
+
+
+def _parse_saturacao(valor: Optional[str]) -> float:
+    if not valor:
+        return float("nan")
+    try:
+        return float(int(valor.replace("%", "")))
+    except (ValueError, AttributeError):
+        return float("nan")
+
+
 triagem_service = TriagemService()
\ No newline at end of file
@@ -1,8 +1,8 @@
-import requests
 import base64
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 from app.core.config import settings
+from app.core.metrics import medir_externo
 
 class ZoomService:
     def __init__(self):
@@ -12,6 +12,15 @@ class ZoomService:
         self.base_url = "https://api.zoom.us/v2"
         self._access_token = None
         self._token_expiry = None
+        self._session = None
+    
+    @property
+    def session(self):
+        """Sessão HTTP (keep-alive) criada no primeiro uso; `requests` só é importado aqui"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
     
     def _get_access_token(self) -> str:
         if self._access_token and self._token_expiry and datetime.utcnow() < self._token_expiry:
@@ -20,7 +29,8 @@ class ZoomService:
         credentials = f"{self.client_id}:{self.client_secret}"
         encoded_credentials = base64.b64encode(credentials.encode()).decode()
         headers = {"Authorization": f"Basic {encoded_credentials}", "Content-Type": "application/x-www-form-urlencoded"}
-        response = requests.post(url, headers=headers)
+        with medir_externo("zoom"):
+            response = self.session.post(url, headers=headers)
         response.raise_for_status()
         data = response.json()
         self._access_token = data["access_token"]
@@ -34,7 +44,8 @@ class ZoomService:
         meeting_data = {"topic": topic, "type": 2, "duration": duration, "timezone": timezone, "settings": {"host_video": True, "participant_video": True, "join_before_host": False, "mute_upon_entry": True, "watermark": False, "audio": "both", "auto_recording": "cloud", "waiting_room": False, "approval_type": 2}}
         if agenda:
             meeting_data["agenda"] = agenda
-        response = requests.post(url, json=meeting_data, headers=headers)
+        with medir_externo("zoom"):
+            response = self.session.post(url, json=meeting_data, headers=headers)
         response.raise_for_status()
         data = response.json()
         return {"meeting_id": str(data["id"]), "join_url": data["join_url"], "start_url": data["start_url"], "password": data.get("password", "")}
@@ -8,14 +8,59 @@ from typing import Optional
 from datetime import datetime
 import json
 
+from starlette.concurrency import run_in_threadpool
+
 from app.core.database import get_db
 from app.core.security import get_current_user, decode_token
-from app.models.models import Consulta, User
+from app.models.models import Consulta, ConsultaStatus, User
+from app.services.consulta_status_service import (
+    consulta_status_service, EVENTO_STATUS_ALTERADO,
+    ConflitoTransicaoError, TransicaoInvalidaError,
+)
+from app.services.outbox_service import assinar
+from app.services.reunioes_service import EVENTO_ZOOM_PROVISIONADA
 from app.websockets.connection_manager import get_manager
+from app.websockets.difusao import difusao
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
 
+def _persistir_status(consulta_id: int, user_id: int, novo_status: Optional[str]) -> Optional[str]:
+    """
+    Aplica a transição pedida via WebSocket; retorna a mensagem de erro, se houver.
+    Só o profissional atribuído pode iniciar a consulta (AGUARDANDO_MEDICO ->
+    EM_ATENDIMENTO, também em POST /consultas/{id}/iniciar-consulta); as demais
+    transições têm regras de responsável e dados próprios e ficam nas rotas HTTP.
+    """
+    from app.core.database import SessionLocal
+    try:
+        novo = ConsultaStatus(novo_status)
+    except ValueError:
+        return f"Status inválido: {novo_status}"
+    if novo != ConsultaStatus.EM_ATENDIMENTO:
+        return "Pelo WebSocket só é possível iniciar a consulta (em_atendimento); use as rotas HTTP"
+    db = SessionLocal()
+    try:
+        consulta = db.query(Consulta).filter(Consulta.id == consulta_id).first()
+        if not consulta:
+            return "Consulta não encontrada"
+        if consulta.medico_id != user_id:
+            return "Apenas o profissional atribuído pode iniciar a consulta"
+        consulta_status_service.transicionar(db, consulta, novo, usuario_id=user_id)
+        return None
+    except (TransicaoInvalidaError, ConflitoTransicaoError) as e:
+        return str(e)
+    finally:
+        db.close()
+
+
+@assinar(EVENTO_STATUS_ALTERADO, "websocket")
+@assinar(EVENTO_ZOOM_PROVISIONADA, "websocket")
+async def _transmitir_evento(mensagem: dict):
+    """Assinante do outbox: repassa o evento à sala da consulta, em qualquer worker"""
+    await difusao.publicar(mensagem)
+
+
 async def get_user_from_token(websocket: WebSocket, token: Optional[str] = None) -> Optional[User]:
     """Valida token JWT do WebSocket e retorna usuário"""
     if not token:
@@ -129,20 +174,13 @@ async def consultation_websocket(
                         )
                     
                     elif message_type == "status_update":
-                        # Atualização de status (apenas admin/enfermeira/médico)
-                        if user.role.value in ["admin", "supervisor", "nurse", "doctor"]:
-                            await manager.broadcast_to_room(
-                                consulta_id,
-                                {
-                                    "type": "status_update",
-                                    "status": message.get("status"),
-                                    "updated_by": {
-                                        "id": user.id,
-                                        "nome": user.nome,
-                                    },
-                                    "timestamp": datetime.utcnow().isoformat(),
-                                }
-                            )
+                        # Início da consulta pelo profissional atribuído (ver _persistir_status):
+                        # persistido pela máquina de estados; a sala recebe o evento após o commit
+                        erro = await run_in_threadpool(
+                            _persistir_status, consulta_id, user.id, message.get("status")
+                        )
+                        if erro:
+                            await websocket.send_json({"type": "error", "message": erro})
                     
                     elif message_type == "typing":
                         # Indicador de digitação
@@ -0,0 +1,89 @@
+"""
+Difusão dos eventos de consulta (status, zoom_ready) para as salas WebSocket.
+
+O assinante "websocket" do outbox roda no worker que reservou o evento, mas
+as conexões da sala podem estar em qualquer worker. Com WS_REDIS_URL o evento
+é publicado em um canal Redis e cada worker (inscrito no canal desde o
+lifespan) repassa às salas que mantém. Sem Redis, vale para um único
+processo: o evento vai direto às salas locais.
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+from app.core.config import settings
+from app.websockets.connection_manager import get_manager
+
+CANAL = "stixconnect:ws:consultas"
+
+
+async def _entregar_local(mensagem: dict):
+    await get_manager().broadcast_to_room(mensagem["consulta_id"], mensagem)
+
+
+class DifusaoLocal:
+    """Salas do próprio processo"""
+
+    running = True
+
+    async def publicar(self, mensagem: dict):
+        await _entregar_local(mensagem)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class DifusaoRedis:
+    """PUBLISH no canal; cada worker assina o canal e entrega às suas salas"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # dependência opcional
+
+        self._redis = redis.from_url(url)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def publicar(self, mensagem: dict):
+        await self._redis.publish(CANAL, json.dumps(mensagem, default=str))
+
+    async def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._escutar())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _escutar(self):
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(CANAL)
+                async for item in pubsub.listen():
+                    if item["type"] == "message":
+                        await _entregar_local(json.loads(item["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro na difusão WebSocket (Redis): {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+
+
+def criar_difusao():
+    if settings.WS_REDIS_URL:
+        return DifusaoRedis(settings.WS_REDIS_URL)
+    return DifusaoLocal()
+
+
+difusao = criar_difusao()
@@ -0,0 +1,10 @@
+#!/bin/sh
+# Aplica as migrations pendentes e inicia a API.
+# MIGRAR_NA_INICIALIZACAO=false pula o passo (ex.: migrations rodadas por um job separado).
+set -e
+if [ "${MIGRAR_NA_INICIALIZACAO:-true}" = "true" ]; then
+    # Banco do create_all antigo (sem alembic_version) é marcado na revisão equivalente
+    python scripts/stamp_legacy_schema.py
+    alembic upgrade head
+fi
+exec "$@"
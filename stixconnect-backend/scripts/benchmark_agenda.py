@@ -0,0 +1,137 @@
+"""
+Benchmark da agenda
+Cria P profissionais com expediente de segunda a sábado (08h-18h, slots de
+30 min) e reservas ocupando uma fração dos slots dos próximos D dias em um
+SQLite temporário, e mede:
+- GET /agenda/slots de todos os profissionais no período (listar_slots:
+  duas consultas + IndiceIntervalos por profissional/dia);
+- o mesmo cálculo com verificação ingênua (cada slot percorre todas as
+  reservas do profissional), conferindo que os dois dão o mesmo resultado;
+- reservar() de um horário livre (validação, bloqueio e índice do dia).
+
+Uso: python scripts/benchmark_agenda.py [--profissionais 50] [--dias 31] [--ocupacao 0.6]
+"""
+
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as hora, timedelta
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.models import Consulta, ConsultaStatus, ConsultaTipo, HorarioTrabalho, User, UserRole
+from app.services.agenda_service import agenda_service, dia_local, slots_do_bloco
+
+
+def popular(db, profissionais: int, dias: int, ocupacao: float, inicio: date) -> int:
+    paciente = User(nome="Paciente", email="p@x.com", senha_hash="x", role=UserRole.PATIENT)
+    medicos = [
+        User(nome=f"Dr {i:03d}", email=f"d{i}@x.com", senha_hash="x", role=UserRole.DOCTOR)
+        for i in range(profissionais)
+    ]
+    db.add_all([paciente] + medicos)
+    db.flush()
+    blocos = [
+        HorarioTrabalho(profissional_id=m.id, dia_semana=d, hora_inicio=hora(8), hora_fim=hora(18), duracao_slot_minutos=30)
+        for m in medicos for d in range(6)
+    ]
+    db.add_all(blocos)
+    db.flush()
+    rng = random.Random(42)
+    reservas = []
+    for bloco in blocos:
+        for n in range(dias):
+            dia = inicio + timedelta(days=n)
+            if dia.weekday() != bloco.dia_semana:
+                continue
+            for slot_inicio, slot_fim in slots_do_bloco(dia, bloco):
+                if rng.random() < ocupacao:
+                    reservas.append(Consulta(
+                        paciente_id=paciente.id, medico_id=bloco.profissional_id, tipo=ConsultaTipo.AGENDADA,
+                        status=ConsultaStatus.AGENDADA, data_agendamento=slot_inicio, data_agendamento_fim=slot_fim,
+                    ))
+    db.add_all(reservas)
+    db.commit()
+    return len(reservas)
+
+
+def slots_ingenuo(db, inicio: date, fim: date) -> dict:
+    """Mesmo resultado de listar_slots, verificando cada slot contra todas as reservas do profissional"""
+    reservas = defaultdict(list)
+    for medico_id, r_inicio, r_fim in db.query(Consulta.medico_id, Consulta.data_agendamento, Consulta.data_agendamento_fim).filter(
+        Consulta.tipo == ConsultaTipo.AGENDADA, Consulta.status != ConsultaStatus.CANCELADA
+    ):
+        reservas[medico_id].append((r_inicio, r_fim))
+    minimo = datetime.utcnow() + timedelta(minutes=60)
+    livres = defaultdict(list)
+    for bloco in db.query(HorarioTrabalho).order_by(HorarioTrabalho.hora_inicio):
+        for n in range((fim - inicio).days + 1):
+            dia = inicio + timedelta(days=n)
+            if dia.weekday() != bloco.dia_semana:
+                continue
+            for s_inicio, s_fim in slots_do_bloco(dia, bloco):
+                if s_inicio >= minimo and not any(r_i < s_fim and r_f > s_inicio for r_i, r_f in reservas[bloco.profissional_id]):
+                    livres[bloco.profissional_id].append((s_inicio, s_fim))
+    return {k: sorted(v) for k, v in livres.items()}
+
+
+def medir(funcao, repeticoes: int) -> float:
+    funcao()  # aquecimento
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profissionais", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=31)
+    parser.add_argument("--ocupacao", type=float, default=0.6)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    inicio = dia_local(datetime.utcnow()) + timedelta(days=1)
+    fim = inicio + timedelta(days=args.dias - 1)
+    reservas = popular(db, args.profissionais, args.dias, args.ocupacao, inicio)
+    print(f"{args.profissionais} profissionais, {args.dias} dias, {reservas} reservas ({args.ocupacao:.0%} dos slots)\n")
+
+    indice = {r["profissional_id"]: [(s["inicio"], s["fim"]) for s in r["slots"]]
+              for r in agenda_service.listar_slots(db, inicio, fim)}
+    ingenuo = slots_ingenuo(db, inicio, fim)
+    assert indice == ingenuo, "resultados diferentes"
+    livres = sum(len(v) for v in indice.values())
+
+    ms_indice = medir(lambda: agenda_service.listar_slots(db, inicio, fim), args.repeticoes)
+    ms_ingenuo = medir(lambda: slots_ingenuo(db, inicio, fim), args.repeticoes)
+    print(f"slots livres no período: {livres}")
+    print(f"listar_slots (índice):    {ms_indice:9.1f} ms")
+    print(f"verificação ingênua:      {ms_ingenuo:9.1f} ms  ({ms_ingenuo / ms_indice:.1f}x)")
+
+    medico_id, slots = next(iter(indice.items()))
+    tempos = []
+    for slot_inicio, _ in slots[:20]:
+        t0 = time.perf_counter()
+        agenda_service.reservar(db, medico_id, slot_inicio)
+        tempos.append((time.perf_counter() - t0) * 1000)
+        db.rollback()
+    tempos.sort()
+    print(f"reservar (mediana de {len(tempos)}): {tempos[len(tempos) // 2]:.2f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
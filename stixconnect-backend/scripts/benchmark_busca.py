@@ -0,0 +1,114 @@
+"""
+Benchmark da busca de usuários por nome
+Compara a varredura linear (equivalente ao antigo ilike('%termo%')) com o
+índice de n-gramas em memória usado no SQLite, reportando p50/p95/p99, e
+mede as sugestões por prefixo (trie com top-K por nó) de /search/suggest.
+
+Uso: python scripts/benchmark_busca.py [--usuarios 200000] [--buscas 500]
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import normalizar_nome
+from app.services.search_service import NgramIndex, tokenizar
+from app.services.suggest_service import PrefixTrie
+
+PRENOMES = ["José", "Maria", "Ana", "João", "Antônio", "Francisco", "Carlos", "Paulo", "Pedro", "Lucas",
+            "Luiz", "Marcos", "Luís", "Gabriel", "Rafael", "Márcia", "Juliana", "Fernanda", "Patrícia", "Aline",
+            "Sandra", "Camila", "Amanda", "Bruna", "Jéssica", "Letícia", "Júlia", "Luciana", "Vanessa", "Mariana"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima",
+              "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes",
+              "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques",
+              "Machado", "Mendes", "Freitas", "Cardoso", "Ramos", "Gonçalves", "Santana", "Teixeira", "Conceição"]
+ROLES = ["patient"] * 9 + ["doctor", "nurse"]
+
+
+def gerar_nome(rng: random.Random) -> str:
+    sobrenomes = rng.sample(SOBRENOMES, rng.randint(1, 3))
+    # Sufixo aleatório para tornar os nomes mais distintos
+    sufixo = "".join(rng.choice("bcdfgklmnprstv") + rng.choice("aeiou") for _ in range(3))
+    return " ".join([rng.choice(PRENOMES), sufixo.capitalize()] + sobrenomes)
+
+
+def gerar_buscas(rng: random.Random, nomes: list, quantidade: int) -> list:
+    buscas = []
+    for _ in range(quantidade):
+        tokens = normalizar_nome(rng.choice(nomes)).split()
+        tipo = rng.random()
+        if tipo < 0.3:
+            buscas.append(tokens[1][:rng.randint(1, 4)])            # digitando (prefixo curto)
+        elif tipo < 0.6:
+            buscas.append(f"{tokens[0]} {tokens[1][:3]}")           # prenome + início do sobrenome
+        elif tipo < 0.8:
+            buscas.append(" ".join(tokens[:3]))                     # nome completo
+        else:
+            buscas.append(tokens[-1][1:5])                          # trecho do meio
+    return buscas
+
+
+def percentis(tempos: list) -> str:
+    tempos = sorted(tempos)
+    p = lambda q: tempos[min(int(len(tempos) * q), len(tempos) - 1)] * 1000
+    return f"p50 {p(0.50):8.3f}ms | p95 {p(0.95):8.3f}ms | p99 {p(0.99):8.3f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--usuarios", type=int, default=200000)
+    parser.add_argument("--buscas", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    nomes = [gerar_nome(rng) for _ in range(args.usuarios)]
+    normalizados = [normalizar_nome(n) for n in nomes]
+    roles = [rng.choice(ROLES) for _ in nomes]
+    buscas = gerar_buscas(rng, nomes, args.buscas)
+
+    inicio = time.perf_counter()
+    index = NgramIndex()
+    for user_id, (nome, role) in enumerate(zip(normalizados, roles), start=1):
+        index.upsert(user_id, nome, role, True)
+    print(f"Índice de n-gramas: {len(index):,} usuários em {time.perf_counter() - inicio:.1f}s")
+
+    tempos_linear = []
+    for termo in buscas[: max(args.buscas // 10, 10)]:
+        inicio = time.perf_counter()
+        alvo = normalizar_nome(termo)
+        _ = [i for i, (nome, role) in enumerate(zip(normalizados, roles)) if role == "patient" and alvo in nome]
+        tempos_linear.append(time.perf_counter() - inicio)
+
+    tempos_indice = []
+    for termo in buscas:
+        inicio = time.perf_counter()
+        index.search(tokenizar(termo), {"patient"}, True, 0, 20)
+        tempos_indice.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    trie = PrefixTrie()
+    for user_id, (nome, role) in enumerate(zip(normalizados, roles), start=1):
+        if role == "patient":
+            for token in dict.fromkeys(nome.split()):
+                trie.add(token, user_id)
+    construcao_trie = time.perf_counter() - inicio
+
+    tempos_sugestao = []
+    for termo in buscas:
+        prefixo = tokenizar(termo)[-1]
+        inicio = time.perf_counter()
+        trie.top(prefixo)[:10]
+        tempos_sugestao.append(time.perf_counter() - inicio)
+
+    print(f"varredura linear : {percentis(tempos_linear)}")
+    print(f"índice n-gramas  : {percentis(tempos_indice)}")
+    print(f"sugestões (trie) : {percentis(tempos_sugestao)} (construção {construcao_trie:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Relatório de bytes economizados pela compressão das respostas
+Gera payloads representativos (fila/listagem de consultas, página de pacientes,
+perfil do usuário) com os mesmos serializadores das rotas e mostra o tamanho
+original, com gzip e com brotli (se o pacote estiver instalado) nos níveis
+configurados, e o tempo de compressão de cada um.
+
+Uso: python scripts/benchmark_compressao.py [--linhas 500]
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+from typing import List
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.compressao import brotli, comprimir
+from app.core.config import settings
+from app.core.database import Base
+from app.core.responses import resposta_validada
+from app.models.models import Consulta, User, UserRole
+from app.routers.consultas import com_relacionamentos
+from app.schemas.patients import PatientResponse
+from app.schemas.schemas import ConsultaDetailResponse, Pagina, UserResponse
+from benchmark_serializacao import popular
+
+
+def payloads(db, linhas: int):
+    consultas = com_relacionamentos(db.query(Consulta)).order_by(Consulta.created_at.desc()).all()
+    pacientes = db.query(User).filter(User.role == UserRole.PATIENT).limit(100).all()
+    enfermeira = db.query(User).filter(User.role == UserRole.NURSE).first()
+    pagina = {"items": pacientes, "total": linhas, "skip": 0, "limit": 100}
+    return [
+        ("GET /users/me", resposta_validada(UserResponse, enfermeira).body),
+        ("GET /consultas/queue (20)", resposta_validada(List[ConsultaDetailResponse], consultas[:20]).body),
+        ("GET /patients/ (100)", resposta_validada(Pagina[PatientResponse], pagina).body),
+        (f"GET /consultas/ ({linhas})", resposta_validada(List[ConsultaDetailResponse], consultas).body),
+    ]
+
+
+def medir(corpo: bytes, codificacao: str):
+    inicio = time.perf_counter()
+    comprimido = comprimir(corpo, codificacao)
+    return len(comprimido), (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    popular(db, args.linhas)
+
+    codificacoes = ["gzip"] + (["br"] if brotli is not None else [])
+    print(f"limite: {settings.COMPRESSAO_MIN_BYTES} bytes, gzip nível {settings.COMPRESSAO_GZIP_NIVEL}, "
+          f"brotli qualidade {settings.COMPRESSAO_BROTLI_QUALIDADE}" + ("" if brotli else " (brotli não instalado)") + "\n")
+    total_original = {c: 0 for c in codificacoes}
+    total_enviado = {c: 0 for c in codificacoes}
+    for nome, corpo in payloads(db, args.linhas):
+        colunas = []
+        for codificacao in codificacoes:
+            if len(corpo) < settings.COMPRESSAO_MIN_BYTES:
+                tamanho, ms = len(corpo), 0.0
+            else:
+                tamanho, ms = medir(corpo, codificacao)
+            total_original[codificacao] += len(corpo)
+            total_enviado[codificacao] += tamanho
+            colunas.append(f"{codificacao}: {tamanho:8d} B ({1 - tamanho / len(corpo):5.1%} menos, {ms:6.2f} ms)")
+        print(f"{nome:26s} original: {len(corpo):8d} B   " + "   ".join(colunas))
+    for codificacao in codificacoes:
+        economia = total_original[codificacao] - total_enviado[codificacao]
+        print(f"\n{codificacao}: {economia} bytes economizados ({economia / total_original[codificacao]:.1%})", end="")
+    print()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
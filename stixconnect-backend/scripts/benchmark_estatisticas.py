@@ -0,0 +1,108 @@
+"""
+Benchmark de /admin/estatisticas
+Compara as consultas COUNT(*) originais (varredura com func.date(created_at))
+com a leitura dos contadores incrementais do EstatisticasService, e mede o
+custo de manter os contadores em cada commit.
+
+Uso: python scripts/benchmark_estatisticas.py [--consultas 200000]
+"""
+
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import func
+
+from app.core.database import Base, SessionLocal, engine
+from app.models.models import ClassificacaoUrgencia, Consulta, ConsultaStatus, ConsultaTipo, User, UserRole
+from app.services.estatisticas_service import estatisticas_service
+
+
+def popular(quantidade: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    paciente = User(nome="Paciente", email="p@bench", senha_hash="x", role=UserRole.PATIENT)
+    db.add(paciente)
+    db.commit()
+    rnd = random.Random(42)
+    agora = datetime.utcnow()
+    linhas = []
+    for _ in range(quantidade):
+        criada = agora - timedelta(minutes=rnd.randint(0, 60 * 24 * 365))
+        inicio = criada + timedelta(minutes=rnd.randint(1, 90)) if rnd.random() < 0.8 else None
+        linhas.append({
+            "paciente_id": paciente.id,
+            "tipo": ConsultaTipo.URGENTE,
+            "status": rnd.choice(list(ConsultaStatus)),
+            "classificacao_urgencia": rnd.choice(list(ClassificacaoUrgencia)),
+            "created_at": criada,
+            "data_inicio": inicio,
+            "data_fim": inicio + timedelta(minutes=rnd.randint(5, 60)) if inicio else None,
+        })
+    db.bulk_insert_mappings(Consulta, linhas)
+    db.commit()
+    db.close()
+
+
+def estatisticas_original(db):
+    hoje = datetime.utcnow().date()
+    total = db.query(func.count(Consulta.id)).scalar()
+    hoje_total = db.query(func.count(Consulta.id)).filter(func.date(Consulta.created_at) == hoje).scalar()
+    return {"total_consultas": total, "consultas_hoje": hoje_total}
+
+
+def medir(funcao, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--consultas", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"Populando {args.consultas} consultas...")
+    popular(args.consultas)
+    db = SessionLocal()
+
+    inicio = time.perf_counter()
+    resumo = estatisticas_service.resumo(db)
+    carga = (time.perf_counter() - inicio) * 1000
+    original = estatisticas_original(db)
+    assert original["total_consultas"] == resumo["total_consultas"]
+    assert original["consultas_hoje"] == resumo["consultas_hoje"]
+
+    t_original = medir(lambda: estatisticas_original(db), 5)
+    t_contadores = medir(lambda: estatisticas_service.resumo(db), 1000)
+
+    # Custo por commit de uma transição de status (com e sem os hooks)
+    ids = [i for (i,) in db.query(Consulta.id).limit(500)]
+
+    def transicoes():
+        for consulta_id in ids:
+            consulta = db.get(Consulta, consulta_id)
+            consulta.status = ConsultaStatus.FINALIZADA if consulta.status != ConsultaStatus.FINALIZADA else ConsultaStatus.EM_ATENDIMENTO
+            db.commit()
+
+    t_commit = medir(transicoes, 1) / len(ids)
+
+    print(f"\nCOUNT(*) + func.date(created_at) : {t_original:10.2f} ms/requisição")
+    print(f"contadores incrementais           : {t_contadores:10.4f} ms/requisição")
+    print(f"carga inicial dos contadores      : {carga:10.1f} ms (uma vez por processo)")
+    print(f"commit de transição (com hooks)   : {t_commit:10.3f} ms")
+    print(f"\nResumo: {resumo}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark do overhead do MetricsMiddleware
+Chama a aplicação ASGI diretamente (sem rede) com e sem instrumentação
+(middleware e eventos SQL do Engine), em:
+- /ping: rota assíncrona trivial (só o custo fixo, não representativa);
+- /itens/{id}: rota síncrona com um comando SQL cru;
+- /eu: rota autenticada típica (JWT + usuário via ORM, como get_current_user),
+  que é a referência do limite de 2%;
+e reporta o custo por requisição e o overhead relativo.
+
+Uso: python scripts/benchmark_metrics.py [--requisicoes 10000]
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from app.core.database import Base, SessionLocal, engine, get_db
+from app.core.metrics import MetricsMiddleware, _sql_fim, _sql_inicio
+from app.core.security import create_access_token, get_current_user
+from app.models.models import User, UserRole
+
+TOKEN = create_access_token({"sub": "bench@stixconnect.local"})
+
+
+def criar_app(com_metricas: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/itens/{item_id}")
+    def item(item_id: int):
+        db = SessionLocal()
+        try:
+            return {"id": item_id, "valor": db.execute(text("SELECT :v"), {"v": item_id}).scalar()}
+        finally:
+            db.close()
+
+    @app.get("/eu")
+    def eu(usuario: User = Depends(get_current_user), db=Depends(get_db)):
+        return {"id": usuario.id, "email": usuario.email, "nome": usuario.nome}
+
+    if com_metricas:
+        app.add_middleware(MetricsMiddleware, server_timing=False)
+    return app
+
+
+async def chamar(app, path: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {TOKEN}".encode())], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def medir(app, path: str, quantidade: int) -> float:
+    for _ in range(200):
+        await chamar(app, path)
+    inicio = time.perf_counter()
+    for _ in range(quantidade):
+        await chamar(app, path)
+    return (time.perf_counter() - inicio) / quantidade * 1e6
+
+
+def eventos_sql(ligados: bool):
+    for nome, funcao in (("before_cursor_execute", _sql_inicio), ("after_cursor_execute", _sql_fim)):
+        if ligados and not event.contains(Engine, nome, funcao):
+            event.listen(Engine, nome, funcao)
+        elif not ligados and event.contains(Engine, nome, funcao):
+            event.remove(Engine, nome, funcao)
+
+
+def popular():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if not db.query(User).filter(User.email == "bench@stixconnect.local").first():
+            db.add(User(email="bench@stixconnect.local", nome="Bench", senha_hash="x", role=UserRole.ADMIN))
+            db.commit()
+    finally:
+        db.close()
+
+
+async def main_async(quantidade: int):
+    popular()
+    sem, com = criar_app(False), criar_app(True)
+    print(f"{'rota':>14} | {'sem (µs/req)':>12} | {'com (µs/req)':>12} | {'overhead':>8}")
+    print("-" * 56)
+    for path in ("/ping", "/itens/7", "/eu"):
+        # Intercala as medições para reduzir o efeito de ruído da máquina
+        tempos_sem, tempos_com = [], []
+        for _ in range(10):
+            eventos_sql(False)
+            tempos_sem.append(await medir(sem, path, quantidade // 10))
+            eventos_sql(True)
+            tempos_com.append(await medir(com, path, quantidade // 10))
+        t_sem, t_com = min(tempos_sem), min(tempos_com)
+        print(f"{path:>14} | {t_sem:>12.1f} | {t_com:>12.1f} | {(t_com - t_sem) / t_sem * 100:>7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requisicoes", type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requisicoes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark da migração do banco legado
+Cria um banco legado de teste (SQLite com tb_usuario/tb_profile/tb_consultas/
+tb_triagem) e compara a migração original (fetchall + um SELECT por e-mail +
+objetos ORM) com o MigradorLegado (blocos, verificação IN por bloco, INSERT em
+lote e checkpoint). Também pode apontar para um MySQL de teste com --origem.
+
+Uso: python scripts/benchmark_migracao.py [--usuarios 50000] [--consultas 100000] [--bloco 5000]
+"""
+
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.models import Consulta, Triagem, User
+from app.services.migracao_legado import MigradorLegado, map_role
+
+PERFIS = ["Administrador", "Médico", "Enfermeiro", "Paciente"]
+
+
+def criar_legado(url: str, usuarios: int, consultas: int):
+    engine = create_engine(url)
+    rnd = random.Random(7)
+    agora = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for tabela in ("tb_triagem", "tb_consultas", "tb_usuario", "tb_profile"):
+            conn.execute(text(f"DROP TABLE IF EXISTS {tabela}"))
+        conn.execute(text("CREATE TABLE tb_profile (idProfile INTEGER PRIMARY KEY, nome VARCHAR(50), rota VARCHAR(50))"))
+        conn.execute(text(
+            "CREATE TABLE tb_usuario (id INTEGER PRIMARY KEY, nome VARCHAR(255), email VARCHAR(255), password VARCHAR(255),"
+            " codPerfil INTEGER, telefone VARCHAR(20), cpf VARCHAR(14), data_nascimento DATE, ativo INTEGER,"
+            " nroMatricula VARCHAR(50), created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE tb_consultas (id INTEGER PRIMARY KEY, paciente_id INTEGER, enfermeira_id INTEGER, medico_id INTEGER,"
+            " tipo VARCHAR(20), status VARCHAR(30), classificacao_urgencia VARCHAR(20), data_inicio DATETIME,"
+            " data_fim DATETIME, observacoes TEXT, created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE tb_triagem (id INTEGER PRIMARY KEY, consulta_id INTEGER, paciente_id INTEGER, sintomas TEXT,"
+            " temperatura VARCHAR(10), saturacao_oxigenio VARCHAR(10), pressao_arterial VARCHAR(20), created_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO tb_profile VALUES (:id, :nome, '/')"),
+                     [{"id": i + 1, "nome": nome} for i, nome in enumerate(PERFIS)])
+        conn.execute(text(
+            "INSERT INTO tb_usuario VALUES (:id, :nome, :email, 'hash', :perfil, NULL, :cpf, '1980-05-01', 1, NULL, :criado, :criado)"
+        ), [
+            {"id": i, "nome": f"Usuário {i}", "email": f"u{i}@legado" if i % 1000 else f"u{i - 1}@legado",
+             "perfil": rnd.randint(1, 4), "cpf": f"{i:011d}", "criado": agora - timedelta(days=i % 900)}
+            for i in range(1, usuarios + 1)
+        ])
+        conn.execute(text(
+            "INSERT INTO tb_consultas VALUES (:id, :paciente, NULL, NULL, 'urgente', :status, 'media', :inicio, :fim, NULL, :criado)"
+        ), [
+            {"id": i, "paciente": rnd.randint(1, usuarios - 1), "status": rnd.choice(["finalizada", "cancelada", "aguardando"]),
+             "criado": agora - timedelta(minutes=i), "inicio": agora - timedelta(minutes=i - 10),
+             "fim": agora - timedelta(minutes=i - 40)}
+            for i in range(1, consultas + 1)
+        ])
+        conn.execute(text(
+            "INSERT INTO tb_triagem VALUES (:id, :id, 1, 'febre', '38,5', '95%', '120/80', :criado)"
+        ), [{"id": i, "criado": agora} for i in range(1, consultas + 1, 2)])
+    return engine
+
+
+def migracao_original(origem, destino) -> float:
+    """fetchall + SELECT por e-mail + ORM, como em scripts/migrate_data.py (apenas usuários)"""
+    Sessao = sessionmaker(bind=destino)
+    db = Sessao()
+    inicio = time.perf_counter()
+    with origem.connect() as conn:
+        linhas = conn.execute(text(
+            "SELECT u.*, p.nome AS nomePerfil FROM tb_usuario u LEFT JOIN tb_profile p ON p.idProfile = u.codPerfil ORDER BY u.id"
+        )).mappings().fetchall()
+    for row in linhas:
+        if db.query(User).filter(User.email == row["email"]).first():
+            continue
+        db.add(User(id=row["id"], nome=row["nome"], email=row["email"], senha_hash=row["password"],
+                    role=map_role(row["codPerfil"], row["nomePerfil"]), cpf=row["cpf"],
+                    data_nascimento=datetime.fromisoformat(row["data_nascimento"])))
+        db.flush()
+    db.commit()
+    db.close()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--usuarios", type=int, default=50000)
+    parser.add_argument("--consultas", type=int, default=100000)
+    parser.add_argument("--bloco", type=int, default=5000)
+    parser.add_argument("--origem", help="URL de um banco legado de teste (padrão: SQLite temporário)")
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    origem_url = args.origem or f"sqlite:///{pasta}/legado.db"
+    print(f"Criando legado de teste: {args.usuarios} usuários, {args.consultas} consultas...")
+    origem = criar_legado(origem_url, args.usuarios, args.consultas)
+
+    destino_original = create_engine(f"sqlite:///{pasta}/original.db")
+    Base.metadata.create_all(bind=destino_original)
+    t_original = migracao_original(origem, destino_original)
+
+    destino = create_engine(f"sqlite:///{pasta}/novo.db")
+    Base.metadata.create_all(bind=destino)
+    checkpoint = f"{pasta}/checkpoint.json"
+    inicio = time.perf_counter()
+    relatorio = MigradorLegado(origem, destino, args.bloco, checkpoint).executar()
+    t_novo = time.perf_counter() - inicio
+
+    with destino.connect() as conn:
+        contagens = {m.__tablename__: conn.scalar(func.count().select().select_from(m.__table__)) for m in (User, Consulta, Triagem)}
+    with destino_original.connect() as conn:
+        usuarios_original = conn.scalar(func.count().select().select_from(User.__table__))
+    assert contagens["users"] == usuarios_original, (contagens, usuarios_original)
+
+    # Nova execução com o mesmo checkpoint: nada a reler
+    retomada = MigradorLegado(origem, destino, args.bloco, checkpoint).executar()
+    assert all(r["lidas"] == 0 for r in retomada.values()), retomada
+
+    print(f"\noriginal (só usuários)       : {t_original:8.2f} s  ({args.usuarios / t_original:10.0f} linhas/s)")
+    total = sum(r["lidas"] for r in relatorio.values())
+    print(f"MigradorLegado (3 tabelas)   : {t_novo:8.2f} s  ({total / t_novo:10.0f} linhas/s)")
+    for nome, dados in relatorio.items():
+        print(f"  {nome:10s} {dados}")
+    print(f"Linhas gravadas: {contagens}")
+
+
+if __name__ == "__main__":
+    main()
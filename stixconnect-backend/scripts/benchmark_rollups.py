@@ -0,0 +1,104 @@
+"""
+Benchmark dos rollups horários de tempos de consulta
+Popula consultas encerradas ao longo de N dias e compara, para os percentis
+de espera/duração dos últimos 30 dias:
+- cálculo direto (lê as linhas de consultas e ordena)
+- mesclagem dos DDSketches dos rollups horários
+Também mede o backfill inicial do job e o erro relativo dos percentis.
+
+Uso: python scripts/benchmark_rollups.py [--consultas 200000] [--dias 90]
+"""
+
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app.core.database import Base, SessionLocal, engine
+from app.models.models import ClassificacaoUrgencia, Consulta, ConsultaStatus, ConsultaTipo, User, UserRole
+from app.services.rollup_service import rollup_service
+
+
+def popular(quantidade: int, dias: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    paciente = User(nome="Paciente", email="p@bench", senha_hash="x", role=UserRole.PATIENT)
+    medico = User(nome="Médico", email="m@bench", senha_hash="x", role=UserRole.DOCTOR)
+    db.add_all([paciente, medico])
+    db.commit()
+    rnd = random.Random(42)
+    agora = datetime.utcnow()
+    linhas = []
+    for _ in range(quantidade):
+        criada = agora - timedelta(minutes=rnd.randint(120, 60 * 24 * dias))
+        inicio = criada + timedelta(seconds=rnd.lognormvariate(6, 1))
+        linhas.append({
+            "paciente_id": paciente.id,
+            "medico_id": medico.id if rnd.random() < 0.6 else None,
+            "tipo": ConsultaTipo.URGENTE,
+            "status": ConsultaStatus.FINALIZADA,
+            "classificacao_urgencia": rnd.choice(list(ClassificacaoUrgencia)),
+            "created_at": criada,
+            "data_inicio": inicio,
+            "data_fim": inicio + timedelta(minutes=rnd.uniform(5, 60)),
+        })
+    db.bulk_insert_mappings(Consulta, linhas)
+    db.commit()
+    db.close()
+
+
+def percentis_diretos(db, inicio, fim):
+    rows = db.query(Consulta.created_at, Consulta.data_inicio, Consulta.data_fim).filter(
+        Consulta.data_fim >= inicio, Consulta.data_fim < fim
+    ).all()
+    esperas = sorted((i - c).total_seconds() / 60 for c, i, _ in rows)
+    duracoes = sorted((f - i).total_seconds() / 60 for _, i, f in rows)
+    pct = lambda v, q: v[int(q * (len(v) - 1))]
+    return {q: (pct(esperas, q), pct(duracoes, q)) for q in (0.5, 0.9, 0.95, 0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--consultas", type=int, default=200000)
+    parser.add_argument("--dias", type=int, default=90)
+    args = parser.parse_args()
+
+    print(f"Populando {args.consultas} consultas em {args.dias} dias...")
+    popular(args.consultas, args.dias)
+    db = SessionLocal()
+
+    t0 = time.perf_counter()
+    resultado = rollup_service.executar(db)
+    backfill = time.perf_counter() - t0
+
+    fim = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    inicio = fim - timedelta(days=30)
+
+    t0 = time.perf_counter()
+    diretos = percentis_diretos(db, inicio, fim)
+    t_direto = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    for _ in range(5):
+        rollup = rollup_service.consultar(db, inicio, fim)[0]
+    t_rollup = (time.perf_counter() - t0) / 5 * 1000
+
+    print(f"\nbackfill do job: {backfill:.1f}s ({resultado['horas']} horas, {resultado['buckets']} buckets)")
+    print(f"percentis de 30 dias, leitura das linhas : {t_direto:8.1f} ms")
+    print(f"percentis de 30 dias, mescla de rollups  : {t_rollup:8.1f} ms")
+    print(f"\n{'quantil':>8} | {'espera real':>11} | {'rollup':>8} | {'duração real':>12} | {'rollup':>8}")
+    for q, (espera, duracao) in diretos.items():
+        p = f"p{int(q * 100)}_minutos"
+        print(f"{q:>8} | {espera:>11.2f} | {rollup['espera'][p]:>8.1f} | {duracao:>12.2f} | {rollup['duracao'][p]:>8.1f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
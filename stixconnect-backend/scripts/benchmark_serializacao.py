@@ -0,0 +1,112 @@
+"""
+Benchmark de serialização das listagens
+Cria N consultas (com paciente, equipe e triagem) e N pacientes em um SQLite
+temporário e mede o tempo de CPU por resposta de cada listagem em dois
+caminhos:
+- padrão do FastAPI: retorno ORM -> serialize_response (validação contra o
+  response_model + jsonable_encoder) -> JSONResponse (json.dumps);
+- resposta_validada: uma validação com TypeAdapter + dump_json no pydantic-core.
+As duas saídas são comparadas para garantir o mesmo JSON.
+
+Uso: python scripts/benchmark_serializacao.py [--linhas 500] [--repeticoes 30]
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.core.responses import resposta_validada
+from app.models.models import Consulta, ConsultaStatus, ConsultaTipo, Triagem, User, UserRole
+from app.routers.consultas import com_relacionamentos
+from app.schemas.patients import PatientResponse
+from app.schemas.schemas import ConsultaDetailResponse, Pagina
+
+
+def popular(db, linhas: int):
+    agora = datetime(2026, 1, 1)
+    enfermeira = User(nome="Enf Ana", email="n@x.com", senha_hash="x", role=UserRole.NURSE)
+    medico = User(nome="Dr João", email="d@x.com", senha_hash="x", role=UserRole.DOCTOR, crm="123", especialidade="Clínica")
+    db.add_all([enfermeira, medico])
+    pacientes = [
+        User(nome=f"Paciente {i}", email=f"p{i}@x.com", senha_hash="x", role=UserRole.PATIENT,
+             cpf=f"{i:011d}", telefone="11999990000", endereco="Rua A, 10", num_prontuario=f"STIX-{i:06d}")
+        for i in range(linhas)
+    ]
+    db.add_all(pacientes)
+    db.flush()
+    for i, paciente in enumerate(pacientes):
+        consulta = Consulta(
+            paciente_id=paciente.id, enfermeira_id=enfermeira.id, medico_id=medico.id,
+            tipo=ConsultaTipo.URGENTE, status=ConsultaStatus.FINALIZADA,
+            created_at=agora - timedelta(minutes=i), data_inicio=agora, data_fim=agora + timedelta(minutes=20),
+            observacoes="Paciente orientado", diagnostico="Gripe",
+        )
+        db.add(consulta)
+        db.flush()
+        db.add(Triagem(consulta_id=consulta.id, paciente_id=paciente.id, sintomas="febre e tosse",
+                       temperatura="38,2", saturacao_oxigenio="96%", pressao_arterial="120/80"))
+    db.commit()
+
+
+def caminho_padrao(tipo, dados) -> bytes:
+    campo = create_response_field(name="Response", type_=tipo)
+    conteudo = asyncio.run(serialize_response(field=campo, response_content=dados, is_coroutine=False))
+    return JSONResponse(conteudo).body
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Tempo de CPU médio (ms) por resposta"""
+    funcao()  # aquecimento (cache do TypeAdapter / response field)
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.process_time() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=500)
+    parser.add_argument("--repeticoes", type=int, default=30)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    popular(db, args.linhas)
+
+    consultas = com_relacionamentos(db.query(Consulta)).order_by(Consulta.created_at.desc()).all()
+    pacientes = db.query(User).filter(User.role == UserRole.PATIENT).all()
+    casos = [
+        ("GET /consultas/", List[ConsultaDetailResponse], consultas),
+        ("GET /patients/", Pagina[PatientResponse],
+         {"items": pacientes, "total": len(pacientes), "skip": 0, "limit": len(pacientes)}),
+    ]
+
+    print(f"{args.linhas} linhas por resposta, {args.repeticoes} repetições (CPU por resposta)\n")
+    for nome, tipo, dados in casos:
+        assert json.loads(caminho_padrao(tipo, dados)) == json.loads(resposta_validada(tipo, dados).body), nome
+        t_padrao = medir(lambda: caminho_padrao(tipo, dados), args.repeticoes)
+        t_novo = medir(lambda: resposta_validada(tipo, dados).body, args.repeticoes)
+        print(f"{nome:18s} padrão: {t_padrao:8.2f} ms   resposta_validada: {t_novo:8.2f} ms   ({t_padrao / t_novo:4.1f}x)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark de inicialização (cold start)
+Mede, em processos novos:
+- tempo de import de app.main (python -X importtime), com os módulos mais caros
+- tempo até a primeira resposta (interpretador + import + lifespan + GET /health/ready)
+
+Os resultados podem ser comparados com a linha de base versionada em
+scripts/startup_baseline.json.
+
+Uso: python scripts/benchmark_startup.py [--execucoes 5] [--salvar] [--comparar]
+"""
+
+import sys
+import os
+import argparse
+import json
+import statistics
+import subprocess
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(RAIZ, "scripts", "startup_baseline.json")
+
+# Bibliotecas que não devem ser carregadas na inicialização
+IMPORTS_TARDIOS = ["boto3", "botocore", "requests", "numpy", "PIL", "pypdfium2", "pydicom"]
+
+PRIMEIRA_REQUISICAO = """
+import time
+inicio = time.perf_counter()
+from app.main import app
+importado = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    iniciado = time.perf_counter()
+    response = client.get("/health/ready")
+    respondido = time.perf_counter()
+print(response.status_code, importado - inicio, iniciado - importado, respondido - iniciado)
+"""
+
+
+def ambiente(tmpdir: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = RAIZ
+    env["DATABASE_URL"] = f"sqlite:///{tmpdir}/startup.db"
+    env["PREVIEW_ENABLED"] = "false"
+    return env
+
+
+def medir_importtime(env: dict):
+    """(total em ms, [(módulo, ms acumulado)], módulos tardios carregados)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    modulos = []
+    for linha in result.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        partes = linha.split("|")
+        try:
+            acumulado = int(partes[1].strip())
+        except ValueError:
+            continue
+        nome = partes[2]
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        modulos.append((nome.strip(), acumulado / 1000, profundidade))
+
+    total = next(ms for nome, ms, _ in modulos if nome == "app.main")
+    nivel_1 = sorted(((n, ms) for n, ms, p in modulos if p == 1), key=lambda m: -m[1])
+    carregados = sorted({n.split(".")[0] for n, _, _ in modulos} & set(IMPORTS_TARDIOS))
+    return total, nivel_1, carregados
+
+
+def medir_primeira_requisicao(env: dict):
+    """(status, interpretador+import+lifespan+requisição em ms, import, lifespan, requisição)"""
+    inicio = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PRIMEIRA_REQUISICAO],
+        env=env, cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    total = (time.perf_counter() - inicio) * 1000
+    status, importado, iniciado, respondido = result.stdout.split()[-4:]
+    return int(status), total, float(importado) * 1000, float(iniciado) * 1000, float(respondido) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--execucoes", type=int, default=5)
+    parser.add_argument("--salvar", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--comparar", action="store_true", help="compara com a linha de base versionada")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = ambiente(tmpdir)
+        imports = [medir_importtime(env) for _ in range(args.execucoes)]
+        requisicoes = [medir_primeira_requisicao(env) for _ in range(args.execucoes)]
+
+    resultado = {
+        "import_app_main_ms": round(statistics.median(t for t, _, _ in imports), 1),
+        "primeira_requisicao_ms": round(statistics.median(r[1] for r in requisicoes), 1),
+        "lifespan_ms": round(statistics.median(r[3] for r in requisicoes), 1),
+        "status_ready": requisicoes[-1][0],
+        "imports_tardios_carregados": imports[-1][2],
+    }
+
+    print(f"import app.main        : {resultado['import_app_main_ms']:8.1f} ms (mediana de {args.execucoes})")
+    print(f"até a 1ª resposta      : {resultado['primeira_requisicao_ms']:8.1f} ms (processo novo)")
+    print(f"lifespan (startup)     : {resultado['lifespan_ms']:8.1f} ms")
+    print(f"/health/ready          : {resultado['status_ready']}")
+    print(f"imports tardios no boot: {', '.join(resultado['imports_tardios_carregados']) or 'nenhum'}")
+    print("\nMódulos mais caros importados por app.main:")
+    for nome, ms in imports[-1][1][:10]:
+        print(f"  {ms:8.1f} ms  {nome}")
+
+    if args.comparar and os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        print("\nComparação com a linha de base:")
+        for chave in ("import_app_main_ms", "primeira_requisicao_ms"):
+            variacao = (resultado[chave] - baseline[chave]) / baseline[chave] * 100
+            print(f"  {chave}: {baseline[chave]} -> {resultado[chave]} ({variacao:+.0f}%)")
+
+    if args.salvar:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nLinha de base salva em {BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark da classificação de urgência por palavras-chave
+Compara a busca antiga (um `in` por palavra-chave) com o KeywordMatcher
+compilado, para listas de 10, 100 e 1000 palavras-chave, e a classificação
+individual com a classificação em lote (classificar_lote) com as regras padrão.
+
+Uso: python scripts/benchmark_triagem.py [--textos 5000] [--lote 100000]
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.triagem_service import TriagemService, get_keyword_matcher
+
+SILABAS = ["ca", "de", "fi", "go", "lu", "ma", "ne", "pi", "ro", "sa", "te", "vo", "bra", "cre", "dis", "ção", "ões", "ên"]
+PALAVRAS_COMUNS = ["paciente", "relata", "desde", "ontem", "com", "sem", "melhora", "piora", "forte", "leve", "noite", "dia"]
+
+
+def gerar_termo(rng: random.Random) -> str:
+    palavras = rng.randint(1, 3)
+    return " ".join("".join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4))) for _ in range(palavras))
+
+
+def gerar_regras(rng: random.Random, total: int) -> dict:
+    termos = set()
+    while len(termos) < total:
+        termos.add(gerar_termo(rng))
+    termos = sorted(termos)
+    corte = total // 3
+    return {"critico": termos[:corte], "alto": termos[corte:]}
+
+
+def gerar_textos(rng: random.Random, regras: dict, quantidade: int) -> list:
+    todos = regras["critico"] + regras["alto"]
+    textos = []
+    for _ in range(quantidade):
+        palavras = [rng.choice(PALAVRAS_COMUNS) for _ in range(rng.randint(15, 40))]
+        # ~30% dos textos contêm alguma palavra-chave
+        if rng.random() < 0.3:
+            palavras.insert(rng.randrange(len(palavras)), rng.choice(todos))
+        textos.append(" ".join(palavras).capitalize())
+    return textos
+
+
+def classificar_ingenuo(regras: dict, texto: str) -> int:
+    """Implementação anterior: lower() + substring para cada palavra-chave"""
+    texto = texto.lower()
+    for termo in regras["critico"]:
+        if termo in texto:
+            return 3
+    return sum(2 for termo in regras["alto"] if termo in texto)
+
+
+def medir(func, textos) -> float:
+    inicio = time.perf_counter()
+    for texto in textos:
+        func(texto)
+    return len(textos) / (time.perf_counter() - inicio)
+
+
+def medir_lote(rng: random.Random, quantidade: int):
+    matcher = get_keyword_matcher()
+    termos = list(matcher.term_category)
+    sintomas = gerar_textos(rng, {"critico": termos, "alto": []}, quantidade)
+    temperaturas = [rng.choice([None, "36,5", "38.7", "39,8", "x"]) for _ in range(quantidade)]
+    saturacoes = [rng.choice([None, "88%", "93", "98%"]) for _ in range(quantidade)]
+    dores = [rng.choice([None, 0, 5, 7, 9]) for _ in range(quantidade)]
+
+    inicio = time.perf_counter()
+    individual = [
+        TriagemService.classificar_urgencia(s, d, t, o, matcher=matcher)
+        for s, t, o, d in zip(sintomas, temperaturas, saturacoes, dores)
+    ]
+    tempo_individual = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    lote = TriagemService.classificar_lote(sintomas, temperaturas, saturacoes, dores, matcher=matcher)
+    tempo_lote = time.perf_counter() - inicio
+
+    assert lote == individual, "classificar_lote divergiu de classificar_urgencia"
+    print(f"\nLote de {quantidade:,} formulários: individual {tempo_individual:.2f}s | lote {tempo_lote:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--textos", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'palavras-chave':>15} | {'ingênuo (cls/s)':>16} | {'compilado (cls/s)':>18} | {'compilação (ms)':>15}")
+    print("-" * 74)
+    for total in (10, 100, 1000):
+        regras = gerar_regras(rng, total)
+        textos = gerar_textos(rng, regras, args.textos)
+
+        inicio = time.perf_counter()
+        matcher = KeywordMatcher(regras)
+        compilacao_ms = (time.perf_counter() - inicio) * 1000
+
+        ingenuo = medir(lambda t: classificar_ingenuo(regras, t), textos)
+        compilado = medir(lambda t: TriagemService.classificar_urgencia(t, matcher=matcher), textos)
+        print(f"{total:>15} | {ingenuo:>16,.0f} | {compilado:>18,.0f} | {compilacao_ms:>15.1f}")
+
+    if args.lote:
+        medir_lote(rng, args.lote)
+
+
+if __name__ == "__main__":
+    main()
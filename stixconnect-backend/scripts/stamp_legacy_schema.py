@@ -0,0 +1,49 @@
+"""
+Script para marcar no Alembic um banco criado pelo create_all antigo
+Bancos criados na importação do app não têm a tabela alembic_version; sem a
+marcação, `alembic upgrade head` tenta recriar as tabelas base e falha.
+Detecta até qual revisão o schema legado chegou (000_base, 001 ou
+002_add_availability_fields) e roda `alembic stamp` nela, para que o
+upgrade aplique só as migrations seguintes (003 em diante, com os backfills).
+Não faz nada em banco vazio ou já versionado.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from app.core.config import settings
+
+
+def revisao_legada(inspetor):
+    """Revisão equivalente ao schema legado, ou None se não houver o que marcar."""
+    if inspetor.has_table("alembic_version") or not inspetor.has_table("users"):
+        return None
+    colunas = {coluna["name"] for coluna in inspetor.get_columns("users")}
+    if "disponibilidade" in colunas:
+        return "002_add_availability_fields"
+    if "refresh_token" in colunas:
+        return "001"
+    return "000_base"
+
+
+def main():
+    engine = create_engine(settings.DATABASE_URL)
+    try:
+        revisao = revisao_legada(inspect(engine))
+    finally:
+        engine.dispose()
+    if revisao is None:
+        return
+    print(f"[INFO] Schema legado sem alembic_version; marcando revisão {revisao}")
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command.stamp(Config(os.path.join(raiz, "alembic.ini")), revisao)
+
+
+if __name__ == "__main__":
+    main()
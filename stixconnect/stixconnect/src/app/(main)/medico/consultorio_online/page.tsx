@@ -16,6 +16,34 @@ function ConsultorioContent() {
     const [zoomUrl, setZoomUrl] = useState<string | null>(null);
 
     useEffect(() => {
+        let cancelado = false;
+        let tentativa: ReturnType<typeof setTimeout> | undefined;
+
+        // A reunião Zoom é criada em segundo plano: consulta de novo até ela aparecer
+        function aguardarZoom(id: number, restantes: number) {
+            if (cancelado) return;
+            if (restantes <= 0) {
+                setError("Reunião Zoom ainda não foi criada para esta consulta.");
+                return;
+            }
+            setError("Reunião Zoom sendo criada, aguarde...");
+            tentativa = setTimeout(async () => {
+                try {
+                    const data = await consultationService.getConsultationById(id);
+                    if (cancelado) return;
+                    if (data.zoom_join_url) {
+                        setConsulta(data);
+                        setZoomUrl(data.zoom_join_url);
+                        setError(null);
+                        return;
+                    }
+                } catch (err) {
+                    console.error("Erro ao verificar reunião Zoom:", err);
+                }
+                aguardarZoom(id, restantes - 1);
+            }, 3000);
+        }
+
         async function loadConsulta() {
             try {
                 setLoading(true);
@@ -28,7 +56,7 @@ function ConsultorioContent() {
                     if (data.zoom_join_url) {
                         setZoomUrl(data.zoom_join_url);
                     } else {
-                        setError("Reunião Zoom ainda não foi criada para esta consulta.");
+                        aguardarZoom(data.id, 20);
                     }
                 } else {
                     // Se não tiver ID, buscar consultas ativas do médico
@@ -45,7 +73,7 @@ function ConsultorioContent() {
                         if (consultaAtiva.zoom_join_url) {
                             setZoomUrl(consultaAtiva.zoom_join_url);
                         } else {
-                            setError("Reunião Zoom ainda não foi criada para esta consulta.");
+                            aguardarZoom(consultaAtiva.id, 20);
                         }
                     } else {
                         setError("Nenhuma consulta ativa encontrada. Aguarde o enfermeiro encaminhar um paciente.");
@@ -60,6 +88,10 @@ function ConsultorioContent() {
         }
 
         loadConsulta();
+        return () => {
+            cancelado = true;
+            clearTimeout(tentativa);
+        };
     }, [consultaId]);
 
     const cards = [